@@ -0,0 +1,63 @@
+"""
+Benchmark kernel launches in the CUDA simulator, which has to be enabled
+before numba is imported, hence the subprocesses.  The Python version uses
+the default simulator, the Numba version its fast mode (NUMBA_CUDASIM_FAST).
+
+When run as a script, also report the number of simulated launches per
+second in each mode.
+"""
+from __future__ import absolute_import, print_function, division
+
+import os
+import subprocess
+import sys
+
+from numba.utils import benchmark
+
+
+code = """if 1:
+    import time
+    import numpy as np
+    from numba import cuda
+
+    @cuda.jit
+    def saxpy(a, x, y, out):
+        i = cuda.grid(1)
+        if i < out.size:
+            out[i] = a * x[i] + y[i]
+
+    n = 256
+    x = cuda.to_device(np.arange(n, dtype=np.float32))
+    y = cuda.to_device(np.ones(n, dtype=np.float32))
+    out = cuda.device_array_like(x)
+    nlaunches = %d
+    t = time.time()
+    for i in range(nlaunches):
+        saxpy[4, 64](2.0, x, y, out)
+    out.copy_to_host()
+    print(nlaunches / (time.time() - t))
+    """
+
+
+def run_simulator(fast, nlaunches=5):
+    env = dict(os.environ, NUMBA_ENABLE_CUDASIM='1',
+               NUMBA_CUDASIM_FAST=str(int(fast)))
+    out = subprocess.check_output([sys.executable, '-c', code % nlaunches],
+                                  env=env)
+    return float(out)
+
+
+def python_main():
+    run_simulator(False)
+
+
+def numba_main():
+    run_simulator(True)
+
+
+if __name__ == '__main__':
+    print(benchmark(python_main))
+    print(benchmark(numba_main))
+    for name, fast in [("default", False), ("fast", True)]:
+        print("launches per second (%s): %.1f"
+              % (name, run_simulator(fast, nlaunches=50)))
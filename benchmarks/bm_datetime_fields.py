@@ -0,0 +1,59 @@
+"""
+Benchmark calendar field extraction and rounding over a datetime64 array,
+as used for bucketing time series.  The Python version uses pandas'
+accessors if available, the numpy reference implementation otherwise.
+"""
+from __future__ import absolute_import, print_function, division
+
+import numpy as np
+from numba import jit, npdatetime
+from numba.utils import benchmark
+
+try:
+    import pandas
+except ImportError:
+    pandas = None
+
+
+def bucket_counts(arr):
+    # Count timestamps per (day of week, hour) bucket
+    counts = np.zeros((7, 24), np.int64)
+    for i in range(arr.shape[0]):
+        wd = npdatetime.weekday(arr[i])
+        h = npdatetime.hour(arr[i])
+        if wd >= 0:
+            counts[wd, h] += 1
+    return counts
+
+
+def floor_minutes(arr):
+    return npdatetime.floor(arr, np.timedelta64(15, 'm'))
+
+
+numba_bucket_counts = jit(nopython=True)(bucket_counts)
+numba_floor_minutes = jit(nopython=True)(floor_minutes)
+
+arr = (np.datetime64('2015-01-01T00:00:00', 'ns')
+       + np.arange(0, 10**6) * np.timedelta64(61, 's'))
+
+
+def python_main():
+    if pandas is not None:
+        index = pandas.DatetimeIndex(arr)
+        counts = np.zeros((7, 24), np.int64)
+        np.add.at(counts, (index.weekday, index.hour), 1)
+        index.floor('15min')
+    else:
+        counts = np.zeros((7, 24), np.int64)
+        np.add.at(counts, (npdatetime.weekday(arr), npdatetime.hour(arr)), 1)
+        floor_minutes(arr)
+
+
+def numba_main():
+    numba_bucket_counts(arr)
+    numba_floor_minutes(arr)
+
+
+if __name__ == '__main__':
+    print(benchmark(python_main))
+    print(benchmark(numba_main))
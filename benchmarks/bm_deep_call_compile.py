@@ -0,0 +1,72 @@
+"""
+Benchmark the compilation of a deep chain of jitted functions, each one
+calling the previous one.  The Python version links the callees' code
+into each caller, the Numba version resolves calls by symbol lookup
+(NUMBA_LINK_BY_SYMBOL).
+
+When run as a script, also report the compilation time for several
+chain depths.
+"""
+from __future__ import absolute_import, print_function, division
+
+import time
+
+from numba import config, jit
+from numba.utils import benchmark
+
+
+def make_chain(depth):
+    """
+    Return the last of *depth* jitted functions, each one calling
+    the previous one.
+    """
+    callee = None
+    for i in range(depth):
+        ns = {'callee': callee}
+        lines = ["def f(x):",
+                 "    s = 0.0",
+                 "    for i in range(x.size):",
+                 "        y = x[i] * %d.5" % i,
+                 "        if y > 1.0:",
+                 "            s += y * y - 1.0",
+                 "        else:",
+                 "            s -= y / 3.0",
+                 ]
+        if callee is not None:
+            lines.append("    s += callee(x)")
+        lines.append("    return s")
+        exec("\n".join(lines), ns)
+        callee = jit(nopython=True)(ns['f'])
+    return callee
+
+
+def compile_chain(depth, link_by_symbol):
+    """
+    Compile a chain of *depth* functions, and return the time taken.
+    """
+    old = config.LINK_BY_SYMBOL
+    config.LINK_BY_SYMBOL = link_by_symbol
+    try:
+        func = make_chain(depth)
+        t0 = time.time()
+        func.compile("(float64[:],)")
+        return time.time() - t0
+    finally:
+        config.LINK_BY_SYMBOL = old
+
+
+def python_main():
+    compile_chain(30, False)
+
+
+def numba_main():
+    compile_chain(30, True)
+
+
+if __name__ == '__main__':
+    print(benchmark(python_main))
+    print(benchmark(numba_main))
+    for depth in (10, 20, 40, 80):
+        print("depth %3d: linked %.3f s   by symbol %.3f s"
+              % (depth, compile_chain(depth, False),
+                 compile_chain(depth, True)))
@@ -0,0 +1,70 @@
+"""
+Benchmark floating-point reductions compiled with and without the
+``fastmath`` option.  The Python version runs the strict IEEE 754
+functions, the Numba version lets LLVM reassociate and vectorize them.
+
+When run as a script, also report the time of each function at several
+optimization levels.
+"""
+from __future__ import absolute_import, print_function, division
+
+import timeit
+
+import numpy as np
+from numba import njit
+from numba.utils import benchmark
+
+
+def array_sum(a):
+    s = 0.0
+    for i in range(a.size):
+        s += a[i]
+    return s
+
+def array_dot(a, b):
+    s = 0.0
+    for i in range(a.size):
+        s += a[i] * b[i]
+    return s
+
+strict_sum = njit(array_sum)
+strict_dot = njit(array_dot)
+fast_sum = njit(fastmath=True)(array_sum)
+fast_dot = njit(fastmath=True)(array_dot)
+
+x = np.linspace(0, 1, 10**6)
+y = np.linspace(1, 2, 10**6)
+
+
+def run(sum_func, dot_func):
+    for i in range(20):
+        sum_func(x)
+        dot_func(x, y)
+
+
+def python_main():
+    run(strict_sum, strict_dot)
+
+
+def numba_main():
+    run(fast_sum, fast_dot)
+
+
+def measure(fn, *args):
+    """
+    Return the best time of a call of *fn* on *args*.
+    """
+    fn(*args)
+    return min(timeit.Timer(lambda: fn(*args)).repeat(repeat=5, number=10)) / 10
+
+
+if __name__ == '__main__':
+    print(benchmark(python_main))
+    print(benchmark(numba_main))
+    for opt in (1, 2, 3):
+        for fastmath in (False, True):
+            sum_func = njit(opt=opt, fastmath=fastmath)(array_sum)
+            dot_func = njit(opt=opt, fastmath=fastmath)(array_dot)
+            print("opt=%d fastmath=%-5s  sum %8.3f ms   dot %8.3f ms"
+                  % (opt, fastmath, measure(sum_func, x) * 1e3,
+                     measure(dot_func, x, y) * 1e3))
@@ -0,0 +1,59 @@
+"""
+Benchmark the latency of the first compilation in a fresh interpreter,
+which includes creating the CPU typing and target contexts.  The Python
+version runs the same function uncompiled.
+
+When run as a script, also report the peak resident memory of the
+process after the first compilation (on Unix).
+"""
+from __future__ import absolute_import, print_function, division
+
+import subprocess
+import sys
+
+from numba.utils import benchmark
+
+
+code = """if 1:
+    import numpy as np
+    from numba import jit
+
+    def sum2d(arr):
+        s = 0.0
+        for i in range(arr.shape[0]):
+            for j in range(arr.shape[1]):
+                s += arr[i, j]
+        return s
+
+    arr = np.arange(6.0).reshape(2, 3)
+    %s(arr)
+    %s
+    """
+
+report_memory = """
+    import resource
+    print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+    """
+
+
+def run_python(*args):
+    return subprocess.check_output([sys.executable, '-c', code % args])
+
+
+def python_main():
+    run_python("sum2d", "")
+
+
+def numba_main():
+    run_python("jit(nopython=True)(sum2d)", "")
+
+
+if __name__ == '__main__':
+    print(benchmark(python_main))
+    print(benchmark(numba_main))
+    if sys.platform != 'win32':
+        for name, func in [("python", "sum2d"),
+                           ("numba", "jit(nopython=True)(sum2d)")]:
+            # ru_maxrss is in kilobytes on Linux, bytes on OS X
+            maxrss = int(run_python(func, report_memory))
+            print("peak RSS (%s): %d" % (name, maxrss))
@@ -0,0 +1,60 @@
+"""
+Benchmark the time taken by "import numba" in a fresh interpreter,
+compared to "import numpy" (which numba needs anyway).
+
+When run as a script, also report the cumulative import time of numba
+and of its slowest submodules, as measured by "python -X importtime"
+(Python 3.7+).
+"""
+from __future__ import absolute_import, print_function, division
+
+import subprocess
+import sys
+
+from numba.utils import benchmark
+
+
+def run_python(code, *options):
+    subprocess.check_call([sys.executable] + list(options) + ['-c', code])
+
+
+def python_main():
+    run_python("import numpy")
+
+
+def numba_main():
+    run_python("import numba")
+
+
+def importtime(module='numba'):
+    """
+    Return a list of (cumulative microseconds, module name) tuples for
+    *module* and its submodules, as reported by "-X importtime".
+    """
+    popen = subprocess.Popen([sys.executable, '-X', 'importtime', '-c',
+                              'import %s' % module],
+                             stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    _, err = popen.communicate()
+    timings = []
+    for line in err.decode().splitlines():
+        # Format: "import time: self [us] | cumulative | imported package"
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        try:
+            cumulative = int(fields[1])
+        except ValueError:
+            # Header line
+            continue
+        name = fields[2].strip()
+        if name == module or name.startswith(module + '.'):
+            timings.append((cumulative, name))
+    return sorted(timings, reverse=True)
+
+
+if __name__ == '__main__':
+    print(benchmark(python_main))
+    print(benchmark(numba_main))
+    if sys.version_info >= (3, 7):
+        for cumulative, name in importtime()[:15]:
+            print("%10.1f ms  %s" % (cumulative / 1e3, name))
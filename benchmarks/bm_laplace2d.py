@@ -1,7 +1,7 @@
 from __future__ import absolute_import, print_function, division
 
 import numpy as np
-from numba import jit
+from numba import jit, prange
 from numba.utils import benchmark
 
 
@@ -18,9 +18,28 @@ def jacobi_relax_core(A, Anew):
     return error
 
 
+def jacobi_relax_core_parallel(A, Anew, row_error):
+    n = A.shape[0]
+    m = A.shape[1]
+
+    # Rows are independent, the error is reduced per row
+    for j in prange(1, n - 1):
+        error = 0.0
+        for i in range(1, m - 1):
+            Anew[j, i] = 0.25 * ( A[j, i + 1] + A[j, i - 1] \
+                                + A[j - 1, i] + A[j + 1, i])
+            error = max(error, abs(Anew[j, i] - A[j, i]))
+        row_error[j] = error
+    return row_error.max()
+
+
 numba_jacobi_relax_core = jit("float64[:,::1], float64[:,::1]", nopython=True)\
                              (jacobi_relax_core)
 
+numba_jacobi_relax_core_parallel = jit(
+    "float64(float64[:,::1], float64[:,::1], float64[::1])",
+    nopython=True)(jacobi_relax_core_parallel)
+
 
 def run(fn):
     NN = 1024
@@ -60,6 +79,15 @@ def numba_main():
     run(numba_jacobi_relax_core)
 
 
+def numba_parallel_main():
+    row_error = np.zeros(1024)
+    run(lambda A, Anew: numba_jacobi_relax_core_parallel(A, Anew, row_error))
+
+
 if __name__ == '__main__':
     print(benchmark(python_main))
-    print(benchmark(numba_main))
\ No newline at end of file
+    serial = benchmark(numba_main)
+    print(serial)
+    parallel = benchmark(numba_parallel_main)
+    print(parallel)
+    print("prange speedup: %.2f" % (serial.best / parallel.best))
\ No newline at end of file
@@ -0,0 +1,56 @@
+"""
+Benchmark the compilation of a large generated function with hundreds of
+operator call sites, whose typing is dominated by overload resolution.
+The Python version runs the same function uncompiled.
+
+When run as a script, also report the compilation time for several sizes.
+"""
+from __future__ import absolute_import, print_function, division
+
+import time
+
+from numba import jit
+from numba.utils import benchmark
+
+
+statements = [
+    "a = a + b * {k}",
+    "b = b - (a >> {s}) % {k}",
+    "x = x * 0.5 + a - {k}.0",
+    "y = y + x / {k}.0 - b",
+    "a = a ^ (b & {k})",
+    "y = abs(y) + (x - a) * 2",
+    ]
+
+
+def make_function(nstatements):
+    """
+    Return a new function of (a, b, x, y) running *nstatements* arithmetic
+    statements on integers and floats.
+    """
+    lines = ["def f(a, b, x, y):"]
+    for i in range(nstatements):
+        stmt = statements[i % len(statements)]
+        lines.append("    " + stmt.format(k=i % 13 + 1, s=i % 5 + 1))
+    lines.append("    return a + b + x + y")
+    ns = {}
+    exec("\n".join(lines), ns)
+    return ns['f']
+
+
+def python_main():
+    make_function(600)(1, 2, 3.0, 4.0)
+
+
+def numba_main():
+    jit(nopython=True)(make_function(600))(1, 2, 3.0, 4.0)
+
+
+if __name__ == '__main__':
+    print(benchmark(python_main))
+    print(benchmark(numba_main))
+    for n in (100, 300, 1000):
+        func = jit(nopython=True)(make_function(n))
+        t0 = time.time()
+        func.compile("(int64, int64, float64, float64)")
+        print("%5d statements: %.3f s" % (n, time.time() - t0))
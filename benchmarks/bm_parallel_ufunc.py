@@ -0,0 +1,65 @@
+"""
+Benchmark parallel ufuncs across array sizes.  The Python version uses
+the "cpu" target, the Numba version the "parallel" target.
+
+When run as a script, also report the latency of a call for small arrays
+and the throughput for large arrays, for both targets and for a parallel
+ufunc which never switches to serial execution for small arrays.
+"""
+from __future__ import absolute_import, print_function, division
+
+import timeit
+
+import numpy as np
+from numba import vectorize
+from numba.utils import benchmark
+
+
+def axpy(a, x, y):
+    return a * x + y
+
+sig = 'float64(float64, float64, float64)'
+cpu_axpy = vectorize(sig, target='cpu')(axpy)
+parallel_axpy = vectorize(sig, target='parallel')(axpy)
+always_parallel_axpy = vectorize(sig, target='parallel',
+                                 parallel_threshold=0)(axpy)
+
+sizes = [10, 1000, 10**5, 10**7]
+arrays = dict((n, (np.linspace(0, 1, n), np.linspace(1, 2, n)))
+              for n in sizes)
+
+
+def run(fn):
+    for n in sizes:
+        x, y = arrays[n]
+        for i in range(max(1, 10**6 // n)):
+            fn(2.0, x, y)
+
+
+def python_main():
+    run(cpu_axpy)
+
+
+def numba_main():
+    run(parallel_axpy)
+
+
+def measure(fn, n):
+    """
+    Return the best time of a call of *fn* for arrays of size *n*.
+    """
+    x, y = arrays[n]
+    number = max(1, 10**6 // n)
+    timer = timeit.Timer(lambda: fn(2.0, x, y))
+    return min(timer.repeat(repeat=5, number=number)) / number
+
+
+if __name__ == '__main__':
+    print(benchmark(python_main))
+    print(benchmark(numba_main))
+    for name, fn in [("cpu", cpu_axpy), ("parallel", parallel_axpy),
+                     ("always", always_parallel_axpy)]:
+        for n in sizes:
+            t = measure(fn, n)
+            print("%-8s n=%-9d latency %9.2f us   throughput %8.1f Melem/s"
+                  % (name, n, t * 1e6, n / t / 1e6))
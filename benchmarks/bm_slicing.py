@@ -0,0 +1,47 @@
+"""
+Benchmark a slicing-heavy loop, which stresses NRT reference counting.
+Also measures compilation time, since the refcount pruning pass runs
+at compile time.
+"""
+from __future__ import absolute_import, print_function, division
+
+import numpy as np
+from numba import jit
+from numba.utils import benchmark
+
+
+def rolling_sums(arr, width):
+    n = arr.shape[0] - width + 1
+    out = np.empty(n, dtype=arr.dtype)
+    for i in range(n):
+        window = arr[i:i + width]
+        row = window[1:]
+        acc = window[0]
+        for j in range(row.shape[0]):
+            acc += row[j]
+        out[i] = acc
+    return out
+
+
+numba_rolling_sums = jit(nopython=True)(rolling_sums)
+
+arr = np.arange(5000, dtype=np.float64)
+
+
+def python_main():
+    rolling_sums(arr, 8)
+
+
+def numba_main():
+    numba_rolling_sums(arr, 8)
+
+
+def compile_main():
+    # A new dispatcher each time, to measure compilation from scratch
+    jit("float64[:](float64[:], intp)", nopython=True)(rolling_sums)
+
+
+if __name__ == '__main__':
+    print(benchmark(python_main))
+    print(benchmark(numba_main))
+    print("compile", benchmark(compile_main))
@@ -0,0 +1,62 @@
+"""
+Benchmark the latency of the first call of a function, and the duration
+of later calls.  The Python version compiles the function fully optimized
+before returning from the first call, the Numba version uses tiered
+compilation.
+
+When run as a script, also report the time taken by successive calls
+with tiered compilation, as the optimized version replaces the quick one.
+"""
+from __future__ import absolute_import, print_function, division
+
+import time
+
+import numpy as np
+from numba import jit
+from numba.utils import benchmark
+
+
+def kernel(a, b):
+    s = 0.0
+    for i in range(a.size):
+        x = a[i] * b[i]
+        if x > 0.5:
+            s += x * x
+        else:
+            s -= np.sqrt(x + 1.0)
+    return s
+
+a = np.linspace(0, 1, 10**6)
+b = np.linspace(1, 2, 10**6)
+
+
+def run(tiered):
+    func = jit(nopython=True, tiered=tiered)(kernel)
+    for i in range(10):
+        func(a, b)
+    return func
+
+
+def python_main():
+    run(False)
+
+
+def numba_main():
+    run(True).wait_for_optimized()
+
+
+if __name__ == '__main__':
+    print(benchmark(python_main))
+    print(benchmark(numba_main))
+    for tiered in (False, True):
+        func = jit(nopython=True, tiered=tiered)(kernel)
+        times = []
+        for i in range(8):
+            t0 = time.time()
+            func(a, b)
+            times.append(time.time() - t0)
+            time.sleep(0.1)
+        print("tiered=%-5s  first call %.3f s, then %s ms"
+              % (tiered, times[0],
+                 ", ".join("%.1f" % (t * 1e3) for t in times[1:])))
+        func.wait_for_optimized()
@@ -0,0 +1,62 @@
+"""
+Benchmark the type inference of large generated functions whose types
+flow backwards through a loop, so that each statement's type depends on
+the next one's.  The Python version runs the same function uncompiled.
+
+When run as a script, also report the type inference time for several
+sizes; it should grow linearly with the number of statements.
+"""
+from __future__ import absolute_import, print_function, division
+
+import time
+
+from numba import bytecode, compiler, jit, typeinfer, typing, types
+from numba.utils import benchmark
+
+
+def make_function(nstatements):
+    """
+    Return a new function of (x,) assigning each of *nstatements*
+    variables from the next one in a loop.
+    """
+    lines = ["def f(x):"]
+    lines += ["    a%d = 0" % i for i in range(nstatements + 1)]
+    lines.append("    for i in range(3):")
+    lines += ["        a%d = a%d + 1" % (i, i + 1) for i in range(nstatements)]
+    lines.append("        a%d = x" % nstatements)
+    lines.append("    return a0")
+    ns = {}
+    exec("\n".join(lines), ns)
+    return ns['f']
+
+
+def python_main():
+    make_function(300)(1.5)
+
+
+def numba_main():
+    jit(nopython=True)(make_function(300))(1.5)
+
+
+def infer_types(func):
+    """
+    Run type inference of *func* for a float64 argument, and return the
+    time taken.
+    """
+    interp = compiler.translate_stage(bytecode.ByteCode(func=func))
+    t0 = time.time()
+    infer = typeinfer.TypeInferer(typing.Context(), interp)
+    infer.seed_argument('x', 0, types.float64)
+    infer.build_constraint()
+    infer.propagate()
+    infer.unify()
+    return time.time() - t0
+
+
+if __name__ == '__main__':
+    print(benchmark(python_main))
+    print(benchmark(numba_main))
+    for n in (100, 200, 400, 800):
+        t = infer_types(make_function(n))
+        print("%5d statements: %.3f s (%.1f us / statement)"
+              % (n, t, t / n * 1e6))
@@ -0,0 +1,57 @@
+"""
+Benchmark reductions and accumulations of Numba ufuncs.  The Python
+version uses a ufunc without identity, whose reductions run in NumPy's
+generic loop; the Numba version uses a DUFunc with an identity, whose
+reductions run in a compiled loop.
+
+When run as a script, also compare with a "parallel" ufunc.
+"""
+from __future__ import absolute_import, print_function, division
+
+import timeit
+
+import numpy as np
+from numba import vectorize
+from numba.utils import benchmark
+
+
+def add(a, b):
+    return a + b
+
+sig = 'float64(float64, float64)'
+generic_add = vectorize([sig])(add)
+dufunc_add = vectorize(identity=0)(add)
+parallel_add = vectorize([sig], target='parallel', identity=0)(add)
+
+arr = np.linspace(0, 1, 10**6)
+
+
+def run(fn):
+    for i in range(10):
+        fn.reduce(arr)
+        fn.accumulate(arr)
+
+
+def python_main():
+    run(generic_add)
+
+
+def numba_main():
+    run(dufunc_add)
+
+
+def measure(fn):
+    """
+    Return the best times of a reduction and of an accumulation of *fn*.
+    """
+    return [min(timeit.Timer(lambda: meth(arr)).repeat(repeat=5, number=10))
+            / 10 for meth in (fn.reduce, fn.accumulate)]
+
+
+if __name__ == '__main__':
+    print(benchmark(python_main))
+    print(benchmark(numba_main))
+    for name, fn in [("generic", generic_add), ("dufunc", dufunc_add),
+                     ("parallel", parallel_add)]:
+        print("%-8s reduce %8.3f ms   accumulate %8.3f ms"
+              % tuple([name] + [t * 1e3 for t in measure(fn)]))
@@ -3,14 +3,14 @@ Expose top-level symbols that are safe for import *
 """
 from __future__ import print_function, division, absolute_import
 import re
+import sys
 
 from . import testing, decorators
 from . import errors, special, types, config
 
-# Re-export typeof
+# Re-export typeof and prange
 from .special import *
 from .errors import *
-from .pycc.decorators import export, exportmany
 
 # Re-export all type names
 from .types import *
@@ -19,9 +19,7 @@ from .types import *
 jit = decorators.jit
 autojit = decorators.autojit
 njit = decorators.njit
-
-# Re export vectorize decorators
-from .npyufunc import vectorize, guvectorize
+cfunc = decorators.cfunc
 
 # Re export from_dtype
 from .numpy_support import from_dtype
@@ -29,16 +27,51 @@ from .numpy_support import from_dtype
 # Re-export test entrypoint
 test = testing.test
 
-# Try to initialize cuda
-from . import cuda
+# Heavy subpackages and the decorators they provide are only imported
+# on first access, so that "import numba" stays cheap for CPU-only users.
+_lazy_submodules = frozenset(['cuda', 'hsa', 'pycc'])
+_lazy_attributes = {
+    'vectorize': 'npyufunc',
+    'guvectorize': 'npyufunc',
+    'set_num_threads': 'npyufunc.parallel',
+    'get_num_threads': 'npyufunc.parallel',
+    'export': 'pycc.decorators',
+    'exportmany': 'pycc.decorators',
+}
+
+def _load_lazy(name):
+    from importlib import import_module
+    if name in _lazy_submodules:
+        value = import_module('.' + name, __name__)
+    else:
+        module = import_module('.' + _lazy_attributes[name], __name__)
+        value = getattr(module, name)
+    globals()[name] = value
+    return value
+
+if sys.version_info >= (3, 7):
+    def __getattr__(name):
+        if name in _lazy_submodules or name in _lazy_attributes:
+            return _load_lazy(name)
+        raise AttributeError("module %r has no attribute %r"
+                             % (__name__, name))
+else:
+    # No module __getattr__ (PEP 562), load everything eagerly
+    for _name in sorted(_lazy_submodules) + sorted(_lazy_attributes):
+        if _name != 'hsa':
+            _load_lazy(_name)
+    del _name
 
 
 __all__ = """
 jit
 autojit
 njit
+cfunc
 vectorize
 guvectorize
+set_num_threads
+get_num_threads
 export
 exportmany
 cuda
@@ -77,13 +110,6 @@ def _ensure_llvm():
 
 _ensure_llvm()
 
-
-# Process initialization
-# Should this be hooked into CPUContext instead?
-from .targets.randomimpl import random_init
-random_init()
-del random_init
-
 from ._version import get_versions
 __version__ = get_versions()['version']
 del get_versions
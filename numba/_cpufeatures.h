@@ -0,0 +1,149 @@
+/*
+ * Detection of the instruction set extensions supported by the CPU
+ * (and enabled by the OS), using LLVM's feature names.
+ */
+
+#ifndef NUMBA_CPUFEATURES_H_
+#define NUMBA_CPUFEATURES_H_
+
+#if defined(__x86_64__) || defined(__i386__) || defined(_M_X64) || defined(_M_IX86)
+    #define NUMBA_CPU_X86 1
+    #if defined(_MSC_VER)
+        #include <intrin.h>
+    #else
+        #include <cpuid.h>
+    #endif
+#endif
+
+/* Bits of the mask returned by numba_cpu_features() */
+enum {
+    NUMBA_CPU_SSE2 = 0,
+    NUMBA_CPU_SSE3,
+    NUMBA_CPU_SSSE3,
+    NUMBA_CPU_SSE41,
+    NUMBA_CPU_SSE42,
+    NUMBA_CPU_POPCNT,
+    NUMBA_CPU_AVX,
+    NUMBA_CPU_F16C,
+    NUMBA_CPU_FMA,
+    NUMBA_CPU_MOVBE,
+    NUMBA_CPU_BMI,
+    NUMBA_CPU_BMI2,
+    NUMBA_CPU_LZCNT,
+    NUMBA_CPU_AVX2,
+    NUMBA_CPU_AVX512F,
+    NUMBA_CPU_AVX512CD,
+    NUMBA_CPU_AVX512DQ,
+    NUMBA_CPU_AVX512BW,
+    NUMBA_CPU_AVX512VL,
+    NUMBA_CPU_NFEATURES
+};
+
+static const char * const numba_cpu_feature_names[NUMBA_CPU_NFEATURES] = {
+    "sse2", "sse3", "ssse3", "sse4.1", "sse4.2", "popcnt", "avx", "f16c",
+    "fma", "movbe", "bmi", "bmi2", "lzcnt", "avx2",
+    "avx512f", "avx512cd", "avx512dq", "avx512bw", "avx512vl"
+};
+
+#ifdef NUMBA_CPU_X86
+
+static void
+numba_cpuid(unsigned int leaf, unsigned int subleaf, unsigned int regs[4])
+{
+#if defined(_MSC_VER)
+    int r[4];
+    __cpuidex(r, (int) leaf, (int) subleaf);
+    regs[0] = r[0]; regs[1] = r[1]; regs[2] = r[2]; regs[3] = r[3];
+#else
+    __cpuid_count(leaf, subleaf, regs[0], regs[1], regs[2], regs[3]);
+#endif
+}
+
+/* The register state enabled by the OS (XCR0) */
+static unsigned long long
+numba_xgetbv(void)
+{
+#if defined(_MSC_VER)
+    return _xgetbv(0);
+#else
+    unsigned int eax, edx;
+    /* xgetbv, spelled out for old assemblers */
+    __asm__ __volatile__ (".byte 0x0f, 0x01, 0xd0"
+                          : "=a" (eax), "=d" (edx) : "c" (0));
+    return ((unsigned long long) edx << 32) | eax;
+#endif
+}
+
+#define NUMBA_HAS_BIT(reg, bit) (((reg) >> (bit)) & 1)
+
+static unsigned int
+numba_cpu_features(void)
+{
+    unsigned int regs[4], maxleaf, mask = 0;
+    unsigned long long xcr0 = 0;
+    int os_avx = 0, os_avx512 = 0;
+
+    numba_cpuid(0, 0, regs);
+    maxleaf = regs[0];
+    if (maxleaf < 1)
+        return 0;
+
+    numba_cpuid(1, 0, regs);
+    /* EDX */
+    if (NUMBA_HAS_BIT(regs[3], 26)) mask |= 1U << NUMBA_CPU_SSE2;
+    /* ECX */
+    if (NUMBA_HAS_BIT(regs[2], 0)) mask |= 1U << NUMBA_CPU_SSE3;
+    if (NUMBA_HAS_BIT(regs[2], 9)) mask |= 1U << NUMBA_CPU_SSSE3;
+    if (NUMBA_HAS_BIT(regs[2], 19)) mask |= 1U << NUMBA_CPU_SSE41;
+    if (NUMBA_HAS_BIT(regs[2], 20)) mask |= 1U << NUMBA_CPU_SSE42;
+    if (NUMBA_HAS_BIT(regs[2], 22)) mask |= 1U << NUMBA_CPU_MOVBE;
+    if (NUMBA_HAS_BIT(regs[2], 23)) mask |= 1U << NUMBA_CPU_POPCNT;
+    /* AVX needs the OS to save the YMM registers (OSXSAVE, then XCR0) */
+    if (NUMBA_HAS_BIT(regs[2], 27)) {
+        xcr0 = numba_xgetbv();
+        os_avx = (xcr0 & 0x6) == 0x6;
+        os_avx512 = os_avx && (xcr0 & 0xe0) == 0xe0;
+    }
+    if (os_avx) {
+        if (NUMBA_HAS_BIT(regs[2], 28)) mask |= 1U << NUMBA_CPU_AVX;
+        if (NUMBA_HAS_BIT(regs[2], 29)) mask |= 1U << NUMBA_CPU_F16C;
+        if (NUMBA_HAS_BIT(regs[2], 12)) mask |= 1U << NUMBA_CPU_FMA;
+    }
+
+    if (maxleaf >= 7) {
+        numba_cpuid(7, 0, regs);
+        /* EBX */
+        if (NUMBA_HAS_BIT(regs[1], 3)) mask |= 1U << NUMBA_CPU_BMI;
+        if (NUMBA_HAS_BIT(regs[1], 8)) mask |= 1U << NUMBA_CPU_BMI2;
+        if (os_avx && NUMBA_HAS_BIT(regs[1], 5))
+            mask |= 1U << NUMBA_CPU_AVX2;
+        if (os_avx512) {
+            if (NUMBA_HAS_BIT(regs[1], 16)) mask |= 1U << NUMBA_CPU_AVX512F;
+            if (NUMBA_HAS_BIT(regs[1], 28)) mask |= 1U << NUMBA_CPU_AVX512CD;
+            if (NUMBA_HAS_BIT(regs[1], 17)) mask |= 1U << NUMBA_CPU_AVX512DQ;
+            if (NUMBA_HAS_BIT(regs[1], 30)) mask |= 1U << NUMBA_CPU_AVX512BW;
+            if (NUMBA_HAS_BIT(regs[1], 31)) mask |= 1U << NUMBA_CPU_AVX512VL;
+        }
+    }
+
+    numba_cpuid(0x80000000U, 0, regs);
+    if (regs[0] >= 0x80000001U) {
+        numba_cpuid(0x80000001U, 0, regs);
+        if (NUMBA_HAS_BIT(regs[2], 5)) mask |= 1U << NUMBA_CPU_LZCNT;
+    }
+    return mask;
+}
+
+#undef NUMBA_HAS_BIT
+
+#else  /* NUMBA_CPU_X86 */
+
+static unsigned int
+numba_cpu_features(void)
+{
+    return 0;
+}
+
+#endif  /* NUMBA_CPU_X86 */
+
+#endif  /* NUMBA_CPUFEATURES_H_ */
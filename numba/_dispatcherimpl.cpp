@@ -1,4 +1,5 @@
 #include "typeconv/typeconv.hpp"
+#include <algorithm>
 #include <cassert>
 #include <vector>
 
@@ -12,6 +13,14 @@ public:
     Dispatcher(TypeManager *tm, int argct): argct(argct), tm(tm) { }
 
     void addDefinition(Type args[], void *callable) {
+        // An existing definition for the same signature is replaced
+        const int ovct = functions.size();
+        for (int i=0; i<ovct; ++i) {
+            if (std::equal(args, args + argct, overloads.begin() + i * argct)) {
+                functions[i] = callable;
+                return;
+            }
+        }
         overloads.reserve(argct + overloads.size());
         for (int i=0; i<argct; ++i) {
             overloads.push_back(args[i]);
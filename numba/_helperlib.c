@@ -13,6 +13,7 @@
 #include <numpy/arrayscalars.h>
 
 #include "_arraystruct.h"
+#include "_cpufeatures.h"
 
 /* For Numpy 1.6 */
 #ifndef NPY_ARRAY_BEHAVED
@@ -38,14 +39,14 @@ typedef struct {
     double gauss;
 } rnd_state_t;
 
-static rnd_state_t py_random_state;
-static rnd_state_t np_random_state;
+NUMBA_EXPORT_DATA(rnd_state_t) numba_py_random_state;
+NUMBA_EXPORT_DATA(rnd_state_t) numba_np_random_state;
 
 /* Some code portions below from CPython's _randommodule.c, some others
    from Numpy's and Jean-Sebastien Roy's randomkit.c. */
 
-static void
-Numba_rnd_shuffle(rnd_state_t *state)
+NUMBA_EXPORT_FUNC(void)
+numba_rnd_shuffle(rnd_state_t *state)
 {
     int i;
     unsigned int y;
@@ -66,8 +67,8 @@ Numba_rnd_shuffle(rnd_state_t *state)
 }
 
 /* Initialize mt[] with an integer seed */
-static void
-Numba_rnd_init(rnd_state_t *state, unsigned int seed)
+NUMBA_EXPORT_FUNC(void)
+numba_rnd_init(rnd_state_t *state, unsigned int seed)
 {
     unsigned int pos;
     seed &= 0xffffffffU;
@@ -89,7 +90,7 @@ rnd_init_by_array(rnd_state_t *state, unsigned int init_key[], size_t key_length
     size_t i, j, k;
     unsigned int *mt = state->mt;
 
-    Numba_rnd_init(state, 19650218U);
+    numba_rnd_init(state, 19650218U);
     i = 1; j = 0;
     k = (MT_N > key_length ? MT_N : key_length);
     for (; k; k--) {
@@ -143,7 +144,7 @@ _rnd_random_seed(rnd_state_t *state)
     rshift = sizeof(void *) > 4 ? 16 : 0;
     seed ^= (Py_uintptr_t) &timemod >> rshift;
     seed += (Py_uintptr_t) &PyObject_CallMethod >> rshift;
-    Numba_rnd_init(state, seed);
+    numba_rnd_init(state, seed);
     return 0;
 }
 
@@ -161,7 +162,7 @@ rnd_shuffle(PyObject *self, PyObject *arg)
     rnd_state_t *state;
     if (!rnd_state_converter(arg, &state))
         return NULL;
-    Numba_rnd_shuffle(state);
+    numba_rnd_shuffle(state);
     Py_RETURN_NONE;
 }
 
@@ -260,7 +261,7 @@ rnd_seed(PyObject *self, PyObject *args)
         PyErr_Clear();
         return rnd_seed_with_urandom(self, args);
     }
-    Numba_rnd_init(state, seed);
+    numba_rnd_init(state, seed);
     Py_RETURN_NONE;
 }
 
@@ -277,7 +278,7 @@ get_next_int32(rnd_state_t *state)
     unsigned int y;
 
     if (state->index == MT_N) {
-        Numba_rnd_shuffle(state);
+        numba_rnd_shuffle(state);
         state->index = 0;
     }
     y = state->mt[state->index++];
@@ -340,8 +341,8 @@ loggam(double x)
 }
 
 
-static int64_t
-Numba_poisson_ptrs(rnd_state_t *state, double lam)
+NUMBA_EXPORT_FUNC(int64_t)
+numba_poisson_ptrs(rnd_state_t *state, double lam)
 {
     /* This method is invoked only if the parameter lambda of this
      * distribution is big enough ( >= 10 ). The algorithm used is
@@ -387,32 +388,32 @@ Numba_poisson_ptrs(rnd_state_t *state, double lam)
  */
 
 /* provide 64-bit division function to 32-bit platforms */
-static
-int64_t Numba_sdiv(int64_t a, int64_t b) {
+NUMBA_EXPORT_FUNC(int64_t)
+numba_sdiv(int64_t a, int64_t b) {
     return a / b;
 }
 
-static
-uint64_t Numba_udiv(uint64_t a, uint64_t b) {
+NUMBA_EXPORT_FUNC(uint64_t)
+numba_udiv(uint64_t a, uint64_t b) {
     return a / b;
 }
 
 /* provide 64-bit remainder function to 32-bit platforms */
-static
-int64_t Numba_srem(int64_t a, int64_t b) {
+NUMBA_EXPORT_FUNC(int64_t)
+numba_srem(int64_t a, int64_t b) {
     return a % b;
 }
 
-static
-uint64_t Numba_urem(uint64_t a, uint64_t b) {
+NUMBA_EXPORT_FUNC(uint64_t)
+numba_urem(uint64_t a, uint64_t b) {
     return a % b;
 }
 
 /* provide frexp and ldexp; these wrappers deal with special cases
  * (zero, nan, infinity) directly, to sidestep platform differences.
  */
-static
-double Numba_frexp(double x, int *exp)
+NUMBA_EXPORT_FUNC(double)
+numba_frexp(double x, int *exp)
 {
     if (!Py_IS_FINITE(x) || !x)
         *exp = 0;
@@ -421,8 +422,8 @@ double Numba_frexp(double x, int *exp)
     return x;
 }
 
-static
-float Numba_frexpf(float x, int *exp)
+NUMBA_EXPORT_FUNC(float)
+numba_frexpf(float x, int *exp)
 {
     if (Py_IS_NAN(x) || Py_IS_INFINITY(x) || !x)
         *exp = 0;
@@ -431,16 +432,16 @@ float Numba_frexpf(float x, int *exp)
     return x;
 }
 
-static
-double Numba_ldexp(double x, int exp)
+NUMBA_EXPORT_FUNC(double)
+numba_ldexp(double x, int exp)
 {
     if (Py_IS_FINITE(x) && x && exp)
         x = ldexp(x, exp);
     return x;
 }
 
-static
-float Numba_ldexpf(float x, int exp)
+NUMBA_EXPORT_FUNC(float)
+numba_ldexpf(float x, int exp)
 {
     if (Py_IS_FINITE(x) && x && exp)
         x = ldexpf(x, exp);
@@ -448,8 +449,8 @@ float Numba_ldexpf(float x, int exp)
 }
 
 /* provide complex power */
-static
-void Numba_cpow(Py_complex *a, Py_complex *b, Py_complex *c) {
+NUMBA_EXPORT_FUNC(void)
+numba_cpow(Py_complex *a, Py_complex *b, Py_complex *c) {
     *c = _Py_c_pow(*a, *b);
 }
 
@@ -623,8 +624,8 @@ lanczos_sum(double x)
     return num/den;
 }
 
-static double
-Numba_gamma(double x)
+NUMBA_EXPORT_FUNC(double)
+numba_gamma(double x)
 {
     double absx, r, y, z, sqrtpow;
 
@@ -719,10 +720,10 @@ Numba_gamma(double x)
     return r;
 }
 
-static float
-Numba_gammaf(float x)
+NUMBA_EXPORT_FUNC(float)
+numba_gammaf(float x)
 {
-    return (float) Numba_gamma(x);
+    return (float) numba_gamma(x);
 }
 
 /*
@@ -730,8 +731,8 @@ Numba_gammaf(float x)
    For large arguments, Lanczos' formula works extremely well here.
 */
 
-static double
-Numba_lgamma(double x)
+NUMBA_EXPORT_FUNC(double)
+numba_lgamma(double x)
 {
     double r, absx;
 
@@ -773,10 +774,10 @@ Numba_lgamma(double x)
     return r;
 }
 
-static float
-Numba_lgammaf(float x)
+NUMBA_EXPORT_FUNC(float)
+numba_lgammaf(float x)
 {
-    return (float) Numba_lgamma(x);
+    return (float) numba_lgamma(x);
 }
 
 /* provide erf() and erfc(); code borrowed from CPython */
@@ -893,8 +894,8 @@ m_erfc_contfrac(double x)
 
 /* Error function erf(x), for general x */
 
-static double
-Numba_erf(double x)
+NUMBA_EXPORT_FUNC(double)
+numba_erf(double x)
 {
     double absx, cf;
 
@@ -909,16 +910,16 @@ Numba_erf(double x)
     }
 }
 
-static float
-Numba_erff(float x)
+NUMBA_EXPORT_FUNC(float)
+numba_erff(float x)
 {
-    return (float) Numba_erf(x);
+    return (float) numba_erf(x);
 }
 
 /* Complementary error function erfc(x), for general x. */
 
-static double
-Numba_erfc(double x)
+NUMBA_EXPORT_FUNC(double)
+numba_erfc(double x)
 {
     double absx, cf;
 
@@ -933,15 +934,15 @@ Numba_erfc(double x)
     }
 }
 
-static float
-Numba_erfcf(float x)
+NUMBA_EXPORT_FUNC(float)
+numba_erfcf(float x)
 {
-    return (float) Numba_erfc(x);
+    return (float) numba_erfc(x);
 }
 
 
-static
-int Numba_complex_adaptor(PyObject* obj, Py_complex *out) {
+NUMBA_EXPORT_FUNC(int)
+numba_complex_adaptor(PyObject* obj, Py_complex *out) {
     PyObject* fobj;
     PyArray_Descr *dtype;
     double val[2];
@@ -986,8 +987,8 @@ typedef struct {
 /*
 Get data address of record data buffer
 */
-static
-void* Numba_extract_record_data(PyObject *recordobj, Py_buffer *pbuf) {
+NUMBA_EXPORT_FUNC(void*)
+numba_extract_record_data(PyObject *recordobj, Py_buffer *pbuf) {
     PyObject *attrdata;
     void *ptr;
 
@@ -1036,8 +1037,8 @@ void* Numba_extract_record_data(PyObject *recordobj, Py_buffer *pbuf) {
  * Return a record instance with dtype as the record type, and backed
  * by a copy of the memory area pointed to by (pdata, size).
  */
-static
-PyObject* Numba_recreate_record(void *pdata, int size, PyObject *dtype) {
+NUMBA_EXPORT_FUNC(PyObject*)
+numba_recreate_record(void *pdata, int size, PyObject *dtype) {
     PyObject *numpy = NULL;
     PyObject *numpy_record = NULL;
     PyObject *aryobj = NULL;
@@ -1070,8 +1071,8 @@ CLEANUP:
     return record;
 }
 
-static
-int Numba_adapt_ndarray(PyObject *obj, arystruct_t* arystruct) {
+NUMBA_EXPORT_FUNC(int)
+numba_adapt_ndarray(PyObject *obj, arystruct_t* arystruct) {
     PyArrayObject *ndary;
     int i, ndim;
     npy_intp *p;
@@ -1098,15 +1099,15 @@ int Numba_adapt_ndarray(PyObject *obj, arystruct_t* arystruct) {
     return 0;
 }
 
-static int
-Numba_get_buffer(PyObject *obj, Py_buffer *buf)
+NUMBA_EXPORT_FUNC(int)
+numba_get_buffer(PyObject *obj, Py_buffer *buf)
 {
     /* Ask for shape and strides, but no suboffsets */
     return PyObject_GetBuffer(obj, buf, PyBUF_RECORDS_RO);
 }
 
-static void
-Numba_adapt_buffer(Py_buffer *buf, arystruct_t *arystruct)
+NUMBA_EXPORT_FUNC(void)
+numba_adapt_buffer(Py_buffer *buf, arystruct_t *arystruct)
 {
     int i;
     npy_intp *p;
@@ -1126,14 +1127,14 @@ Numba_adapt_buffer(Py_buffer *buf, arystruct_t *arystruct)
     arystruct->meminfo = NULL;
 }
 
-static void
-Numba_release_buffer(Py_buffer *buf)
+NUMBA_EXPORT_FUNC(void)
+numba_release_buffer(Py_buffer *buf)
 {
     PyBuffer_Release(buf);
 }
 
-static
-PyObject* Numba_ndarray_new(int nd,
+NUMBA_EXPORT_FUNC(PyObject*)
+numba_ndarray_new(int nd,
                             npy_intp *dims,   /* shape */
                             npy_intp *strides,
                             void* data,
@@ -1159,8 +1160,8 @@ PyObject* Numba_ndarray_new(int nd,
  * If no copy is needed, returns 1 and fills `npy_intp *newstrides`
  *     with appropriate strides
  */
-static int
-Numba_attempt_nocopy_reshape(npy_intp nd, const npy_intp *dims, const npy_intp *strides,
+NUMBA_EXPORT_FUNC(int)
+numba_attempt_nocopy_reshape(npy_intp nd, const npy_intp *dims, const npy_intp *strides,
                              npy_intp newnd, const npy_intp *newdims,
                              npy_intp *newstrides, npy_intp itemsize,
                              int is_f_order)
@@ -1277,8 +1278,8 @@ Numba_attempt_nocopy_reshape(npy_intp nd, const npy_intp *dims, const npy_intp *
 /* We use separate functions for datetime64 and timedelta64, to ensure
  * proper type checking.
  */
-static npy_int64
-Numba_extract_np_datetime(PyObject *td)
+NUMBA_EXPORT_FUNC(npy_int64)
+numba_extract_np_datetime(PyObject *td)
 {
     if (!PyArray_IsScalar(td, Datetime)) {
         PyErr_SetString(PyExc_TypeError,
@@ -1288,8 +1289,8 @@ Numba_extract_np_datetime(PyObject *td)
     return PyArrayScalar_VAL(td, Timedelta);
 }
 
-static npy_int64
-Numba_extract_np_timedelta(PyObject *td)
+NUMBA_EXPORT_FUNC(npy_int64)
+numba_extract_np_timedelta(PyObject *td)
 {
     if (!PyArray_IsScalar(td, Timedelta)) {
         PyErr_SetString(PyExc_TypeError,
@@ -1299,8 +1300,8 @@ Numba_extract_np_timedelta(PyObject *td)
     return PyArrayScalar_VAL(td, Timedelta);
 }
 
-static PyObject *
-Numba_create_np_datetime(npy_int64 value, int unit_code)
+NUMBA_EXPORT_FUNC(PyObject *)
+numba_create_np_datetime(npy_int64 value, int unit_code)
 {
     PyDatetimeScalarObject *obj = (PyDatetimeScalarObject *)
         PyArrayScalar_New(Datetime);
@@ -1312,8 +1313,8 @@ Numba_create_np_datetime(npy_int64 value, int unit_code)
     return (PyObject *) obj;
 }
 
-static PyObject *
-Numba_create_np_timedelta(npy_int64 value, int unit_code)
+NUMBA_EXPORT_FUNC(PyObject *)
+numba_create_np_timedelta(npy_int64 value, int unit_code)
 {
     PyTimedeltaScalarObject *obj = (PyTimedeltaScalarObject *)
         PyArrayScalar_New(Timedelta);
@@ -1325,32 +1326,32 @@ Numba_create_np_timedelta(npy_int64 value, int unit_code)
     return (PyObject *) obj;
 }
 
-static
-uint64_t Numba_fptoui(double x) {
+NUMBA_EXPORT_FUNC(uint64_t)
+numba_fptoui(double x) {
     /* First cast to signed int of the full width to make sure sign extension
        happens (this can make a difference on some platforms...). */
     return (uint64_t) (int64_t) x;
 }
 
-static
-uint64_t Numba_fptouif(float x) {
+NUMBA_EXPORT_FUNC(uint64_t)
+numba_fptouif(float x) {
     return (uint64_t) (int64_t) x;
 }
 
-static
-void Numba_gil_ensure(PyGILState_STATE *state) {
+NUMBA_EXPORT_FUNC(void)
+numba_gil_ensure(PyGILState_STATE *state) {
     *state = PyGILState_Ensure();
 }
 
-static
-void Numba_gil_release(PyGILState_STATE *state) {
+NUMBA_EXPORT_FUNC(void)
+numba_gil_release(PyGILState_STATE *state) {
     PyGILState_Release(*state);
 }
 
 /* Logic for raising an arbitrary object.  Adapted from CPython's ceval.c.
    This *consumes* a reference count to its argument. */
-static int
-Numba_do_raise(PyObject *exc)
+NUMBA_EXPORT_FUNC(int)
+numba_do_raise(PyObject *exc)
 {
     PyObject *type = NULL, *value = NULL;
 
@@ -1434,8 +1435,8 @@ raise_error:
     return 0;
 }
 
-static PyObject *
-Numba_unpickle(const char *data, Py_ssize_t n)
+NUMBA_EXPORT_FUNC(PyObject *)
+numba_unpickle(const char *data, Py_ssize_t n)
 {
     PyObject *buf, *obj;
     static PyObject *loads;
@@ -1468,8 +1469,8 @@ Numba_unpickle(const char *data, Py_ssize_t n)
 /*
 Define bridge for all math functions
 */
-#define MATH_UNARY(F, R, A) static R Numba_##F(A a) { return F(a); }
-#define MATH_BINARY(F, R, A, B) static R Numba_##F(A a, B b) \
+#define MATH_UNARY(F, R, A) static R numba_##F(A a) { return F(a); }
+#define MATH_BINARY(F, R, A, B) static R numba_##F(A a, B b) \
                                        { return F(a, b); }
     #include "mathnames.inc"
 #undef MATH_UNARY
@@ -1496,9 +1497,7 @@ build_c_helpers_dict(void)
     Py_DECREF(o);                                      \
 } while (0)
 
-#define declmethod(func) _declpointer(#func, &Numba_##func)
-
-#define declpointer(ptr) _declpointer(#ptr, &ptr)
+#define declmethod(func) _declpointer(#func, &numba_##func)
 
     declmethod(sdiv);
     declmethod(srem);
@@ -1540,8 +1539,8 @@ build_c_helpers_dict(void)
     declmethod(poisson_ptrs);
     declmethod(attempt_nocopy_reshape);
 
-    declpointer(py_random_state);
-    declpointer(np_random_state);
+    _declpointer("py_random_state", &numba_py_random_state);
+    _declpointer("np_random_state", &numba_np_random_state);
 
 #define MATH_UNARY(F, R, A) declmethod(F);
 #define MATH_BINARY(F, R, A, B) declmethod(F);
@@ -1556,7 +1555,39 @@ error:
     return NULL;
 }
 
+/*
+ * Return a tuple of the names of the CPU features supported by the host.
+ */
+static PyObject *
+get_cpu_features(PyObject *self, PyObject *args)
+{
+    PyObject *features, *name;
+    unsigned int mask = numba_cpu_features();
+    int i, n = 0;
+
+    for (i = 0; i < NUMBA_CPU_NFEATURES; i++) {
+        if (mask & (1U << i))
+            n++;
+    }
+    features = PyTuple_New(n);
+    if (features == NULL)
+        return NULL;
+    n = 0;
+    for (i = 0; i < NUMBA_CPU_NFEATURES; i++) {
+        if (mask & (1U << i)) {
+            name = PyString_FromString(numba_cpu_feature_names[i]);
+            if (name == NULL) {
+                Py_DECREF(features);
+                return NULL;
+            }
+            PyTuple_SET_ITEM(features, n++, name);
+        }
+    }
+    return features;
+}
+
 static PyMethodDef ext_methods[] = {
+    { "get_cpu_features", (PyCFunction) get_cpu_features, METH_NOARGS, NULL },
     { "rnd_get_state", (PyCFunction) rnd_get_state, METH_O, NULL },
     { "rnd_seed", (PyCFunction) rnd_seed, METH_VARARGS, NULL },
     { "rnd_set_state", (PyCFunction) rnd_set_state, METH_VARARGS, NULL },
@@ -1579,8 +1610,8 @@ MOD_INIT(_helperlib) {
     PyModule_AddIntConstant(m, "py_buffer_size", sizeof(Py_buffer));
     PyModule_AddIntConstant(m, "py_gil_state_size", sizeof(PyGILState_STATE));
 
-    if (_rnd_random_seed(&py_random_state) ||
-        _rnd_random_seed(&np_random_state))
+    if (_rnd_random_seed(&numba_py_random_state) ||
+        _rnd_random_seed(&numba_np_random_state))
         return MOD_ERROR_VAL;
 
     return MOD_SUCCESS_VAL(m);
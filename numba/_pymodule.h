@@ -44,6 +44,19 @@
     #define PyMem_RawFree free
 #endif
 
+/* The C helpers called by the compiled code.  Their symbols are hidden
+   from other shared objects, but can be statically linked with the code
+   compiled by pycc. */
+#if defined(__GNUC__) && !defined(_WIN32)
+    #define NUMBA_EXPORT_FUNC(_rettype) \
+        __attribute__ ((visibility("hidden"))) _rettype
+    #define NUMBA_EXPORT_DATA(_vartype) \
+        __attribute__ ((visibility("hidden"))) _vartype
+#else
+    #define NUMBA_EXPORT_FUNC(_rettype) _rettype
+    #define NUMBA_EXPORT_DATA(_vartype) _vartype
+#endif
+
 #ifndef Py_MIN
 #define Py_MIN(x, y) (((x) > (y)) ? (y) : (x))
 #endif
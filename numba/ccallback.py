@@ -0,0 +1,107 @@
+"""
+Implementation of compiled C callbacks (@cfunc).
+"""
+from __future__ import print_function, division, absolute_import
+
+import ctypes
+
+from . import compiler, sigutils
+from .targets import registry
+from .typing import ctypes_utils
+from .utils import cached_property
+
+
+class CFunc(object):
+    """
+    A compiled C callback, as created by the @cfunc decorator.
+
+    The native function has a C calling convention and takes and returns
+    native values, so it can be called from C code (or any foreign
+    function interface) without involving the Python interpreter.
+    """
+    _targetdescr = registry.CPUTarget()
+
+    def __init__(self, pyfunc, sig, locals, options):
+        args, return_type = sigutils.normalize_signature(sig)
+        self._pyfunc = pyfunc
+        self._locals = locals
+        self._targetoptions = dict(options, nopython=True)
+        self.__name__ = pyfunc.__name__
+        self.__doc__ = pyfunc.__doc__
+        self._compile(args, return_type)
+
+    def _compile(self, args, return_type):
+        typingctx = self._targetdescr.typing_context
+        targetctx = self._targetdescr.target_context
+
+        flags = compiler.Flags()
+        self._targetdescr.options.parse_as_flags(flags, self._targetoptions)
+        # The C wrapper is added to the library before it is finalized
+        flags.set('no_cpython_wrapper')
+        flags.set('no_compile')
+
+        with compiler.global_compiler_lock:
+            library = targetctx.jit_codegen().create_library(
+                "cfunc.%s" % (self._pyfunc.__name__,), opt=flags.opt,
+                loop_vectorize=flags.loop_vectorize)
+            cres = compiler.compile_extra(typingctx, targetctx, self._pyfunc,
+                                          args=args, return_type=return_type,
+                                          flags=flags, locals=self._locals,
+                                          library=library)
+            fndesc = cres.fndesc
+            targetctx.create_cfunc_wrapper(library, fndesc, cres.environment,
+                                           cres.call_helper)
+            library.finalize()
+
+        self._library = library
+        self._signature = cres.signature
+        self._native_name = fndesc.llvm_cfunc_wrapper_name
+        self._address = library.get_pointer_to_function(self._native_name)
+        # Keep the environment alive with the native function
+        self._environment = cres.environment
+
+    @property
+    def native_name(self):
+        """
+        The name of the native function.
+        """
+        return self._native_name
+
+    @property
+    def address(self):
+        """
+        The address of the native function.
+        """
+        return self._address
+
+    @property
+    def signature(self):
+        """
+        The Numba signature of the native function.
+        """
+        return self._signature
+
+    @cached_property
+    def ctypes(self):
+        """
+        A ctypes function object calling the native function.
+        """
+        sig = self._signature
+        ctypes_restype = ctypes_utils.to_ctypes(sig.return_type)
+        ctypes_argtypes = [ctypes_utils.to_ctypes(a) for a in sig.args]
+        functype = ctypes.CFUNCTYPE(ctypes_restype, *ctypes_argtypes)
+        return functype(self._address)
+
+    def inspect_llvm(self):
+        """
+        Return the LLVM IR of the library the native function is
+        defined in.
+        """
+        return self._library.get_llvm_str()
+
+    def __call__(self, *args, **kwargs):
+        # A convenience for testing: the call goes through ctypes
+        return self.ctypes(*args, **kwargs)
+
+    def __repr__(self):
+        return "<Numba C callback %r>" % (self.__name__,)
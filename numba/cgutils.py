@@ -791,6 +791,22 @@ def global_constant(builder_or_module, name, value, linkage=lc.LINKAGE_INTERNAL)
     return data
 
 
+def add_global_ctor(module, func, priority=65535):
+    """
+    Register the void function *func* to be called when the object
+    compiled from *module* is loaded.  A module has only one list of
+    constructors, so this can be called only once per module.
+    """
+    ctor_ty = Type.struct([Type.int(32), func.type, Type.pointer(Type.int(8))])
+    init = Constant.array(ctor_ty, [
+        Constant.struct([Constant.int(Type.int(32), priority), func,
+                         Constant.null(Type.pointer(Type.int(8)))])])
+    ctors = module.add_global_variable(init.type, name="llvm.global_ctors")
+    ctors.linkage = 'appending'
+    ctors.initializer = init
+    return ctors
+
+
 def divmod_by_constant(builder, val, divisor):
     """
     Compute the (quotient, remainder) of *val* divided by the constant
@@ -5,6 +5,7 @@ from contextlib import contextmanager
 from collections import namedtuple, defaultdict
 from pprint import pprint
 import sys
+import threading
 import warnings
 import traceback
 
@@ -35,9 +36,20 @@ class Flags(utils.ConfigOptions):
         'forceinline',
         'no_cpython_wrapper',
         'nrt',
+        # Use non-atomic NRT refcount operations
+        'nrt_nonatomic',
         'no_rewrites',
+        # Allow reordering floating-point operations
+        'fastmath',
     ])
 
+    VALUE_OPTIONS = {
+        # LLVM optimization level and loop vectorization, None meaning
+        # NUMBA_OPT and NUMBA_LOOP_VECTORIZE apply
+        'opt': None,
+        'loop_vectorize': None,
+    }
+
 
 DEFAULT_FLAGS = Flags()
 DEFAULT_FLAGS.set('nrt')
@@ -275,6 +287,10 @@ class Pipeline(object):
             subtargetoptions['enable_boundcheck'] = True
         if flags.nrt:
             subtargetoptions['enable_nrt'] = True
+        if flags.nrt_nonatomic:
+            subtargetoptions['enable_nrt_nonatomic'] = True
+        if flags.fastmath:
+            subtargetoptions['enable_fastmath'] = True
 
         self.targetctx = targetctx.subtarget(**subtargetoptions)
         self.library = library
@@ -470,6 +486,8 @@ class Pipeline(object):
         with self.fallback_context('Internal error in rewriting pass '
                                    'encountered during compilation of '
                                    'function "%s"' % (self.func_attr.name,)):
+            # Register the array expression rewrite, if not already done
+            from .npyufunc import array_exprs
             rewrites.rewrite_registry.apply(self, self.interp.blocks)
 
     def stage_annotate_type(self):
@@ -529,7 +547,9 @@ class Pipeline(object):
         """
         if self.library is None:
             codegen = self.targetctx.jit_codegen()
-            self.library = codegen.create_library(self.bc.func_qualname)
+            self.library = codegen.create_library(
+                self.bc.func_qualname, opt=self.flags.opt,
+                loop_vectorize=self.flags.loop_vectorize)
             # Enable object caching upfront, so that the library can
             # be later serialized.
             self.library.enable_object_caching()
@@ -628,6 +648,12 @@ class Pipeline(object):
         return pm.run(self.status)
 
 
+# Compilation isn't thread-safe (e.g. the code generators are shared),
+# so only one thread compiles at a time.  Reentrant, since compiling a
+# function can compile the functions it calls.
+global_compiler_lock = threading.RLock()
+
+
 def compile_extra(typingctx, targetctx, func, args, return_type, flags,
                   locals, library=None):
     """
@@ -636,26 +662,29 @@ def compile_extra(typingctx, targetctx, func, args, return_type, flags,
     - return_type
         Use ``None`` to indicate
     """
-    pipeline = Pipeline(typingctx, targetctx, library,
-                        args, return_type, flags, locals)
-    return pipeline.compile_extra(func)
+    with global_compiler_lock:
+        pipeline = Pipeline(typingctx, targetctx, library,
+                            args, return_type, flags, locals)
+        return pipeline.compile_extra(func)
 
 
 def compile_bytecode(typingctx, targetctx, bc, args, return_type, flags,
                      locals, lifted=(), lifted_from=None,
                      func_attr=DEFAULT_FUNCTION_ATTRIBUTES, library=None):
 
-    pipeline = Pipeline(typingctx, targetctx, library,
-                        args, return_type, flags, locals)
-    return pipeline.compile_bytecode(bc=bc, lifted=lifted, lifted_from=lifted_from, func_attr=func_attr)
+    with global_compiler_lock:
+        pipeline = Pipeline(typingctx, targetctx, library,
+                            args, return_type, flags, locals)
+        return pipeline.compile_bytecode(bc=bc, lifted=lifted, lifted_from=lifted_from, func_attr=func_attr)
 
 
 def compile_internal(typingctx, targetctx, library,
                      func, args, return_type, flags, locals):
     # For now this is the same thing as compile_extra().
-    pipeline = Pipeline(typingctx, targetctx, library,
-                        args, return_type, flags, locals)
-    return pipeline.compile_extra(func)
+    with global_compiler_lock:
+        pipeline = Pipeline(typingctx, targetctx, library,
+                            args, return_type, flags, locals)
+        return pipeline.compile_extra(func)
 
 
 def _is_nopython_types(t):
@@ -1,5 +1,6 @@
 from __future__ import print_function, division, absolute_import
 
+import multiprocessing
 import struct
 import sys
 import os
@@ -122,6 +123,10 @@ class _EnvReloader(object):
         # Force dump of Optimized LLVM IR
         DUMP_OPTIMIZED = _readenv("NUMBA_DUMP_OPTIMIZED", int, DEBUG)
 
+        # Resolve calls to other compiled functions through the JIT engine
+        # instead of linking their code into each caller
+        LINK_BY_SYMBOL = _readenv("NUMBA_LINK_BY_SYMBOL", int, 0)
+
         # Force disable loop vectorize
         # Loop vectorizer is disabled on 32-bit win32 due to a bug (#649)
         LOOP_VECTORIZE = _readenv("NUMBA_LOOP_VECTORIZE", int,
@@ -130,6 +135,17 @@ class _EnvReloader(object):
         # Force dump of generated assembly
         DUMP_ASSEMBLY = _readenv("NUMBA_DUMP_ASSEMBLY", int, DEBUG)
 
+        # Instrument NRT allocations with their source location
+        NRT_ALLOC_PROFILE = _readenv("NUMBA_NRT_ALLOC_PROFILE", int, 0)
+
+        # Number of threads running the parallel targets and prange() loops,
+        # including the calling thread
+        NUM_THREADS = max(1, _readenv("NUMBA_NUM_THREADS", int,
+                                      multiprocessing.cpu_count()))
+
+        # Pin the worker threads of the parallel targets to distinct CPUs
+        PIN_THREADS = _readenv("NUMBA_PIN_THREADS", int, 0)
+
         # Force dump of type annotation
         ANNOTATE = _readenv("NUMBA_DUMP_ANNOTATION", int, 0)
 
@@ -147,10 +163,20 @@ class _EnvReloader(object):
         # Force CUDA compute capability to a specific version
         FORCE_CUDA_CC = _readenv("NUMBA_FORCE_CUDA_CC", _parse_cc, None)
 
+        # The CPU (LLVM name, e.g. "generic") and features (e.g. "+avx2")
+        # the JIT compiles for, instead of the host CPU
+        CPU_NAME = _readenv("NUMBA_CPU_NAME", str, None)
+        CPU_FEATURES = _readenv("NUMBA_CPU_FEATURES", str, None)
+
+        # Let cached functions compiled for another CPU be loaded if
+        # the host supports the instruction set extensions they use
+        CACHE_MULTI_ISA = _readenv("NUMBA_CACHE_MULTI_ISA", int, 0)
+
         # x86-64 specific
         # Enable AVX on supported platforms where it won't degrade performance.
         ENABLE_AVX = _readenv("NUMBA_ENABLE_AVX", int,
-                              _cpu_name not in ('corei7-avx', 'core-avx-i'))
+                              (CPU_NAME or _cpu_name)
+                              not in ('corei7-avx', 'core-avx-i'))
 
         # Disable jit for debugging
         DISABLE_JIT = _readenv("NUMBA_DISABLE_JIT", int, 0)
@@ -158,6 +184,12 @@ class _EnvReloader(object):
         # Enable CUDA simulator
         ENABLE_CUDASIM = _readenv("NUMBA_ENABLE_CUDASIM", int, 0)
 
+        # Compile simulated CUDA kernels for the CPU
+        CUDASIM_COMPILE = _readenv("NUMBA_CUDASIM_COMPILE", int, 0)
+
+        # Trade some fidelity of the CUDA simulator for speed
+        CUDASIM_FAST = _readenv("NUMBA_CUDASIM_FAST", int, 0)
+
         # HSA Configs
 
         # Disable HSA support
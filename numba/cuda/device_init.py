@@ -5,7 +5,6 @@ from .stubs import (threadIdx, blockIdx, blockDim, gridDim, syncthreads,
                     shared, local, const, grid, gridsize, atomic)
 from .cudadrv.error import CudaSupportError
 from .cudadrv import nvvm
-from . import initialize
 from .errors import KernelRuntimeError
 
 from .decorators import jit, autojit, declare_device
@@ -29,4 +28,3 @@ def cuda_error():
     """
     return driver.driver.initialization_error
 
-initialize.initialize_all()
@@ -1,6 +1,7 @@
 from contextlib import contextmanager
 import numpy as np
 from warnings import warn
+from numba import config
 from numba.six import raise_from
 
 class FakeShape(tuple):
@@ -43,6 +44,9 @@ class FakeCUDAArray(object):
 
     def copy_to_host(self, ary=None, stream=0):
         if ary is None:
+            if config.CUDASIM_FAST:
+                # A single copy preserving the memory layout
+                return np.array(self._ary, order='K')
             ary = np.empty_like(self._ary)
         # NOTE: np.copyto() introduced in Numpy 1.7
         try:
@@ -59,6 +63,8 @@ class FakeCUDAArray(object):
         will copy data up to the length of the smallest of the two arrays,
         whereas this expects the size of the arrays to be equal.
         '''
+        if isinstance(ary, FakeCUDAArray):
+            ary = ary._ary
         try:
             np.copyto(self._ary, ary)
         except AttributeError:
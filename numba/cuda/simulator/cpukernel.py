@@ -0,0 +1,420 @@
+'''
+Compiled execution of @cuda.jit kernels in the simulator.
+
+When NUMBA_CUDASIM_COMPILE is set, a kernel is translated into a function
+that can be compiled in nopython mode for the CPU:
+
+* thread and block indices and dimensions are read from an extra tuple
+  argument;
+* shared arrays become extra arguments, allocated once per block;
+* local arrays are allocated with np.empty();
+* atomic operations become plain read-modify-write functions, since all
+  threads run sequentially in the calling thread;
+* each syncthreads() becomes a yield, so that kernels using it are compiled
+  as generators and the threads of a block are advanced in turn, from one
+  barrier to the next.
+
+Kernels without syncthreads() are launched by a compiled loop nest over the
+grid and the blocks.  Kernels that cannot be translated or compiled are run
+by the interpreted simulator.
+'''
+
+from __future__ import print_function, absolute_import, division
+
+import ast
+import inspect
+import textwrap
+import warnings
+
+import numpy as np
+
+from numba import numpy_support, six, types
+from numba.config import NumbaWarning
+from numba.decorators import jit
+
+
+class UnsupportedKernel(Exception):
+    '''
+    Raised when a kernel uses a feature not supported by compiled execution.
+    '''
+
+
+# Layout of the index tuple passed to translated functions
+_INDEX_ARG = '__sim_idx'
+_INDEX_OFFSETS = {'threadIdx': 0, 'blockIdx': 3, 'blockDim': 6, 'gridDim': 9}
+_AXES = 'xyz'
+
+
+def atomic_add(ary, idx, val):
+    old = ary[idx]
+    ary[idx] = old + val
+    return old
+
+
+def atomic_max(ary, idx, val):
+    # NaN is treated as missing data, as in CUDA
+    old = ary[idx]
+    if old != old:
+        ary[idx] = val
+    elif val == val and val > old:
+        ary[idx] = val
+    return old
+
+
+# Names injected in the globals of translated functions
+_HELPERS = {
+    '__sim_empty': np.empty,
+    '__sim_atomic_add': jit(nopython=True)(atomic_add),
+    '__sim_atomic_max': jit(nopython=True)(atomic_max),
+}
+
+
+def _index_source(name, axis):
+    return '%s[%d]' % (_INDEX_ARG, _INDEX_OFFSETS[name] + _AXES.index(axis))
+
+
+def _grid_source(ndim, sizes_only=False):
+    comps = []
+    for axis in _AXES[:ndim]:
+        if sizes_only:
+            comps.append('%s * %s' % (_index_source('blockDim', axis),
+                                      _index_source('gridDim', axis)))
+        else:
+            comps.append('%s * %s + %s' % (_index_source('blockIdx', axis),
+                                           _index_source('blockDim', axis),
+                                           _index_source('threadIdx', axis)))
+    if ndim == 1:
+        return comps[0]
+    return '(%s)' % ', '.join(comps)
+
+
+def _parse_expr(source, node):
+    return ast.copy_location(ast.parse(source, mode='eval').body, node)
+
+
+class _KernelTransformer(ast.NodeTransformer):
+    '''
+    Rewrite the uses of the cuda module in the body of a kernel or device
+    function.
+    '''
+
+    def __init__(self, globals, is_device):
+        self.globals = globals
+        self.is_device = is_device
+        # (shape, dtype) of each shared array, in order of appearance
+        self.shared = []
+        self.has_barrier = False
+        # Injected name -> device function (a FakeCUDAKernel)
+        self.device_functions = {}
+
+    def _cuda_path(self, node):
+        '''
+        If *node* is an attribute chain starting from the cuda module,
+        return the list of attribute names, otherwise None.
+        '''
+        attrs = []
+        while isinstance(node, ast.Attribute):
+            attrs.append(node.attr)
+            node = node.value
+        if isinstance(node, ast.Name) and node.id == 'cuda':
+            return attrs[::-1]
+
+    def _evaluate(self, node):
+        expr = ast.Expression(body=node)
+        ast.fix_missing_locations(expr)
+        try:
+            return eval(compile(expr, '<cuda kernel>', 'eval'), self.globals)
+        except Exception:
+            raise UnsupportedKernel('shared array shape and dtype must be '
+                                    'constants')
+
+    def _array_args(self, node):
+        '''
+        Return the (shape, dtype) argument nodes of an array() call.
+        '''
+        args = dict(zip(('shape', 'dtype'), node.args))
+        for kw in node.keywords:
+            if kw.arg not in ('shape', 'dtype') or kw.arg in args:
+                raise UnsupportedKernel('invalid array() arguments')
+            args[kw.arg] = kw.value
+        if len(args) != 2:
+            raise UnsupportedKernel('invalid array() arguments')
+        return args['shape'], args['dtype']
+
+    def _check_plain_call(self, node):
+        if (getattr(node, 'starargs', None) or getattr(node, 'kwargs', None)
+            or any(kw.arg is None for kw in node.keywords)
+            or any(type(arg).__name__ == 'Starred' for arg in node.args)):
+            raise UnsupportedKernel('* and ** arguments are not supported')
+
+    def _helper_call(self, name, node, args):
+        call = _parse_expr('%s()' % name, node)
+        call.args = args
+        return call
+
+    def visit_Expr(self, node):
+        # A syncthreads() statement becomes a yield
+        value = node.value
+        if (isinstance(value, ast.Call)
+            and self._cuda_path(value.func) == ['syncthreads']):
+            if self.is_device:
+                raise UnsupportedKernel('syncthreads() in a device function')
+            self.has_barrier = True
+            stub = ast.parse('def f():\n    yield 0').body[0]
+            return ast.copy_location(stub.body[0], node)
+        return self.generic_visit(node)
+
+    def visit_Call(self, node):
+        self._check_plain_call(node)
+        path = self._cuda_path(node.func)
+        if path is None:
+            node = self.generic_visit(node)
+            if isinstance(node.func, ast.Name):
+                self._rewrite_device_call(node)
+            return node
+
+        if path in (['grid'], ['gridsize']):
+            try:
+                [ndim] = [ast.literal_eval(arg) for arg in node.args]
+            except ValueError:
+                raise UnsupportedKernel('cuda.%s() needs a constant argument'
+                                        % path[0])
+            if ndim not in (1, 2, 3):
+                raise UnsupportedKernel('invalid number of grid dimensions')
+            return _parse_expr(_grid_source(ndim, path == ['gridsize']),
+                               node)
+
+        if path == ['shared', 'array']:
+            if self.is_device:
+                raise UnsupportedKernel('shared array in a device function')
+            shape, dtype = self._array_args(node)
+            name = '__sim_shared_%d' % len(self.shared)
+            self.shared.append((self._evaluate(shape), self._evaluate(dtype)))
+            return _parse_expr(name, node)
+
+        if path == ['local', 'array']:
+            shape, dtype = self._array_args(node)
+            return self._helper_call('__sim_empty', node,
+                                     [self.visit(shape), self.visit(dtype)])
+
+        args = [self.visit(arg) for arg in node.args]
+        if path == ['const', 'array_like'] and len(args) == 1:
+            return args[0]
+        if path in (['atomic', 'add'], ['atomic', 'max']) and not node.keywords:
+            return self._helper_call('__sim_atomic_%s' % path[1], node, args)
+        raise UnsupportedKernel('unsupported call to cuda.%s()'
+                                % '.'.join(path))
+
+    def _rewrite_device_call(self, node):
+        from .kernel import FakeCUDAKernel
+        func = self.globals.get(node.func.id)
+        if isinstance(func, FakeCUDAKernel) and func._device:
+            name = '__sim_device_%s' % node.func.id
+            self.device_functions[name] = func
+            node.func = _parse_expr(name, node.func)
+            node.args.append(_parse_expr(_INDEX_ARG, node))
+
+    def visit_Attribute(self, node):
+        path = self._cuda_path(node)
+        if path is None:
+            return self.generic_visit(node)
+        if (len(path) == 2 and path[0] in _INDEX_OFFSETS
+            and path[1] in _AXES):
+            return _parse_expr(_index_source(*path), node)
+        raise UnsupportedKernel('unsupported use of cuda.%s' % '.'.join(path))
+
+    def visit_Name(self, node):
+        if node.id == 'cuda':
+            raise UnsupportedKernel('the cuda module can only be used through '
+                                    'its attributes')
+        return node
+
+    def _unsupported(self, node):
+        raise UnsupportedKernel('nested functions and classes are not '
+                                'supported')
+
+    visit_FunctionDef = visit_ClassDef = visit_Lambda = _unsupported
+
+
+def translate(fn, is_device=False, _active=()):
+    '''
+    Translate the kernel or device function *fn* into a Python function
+    suitable for compilation in nopython mode.  The translated function
+    takes the index tuple as an additional argument after the original
+    ones, then (for kernels) one argument per shared array.
+
+    Return a (function, transformer) tuple.  UnsupportedKernel is raised
+    if the function can't be translated.
+    '''
+    if fn in _active:
+        raise UnsupportedKernel('recursive device functions are not supported')
+    code = fn.__code__
+    if (code.co_flags & (inspect.CO_VARARGS | inspect.CO_VARKEYWORDS)
+        or fn.__defaults__ or getattr(code, 'co_kwonlyargcount', 0)):
+        raise UnsupportedKernel('default, * and ** arguments are not '
+                                'supported')
+    try:
+        lines, firstlineno = inspect.getsourcelines(fn)
+        filename = inspect.getsourcefile(fn) or '<cuda kernel>'
+    except (IOError, TypeError):
+        raise UnsupportedKernel('source code is not available')
+    tree = ast.parse(textwrap.dedent(''.join(lines)))
+    fdef = tree.body[0]
+    if not isinstance(fdef, ast.FunctionDef):
+        raise UnsupportedKernel('kernel must be defined with def')
+
+    globals = dict(fn.__globals__)
+    if fn.__closure__:
+        for name, cell in zip(code.co_freevars, fn.__closure__):
+            globals[name] = cell.cell_contents
+    globals.update(_HELPERS)
+
+    transformer = _KernelTransformer(globals, is_device)
+    body = [transformer.visit(stmt) for stmt in fdef.body]
+
+    for name, devfn in transformer.device_functions.items():
+        compiled = getattr(devfn, '_compiled_device', None)
+        if compiled is None:
+            pyfunc, _ = translate(devfn.fn, True, _active + (fn,))
+            compiled = devfn._compiled_device = jit(nopython=True)(pyfunc)
+        globals[name] = compiled
+
+    params = list(code.co_varnames[:code.co_argcount]) + [_INDEX_ARG]
+    params += ['__sim_shared_%d' % i for i in range(len(transformer.shared))]
+    # Parse a stub function to get the right argument nodes for the
+    # Python version.
+    module = ast.parse('def %s(%s): pass' % (fdef.name, ', '.join(params)))
+    module.body[0].body = body
+    ast.increment_lineno(module, firstlineno - 1)
+    ast.fix_missing_locations(module)
+    namespace = {}
+    six.exec_(compile(module, filename, 'exec'), globals, namespace)
+    return namespace[fdef.name], transformer
+
+
+_LAUNCH_TEMPLATE = '''
+def launch(%(args)s__sim_grid, __sim_block%(shapes)s):
+    for bx in range(__sim_grid[0]):
+        for by in range(__sim_grid[1]):
+            for bz in range(__sim_grid[2]):
+%(allocs)s
+                for tx in range(__sim_block[0]):
+                    for ty in range(__sim_block[1]):
+                        for tz in range(__sim_block[2]):
+                            idx = (tx, ty, tz, bx, by, bz,
+                                   __sim_block[0], __sim_block[1],
+                                   __sim_block[2], __sim_grid[0],
+                                   __sim_grid[1], __sim_grid[2])
+                            kernel(%(args)sidx%(shared)s)
+'''
+
+
+def _shared_alloc_source(i):
+    return ('                __sim_shared_%d = __sim_empty(__sim_shape_%d, '
+            '__sim_dtype_%d)' % (i, i, i))
+
+
+def _as_numpy_dtype(dtype):
+    if isinstance(dtype, types.Type):
+        return numpy_support.as_dtype(dtype)
+    return np.dtype(dtype)
+
+
+class CPUKernel(object):
+    '''
+    A kernel compiled for execution on the CPU.
+    '''
+
+    def __init__(self, fn):
+        pyfunc, transformer = translate(fn)
+        self._shared = transformer.shared
+        self._kernel = jit(nopython=True)(pyfunc)
+        self._has_barrier = transformer.has_barrier
+        if not self._has_barrier:
+            self._launch = self._make_launcher(fn)
+
+    def _make_launcher(self, fn):
+        code = fn.__code__
+        nshared = len(self._shared)
+        source = _LAUNCH_TEMPLATE % dict(
+            args=''.join('a%d, ' % i for i in range(code.co_argcount)),
+            shapes=''.join(', __sim_shape_%d' % i for i in range(nshared)),
+            allocs='\n'.join(_shared_alloc_source(i)
+                             for i in range(nshared)) or '                pass',
+            shared=''.join(', __sim_shared_%d' % i for i in range(nshared)),
+            )
+        namespace = dict(_HELPERS, kernel=self._kernel)
+        for i, (shape, dtype) in enumerate(self._shared):
+            namespace['__sim_dtype_%d' % i] = dtype
+        six.exec_(compile(source, '<cuda kernel launch>', 'exec'), namespace)
+        return jit(nopython=True)(namespace['launch'])
+
+    def _shared_shapes(self, dynshared_size):
+        shapes = []
+        for shape, dtype in self._shared:
+            if shape == 0:
+                # Dynamic shared memory
+                shape = dynshared_size // _as_numpy_dtype(dtype).itemsize
+            if not isinstance(shape, tuple):
+                shape = (shape,)
+            shapes.append(shape)
+        return shapes
+
+    def compile(self, args, grid_dim, block_dim, dynshared_size):
+        '''
+        Compile the kernel for the given launch.  Errors are raised here
+        rather than when running it.
+        '''
+        shapes = self._shared_shapes(dynshared_size)
+        if self._has_barrier:
+            disp = self._kernel
+            # The kernel takes the shared arrays, as allocated by run()
+            shared = [np.empty(shape, _as_numpy_dtype(dtype))
+                      for shape, (_, dtype) in zip(shapes, self._shared)]
+            launch_args = list(args) + [(0,) * 12] + shared
+        else:
+            disp = self._launch
+            launch_args = list(args) + [tuple(grid_dim),
+                                        tuple(block_dim)] + shapes
+        disp.compile(tuple(disp.typeof_pyval(a) for a in launch_args))
+
+    def run(self, args, grid_dim, block_dim, dynshared_size):
+        shapes = self._shared_shapes(dynshared_size)
+        if not self._has_barrier:
+            self._launch(*(list(args) + [tuple(grid_dim), tuple(block_dim)]
+                           + shapes))
+            return
+
+        dtypes = [dtype for shape, dtype in self._shared]
+        for bx, by, bz in np.ndindex(*grid_dim):
+            shared = [np.empty(shape, _as_numpy_dtype(dtype))
+                      for shape, dtype in zip(shapes, dtypes)]
+            # Start all threads, then advance them in turn up to the
+            # next barrier until they have all finished.
+            threads = []
+            for tx, ty, tz in np.ndindex(*block_dim):
+                idx = ((tx, ty, tz, bx, by, bz) + tuple(block_dim)
+                       + tuple(grid_dim))
+                threads.append(self._kernel(*(list(args) + [idx] + shared)))
+            while threads:
+                threads = [t for t in threads if _advance(t)]
+
+
+def _advance(thread):
+    try:
+        next(thread)
+    except StopIteration:
+        return False
+    return True
+
+
+def compile_kernel(fn):
+    '''
+    Return a CPUKernel for the kernel function *fn*, or None if it can't
+    be compiled.
+    '''
+    try:
+        return CPUKernel(fn)
+    except UnsupportedKernel as e:
+        warnings.warn('kernel %s will be interpreted by the simulator: %s'
+                      % (fn.__name__, e), NumbaWarning)
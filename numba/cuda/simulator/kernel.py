@@ -1,10 +1,14 @@
 from __future__ import print_function
-from .array import to_device
-from .kernelapi import Dim3, FakeCUDAModule, swapped_cuda_module
+from .array import to_device, FakeCUDAArray
+from .kernelapi import (Dim3, FakeCUDAModule, SequentialCUDAModule,
+                        swapped_cuda_module)
+from numba import config
+from numba.config import NumbaWarning
 from numba.six import reraise
 import numpy as np
 import sys
 import threading
+import warnings
 
 
 class FakeCUDAKernel(object):
@@ -16,6 +20,10 @@ class FakeCUDAKernel(object):
         self.fn = fn
         self._device = device
         self._fastmath = fastmath
+        # The CPUKernel if compiled (see cpukernel.py), False if the kernel
+        # can't be compiled
+        self._cpu_kernel = None
+        self._syncthreads = None
         # Initial configuration: 1 block, 1 thread, stream 0, no dynamic shared
         # memory.
         self[1, 1, 0, 0]
@@ -24,15 +32,27 @@ class FakeCUDAKernel(object):
         if self._device:
             return self.fn(*args)
 
+        if config.CUDASIM_COMPILE and self._run_compiled(args):
+            return
+
+        if config.CUDASIM_FAST:
+            # Index the arrays directly, without the FakeCUDAArray checks
+            fake_args = [arg._ary if isinstance(arg, FakeCUDAArray) else arg
+                         for arg in args]
+            if not self._uses_syncthreads():
+                self._run_sequential(fake_args)
+                return
+        else:
+            # fake_args substitutes all numpy arrays for FakeCUDAArrays
+            # because they implement some semantics differently
+            def fake_arg(arg):
+                if isinstance(arg, np.ndarray) and arg.ndim > 0:
+                    return to_device(arg)
+                return arg
+            fake_args = [fake_arg(arg) for arg in args]
+
         fake_cuda_module = FakeCUDAModule(self.grid_dim, self.block_dim,
                                           self.dynshared_size)
-        # fake_args substitutes all numpy arrays for FakeCUDAArrays
-        # because they implement some semantics differently
-        def fake_arg(arg):
-            if isinstance(arg, np.ndarray) and arg.ndim > 0:
-                return to_device(arg)
-            return arg
-        fake_args = [fake_arg(arg) for arg in args]
 
         with swapped_cuda_module(self.fn, fake_cuda_module):
             # Execute one block at a time
@@ -40,6 +60,70 @@ class FakeCUDAKernel(object):
                 bm = BlockManager(self.fn, self.grid_dim, self.block_dim)
                 bm.run(grid_point, *fake_args)
 
+    def _run_sequential(self, args):
+        """
+        Run all the threads in turn in the calling thread, which is only
+        possible if they don't synchronize.
+        """
+        fake_cuda_module = SequentialCUDAModule(self.grid_dim, self.block_dim,
+                                                self.dynshared_size)
+        with swapped_cuda_module(self.fn, fake_cuda_module):
+            for grid_point in np.ndindex(*self.grid_dim):
+                blockIdx = fake_cuda_module.blockIdx = Dim3(*grid_point)
+                for block_point in np.ndindex(*self.block_dim):
+                    threadIdx = fake_cuda_module.threadIdx = Dim3(*block_point)
+                    try:
+                        self.fn(*args)
+                    except Exception as e:
+                        reraise(*_thread_exception(e, threadIdx, blockIdx))
+
+    def _uses_syncthreads(self, _seen=()):
+        """
+        Whether the kernel, or a device function it calls, may call
+        syncthreads().
+        """
+        if self._syncthreads is None:
+            seen = _seen + (self,)
+            names = set()
+            codes = [self.fn.__code__]
+            while codes:
+                code = codes.pop()
+                names.update(code.co_names)
+                codes.extend(c for c in code.co_consts
+                             if isinstance(c, type(code)))
+            self._syncthreads = 'syncthreads' in names
+            for name in names:
+                value = self.fn.__globals__.get(name)
+                if (isinstance(value, FakeCUDAKernel) and value not in seen
+                        and value._uses_syncthreads(seen)):
+                    self._syncthreads = True
+        return self._syncthreads
+
+    def _run_compiled(self, args):
+        """
+        Run the kernel compiled for the CPU.  Return False if it can't be
+        compiled, in which case it should be interpreted.
+        """
+        from .cpukernel import compile_kernel
+        if self._cpu_kernel is None:
+            self._cpu_kernel = compile_kernel(self.fn) or False
+        if not self._cpu_kernel:
+            return False
+
+        # Device arrays share their memory with the host arrays
+        args = [arg._ary if isinstance(arg, FakeCUDAArray) else arg
+                for arg in args]
+        launch = (args, self.grid_dim, self.block_dim, self.dynshared_size)
+        try:
+            self._cpu_kernel.compile(*launch)
+        except Exception as e:
+            warnings.warn('kernel %s will be interpreted by the simulator: %s'
+                          % (self.fn.__name__, e), NumbaWarning)
+            self._cpu_kernel = False
+            return False
+        self._cpu_kernel.run(*launch)
+        return True
+
     def __getitem__(self, configuration):
         grid_dim = configuration[0]
         block_dim = configuration[1]
@@ -87,6 +171,21 @@ class FakeCUDAKernel(object):
 # Thread emulation
 
 
+def _thread_exception(e, threadIdx, blockIdx):
+    """
+    Return the exception info for exception *e*, raised by a kernel thread,
+    with the thread's position added to the message.
+    """
+    tid = 'tid=%s' % list(threadIdx)
+    ctaid = 'ctaid=%s' % list(blockIdx)
+    if str(e) == '':
+        msg = '%s %s' % (tid, ctaid)
+    else:
+        msg = '%s %s: %s' % (tid, ctaid, e)
+    tb = sys.exc_info()[2]
+    return (type(e), type(e)(msg), tb)
+
+
 class BlockThread(threading.Thread):
     '''
     Manages the execution of a function for a single CUDA thread.
@@ -104,14 +203,8 @@ class BlockThread(threading.Thread):
         try:
             super(BlockThread, self).run()
         except Exception as e:
-            tid = 'tid=%s' % list(self.threadIdx)
-            ctaid = 'ctaid=%s' % list(self.blockIdx)
-            if str(e) == '':
-                msg = '%s %s' % (tid, ctaid)
-            else:
-                msg = '%s %s: %s' % (tid, ctaid, e)
-            tb = sys.exc_info()[2]
-            self.exception = (type(e), type(e)(msg), tb)
+            self.exception = _thread_exception(e, self.threadIdx,
+                                               self.blockIdx)
 
     def syncthreads(self):
         self.syncthreads_blocked = True
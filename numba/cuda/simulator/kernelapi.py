@@ -186,6 +186,20 @@ class FakeCUDAModule(object):
         raise RuntimeError("Global grid has 1-3 dimensions. %d requested" % n)
 
 
+class SequentialCUDAModule(FakeCUDAModule):
+    '''
+    The cuda module for kernels whose threads are all run in turn by the
+    calling thread (see FakeCUDAKernel._run_sequential).  The indices of the
+    current thread are set directly on the module.
+    '''
+    threadIdx = None
+    blockIdx = None
+
+    def syncthreads(self):
+        raise RuntimeError('syncthreads() called from a kernel run '
+                           'sequentially')
+
+
 @contextmanager
 def swapped_cuda_module(fn, fake_cuda_module):
     fn_globs = fn.__globals__
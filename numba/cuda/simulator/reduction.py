@@ -1,4 +1,29 @@
+import numpy as np
+from numba import config
 from numba.six.moves import reduce as pyreduce
+from .array import FakeCUDAArray
+
+
+def _tree_reduce(func, ary):
+    '''
+    Reduce the 1D array *ary* by applying *func* to its two halves at a time,
+    in the same order as the device reduction kernel does.  Return None if
+    *func* doesn't work elementwise on arrays (e.g. it branches on its
+    arguments), in which case the elements must be reduced one by one.
+    '''
+    try:
+        while len(ary) > 1:
+            half = len(ary) // 2
+            res = func(ary[:half], ary[half:2 * half])
+            if not isinstance(res, np.ndarray) or res.shape != (half,):
+                return None
+            if len(ary) % 2:
+                res = np.concatenate((res, ary[-1:]))
+            ary = res
+    except Exception:
+        return None
+    return ary[0]
+
 
 def Reduce(func):
     def reduce_wrapper(seq, init=None):
@@ -6,6 +31,13 @@ def Reduce(func):
         # initializer but functools.reduce does not.
         if len(seq) == 0 and init == None:
             init = 0
+        if isinstance(seq, FakeCUDAArray):
+            seq = seq._ary
+        if (config.CUDASIM_FAST and isinstance(seq, np.ndarray)
+                and seq.ndim == 1 and len(seq) > 0):
+            res = _tree_reduce(func, seq)
+            if res is not None:
+                return res if init is None else func(init, res)
         if init is not None:
             return pyreduce(func, seq, init)
         else:
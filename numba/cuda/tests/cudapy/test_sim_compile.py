@@ -0,0 +1,136 @@
+"""
+Tests for the compiled execution mode of the CUDA simulator
+(NUMBA_CUDASIM_COMPILE).  Each kernel is run both compiled and interpreted,
+and the results compared.
+"""
+
+from __future__ import print_function, absolute_import, division
+
+import warnings
+
+import numpy as np
+
+from numba import cuda, config, float32, int32
+from numba.cuda.testing import unittest
+from numba.tests.support import override_config
+
+
+TPB = 8
+
+
+def vec_add(a, b, out):
+    i = cuda.grid(1)
+    if i < out.size:
+        out[i] = a[i] + b[i]
+
+
+@cuda.jit(device=True)
+def square(x):
+    return x * x
+
+
+def use_device(a, out):
+    x, y = cuda.grid(2)
+    if x < out.shape[0] and y < out.shape[1]:
+        out[x, y] = square(a[x, y])
+
+
+def block_sum(a, out):
+    sm = cuda.shared.array(shape=TPB, dtype=float32)
+    tx = cuda.threadIdx.x
+    i = cuda.blockIdx.x * cuda.blockDim.x + tx
+    sm[tx] = a[i]
+    cuda.syncthreads()
+    if tx == 0:
+        s = 0.0
+        for j in range(TPB):
+            s += sm[j]
+        out[cuda.blockIdx.x] = s
+
+
+def reverse_dyn_shared(a):
+    sm = cuda.shared.array(0, dtype=float32)
+    i = cuda.threadIdx.x
+    sm[i] = a[i]
+    cuda.syncthreads()
+    a[i] = sm[cuda.blockDim.x - 1 - i]
+
+
+def histogram(a, out):
+    i = cuda.grid(1)
+    if i < a.size:
+        cuda.atomic.add(out, a[i], 1)
+
+
+def local_array(out):
+    l = cuda.local.array(3, int32)
+    i = cuda.grid(1)
+    for k in range(3):
+        l[k] = i + k
+    out[i] = l[0] + l[1] + l[2] + cuda.gridsize(1)
+
+
+def nested_function(a):
+    # Nested functions can't be compiled
+    def inc(x):
+        return x + 1
+    a[0] = inc(a[0])
+
+
+@unittest.skipUnless(config.ENABLE_CUDASIM, 'Simulator only')
+class TestSimulatorCompile(unittest.TestCase):
+
+    def run_both(self, pyfunc, griddim, blockdim, args, sharedmem=0):
+        """
+        Run *pyfunc* as a kernel compiled and interpreted, and check the
+        arrays in *args* are updated identically.
+        """
+        results = []
+        for compile_mode in (1, 0):
+            copies = [arg.copy() for arg in args]
+            with override_config('CUDASIM_COMPILE', compile_mode):
+                kernel = cuda.jit(pyfunc)
+                kernel[griddim, blockdim, 0, sharedmem](*copies)
+            if compile_mode:
+                self.assertTrue(kernel._cpu_kernel)
+            results.append(copies)
+        for got, expected in zip(*results):
+            np.testing.assert_array_equal(got, expected)
+
+    def test_vec_add(self):
+        a = np.arange(100, dtype=np.float32)
+        self.run_both(vec_add, 4, 32, [a, a * 2, np.zeros_like(a)])
+
+    def test_device_function(self):
+        a = np.arange(60, dtype=np.float64).reshape(6, 10)
+        self.run_both(use_device, (2, 3), (3, 4), [a, np.zeros_like(a)])
+
+    def test_syncthreads(self):
+        a = np.arange(4 * TPB, dtype=np.float32)
+        self.run_both(block_sum, 4, TPB, [a, np.zeros(4, np.float32)])
+
+    def test_dynamic_shared_memory(self):
+        a = np.arange(16, dtype=np.float32)
+        self.run_both(reverse_dyn_shared, 1, 16, [a], sharedmem=16 * 4)
+
+    def test_atomics(self):
+        a = np.arange(200, dtype=np.int32) % 7
+        self.run_both(histogram, 7, 32, [a, np.zeros(7, np.int32)])
+
+    def test_local_array(self):
+        self.run_both(local_array, 3, 5, [np.zeros(15, np.int32)])
+
+    def test_fallback(self):
+        a = np.ones(1, dtype=np.int32)
+        with override_config('CUDASIM_COMPILE', 1):
+            kernel = cuda.jit(nested_function)
+            with warnings.catch_warnings(record=True) as w:
+                warnings.simplefilter('always')
+                kernel[1, 1](a)
+        self.assertFalse(kernel._cpu_kernel)
+        self.assertIn('interpreted', str(w[0].message))
+        self.assertEqual(a[0], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
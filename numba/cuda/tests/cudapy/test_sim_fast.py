@@ -0,0 +1,95 @@
+"""
+Tests for the fast mode of the CUDA simulator (NUMBA_CUDASIM_FAST).
+"""
+
+from __future__ import print_function, absolute_import, division
+
+import numpy as np
+
+from numba import cuda, config, float32
+from numba.cuda.testing import unittest
+from numba.tests.support import override_config
+
+
+@cuda.jit(device=True)
+def block_sync():
+    cuda.syncthreads()
+
+
+def scale(a, out):
+    x, y = cuda.grid(2)
+    if x < out.shape[0] and y < out.shape[1]:
+        out[x, y] = a[x, y] * 2
+
+
+def reverse_block(a):
+    sm = cuda.shared.array(8, dtype=float32)
+    i = cuda.threadIdx.x
+    sm[i] = a[i]
+    block_sync()
+    a[i] = sm[7 - i]
+
+
+def fail_last(a):
+    i = cuda.grid(1)
+    if i == a.size - 1:
+        raise ValueError('last')
+    a[i] = i
+
+
+@unittest.skipUnless(config.ENABLE_CUDASIM, 'Simulator only')
+class TestSimulatorFast(unittest.TestCase):
+
+    def setUp(self):
+        self._fast = override_config('CUDASIM_FAST', 1)
+        self._fast.__enter__()
+
+    def tearDown(self):
+        self._fast.__exit__(None, None, None)
+
+    def test_sequential(self):
+        kernel = cuda.jit(scale)
+        a = np.arange(60, dtype=np.float64).reshape(6, 10)
+        out = cuda.device_array_like(a)
+        kernel[(2, 3), (3, 4)](cuda.to_device(a), out)
+        self.assertFalse(kernel._uses_syncthreads())
+        np.testing.assert_array_equal(out.copy_to_host(), a * 2)
+
+    def test_syncthreads_in_device_function(self):
+        kernel = cuda.jit(reverse_block)
+        a = np.arange(8, dtype=np.float32)
+        kernel[1, 8](a)
+        self.assertTrue(kernel._uses_syncthreads())
+        np.testing.assert_array_equal(a, np.arange(8)[::-1])
+
+    def test_exception(self):
+        kernel = cuda.jit(fail_last)
+        with self.assertRaises(ValueError) as raises:
+            kernel[2, 3](np.zeros(6))
+        self.assertIn('tid=[2, 0, 0] ctaid=[1, 0, 0]: last',
+                      str(raises.exception))
+
+    def test_reduce(self):
+        A = np.arange(1001, dtype=np.float64)
+        sum_reduce = cuda.reduce(lambda a, b: a + b)
+        self.assertEqual(sum_reduce(cuda.to_device(A)), A.sum())
+        self.assertEqual(sum_reduce(A, init=5), A.sum() + 5)
+
+    def test_reduce_elementwise_only_when_fast(self):
+        arg_types = set()
+
+        def add(a, b):
+            arg_types.add(type(a))
+            return a + b
+
+        A = np.arange(10, dtype=np.float64)
+        self.assertEqual(cuda.reduce(add)(A), A.sum())
+        self.assertIn(np.ndarray, arg_types)
+        arg_types.clear()
+        with override_config('CUDASIM_FAST', 0):
+            self.assertEqual(cuda.reduce(add)(A), A.sum())
+        self.assertNotIn(np.ndarray, arg_types)
+
+
+if __name__ == '__main__':
+    unittest.main()
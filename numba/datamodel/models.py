@@ -315,6 +315,19 @@ class ExternalFuncPointerModel(PrimitiveModel):
         super(ExternalFuncPointerModel, self).__init__(dmm, fe_type, be_type)
 
 
+@register_default(types.FunctionType)
+class FunctionModel(StructModel):
+    def __init__(self, dmm, fe_type):
+        n = len(fe_type.sigs)
+        members = [
+            # The native entry points, with the Numba calling convention
+            ('addrs', types.UniTuple(types.voidptr, n)),
+            # The specializations' environments
+            ('envs', types.UniTuple(types.pyobject, n)),
+        ]
+        super(FunctionModel, self).__init__(dmm, fe_type, members)
+
+
 @register_default(types.UniTuple)
 @register_default(types.NamedUniTuple)
 class UniTupleModel(DataModel):
@@ -755,6 +768,24 @@ class UnicodeCharSeq(DataModel):
     def get_data_type(self):
         return self._be_type
 
+    def as_data(self, builder, value):
+        return value
+
+    def from_data(self, builder, value):
+        return value
+
+    def as_return(self, builder, value):
+        return value
+
+    def from_return(self, builder, value):
+        return value
+
+    def as_argument(self, builder, value):
+        return value
+
+    def from_argument(self, builder, value):
+        return value
+
 
 @register_default(types.CharSeq)
 class CharSeq(DataModel):
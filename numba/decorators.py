@@ -6,8 +6,6 @@ import warnings
 
 from . import config, sigutils
 from .errors import DeprecationError
-from .targets import registry
-from . import cuda
 
 # -----------------------------------------------------------------------------
 # Decorators
@@ -34,7 +32,8 @@ _msg_deprecated_signature_arg = ("Deprecated keyword argument `{0}`. "
                                  "Signatures should be passed as the first "
                                  "positional argument.")
 
-def jit(signature_or_function=None, locals={}, target='cpu', cache=False, **options):
+def jit(signature_or_function=None, locals={}, target='cpu', cache=False,
+        tiered=False, **options):
     """
     This decorator is used to compile a Python function into native code.
     
@@ -55,6 +54,11 @@ def jit(signature_or_function=None, locals={}, target='cpu', cache=False, **opti
         Specifies the target platform to compile for. Valid targets are cpu,
         gpu, npyufunc, and cuda. Defaults to cpu.
 
+    tiered: bool
+        Set to True to compile each specialization quickly at a low
+        optimization level first, and replace it with a fully optimized
+        version compiled in a background thread.  Default value is False.
+
     targetoptions: 
         For a cpu target, valid options are:
             nopython: bool
@@ -148,25 +152,33 @@ def jit(signature_or_function=None, locals={}, target='cpu', cache=False, **opti
         sigs = None
 
     wrapper = _jit(sigs, locals=locals, target=target, cache=cache,
-                   targetoptions=options)
+                   tiered=tiered, targetoptions=options)
     if pyfunc is not None:
         return wrapper(pyfunc)
     else:
         return wrapper
 
 
-def _jit(sigs, locals, target, cache, targetoptions):
+def _jit(sigs, locals, target, cache, tiered, targetoptions):
+    if config.ENABLE_CUDASIM and target == 'cuda':
+        def wrapper(func):
+            from . import cuda
+            return cuda.jit(func)
+        return wrapper
+
+    # Imported here to keep "import numba" cheap
+    from .targets import registry
     dispatcher = registry.target_registry[target]
 
     def wrapper(func):
-        if config.ENABLE_CUDASIM and target == 'cuda':
-            return cuda.jit(func)
         if config.DISABLE_JIT and not target == 'npyufunc':
             return DisableJitWrapper(func)
         disp = dispatcher(py_func=func, locals=locals,
                           targetoptions=targetoptions)
         if cache:
             disp.enable_caching()
+        if tiered:
+            disp.enable_tiered_compilation()
         if sigs is not None:
             for sig in sigs:
                 disp.compile(sig)
@@ -190,3 +202,43 @@ def njit(*args, **kws):
     return jit(*args, **kws)
 
 
+def cfunc(sig, locals={}, **options):
+    """
+    This decorator is used to compile a Python function into a C callback
+    usable with foreign C libraries.
+
+    Args
+    -----
+    sig:
+        The signature of the C callback, e.g. "float64(float64, intc)".
+        The function is compiled eagerly, in nopython mode.
+
+    locals: dict
+        Mapping of local variable names to Numba types.
+
+    options:
+        The same options as jit() (e.g. fastmath, opt).
+
+    Returns
+    --------
+    A CFunc object, whose ``address`` and ``ctypes`` attributes give
+    access to the native function.
+
+    Example:
+
+        @cfunc("float64(float64)")
+        def integrand(x):
+            return math.exp(-x * x)
+
+        quad(integrand.ctypes, 0, 1)
+    """
+    if 'nopython' in options:
+        warnings.warn('nopython is set for cfunc and is ignored',
+                      RuntimeWarning)
+
+    def wrapper(func):
+        # Imported here to keep "import numba" cheap
+        from .ccallback import CFunc
+        return CFunc(func, sig, locals=locals, options=options)
+
+    return wrapper
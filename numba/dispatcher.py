@@ -2,6 +2,7 @@
 
 from __future__ import print_function, division, absolute_import
 
+import atexit
 import contextlib
 import functools
 import errno
@@ -11,6 +12,7 @@ import os
 from .six.moves import cPickle as pickle
 import struct
 import sys
+import threading
 import warnings
 
 import numba
@@ -18,9 +20,10 @@ from numba import _dispatcher, compiler, utils, types
 from numba.typeconv.rules import default_type_manager
 from numba import sigutils, serialize, types, typing
 from numba.typing.templates import fold_arguments
-from numba.typing.typeof import typeof
+from numba.typing.typeof import typeof, typeof_impl, _typeof_dispatcher
 from numba.bytecode import get_code_object
 from numba.six import create_bound_method, next
+from numba import config
 from .config import NumbaWarning
 
 
@@ -38,6 +41,9 @@ class _OverloadedBase(_dispatcher.Dispatcher):
         self.overloads = utils.OrderedDict()
         # A mapping of signatures to compile results
         self._compileinfos = utils.OrderedDict()
+        # The native entry points of the nopython specializations, computed
+        # when first needed (see _native_entries)
+        self._native_entries_cache = None
 
         self.py_func = py_func
         # other parts of Numba assume the old Python 2 name for code object
@@ -68,6 +74,7 @@ class _OverloadedBase(_dispatcher.Dispatcher):
         self._clear()
         self.overloads.clear()
         self._compileinfos.clear()
+        self._native_entries_cache = None
 
     def _make_finalizer(self):
         """
@@ -75,17 +82,18 @@ class _OverloadedBase(_dispatcher.Dispatcher):
         related compiled functions.
         """
         overloads = self.overloads
-        targetctx = self.targetctx
+        get_targetctx = self._get_targetctx_getter()
 
         # Early-bind utils.shutting_down() into the function's local namespace
         # (see issue #689)
         def finalizer(shutting_down=utils.shutting_down):
             # The finalizer may crash at shutdown, skip it (resources
             # will be cleared by the process exiting, anyway).
-            if shutting_down():
+            if shutting_down() or not overloads:
                 return
             # This function must *not* hold any reference to self:
             # we take care to bind the necessary objects in the closure.
+            targetctx = get_targetctx()
             for func in overloads.values():
                 try:
                     targetctx.remove_user_function(func)
@@ -94,6 +102,14 @@ class _OverloadedBase(_dispatcher.Dispatcher):
 
         return finalizer
 
+    def _get_targetctx_getter(self):
+        """
+        Return a function returning the target context, without holding
+        a reference to self.
+        """
+        targetctx = self.targetctx
+        return lambda: targetctx
+
     @property
     def signatures(self):
         """
@@ -106,6 +122,27 @@ class _OverloadedBase(_dispatcher.Dispatcher):
         return [cres.signature for cres in self._compileinfos.values()
                 if not cres.objectmode and not cres.interpmode]
 
+    @property
+    def _native_entries(self):
+        """
+        The addresses of the native entry point and of the environment of
+        each nopython specialization, in the order of nopython_signatures,
+        as a flat tuple.  This is used when this dispatcher is passed as
+        a first-class function (see types.FunctionType), and cached until
+        the specializations change.
+        """
+        if self._native_entries_cache is None:
+            entries = []
+            for cres in self._compileinfos.values():
+                if cres.objectmode or cres.interpmode:
+                    continue
+                env = cres.environment
+                entries.append(cres.library.get_pointer_to_function(
+                    cres.fndesc.llvm_func_name))
+                entries.append(id(env) if env is not None else 0)
+            self._native_entries_cache = tuple(entries)
+        return self._native_entries_cache
+
     def disable_compile(self, val=True):
         """Disable the compilation of new signatures at call time.
         """
@@ -119,6 +156,7 @@ class _OverloadedBase(_dispatcher.Dispatcher):
         self._insert(sig, cres.entry_point, cres.objectmode, cres.interpmode)
         self.overloads[args] = cres.entry_point
         self._compileinfos[args] = cres
+        self._native_entries_cache = None
 
     def get_call_template(self, args, kws):
         """
@@ -194,6 +232,25 @@ class _OverloadedBase(_dispatcher.Dispatcher):
             print(res.type_annotation, file=file)
             print('=' * 80, file=file)
 
+    def inspect_allocations(self, file=None):
+        """
+        Print the NRT allocations made by this function, per source line.
+        This requires the allocation profiler to be enabled at compile time
+        (see NUMBA_NRT_ALLOC_PROFILE).
+        """
+        from numba.runtime import allocprof
+
+        if file is None:
+            file = sys.stdout
+
+        filename = get_code_object(self.py_func).co_filename
+        qualname = getattr(self.py_func, '__qualname__',
+                           self.py_func.__name__)
+        stats = [st for st in allocprof.get_site_stats(filename)
+                 if st.funcname == qualname]
+        print("%s allocations" % (self.py_func.__name__,), file=file)
+        allocprof.print_report(stats, file=file)
+
     def _explain_ambiguous(self, *args, **kws):
         """
         Callback for the C _Dispatcher object.
@@ -250,6 +307,24 @@ class _OverloadedBase(_dispatcher.Dispatcher):
         return tp
 
 
+# The threads compiling optimized versions in the background (see
+# Overloaded._compile_optimized()), and whether they should stop
+_tier_threads = set()
+_tiering_stopped = threading.Event()
+
+
+@atexit.register
+def _stop_tiered_compilation():
+    """
+    Cancel the background compilations at interpreter exit, and wait for
+    those already in LLVM, which mustn't run while the interpreter is
+    torn down.
+    """
+    _tiering_stopped.set()
+    for thread in list(_tier_threads):
+        thread.join()
+
+
 class Overloaded(_OverloadedBase):
     """
     Implementation of user-facing dispatcher objects (i.e. created using
@@ -271,7 +346,6 @@ class Overloaded(_OverloadedBase):
             Target-specific config options.
         """
         self.typingctx = self.targetdescr.typing_context
-        self.targetctx = self.targetdescr.target_context
 
         pysig = utils.pysignature(py_func)
         arg_count = len(pysig.parameters)
@@ -283,12 +357,42 @@ class Overloaded(_OverloadedBase):
         self.targetoptions = targetoptions
         self.locals = locals
         self._cache = NullCache()
+        self._tiered = False
+        # Background threads compiling optimized versions, and the
+        # compile results they replaced
+        self._tier_threads = []
+        self._replaced_compileinfos = []
 
         self.typingctx.insert_overloaded(self)
 
+    @property
+    def targetctx(self):
+        # The target context is only created when first compiling
+        return self.targetdescr.target_context
+
+    def _get_targetctx_getter(self):
+        targetdescr = self.targetdescr
+        return lambda: targetdescr.target_context
+
     def enable_caching(self):
         self._cache = FunctionCache(self.py_func)
 
+    def enable_tiered_compilation(self):
+        """
+        Compile new specializations quickly at a low optimization level,
+        then replace them with fully optimized versions compiled in
+        a background thread.
+        """
+        self._tiered = True
+
+    def wait_for_optimized(self, timeout=None):
+        """
+        Wait for the optimized versions being compiled in the background
+        (see enable_tiered_compilation()).
+        """
+        for thread in list(self._tier_threads):
+            thread.join(timeout)
+
     def __get__(self, obj, objtype=None):
         '''Allow a JIT function to be bound as a method to an object'''
         if obj is None:  # Unbound method
@@ -323,7 +427,7 @@ class Overloaded(_OverloadedBase):
         return self
 
     def compile(self, sig):
-        with self._compile_lock:
+        with compiler.global_compiler_lock, self._compile_lock:
             args, return_type = sigutils.normalize_signature(sig)
             # Don't recompile if signature already exists
             existing = self.overloads.get(tuple(args))
@@ -343,6 +447,15 @@ class Overloaded(_OverloadedBase):
             flags = compiler.Flags()
             self.targetdescr.options.parse_as_flags(flags, self.targetoptions)
 
+            # With tiered compilation, a quick version is compiled first,
+            # unless the optimization level was given explicitly.
+            tiered = self._tiered and flags.opt is None
+            if tiered:
+                final_flags = flags
+                flags = flags.copy()
+                flags.set_value('opt', self._quick_opt)
+                flags.set_value('loop_vectorize', False)
+
             cres = compiler.compile_extra(self.typingctx, self.targetctx,
                                           self.py_func,
                                           args=args, return_type=return_type,
@@ -353,9 +466,90 @@ class Overloaded(_OverloadedBase):
                 raise cres.typing_error
 
             self.add_overload(cres)
-            self._cache.save_overload(sig, cres)
+            if tiered and not cres.objectmode and not cres.interpmode:
+                self._compile_optimized(sig, cres, final_flags)
+            else:
+                self._cache.save_overload(sig, cres)
             return cres.entry_point
 
+    # Optimization level of the quick versions of tiered compilation
+    _quick_opt = 1
+
+    def _compile_optimized(self, sig, quick_cres, flags):
+        """
+        Start compiling an optimized version of *quick_cres* in
+        a background thread, which will replace it once ready.
+        """
+        args = tuple(quick_cres.signature.args)
+        return_type = quick_cres.signature.return_type
+        flags = flags.copy()
+        # The library is finalized below
+        flags.set('no_compile')
+
+        def is_current():
+            # The quick version may have been removed (e.g. by
+            # recompile()) in the meantime
+            return (not _tiering_stopped.is_set()
+                    and self._compileinfos.get(args) is quick_cres)
+
+        def compile_and_replace():
+            # The global lock is taken first, as in compile()
+            with compiler.global_compiler_lock, self._compile_lock:
+                if not is_current():
+                    return
+                try:
+                    cres = compiler.compile_extra(
+                        self.typingctx, self.targetctx, self.py_func,
+                        args=args, return_type=return_type, flags=flags,
+                        locals=self.locals)
+                except Exception as e:
+                    warnings.warn("could not compile an optimized version "
+                                  "of %s%s: %s" % (self.py_func.__name__,
+                                                   args, e),
+                                  NumbaWarning)
+                    return
+                if cres.objectmode or cres.interpmode:
+                    return
+                library = cres.library
+                library.link()
+
+            # The optimizations take most of the time, and don't hold up
+            # the compilations made meanwhile
+            library.optimize()
+
+            with compiler.global_compiler_lock, self._compile_lock:
+                if not is_current():
+                    return
+                library.finalize()
+                cfunc = self.targetctx.get_executable(
+                    library, cres.fndesc, cres.environment)
+                self.targetctx.insert_user_function(cfunc, cres.fndesc,
+                                                    [library])
+                cres = cres._replace(entry_point=cfunc)
+                # Replace the entry point; the quick version is kept alive,
+                # as other threads may be running it.
+                self.add_overload(cres)
+                self._replaced_compileinfos.append(quick_cres)
+                try:
+                    self.targetctx.remove_user_function(
+                        quick_cres.entry_point)
+                except KeyError:
+                    pass
+                self._cache.save_overload(sig, cres)
+
+        def run():
+            try:
+                compile_and_replace()
+            finally:
+                _tier_threads.discard(thread)
+
+        thread = threading.Thread(target=run)
+        thread.daemon = True
+        self._tier_threads = [t for t in self._tier_threads if t.is_alive()]
+        self._tier_threads.append(thread)
+        _tier_threads.add(thread)
+        thread.start()
+
     def recompile(self):
         """
         Recompile all signatures afresh.
@@ -402,7 +596,7 @@ class LiftedLoop(_OverloadedBase):
         return next(iter(self.bytecode)).lineno
 
     def compile(self, sig):
-        with self._compile_lock:
+        with compiler.global_compiler_lock, self._compile_lock:
             # FIXME this is mostly duplicated from Overloaded
             flags = self.flags
             args, return_type = sigutils.normalize_signature(sig)
@@ -431,6 +625,9 @@ class LiftedLoop(_OverloadedBase):
             return cres.entry_point
 
 
+# Dispatchers passed as arguments are first-class functions
+typeof_impl.register(Overloaded, _typeof_dispatcher)
+
 # Initialize typeof machinery
 _dispatcher.typeof_init(dict((str(t), t._code) for t in types.number_domain))
 
@@ -532,8 +729,11 @@ class FunctionCache(object):
         if not self._enabled:
             return
         overloads = self._load_index()
-        key = self._index_key(sig, target_context.jit_codegen())
+        codegen = target_context.jit_codegen()
+        key = self._index_key(sig, codegen)
         data_name = overloads.get(key)
+        if data_name is None and config.CACHE_MULTI_ISA:
+            data_name = self._find_compatible_overload(overloads, sig, codegen)
         if data_name is None:
             return
         try:
@@ -583,6 +783,9 @@ class FunctionCache(object):
             cannot_cache = "as it uses lifted loops"
         elif cres.has_dynamic_globals:
             cannot_cache = "as it uses dynamic globals (such as ctypes pointers)"
+        elif cres.library is not None and cres.library.links_by_symbol:
+            cannot_cache = ("as it calls other functions by symbol "
+                            "(NUMBA_LINK_BY_SYMBOL)")
         if cannot_cache:
             msg = ('Cannot cache compiled function "%s" %s'
                    % (self._funcname, cannot_cache))
@@ -591,6 +794,19 @@ class FunctionCache(object):
             return False
         return True
 
+    def _find_compatible_overload(self, overloads, sig, codegen):
+        """
+        Find a data file for the given signature compiled for another CPU,
+        but runnable on this host.  A version compiled for the host's CPU
+        model is preferred, then the portable one using the most
+        instruction set extensions.
+        """
+        candidates = [(magic[3] is None, len(magic[3] or ()), data_name)
+                      for (key_sig, magic), data_name in overloads.items()
+                      if key_sig == sig and codegen.is_compatible_magic(magic)]
+        if candidates:
+            return max(candidates)[2]
+
     def _index_key(self, sig, codegen):
         """
         Compute index key for the given signature and codegen.
@@ -103,6 +103,14 @@ class FunctionDescriptor(object):
         """
         return 'wrapper.' + self.mangled_name
 
+    @property
+    def llvm_cfunc_wrapper_name(self):
+        """
+        The LLVM-registered name for a C-compatible wrapper of the
+        raw function.
+        """
+        return 'cfunc.' + self.mangled_name
+
     def __repr__(self):
         return "<function descriptor %r>" % (self.unique_name)
 
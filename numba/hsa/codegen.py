@@ -40,10 +40,11 @@ class JITHSACodegen(BaseCPUCodegen):
         ir_module.triple = TRIPLE
         return ir_module
 
-    def _module_pass_manager(self):
+    def _module_pass_manager(self, opt=None, loop_vectorize=None):
         raise NotImplementedError
 
-    def _function_pass_manager(self, llvm_module):
+    def _function_pass_manager(self, llvm_module, opt=None,
+                               loop_vectorize=None):
         raise NotImplementedError
 
     def _add_module(self, module):
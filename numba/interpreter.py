@@ -85,6 +85,26 @@ class GeneratorInfo(object):
         return self.yield_points.values()
 
 
+class _SerialLoop(Exception):
+    """
+    Raised when a prange() loop can't run in parallel.
+    """
+
+
+def _stmt_reads(stmt):
+    """
+    Return the names of the variables read by statement *stmt*.
+    """
+    if isinstance(stmt, ir.Assign):
+        value = stmt.value
+        if isinstance(value, ir.Var):
+            return [value.name]
+        elif isinstance(value, ir.Inst):
+            return [var.name for var in value.list_vars()]
+        return []
+    return [var.name for var in stmt.list_vars()]
+
+
 class Interpreter(object):
     """A bytecode interpreter that builds up the IR.
     """
@@ -114,6 +134,11 @@ class Interpreter(object):
         self.definitions = collections.defaultdict(list)
         # { ir.Block: { variable names (potentially) alive at start of block } }
         self.block_entry_vars = {}
+        # { header offset: ir.ParallelLoop } of the prange() loops that can
+        # run in parallel, and { header offset: (ir.Loc, reason) } of those
+        # which must run serially
+        self.parallel_loops = {}
+        self.serial_prange_loops = {}
 
         if self.bytecode.is_generator:
             self.generator_info = GeneratorInfo()
@@ -157,6 +182,8 @@ class Interpreter(object):
         self._compute_live_variables()
         if self.generator_info:
             self._compute_generator_info()
+        else:
+            self._find_parallel_loops()
 
     def _compute_live_variables(self):
         """
@@ -240,6 +267,191 @@ class Interpreter(object):
             st |= yp.weak_live_vars
         gi.state_vars = sorted(st)
 
+    def _find_parallel_loops(self):
+        """
+        Find the loops iterating over prange() and check whether they can
+        run in parallel: the loop must only be exited when the iterator is
+        exhausted, and the only variables carried from one iteration to the
+        next must be reductions (e.g. ``s += x``).
+        This must be done after insertion of ir.Dels.
+        """
+        from numba.special import prange
+
+        # { var name: [assigned values] }
+        assignments = collections.defaultdict(list)
+        for ir_block in self.blocks.values():
+            for stmt in ir_block.body:
+                if isinstance(stmt, ir.Assign):
+                    assignments[stmt.target.name].append(stmt.value)
+
+        def get_definition(value):
+            # Like get_definition(), but also following phi assignments
+            while isinstance(value, ir.Var):
+                values = assignments[value.name]
+                if len(values) != 1:
+                    return None
+                value = values[0]
+            return value
+
+        for header, loop in sorted(self.cfa.graph.loops().items()):
+            iternext = self._find_iternext(self.blocks[header])
+            if iternext is None:
+                continue
+            getiter = get_definition(iternext.value.value)
+            if not (isinstance(getiter, ir.Expr) and getiter.op == 'getiter'):
+                continue
+            call = get_definition(getiter.value)
+            if not (isinstance(call, ir.Expr) and call.op == 'call'):
+                continue
+            func = get_definition(call.func)
+            if not (isinstance(func, ir.Global) and func.value is prange):
+                continue
+            try:
+                self.parallel_loops[header] = self._make_parallel_loop(
+                    loop, iternext, assignments)
+            except _SerialLoop as e:
+                self.serial_prange_loops[header] = (iternext.loc, str(e))
+
+    def _find_iternext(self, ir_block):
+        """
+        Return the iternext() assignment of a loop header, or None.
+        """
+        for stmt in ir_block.body:
+            if (isinstance(stmt, ir.Assign)
+                    and isinstance(stmt.value, ir.Expr)
+                    and stmt.value.op == 'iternext'):
+                return stmt
+
+    def _make_parallel_loop(self, loop, iternext, assignments):
+        """
+        Return a ir.ParallelLoop for the prange() *loop* whose header
+        contains the *iternext* assignment, or raise _SerialLoop.
+        """
+        header = self.blocks[loop.header]
+        branch = header.terminator
+        if (not isinstance(branch, ir.Branch) or len(loop.entries) != 1
+                or loop.exits != set([branch.falsebr])):
+            raise _SerialLoop("the loop has several exits")
+
+        # The header only advances the iterator
+        pair = iternext.target.name
+        index_vars = set()
+        header_vars = set()
+        for stmt in header.body:
+            if isinstance(stmt, ir.Assign):
+                value = stmt.value
+                if stmt is iternext:
+                    pass
+                elif (isinstance(value, ir.Expr) and value.op == 'pair_first'
+                        and value.value.name == pair):
+                    index_vars.add(stmt.target.name)
+                elif (isinstance(value, ir.Var)
+                        and value.name in index_vars):
+                    index_vars.add(stmt.target.name)
+                elif not (isinstance(value, ir.Expr)
+                          and value.op == 'pair_second'):
+                    raise _SerialLoop("unexpected loop header")
+                header_vars.add(stmt.target.name)
+
+        body = set(loop.body) - set([loop.header])
+        # { var name: [statements reading it] } in the loop body
+        reads = collections.defaultdict(list)
+        written = set()
+        for offset in body:
+            for stmt in self.blocks[offset].body:
+                if isinstance(stmt, (ir.Return, ir.Yield)):
+                    raise _SerialLoop("the loop body returns")
+                for name in _stmt_reads(stmt):
+                    reads[name].append(stmt)
+                if isinstance(stmt, ir.Assign):
+                    written.add(stmt.target.name)
+        if (header_vars - index_vars) & set(reads):
+            raise _SerialLoop("unexpected loop header")
+
+        # Variables read before being written in an iteration are
+        # carried from the previous iteration
+        reductions = {}
+        for name in sorted(written):
+            if self._is_read_before_write(name, [branch.truebr], body):
+                fn = self._get_reduction(name, body, reads, assignments)
+                if fn is None:
+                    raise _SerialLoop(
+                        "variable '%s' is carried across iterations" % name)
+                reductions[name] = fn
+
+        # Variables private to an iteration mustn't be used after the loop
+        everywhere = set(self.blocks) - set([loop.header])
+        for name in sorted((written | index_vars) - set(reductions)):
+            if self._is_read_before_write(name, loop.exits, everywhere):
+                raise _SerialLoop(
+                    "variable '%s' is used after the loop" % name)
+
+        shared_vars = set(reads) - written - header_vars
+        return ir.ParallelLoop(header=loop.header, body=body,
+                               exit=branch.falsebr,
+                               iterator=iternext.value.value.name,
+                               index_vars=sorted(index_vars & set(reads)),
+                               shared_vars=sorted(shared_vars),
+                               reductions=reductions, loc=iternext.loc)
+
+    def _is_read_before_write(self, name, starts, blocks):
+        """
+        Whether variable *name* can be read before being written, on a path
+        starting at the *starts* blocks and going through *blocks*.
+        """
+        cfg = self.cfa.graph
+        todo = list(starts)
+        seen = set()
+        while todo:
+            offset = todo.pop()
+            if offset in seen or offset not in blocks:
+                continue
+            seen.add(offset)
+            for stmt in self.blocks[offset].body:
+                if name in _stmt_reads(stmt):
+                    return True
+                if isinstance(stmt, ir.Assign) and stmt.target.name == name:
+                    break
+            else:
+                todo.extend(succ for succ, _ in cfg.successors(offset))
+        return False
+
+    def _get_reduction(self, name, body, reads, assignments):
+        """
+        If variable *name* is only updated in the loop *body* by statements
+        such as ``name += value`` or ``name = name * value``, return the
+        binary operator, otherwise None.
+        """
+        fns = set()
+        exprs = []
+        for offset in body:
+            for stmt in self.blocks[offset].body:
+                if not (isinstance(stmt, ir.Assign)
+                        and stmt.target.name == name):
+                    continue
+                value = stmt.value
+                if isinstance(value, ir.Var):
+                    # name = $tmp, where $tmp is only read here
+                    if (len(assignments[value.name]) != 1
+                            or reads[value.name] != [stmt]):
+                        return None
+                    value = assignments[value.name][0]
+                if not (isinstance(value, ir.Expr)
+                        and value.op in ('binop', 'inplace_binop')
+                        and value.lhs.name == name
+                        and value.rhs.name != name):
+                    return None
+                fns.add(value.immutable_fn if value.op == 'inplace_binop'
+                        else value.fn)
+                exprs.append(value)
+        # The variable can't be read elsewhere
+        for stmt in reads[name]:
+            if not (isinstance(stmt, ir.Assign)
+                    and any(stmt.value is expr for expr in exprs)):
+                return None
+        if len(fns) == 1 and fns <= set(['+', '-', '*']):
+            return fns.pop()
+
     def _insert_var_dels(self):
         """
         Insert ir.Del statements where necessary for the various
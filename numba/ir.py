@@ -639,5 +639,33 @@ class Loop(object):
         return "Loop(entry=%s, exit=%s)" % args
 
 
+class ParallelLoop(object):
+    """
+    A prange() loop whose iterations can run in parallel.  *header* is the
+    loop header block, *body* the other blocks of the loop, *exit* the
+    block following the loop.  *iterator* is the name of the range iterator,
+    *index_vars* the names receiving the loop index in the header,
+    *shared_vars* the names defined outside the loop and read in its body,
+    and *reductions* maps the names of variables reduced in the loop to
+    their binary operator.
+    """
+    __slots__ = ("header", "body", "exit", "iterator", "index_vars",
+                 "shared_vars", "reductions", "loc")
+
+    def __init__(self, header, body, exit, iterator, index_vars, shared_vars,
+                 reductions, loc):
+        self.header = header
+        self.body = body
+        self.exit = exit
+        self.iterator = iterator
+        self.index_vars = index_vars
+        self.shared_vars = shared_vars
+        self.reductions = reductions
+        self.loc = loc
+
+    def __repr__(self):
+        return "ParallelLoop(header=%s, exit=%s)" % (self.header, self.exit)
+
+
 # A stub for undefined global reference
 UNDEFINED = object()
@@ -63,6 +63,10 @@ class BaseLower(object):
         self.varmap = {}
         self.firstblk = min(self.blocks.keys())
         self.loc = -1
+        # { header offset: ir.ParallelLoop } of the loops to run in parallel,
+        # and the offsets of their body blocks (see parloops.py)
+        self.parallel_loops = {}
+        self.outlined_blocks = set()
 
         # Subclass initialization
         self.init()
@@ -180,7 +184,15 @@ class BaseLower(object):
         for offset, block in self.blocks.items():
             bb = self.blkmap[offset]
             self.builder.position_at_end(bb)
-            self.lower_block(block)
+            if offset in self.parallel_loops:
+                from . import parloops
+                parloops.lower_parallel_loop(self,
+                                             self.parallel_loops[offset])
+            elif offset in self.outlined_blocks:
+                # Lowered in the outlined function of a parallel loop
+                self.builder.unreachable()
+            else:
+                self.lower_block(block)
 
         self.post_lower()
         return entry_block_tail
@@ -193,13 +205,29 @@ class BaseLower(object):
         for inst in block.body:
             self.loc = inst.loc
             try:
-                self.lower_inst(inst)
+                if config.NRT_ALLOC_PROFILE:
+                    self.lower_inst_with_alloc_site(inst)
+                else:
+                    self.lower_inst(inst)
             except LoweringError:
                 raise
             except Exception as e:
                 msg = "Internal error:\n%s: %s" % (type(e).__name__, e)
                 raise LoweringError(msg, inst.loc)
 
+    def lower_inst_with_alloc_site(self, inst):
+        """
+        Lower the given instruction, tagging NRT allocations with its
+        source location for the allocation profiler.
+        """
+        from numba.runtime import allocprof
+
+        with allocprof.registry.location(self.fndesc, inst.loc) as used:
+            self.lower_inst(inst)
+        if used:
+            # The allocation sites are referenced by address
+            self.has_dynamic_globals = True
+
     def create_cpython_wrapper(self, release_gil=False):
         """
         Create CPython wrapper(s) around this function (or generator).
@@ -231,6 +259,16 @@ class BaseLower(object):
 class Lower(BaseLower):
     GeneratorLower = generators.GeneratorLower
 
+    def pre_lower(self):
+        super(Lower, self).pre_lower()
+        interp = self.interp
+        if self.generator_info is None and (interp.parallel_loops or
+                                            interp.serial_prange_loops):
+            from . import parloops
+            self.parallel_loops = parloops.select_parallel_loops(self)
+            for loop in self.parallel_loops.values():
+                self.outlined_blocks |= loop.body
+
     def lower_inst(self, inst):
         self.debug_print(str(inst))
         if isinstance(inst, ir.Assign):
@@ -561,6 +599,14 @@ class Lower(BaseLower):
                 res = self.context.call_function_pointer(self.builder, pointer,
                                                          argvals, fnty.cconv)
 
+        elif isinstance(fnty, types.FunctionType):
+            # Handle a first-class function (e.g. a dispatcher argument)
+            self.debug_print("# calling first-class function")
+            func = self.loadvar(expr.func.name)
+            res = self.context.call_first_class_function(self.builder, fnty,
+                                                         signature, func,
+                                                         argvals)
+
         else:
             # Normal function resolution (for Numba-compiled functions)
             self.debug_print("# calling normal function: {0}".format(fnty))
@@ -196,3 +196,170 @@ def get_best_unit(unit_a, unit_b):
         return unit_b
     return unit_a
 
+
+# Calendar fields and rounding of datetime64 values.
+# The functions below are usable from both Python and nopython mode,
+# on datetime64 scalars and arrays.  The Python versions serve as
+# a reference for the compiled versions, and use the same algorithms.
+
+def get_ticks_per_day(unit):
+    """
+    Return the number of *unit* ticks in a day, or None if *unit* is
+    coarser than a day or the number doesn't fit in a 64-bit integer.
+    """
+    code = DATETIME_UNITS[unit]
+    if code < 4 or code == 14:
+        return None
+    factor = get_timedelta_conversion_factor('D', unit)
+    if factor >= 2**63:
+        return None
+    return factor
+
+def can_extract_fields(unit):
+    """
+    Whether calendar fields can be extracted from datetime64 values
+    of *unit*.
+    """
+    return DATETIME_UNITS[unit] < 4 or get_ticks_per_day(unit) is not None
+
+def _as_datetime_values(x):
+    """
+    Return (array, int64 view, unit) for a datetime64 scalar or array *x*.
+    """
+    arr = np.asarray(x)
+    if arr.dtype.kind != 'M':
+        raise TypeError("expected a datetime64 scalar or array, got %r"
+                        % (arr.dtype,))
+    unit, count = np.datetime_data(arr.dtype)
+    if count != 1 or unit not in DATETIME_UNITS or not can_extract_fields(unit):
+        raise ValueError("unsupported datetime64 unit %r" % (arr.dtype,))
+    return arr, arr.view(np.int64), unit
+
+def _wrap_result(values):
+    # Return a scalar for 0-d inputs
+    return values[()] if values.ndim == 0 else values
+
+def _days_and_ticks(arr, values, unit):
+    """
+    Split datetime64 *values* into (days since the epoch, ticks within
+    the day).
+    """
+    code = DATETIME_UNITS[unit]
+    if code < 2:
+        return arr.astype('M8[D]').view(np.int64), np.zeros_like(values)
+    elif code == 2:
+        return values * 7, np.zeros_like(values)
+    ticks_per_day = get_ticks_per_day(unit)
+    return values // ticks_per_day, values % ticks_per_day
+
+def civil_from_days(days):
+    """
+    Compute the (year, month, day) of the proleptic Gregorian calendar
+    for *days* since 1970-01-01, without branching (see
+    http://howardhinnant.github.io/date_algorithms.html#civil_from_days).
+    """
+    z = days + 719468
+    era = z // 146097
+    doe = z - era * 146097
+    yoe = (doe - doe // 1460 + doe // 36524 - doe // 146096) // 365
+    doy = doe - (365 * yoe + yoe // 4 - yoe // 100)
+    mp = (5 * doy + 2) // 153
+    day = doy - (153 * mp + 2) // 5 + 1
+    month = mp + np.where(mp < 10, 3, -9)
+    year = yoe + era * 400 + (month <= 2)
+    return year, month, day
+
+def _make_field_getter(name, compute, doc):
+    def getter(x):
+        arr, values, unit = _as_datetime_values(x)
+        days, ticks = _days_and_ticks(arr, values, unit)
+        res = np.asarray(compute(days, ticks, unit), dtype=np.int64)
+        res = np.where(values == NAT, -1, res)
+        return _wrap_result(res)
+    getter.__name__ = name
+    getter.__doc__ = doc
+    return getter
+
+def _time_field(unit_name, modulo):
+    def compute(days, ticks, unit):
+        factor = get_timedelta_conversion_factor(unit_name, unit)
+        if factor is None:
+            # Unit coarser than the field
+            return np.zeros_like(ticks)
+        return (ticks // factor) % modulo
+    return compute
+
+year = _make_field_getter(
+    'year', lambda days, ticks, unit: civil_from_days(days)[0],
+    "Return the year of datetime64 *x*.")
+month = _make_field_getter(
+    'month', lambda days, ticks, unit: civil_from_days(days)[1],
+    "Return the month (1-12) of datetime64 *x*.")
+day = _make_field_getter(
+    'day', lambda days, ticks, unit: civil_from_days(days)[2],
+    "Return the day of the month (1-31) of datetime64 *x*.")
+weekday = _make_field_getter(
+    'weekday', lambda days, ticks, unit: (days + 3) % 7,
+    "Return the day of the week of datetime64 *x*, Monday being 0.")
+hour = _make_field_getter(
+    'hour', _time_field('h', 24),
+    "Return the hour (0-23) of datetime64 *x*.")
+minute = _make_field_getter(
+    'minute', _time_field('m', 60),
+    "Return the minute (0-59) of datetime64 *x*.")
+second = _make_field_getter(
+    'second', _time_field('s', 60),
+    "Return the second (0-59) of datetime64 *x*.")
+
+DATETIME_FIELDS = (year, month, day, weekday, hour, minute, second)
+
+
+def get_rounding_unit(datetime_unit, timedelta_unit):
+    """
+    Return the unit of the result of rounding datetime64 values of
+    *datetime_unit* to a multiple of a timedelta64 of *timedelta_unit*,
+    or None if the units can't be combined.
+    """
+    if datetime_unit == '':
+        return None
+    return combine_datetime_timedelta_units(datetime_unit, timedelta_unit)
+
+def _round_datetime(x, freq, ceil):
+    arr = np.asarray(x)
+    td = np.asarray(freq)
+    if arr.dtype.kind != 'M' or td.dtype.kind != 'm' or td.ndim != 0:
+        raise TypeError("expected a datetime64 scalar or array and a "
+                        "timedelta64 scalar")
+    unit = get_rounding_unit(np.datetime_data(arr.dtype)[0],
+                             np.datetime_data(td.dtype)[0])
+    if unit is None:
+        raise TypeError("cannot round %r to a multiple of %r"
+                        % (arr.dtype, td.dtype))
+    values = arr.astype('M8[%s]' % unit).view(np.int64)
+    step = td.astype('m8[%s]' % unit).view(np.int64)[()]
+    if step == NAT:
+        res = np.empty_like(values)
+        res.fill(NAT)
+    else:
+        if step <= 0:
+            raise ValueError("rounding frequency must be positive")
+        if ceil:
+            res = values + (-values) % step
+        else:
+            res = values - values % step
+        res = np.where(values == NAT, NAT, res)
+    return _wrap_result(res.view('M8[%s]' % unit))
+
+def floor(x, freq):
+    """
+    Round datetime64 *x* down to a multiple of timedelta64 *freq*
+    (counting from the 1970 epoch).
+    """
+    return _round_datetime(x, freq, ceil=False)
+
+def ceil(x, freq):
+    """
+    Round datetime64 *x* up to a multiple of timedelta64 *freq*
+    (counting from the 1970 epoch).
+    """
+    return _round_datetime(x, freq, ceil=True)
@@ -68,6 +68,11 @@ def vectorize(ftylist_or_function=(), **kws):
     target: str
             A string for code generation target.  Default to "cpu".
 
+    parallel_threshold: int or None
+        For the "parallel" target, the minimum number of elements for which
+        a call runs in parallel.  By default, it is calibrated at the first
+        large call of each loop.
+
     identity: int, str, or None
         The identity (or unit) value for the element-wise function
         being implemented.  Allowed values are None (the default), 0, 1,
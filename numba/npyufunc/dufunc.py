@@ -58,6 +58,25 @@ class DUFuncLowerer(object):
                                           explicit_output=explicit_output)
 
 
+def _make_reduce_loop(dufunc):
+    def reduce_loop(arr):
+        acc = arr[0]
+        for i in range(1, arr.shape[0]):
+            acc = dufunc(acc, arr[i])
+        return acc
+    return jit(nopython=True)(reduce_loop)
+
+
+def _make_accumulate_loop(dufunc):
+    def accumulate_loop(arr, out):
+        acc = arr[0]
+        out[0] = acc
+        for i in range(1, arr.shape[0]):
+            acc = dufunc(acc, arr[i])
+            out[i] = acc
+    return jit(nopython=True)(accumulate_loop)
+
+
 class DUFunc(_internal._DUFunc):
     '''Dynamic universal funcion (DUFunc) intended to act like a normal
     Numpy ufunc, but capable of call-time (just-in-time) compilation
@@ -82,6 +101,8 @@ class DUFunc(_internal._DUFunc):
         self._install_type()
         self._lower_me = DUFuncLowerer(self)
         self._install_cg()
+        self._reduce_loop = _make_reduce_loop(self)
+        self._accumulate_loop = _make_accumulate_loop(self)
 
     @property
     def nin(self):
@@ -107,6 +128,67 @@ class DUFunc(_internal._DUFunc):
     def identity(self):
         return self.ufunc.identity
 
+    def reduce(self, array, axis=0, dtype=None, out=None, keepdims=False):
+        """Reduce *array* along *axis*, like ufunc.reduce().  One-dimensional
+        reductions (or reductions over all axes) with a binary DUFunc
+        having an identity run in a compiled loop.
+        """
+        if axis is None and isinstance(array, numpy.ndarray):
+            flat = array.ravel()
+        else:
+            flat = array
+        if (axis in (0, -1, None) and not keepdims
+                and self._native_loop_type(flat, dtype, out) is not None):
+            return flat.dtype.type(self._reduce_loop(flat))
+        return super(DUFunc, self).reduce(array, axis=axis, dtype=dtype,
+                                          out=out, keepdims=keepdims)
+
+    def accumulate(self, array, axis=0, dtype=None, out=None):
+        """Accumulate *array* along *axis*, like ufunc.accumulate().
+        One-dimensional accumulations with a binary DUFunc having an
+        identity run in a compiled loop.
+        """
+        if (axis in (0, -1)
+                and self._native_loop_type(array, dtype, out) is not None):
+            res = numpy.empty(array.shape, array.dtype)
+            self._accumulate_loop(array, res)
+            return res
+        return super(DUFunc, self).accumulate(array, axis=axis, dtype=dtype,
+                                              out=out)
+
+    def _native_loop_type(self, array, dtype, out):
+        """Return the Numba type of the elements of *array* if reducing or
+        accumulating over it can use a compiled loop, None otherwise.
+
+        This requires a non-empty one-dimensional array, an element-wise
+        function from two of its elements to an element, and an identity,
+        which declares the operation as reorderable (as for the parallel
+        target).
+        """
+        ufunc = self.ufunc
+        if (ufunc.nin != 2 or ufunc.nout != 1
+                or ufunc.identity == _internal.PyUFunc_None
+                or type(array) is not numpy.ndarray
+                or array.ndim != 1 or array.size == 0
+                or dtype is not None or out is not None):
+            return None
+        try:
+            ty = numpy_support.from_dtype(array.dtype)
+        except NotImplementedError:
+            return None
+        if not isinstance(ty, (types.Boolean, types.Number)):
+            return None
+        ewise_types = (ty, ty)
+        sig, cres = self.find_ewise_function(ewise_types)
+        if sig is None:
+            if self._frozen:
+                return None
+            self._compile_for_argtys(ewise_types)
+            sig, cres = self.find_ewise_function(ewise_types)
+        if cres.objectmode or sig.return_type != ty:
+            return None
+        return ty
+
     def _compile_for_args(self, *args, **kws):
         nin = self.ufunc.nin
         args_len = len(args)
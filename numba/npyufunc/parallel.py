@@ -1,30 +1,62 @@
 """
 This file implements the code-generator for parallel-vectorize.
 
-ParallelUFunc is the platform independent base class for generating
-the thread dispatcher.  This thread dispatcher launches threads
-that execute the generated function of UFuncCore.
-UFuncCore is subclassed to specialize for the input/output types.
-The actual workload is invoked inside the function generated by UFuncCore.
-UFuncCore also defines a work-stealing mechanism that allows idle threads
-to steal works from other threads.
+The generated kernel hands the ufunc's inner loop to the task scheduler
+implemented in workqueue.c, which splits it in chunks run by a pool of
+worker threads; idle threads steal chunks from the others.  The pool is
+launched again in forked children.
 """
 from __future__ import print_function, absolute_import
 import sys
 import os
-import multiprocessing
 
 import numpy as np
 import llvmlite.llvmpy.core as lc
 import llvmlite.binding as ll
-from numba.npyufunc import ufuncbuilder
-from numba import types, utils
+from numba.npyufunc import ufuncbuilder, _internal
+from numba import config, types, utils
 
 
-NUM_CPU = max(1, multiprocessing.cpu_count())
+# Total number of threads running parallel code, including the caller
+NUM_THREADS = config.NUM_THREADS
+
+
+def set_num_threads(n):
+    """
+    Set the number of threads running parallel ufuncs and prange() loops,
+    including the calling thread, to *n*.  This applies to the calls made
+    afterwards from any thread.  *n* must be between 1 and the
+    NUMBA_NUM_THREADS number of threads launched.
+    """
+    if not (isinstance(n, utils.INT_TYPES) and 1 <= n <= NUM_THREADS):
+        raise ValueError("number of threads must be between 1 and %d, got %r"
+                         % (NUM_THREADS, n))
+    _set_num_threads(n)
+
+
+def get_num_threads():
+    """
+    Return the number of threads running parallel ufuncs and prange()
+    loops, including the calling thread.
+    """
+    return _get_num_threads()
 
 
 class ParallelUFuncBuilder(ufuncbuilder.UFuncBuilder):
+
+    def __init__(self, py_func, identity=None, targetoptions={}):
+        targetoptions = dict(targetoptions)
+        # Calls over fewer elements run serially; None means the threshold
+        # is calibrated at the first large enough call of each loop
+        threshold = targetoptions.pop('parallel_threshold', None)
+        if threshold is not None and not (
+                isinstance(threshold, utils.INT_TYPES) and threshold >= 0):
+            raise ValueError("parallel_threshold must be a non-negative "
+                             "integer, got %r" % (threshold,))
+        self.parallel_threshold = threshold
+        super(ParallelUFuncBuilder, self).__init__(py_func, identity,
+                                                   targetoptions)
+
     def build(self, cres, sig):
         _launch_threads()
 
@@ -33,7 +65,9 @@ class ParallelUFuncBuilder(ufuncbuilder.UFuncBuilder):
         signature = cres.signature
         library = cres.library
         llvm_func = library.get_function(cres.fndesc.llvm_func_name)
-        wrapper = build_ufunc_wrapper(library, ctx, llvm_func, signature)
+        wrapper = build_ufunc_wrapper(library, ctx, llvm_func, signature,
+                                      self.parallel_threshold,
+                                      self._reduce_itemsize(signature))
         ptr = library.get_pointer_to_function(wrapper.name)
         # Get dtypes
         dtypenums = [np.dtype(a.name).num for a in signature.args]
@@ -41,17 +75,33 @@ class ParallelUFuncBuilder(ufuncbuilder.UFuncBuilder):
         keepalive = ()
         return dtypenums, ptr, keepalive
 
+    def _reduce_itemsize(self, signature):
+        """
+        Return the item size of the ufunc loop for *signature* if
+        reductions and accumulations over it may run in parallel, 0
+        otherwise.  This requires a binary loop over a single type, and
+        an identity, which declares the operation as reorderable.
+        """
+        if (self.identity == _internal.PyUFunc_None
+                or len(signature.args) != 2
+                or len(set(signature.args + (signature.return_type,))) != 1):
+            return 0
+        return np.dtype(signature.return_type.name).itemsize
+
 
-def build_ufunc_wrapper(library, ctx, lfunc, signature):
+def build_ufunc_wrapper(library, ctx, lfunc, signature, threshold=None,
+                        reduce_itemsize=0):
     innerfunc = ufuncbuilder.build_ufunc_wrapper(library, ctx, lfunc, signature,
                                                  objmode=False, env=None,
                                                  envptr=None)
-    lfunc = build_ufunc_kernel(library, ctx, innerfunc, signature)
+    lfunc = build_ufunc_kernel(library, ctx, innerfunc, signature,
+                               threshold, reduce_itemsize)
     library.add_ir_module(lfunc.module)
     return lfunc
 
 
-def build_ufunc_kernel(library, ctx, innerfunc, sig):
+def build_ufunc_kernel(library, ctx, innerfunc, sig, threshold=None,
+                       reduce_itemsize=0):
     """Wrap the original CPU ufunc with a parallel dispatcher.
 
     Args
@@ -65,6 +115,14 @@ def build_ufunc_kernel(library, ctx, innerfunc, sig):
     sig
         type signature of the ufunc
 
+    threshold
+        the ufunc loop's serial/parallel cutover threshold, or None if it
+        is calibrated at the first large enough call
+
+    reduce_itemsize
+        item size of the ufunc loop if ufunc.reduce() and ufunc.accumulate()
+        may run in parallel, 0 otherwise
+
     Details
     -------
 
@@ -73,10 +131,10 @@ def build_ufunc_kernel(library, ctx, innerfunc, sig):
     void ufunc_kernel(char **args, npy_intp *dimensions, npy_intp* steps,
                       void* data)
 
-    Divide the work equally across all threads and let the last thread take all
-    the left over.
-
-
+    The work is split in chunks by the scheduler (see workqueue.c), which
+    runs them on the worker threads and the calling thread, unless the
+    call is too small to benefit from it.  Reductions and accumulations
+    are split in blocks whose partial results are combined in order.
     """
     # Declare types and function
     byte_t = lc.Type.int(8)
@@ -100,152 +158,59 @@ def build_ufunc_kernel(library, ctx, innerfunc, sig):
 
     args, dimensions, steps, data = lfunc.args
 
-    # Distribute work
-    total = builder.load(dimensions)
-    ncpu = lc.Constant.int(total.type, NUM_CPU)
-
-    count = builder.udiv(total, ncpu)
-
-    count_list = []
-    remain = total
-
-    for i in range(NUM_CPU):
-        space = builder.alloca(intp_t)
-        count_list.append(space)
-
-        if i == NUM_CPU - 1:
-            # Last thread takes all leftover
-            builder.store(remain, space)
-        else:
-            builder.store(count, space)
-            remain = builder.sub(remain, count)
-
     # Array count is input signature plus 1 (due to output array)
     array_count = len(sig.args) + 1
 
-    # Get the increment step for each array
-    steps_list = []
-    for i in range(array_count):
-        ptr = builder.gep(steps, [lc.Constant.int(lc.Type.int(), i)])
-        step = builder.load(ptr)
-        steps_list.append(step)
-
-    # Get the array argument set for each thread
-    args_list = []
-    for i in range(NUM_CPU):
-        space = builder.alloca(byte_ptr_t,
-                               size=lc.Constant.int(lc.Type.int(), array_count))
-        args_list.append(space)
-
-        for j in range(array_count):
-            # For each array, compute subarray pointer
-            dst = builder.gep(space, [lc.Constant.int(lc.Type.int(), j)])
-            src = builder.gep(args, [lc.Constant.int(lc.Type.int(), j)])
-
-            baseptr = builder.load(src)
-            base = builder.ptrtoint(baseptr, intp_t)
-            multiplier = lc.Constant.int(count.type, i)
-            offset = builder.mul(steps_list[j], builder.mul(count, multiplier))
-            addr = builder.inttoptr(builder.add(base, offset), baseptr.type)
-
-            builder.store(addr, dst)
-
-    # Declare external functions
-    add_task_ty = lc.Type.function(lc.Type.void(), [byte_ptr_t] * 5)
-    empty_fnty = lc.Type.function(lc.Type.void(), ())
-    add_task = mod.get_or_insert_function(add_task_ty, name='numba_add_task')
-    synchronize = mod.get_or_insert_function(empty_fnty,
-                                             name='numba_synchronize')
-    ready = mod.get_or_insert_function(empty_fnty, name='numba_ready')
-
-    # Add tasks for queue; one per thread
-    as_void_ptr = lambda arg: builder.bitcast(arg, byte_ptr_t)
-
-    for each_args, each_dims in zip(args_list, count_list):
-        innerargs = [as_void_ptr(x) for x
-                     in [innerfunc, each_args, each_dims, steps, data]]
-
-        builder.call(add_task, innerargs)
-
-    # Signal worker that we are ready
-    builder.call(ready, ())
-    # Wait for workers
-    builder.call(synchronize, ())
+    parallel_ufunc_ty = lc.Type.function(lc.Type.void(),
+                                         [byte_ptr_t] + list(fnty.args)
+                                         + [lc.Type.int(), intp_t,
+                                            lc.Type.pointer(intp_t)])
+    parallel_ufunc = mod.get_or_insert_function(parallel_ufunc_ty,
+                                                name='numba_parallel_ufunc')
+    # The threshold lives in a global of the kernel's module, so that the
+    # code doesn't embed any address of this process; a negative value is
+    # replaced by the scheduler's calibration.
+    threshold_gv = mod.add_global_variable(intp_t, name=".threshold")
+    threshold_gv.linkage = lc.LINKAGE_INTERNAL
+    threshold_gv.initializer = lc.Constant.int(
+        intp_t, -1 if threshold is None else threshold)
+    builder.call(parallel_ufunc,
+                 [builder.bitcast(innerfunc, byte_ptr_t), args, dimensions,
+                  steps, data, lc.Constant.int(lc.Type.int(), array_count),
+                  lc.Constant.int(intp_t, reduce_itemsize), threshold_gv])
     builder.ret_void()
 
     return lfunc
 
 
-class _ProtectEngineDestroy(object):
-    def __init__(self, set_cas, engine):
-        self.set_cas = set_cas
-        self.engine = engine
-
-    def __del__(self):
-        """
-        We need to set the CAS function to NULL to prevent the worker threads to
-        execute this function as LLVM is releasing the memory of the function.
-        """
-        self.set_cas(0)
-
-
-_keepalive = []
-
-
-def _make_cas_function():
-    """
-    Generate a compare-and-swap function for portability sake.
-    """
-    # Generate IR
-    mod = lc.Module.new('generate-cas')
-    llint = lc.Type.int()
-    llintp = lc.Type.pointer(llint)
-    fnty = lc.Type.function(llint, [llintp, llint, llint])
-    fn = mod.add_function(fnty, name='.numba.parallel.ufunc.cas')
-    ptr, old, repl = fn.args
-    bb = fn.append_basic_block('')
-    builder = lc.Builder.new(bb)
-    outpack = builder.cmpxchg(ptr, old, repl, ordering='monotonic')
-    out = builder.extract_value(outpack, 0)
-    failed = builder.extract_value(outpack, 1)
-    builder.ret(builder.select(failed, old, out))
-
-    # Build & Link
-    llmod = ll.parse_assembly(str(mod))
-    llfn = llmod.get_function(fn.name)
-
-    target = ll.Target.from_default_triple()
-    tm = target.create_target_machine()
-    engine = ll.create_mcjit_compiler(llmod, tm)
-    ptr = engine.get_pointer_to_function(llfn)
-    return engine, ptr
-
-
 def _launch_threads():
     """
-    Initialize work queues and workers
+    Initialize the scheduler's workers
     """
     from . import workqueue as lib
     from ctypes import CFUNCTYPE, c_int
 
-    launch_threads = CFUNCTYPE(None, c_int)(lib.launch_threads)
-    launch_threads(NUM_CPU)
+    launch_threads = CFUNCTYPE(None, c_int, c_int)(lib.launch_threads)
+    # The threads submitting work also run it
+    launch_threads(NUM_THREADS - 1, config.PIN_THREADS)
 
 
 def _init():
     from . import workqueue as lib
-    from ctypes import CFUNCTYPE, c_void_p
-
-    ll.add_symbol('numba_add_task', lib.add_task)
-    ll.add_symbol('numba_synchronize', lib.synchronize)
-    ll.add_symbol('numba_ready', lib.ready)
-
-    set_cas = CFUNCTYPE(None, c_void_p)(lib.set_cas)
-
-    engine, cas_ptr = _make_cas_function()
-    set_cas(c_void_p(cas_ptr))
+    from ctypes import CFUNCTYPE, c_int
 
-    _keepalive.append(_ProtectEngineDestroy(set_cas, engine))
+    global _set_num_threads, _get_num_threads
+
+    ll.add_symbol('numba_parallel_for', lib.parallel_for)
+    ll.add_symbol('numba_parallel_ufunc', lib.parallel_ufunc)
+    ll.add_symbol('numba_get_num_threads', lib.get_num_threads)
+    _set_num_threads = CFUNCTYPE(None, c_int)(lib.set_num_threads)
+    _get_num_threads = CFUNCTYPE(c_int)(lib.get_num_threads)
+    _set_num_threads(NUM_THREADS)
+    # Code loaded from the cache may run parallel jobs without having
+    # called _launch_threads(), so the first job launches the workers
+    init_threads = CFUNCTYPE(None, c_int, c_int)(lib.init_threads)
+    init_threads(NUM_THREADS - 1, config.PIN_THREADS)
 
 
 _init()
@@ -5,7 +5,6 @@ import inspect
 import numpy as np
 
 from numba.decorators import jit
-from numba.targets.registry import target_registry
 from numba.targets.options import TargetOptions
 from numba import utils, compiler, types, sigutils
 from numba.numpy_support import as_dtype
@@ -65,8 +64,6 @@ class UFuncDispatcher(object):
         return cres
 
 
-target_registry['npyufunc'] = UFuncDispatcher
-
 # Utility functions
 
 def _compile_element_wise_function(nb_func, targetoptions, sig=None,
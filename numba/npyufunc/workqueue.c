@@ -1,12 +1,25 @@
 /*
-Implement parallel vectorize workqueue.
-
-This keeps a set of worker threads running all the time.
-They wait and spin on a task queue for jobs.
-
-**WARNING**
-This module is not thread-safe.  Adding task to queue is not protected from
-race condition.
+Implement the task scheduler of the parallel ufunc target and of prange()
+loops.
+
+A set of worker threads sleeps on a condition variable until jobs are
+submitted.  A job runs a function over the iterations [0, total), which
+are divided in one contiguous range per participating thread.  Each thread
+takes chunks of iterations from its own range, then steals chunks from the
+other ranges once its range is exhausted.
+
+The thread submitting a job takes part in it, so that a job always makes
+progress even when all workers are busy (e.g. for jobs submitted from
+a worker).  Jobs are kept in a FIFO queue protected by a mutex, so that
+several threads can submit jobs concurrently.
+
+Reductions (ufunc.reduce()) are split in blocks whose partial results are
+then combined in order.  Accumulations (ufunc.accumulate()) are a two-pass
+scan: the blocks are reduced, the values carried into each block are
+computed from the partial results, then the blocks are scanned.
+
+Worker threads aren't inherited by forked children: they are launched
+again in the child when it first runs parallel code.
 */
 
 #ifdef _MSC_VER
@@ -16,46 +29,45 @@ race condition.
     #define NUMBA_WINTHREAD
 #else
     /* PThread */
+    #ifdef __linux__
+        /* For sched_getaffinity() and pthread_setaffinity_np() */
+        #ifndef _GNU_SOURCE
+        #define _GNU_SOURCE 1
+        #endif
+        #include <sched.h>
+    #endif
     #include <pthread.h>
     #include <unistd.h>
     #define NUMBA_PTHREAD
 #endif
 
+#include <limits.h>
 #include <string.h>
 #include <stdio.h>
-#include "workqueue.h"
+#include <stdlib.h>
+#include <time.h>
 #include "../_pymodule.h"
+#include "workqueue.h"
 
-static cas_function_t *cas = NULL;
-
-void cas_wait(volatile int *ptr, const int old, const int repl) {
-    int out = repl;
-    int timeout = 1;   /* starting from 1us nap */
-    static const int MAX_WAIT_TIME = 20 * 1000; /* max wait is 20ms */
-
-    while (1) {
-        if (cas) { /* protect against CAS function being released by LLVM during
-                      interpreter teardown. */
-            out = cas(ptr, old, repl);
-            if (out == old) return;
-        }
-
-        take_a_nap(timeout);
+/* PThread */
+#ifdef NUMBA_PTHREAD
 
-        /* Exponentially increase the wait time until the max has reached*/
-        timeout <<= 1;
-        if (timeout >= MAX_WAIT_TIME) {
-            timeout = MAX_WAIT_TIME;
-        }
-    }
-}
+typedef pthread_mutex_t mutex_t;
+typedef pthread_cond_t cond_t;
 
-/* As the thread-pool isn't inherited by children,
-   free the task-queue, too. */
-static void reset_after_fork(void);
+#define mutex_init(m) pthread_mutex_init((m), NULL)
+#define mutex_lock(m) pthread_mutex_lock(m)
+#define mutex_unlock(m) pthread_mutex_unlock(m)
+#define cond_init(c) pthread_cond_init((c), NULL)
+#define cond_wait(c, m) pthread_cond_wait((c), (m))
+#define cond_signal(c) pthread_cond_signal(c)
+#define cond_broadcast(c) pthread_cond_broadcast(c)
 
-/* PThread */
-#ifdef NUMBA_PTHREAD
+/* Add `val` to `*ptr`, returning the previous value */
+#define atomic_fetch_add(ptr, val) __sync_fetch_and_add((ptr), (val))
+/* Set `*ptr` to `new` if it is `old`, returning the previous value */
+#define atomic_cas(ptr, old, new) \
+    __sync_val_compare_and_swap((ptr), (old), (new))
 
 thread_pointer numba_new_thread(void *worker, void *arg)
 {
@@ -63,8 +75,6 @@ thread_pointer numba_new_thread(void *worker, void *arg)
     pthread_attr_t attr;
     pthread_t th;
 
-    pthread_atfork(0, 0, reset_after_fork);
-
     /* Create detached threads */
     pthread_attr_init(&attr);
     pthread_attr_setdetachstate(&attr, PTHREAD_CREATE_DETACHED);
@@ -79,16 +89,78 @@ thread_pointer numba_new_thread(void *worker, void *arg)
     return (thread_pointer)th;
 }
 
-void take_a_nap(int usec) {
-    usleep(usec);
+/* Monotonic time in seconds */
+static double get_time(void)
+{
+    struct timespec ts;
+    clock_gettime(CLOCK_MONOTONIC, &ts);
+    return ts.tv_sec + ts.tv_nsec * 1e-9;
 }
 
+static void sleep_ms(int ms)
+{
+    usleep(ms * 1000);
+}
+
+/* Store the ids of up to `max` CPUs the process may run on in `cpus`,
+   returning their number (0 if unknown) */
+static int allowed_cpus(int *cpus, int max)
+{
+    int n = 0;
+#ifdef __linux__
+    cpu_set_t set;
+    int cpu;
+
+    if (sched_getaffinity(0, sizeof(set), &set) != 0)
+        return 0;
+    for (cpu = 0; cpu < CPU_SETSIZE && n < max; ++cpu) {
+        if (CPU_ISSET(cpu, &set))
+            cpus[n++] = cpu;
+    }
+#endif
+    return n;
+}
+
+/* Restrict the calling thread to run on `cpu` */
+static void pin_current_thread(int cpu)
+{
+#ifdef __linux__
+    cpu_set_t set;
+
+    CPU_ZERO(&set);
+    CPU_SET(cpu, &set);
+    pthread_setaffinity_np(pthread_self(), sizeof(set), &set);
+#endif
+}
 
 #endif
 
 /* Win Thread */
 #ifdef NUMBA_WINTHREAD
 
+typedef CRITICAL_SECTION mutex_t;
+typedef CONDITION_VARIABLE cond_t;
+
+#define mutex_init(m) InitializeCriticalSection(m)
+#define mutex_lock(m) EnterCriticalSection(m)
+#define mutex_unlock(m) LeaveCriticalSection(m)
+#define cond_init(c) InitializeConditionVariable(c)
+#define cond_wait(c, m) SleepConditionVariableCS((c), (m), INFINITE)
+#define cond_signal(c) WakeConditionVariable(c)
+#define cond_broadcast(c) WakeAllConditionVariable(c)
+
+#ifdef _WIN64
+    #define atomic_fetch_add(ptr, val) \
+        InterlockedExchangeAdd64((volatile LONGLONG *)(ptr), (val))
+    #define atomic_cas(ptr, old, new) \
+        InterlockedCompareExchange64((volatile LONGLONG *)(ptr), (new), (old))
+#else
+    #define atomic_fetch_add(ptr, val) \
+        InterlockedExchangeAdd((volatile LONG *)(ptr), (val))
+    #define atomic_cas(ptr, old, new) \
+        InterlockedCompareExchange((volatile LONG *)(ptr), (new), (old))
+#endif
+
 /* Adapted from Python/thread_nt.h */
 typedef struct {
     void (*func)(void*);
@@ -128,104 +200,702 @@ thread_pointer numba_new_thread(void *worker, void *arg)
     return (thread_pointer)handle;
 }
 
-void take_a_nap(int usec) {
-    /* MS does not have usec resolution sleep function.
-    Sleeping for zero second will yield this thread.
-    */
-    Sleep(0);
+static double get_time(void)
+{
+    LARGE_INTEGER freq, t;
+    QueryPerformanceFrequency(&freq);
+    QueryPerformanceCounter(&t);
+    return (double) t.QuadPart / freq.QuadPart;
 }
 
+static void sleep_ms(int ms)
+{
+    Sleep(ms);
+}
 
-#endif
+static int allowed_cpus(int *cpus, int max)
+{
+    DWORD_PTR process_mask, system_mask;
+    int n = 0, cpu;
+
+    if (!GetProcessAffinityMask(GetCurrentProcess(), &process_mask,
+                                &system_mask))
+        return 0;
+    for (cpu = 0; cpu < (int) (8 * sizeof(DWORD_PTR)) && n < max; ++cpu) {
+        if (process_mask & ((DWORD_PTR) 1 << cpu))
+            cpus[n++] = cpu;
+    }
+    return n;
+}
 
-typedef struct Task{
-    void (*func)(void *args, void *dims, void *steps, void *data);
-    void *args, *dims, *steps, *data;
-} Task;
+static void pin_current_thread(int cpu)
+{
+    SetThreadAffinityMask(GetCurrentThread(), (DWORD_PTR) 1 << cpu);
+}
 
-typedef struct {
-    volatile int lock;
-    Task task;
-} Queue;
+#endif
 
+/* Number of chunks per thread for ufuncs, so that threads finishing early
+   can steal work from the others */
+#define UFUNC_CHUNKS_PER_THREAD 4
+/* Number of elements timed to calibrate the serial/parallel cutover of
+   a ufunc loop */
+#define CALIBRATION_SIZE 1024
+/* Values of a ufunc loop's threshold before its calibration */
+#define THRESHOLD_UNCALIBRATED -1
+#define THRESHOLD_CALIBRATING -2
+/* Maximum number of arrays of a ufunc (NPY_MAXARGS) */
+#define UFUNC_MAX_ARGS 32
+/* Number of ranges of a job allocated on the stack */
+#define STACK_RANGES 16
+/* Number of times an idle worker polls the queue before sleeping, which
+   saves the wakeup of back-to-back jobs */
+#define SPIN_COUNT 20000
+/* Maximum number of CPUs threads are pinned to */
+#define MAX_CPUS 1024
 
-static Queue *queues = NULL;
-static int queue_count;
-static int queue_pivot = 0;
+typedef struct {
+    volatile Py_ssize_t next;   /* next iteration to take */
+    Py_ssize_t stop;
+    /* Avoid false sharing between the threads taking from ranges */
+    char pad[64 - 2 * sizeof(Py_ssize_t)];
+} Range;
+
+typedef struct Job {
+    range_func_t *func;
+    void *data;
+    Py_ssize_t grain;
+    int nranges;
+    Range *ranges;
+    /* Number of iterations not run yet */
+    volatile Py_ssize_t pending;
+    /* The following members are protected by pool_lock */
+    int next_range;             /* home range of the next joining worker */
+    int active;                 /* number of workers running the job */
+    int done;                   /* all iterations have run */
+    int queued;
+    struct Job *next;
+} Job;
+
+static mutex_t pool_lock;
+/* Signalled when jobs are queued */
+static cond_t work_cond;
+/* Broadcast when jobs complete or workers leave them */
+static cond_t done_cond;
+static Job * volatile queue_head = NULL;
+static Job *queue_tail = NULL;
+/* Number of workers running in this process */
+static int num_workers = 0;
+/* Number of workers requested by launch_threads() or init_threads(), and
+   whether they are pinned to CPUs */
+static int pool_size = 0;
+static int pin_threads = 0;
+/* Set when the workers must be launched by the next job: after
+   init_threads(), and in forked children */
+static volatile int launch_pending = 0;
+/* Maximum number of threads running a job, including its submitter */
+static volatile int thread_limit = INT_MAX;
+/* Time taken to hand a job to sleeping workers and wait for them (in
+   seconds), measured at the first calibration of a ufunc loop */
+static double dispatch_overhead = 0.0;
+/* 0: dispatch_overhead not measured, 1: being measured, 2: measured */
+static volatile Py_ssize_t overhead_state = 0;
+
+/* Both called with pool_lock held */
+static void
+enqueue_job(Job *job)
+{
+    job->next = NULL;
+    job->queued = 1;
+    if (queue_tail)
+        queue_tail->next = job;
+    else
+        queue_head = job;
+    queue_tail = job;
+}
 
-void set_cas(void *ptr) {
-    cas = ptr;
+static void
+dequeue_job(Job *job)
+{
+    Job *prev = NULL, *cur;
+    if (!job->queued)
+        return;
+    for (cur = queue_head; cur != job; cur = cur->next)
+        prev = cur;
+    if (prev)
+        prev->next = job->next;
+    else
+        queue_head = job->next;
+    if (queue_tail == job)
+        queue_tail = prev;
+    job->queued = 0;
 }
 
-void add_task(void *fn, void *args, void *dims, void *steps, void *data) {
-    void (*func)(void *args, void *dims, void *steps, void *data) = fn;
+/* Take a chunk of at most `grain` iterations from `range`, returning its
+   size (0 if the range is exhausted) */
+static Py_ssize_t
+take_chunk(Range *range, Py_ssize_t grain, Py_ssize_t *start)
+{
+    Py_ssize_t begin;
+    if (range->next >= range->stop)
+        return 0;
+    begin = atomic_fetch_add(&range->next, grain);
+    if (begin >= range->stop)
+        return 0;
+    *start = begin;
+    return (range->stop - begin < grain) ? range->stop - begin : grain;
+}
 
-    Queue *queue = &queues[queue_pivot];
+static void start_workers(void);
 
-    Task *task = &queue->task;
-    task->func = func;
-    task->args = args;
-    task->dims = dims;
-    task->steps = steps;
-    task->data = data;
+/* Return the number of threads which may run a job submitted now,
+   including its submitter.  This launches the workers again in a forked
+   child. */
+static int
+job_threads(void)
+{
+    int nthreads;
 
-    /* Move pivot */
-    if ( ++queue_pivot == queue_count ) {
-        queue_pivot = 0;
+    if (launch_pending) {
+        mutex_lock(&pool_lock);
+        if (launch_pending) {
+            launch_pending = 0;
+            start_workers();
+        }
+        mutex_unlock(&pool_lock);
     }
+    nthreads = num_workers + 1;
+    return (thread_limit < nthreads) ? thread_limit : nthreads;
+}
+
+/* Run chunks of `job`, starting with range `home`, until all chunks are
+   taken */
+static void
+run_job(Job *job, int home)
+{
+    int i;
+    Py_ssize_t start, n, count = 0;
 
+    for (i = 0; i < job->nranges; ++i) {
+        Range *range = &job->ranges[(home + i) % job->nranges];
+        while ((n = take_chunk(range, job->grain, &start)) > 0) {
+            job->func(job->data, start, start + n);
+            count += n;
+        }
+    }
+    if (count && atomic_fetch_add(&job->pending, -count) == count) {
+        mutex_lock(&pool_lock);
+        job->done = 1;
+        cond_broadcast(&done_cond);
+        mutex_unlock(&pool_lock);
+    }
 }
 
 static
 void thread_worker(void *arg) {
-    Queue *queue = (Queue*)arg;
-    Task *task;
-
+    Job *job;
+    int home, i;
+    /* The CPU the worker is pinned to, plus one */
+    int cpu = (int) (Py_intptr_t) arg;
+
+    if (cpu > 0)
+        pin_current_thread(cpu - 1);
+    mutex_lock(&pool_lock);
     while (1) {
-        cas_wait(&queue->lock, READY, RUNNING);
+        job = queue_head;
+        if (job == NULL) {
+            mutex_unlock(&pool_lock);
+            for (i = 0; i < SPIN_COUNT && queue_head == NULL; ++i)
+                ;
+            mutex_lock(&pool_lock);
+            if (queue_head == NULL)
+                cond_wait(&work_cond, &pool_lock);
+            continue;
+        }
+        job->active++;
+        home = job->next_range++;
+        /* Keep the number of threads running the job to its number of
+           ranges */
+        if (job->next_range == job->nranges)
+            dequeue_job(job);
+        mutex_unlock(&pool_lock);
+
+        run_job(job, home);
+
+        mutex_lock(&pool_lock);
+        /* All chunks were taken, don't let other workers join */
+        dequeue_job(job);
+        /* The job mustn't be released by its submitter while still
+           being accessed here */
+        if (--job->active == 0 && job->done)
+            cond_broadcast(&done_cond);
+    }
+}
 
-        task = &queue->task;
-        task->func(task->args, task->dims, task->steps, task->data);
+/* parallel_for() on at most `nthreads` threads */
+static void
+run_parallel(range_func_t *func, void *data, Py_ssize_t total,
+             Py_ssize_t grain, int nthreads)
+{
+    Job job;
+    Range stack_ranges[STACK_RANGES];
+    Py_ssize_t start;
+    int i, nranges = nthreads;
+
+    if (total <= 0)
+        return;
+    if (grain < 1)
+        grain = 1;
+    if (nranges == 1 || total <= grain) {
+        func(data, 0, total);
+        return;
+    }
 
-        cas_wait(&queue->lock, RUNNING, DONE);
+    if ((total + grain - 1) / grain < nranges)
+        nranges = (int) ((total + grain - 1) / grain);
+    if (nranges <= STACK_RANGES)
+        job.ranges = stack_ranges;
+    else {
+        job.ranges = (Range *) malloc(sizeof(Range) * nranges);
+        if (job.ranges == NULL) {
+            func(data, 0, total);
+            return;
+        }
+    }
+    /* Split the iterations evenly between the ranges */
+    start = 0;
+    for (i = 0; i < nranges; ++i) {
+        job.ranges[i].next = start;
+        start += total / nranges + (i < total % nranges);
+        job.ranges[i].stop = start;
     }
+    job.func = func;
+    job.data = data;
+    job.grain = grain;
+    job.nranges = nranges;
+    job.pending = total;
+    job.next_range = 1;
+    job.active = 0;
+    job.done = 0;
+
+    mutex_lock(&pool_lock);
+    enqueue_job(&job);
+    for (i = 1; i < nranges; ++i)
+        cond_signal(&work_cond);
+    mutex_unlock(&pool_lock);
+
+    run_job(&job, 0);
+
+    mutex_lock(&pool_lock);
+    dequeue_job(&job);
+    while (!job.done || job.active)
+        cond_wait(&done_cond, &pool_lock);
+    mutex_unlock(&pool_lock);
+
+    if (job.ranges != stack_ranges)
+        free(job.ranges);
 }
 
-void launch_threads(int count) {
-    if ( !queues ) {
-        /* If queues are not yet allocated,
-           create them, one for each thread. */
-       int i;
-       size_t sz = sizeof(Queue) * count;
+void parallel_for(range_func_t *func, void *data, Py_ssize_t total,
+                  Py_ssize_t grain) {
+    run_parallel(func, data, total, grain, job_threads());
+}
 
-       queues = malloc(sz);     /* this memory will leak */
-       memset(queues, 0, sz);
-       queue_count = count;
+typedef struct {
+    ufunc_func_t *func;
+    char **args;
+    Py_ssize_t *steps;
+    void *data;
+    int nargs;
+} UFuncJob;
+
+static void
+run_ufunc_chunk(void *data, Py_ssize_t start, Py_ssize_t stop)
+{
+    UFuncJob *job = (UFuncJob *) data;
+    char *args[UFUNC_MAX_ARGS];
+    Py_ssize_t count = stop - start;
+    int i;
+
+    for (i = 0; i < job->nargs; ++i)
+        args[i] = job->args[i] + start * job->steps[i];
+    job->func(args, &count, job->steps, job->data);
+}
 
-       for (i = 0; i < count; ++i) {
-            numba_new_thread(thread_worker, &queues[i]);
-       }
+/* The kinds of calls NumPy makes to the inner loop of a binary ufunc */
+enum {
+    LOOP_ELEMENTWISE,
+    /* ufunc.reduce(): args[0] and args[2] are the accumulator */
+    LOOP_REDUCE,
+    /* ufunc.accumulate(): args[0] is the output shifted by one element */
+    LOOP_ACCUMULATE
+};
+
+static int
+loop_kind(char **args, Py_ssize_t *steps, int nargs)
+{
+    if (nargs != 3 || steps[0] != steps[2])
+        return LOOP_ELEMENTWISE;
+    if (steps[0] == 0 && args[0] == args[2])
+        return LOOP_REDUCE;
+    if (steps[0] != 0 && args[2] == args[0] + steps[0])
+        return LOOP_ACCUMULATE;
+    return LOOP_ELEMENTWISE;
+}
+
+/* A reduction or accumulation split in blocks.  The partial results of
+   the blocks are stored `itemsize` bytes apart in `partials`, and the
+   values carried into the blocks in `carries`. */
+typedef struct {
+    ufunc_func_t *func;
+    char **args;
+    Py_ssize_t *steps;
+    void *data;
+    Py_ssize_t total;
+    Py_ssize_t nblocks;
+    Py_ssize_t itemsize;
+    char *partials;
+    char *carries;
+} ScanJob;
+
+static void
+block_bounds(ScanJob *job, Py_ssize_t block, Py_ssize_t *start,
+             Py_ssize_t *stop)
+{
+    Py_ssize_t size = job->total / job->nblocks;
+    Py_ssize_t extra = job->total % job->nblocks;
+
+    *start = block * size + (block < extra ? block : extra);
+    *stop = *start + size + (block < extra);
+}
+
+/* Reduce each block from its first element into its partial result */
+static void
+run_reduce_blocks(void *data, Py_ssize_t first, Py_ssize_t last)
+{
+    ScanJob *job = (ScanJob *) data;
+    Py_ssize_t block, start, stop, count;
+    Py_ssize_t steps[3];
+    char *args[3];
+    char *acc;
+
+    steps[0] = steps[2] = 0;
+    steps[1] = job->steps[1];
+    for (block = first; block < last; ++block) {
+        block_bounds(job, block, &start, &stop);
+        acc = job->partials + block * job->itemsize;
+        memcpy(acc, job->args[1] + start * steps[1], job->itemsize);
+        count = stop - start - 1;
+        if (count > 0) {
+            args[0] = args[2] = acc;
+            args[1] = job->args[1] + (start + 1) * steps[1];
+            job->func(args, &count, steps, job->data);
+        }
     }
 }
 
-void synchronize(void) {
-    int i;
-    for (i = 0; i < queue_count; ++i) {
-        cas_wait(&queues[i].lock, DONE, IDLE);
+/* Scan each block, starting from the value carried into it */
+static void
+run_scan_blocks(void *data, Py_ssize_t first, Py_ssize_t last)
+{
+    ScanJob *job = (ScanJob *) data;
+    Py_ssize_t block, start, stop, count;
+    Py_ssize_t *steps = job->steps;
+    char *args[3];
+
+    for (block = first; block < last; ++block) {
+        block_bounds(job, block, &start, &stop);
+        args[0] = job->carries + block * job->itemsize;
+        args[1] = job->args[1] + start * steps[1];
+        args[2] = job->args[2] + start * steps[2];
+        count = 1;
+        job->func(args, &count, steps, job->data);
+        count = stop - start - 1;
+        if (count > 0) {
+            args[0] = args[2];
+            args[1] += steps[1];
+            args[2] += steps[2];
+            job->func(args, &count, steps, job->data);
+        }
+    }
+}
+
+/* Set `dest` to the combination of `left` and `right` */
+static void
+combine(ScanJob *job, char *left, char *right, char *dest)
+{
+    Py_ssize_t count = 1;
+    Py_ssize_t steps[3] = {0, 0, 0};
+    char *args[3];
+
+    args[0] = left;
+    args[1] = right;
+    args[2] = dest;
+    job->func(args, &count, steps, job->data);
+}
+
+/* Run a reduction or an accumulation over `total` elements in parallel.
+   Returns 0 if it couldn't, in which case nothing has run. */
+static int
+parallel_scan(int kind, ufunc_func_t *func, char **args, Py_ssize_t total,
+              Py_ssize_t *steps, void *data, Py_ssize_t itemsize,
+              int nthreads)
+{
+    ScanJob job;
+    Py_ssize_t block;
+
+    job.nblocks = nthreads * UFUNC_CHUNKS_PER_THREAD;
+    if (job.nblocks > total)
+        job.nblocks = total;
+    job.partials = (char *) malloc(2 * job.nblocks * itemsize);
+    if (job.partials == NULL)
+        return 0;
+    job.carries = job.partials + job.nblocks * itemsize;
+    job.func = func;
+    job.args = args;
+    job.steps = steps;
+    job.data = data;
+    job.total = total;
+    job.itemsize = itemsize;
+
+    if (kind == LOOP_REDUCE) {
+        /* Reduce the blocks in parallel, then fold their results into
+           the accumulator in order */
+        parallel_for(run_reduce_blocks, &job, job.nblocks, 1);
+        for (block = 0; block < job.nblocks; ++block)
+            combine(&job, args[0], job.partials + block * itemsize, args[0]);
+    }
+    else {
+        /* The last block's partial result isn't needed to compute the
+           values carried into the blocks */
+        parallel_for(run_reduce_blocks, &job, job.nblocks - 1, 1);
+        memcpy(job.carries, args[0], itemsize);
+        for (block = 1; block < job.nblocks; ++block)
+            combine(&job, job.carries + (block - 1) * itemsize,
+                    job.partials + (block - 1) * itemsize,
+                    job.carries + block * itemsize);
+        parallel_for(run_scan_blocks, &job, job.nblocks, 1);
     }
+    free(job.partials);
+    return 1;
 }
 
-void ready(void) {
+static void
+busy_range(void *data, Py_ssize_t start, Py_ssize_t stop)
+{
+    double end = get_time() + *(double *) data * (stop - start);
+    while (get_time() < end)
+        ;
+}
+
+/* Measure dispatch_overhead, by running jobs which keep every thread
+   busy for a known time (regardless of thread_limit, which may change) */
+static void
+measure_dispatch_overhead(void)
+{
+    const int nruns = 8;
+    double duration = 50e-6, t0, total = 0.0;
     int i;
-    for (i = 0; i < queue_count; ++i) {
-        cas_wait(&queues[i].lock, IDLE, READY);
+
+    for (i = 0; i < nruns; ++i) {
+        /* Let the workers fall asleep */
+        sleep_ms(1);
+        t0 = get_time();
+        run_parallel(busy_range, &duration, num_workers + 1, 1,
+                     num_workers + 1);
+        total += get_time() - t0 - duration;
+    }
+    dispatch_overhead = (total > 0) ? total / nruns : 0.0;
+}
+
+/* Return whether dispatch_overhead is known, measuring it on the first
+   call.  This takes several milliseconds, which are only spent by the
+   processes calibrating ufunc loops rather than at every launch. */
+static int
+have_dispatch_overhead(void)
+{
+    Py_ssize_t state = atomic_cas(&overhead_state, 0, 1);
+
+    if (state == 0) {
+        measure_dispatch_overhead();
+        atomic_cas(&overhead_state, 1, 2);
+        return 1;
+    }
+    /* If another thread is measuring it, don't wait */
+    return state == 2;
+}
+
+/* Return the number of elements from which running a ufunc loop whose
+   per-element cost is `cost` (in seconds) on `nthreads` threads pays off */
+static Py_ssize_t
+cutover_threshold(double cost, int nthreads)
+{
+    /* A parallel call over n elements takes about
+       overhead + n * cost / nthreads, against n * cost serially.
+       The overhead is doubled to stay on the safe side. */
+    double n;
+
+    if (cost < 1e-12)
+        cost = 1e-12;
+    n = 2 * dispatch_overhead / (cost * (1 - 1.0 / nthreads));
+    if (n >= (double) PY_SSIZE_T_MAX)
+        return PY_SSIZE_T_MAX;
+    return (Py_ssize_t) n + 1;
+}
+
+void parallel_ufunc(ufunc_func_t *func, char **args, Py_ssize_t *dims,
+                    Py_ssize_t *steps, void *data, int nargs,
+                    Py_ssize_t itemsize, Py_ssize_t *threshold) {
+    UFuncJob job;
+    char *rest[UFUNC_MAX_ARGS];
+    Py_ssize_t grain, count, limit, total = dims[0];
+    double t0;
+    int i, kind, nthreads;
+
+    /* The threshold is shared by the concurrent calls of the loop */
+    limit = *(volatile Py_ssize_t *) threshold;
+    nthreads = job_threads();
+    if (nthreads == 1 || nargs > UFUNC_MAX_ARGS || total < limit) {
+        func(args, dims, steps, data);
+        return;
+    }
+    /* Splitting a reduction or an accumulation in chunks changes the
+       order in which the elements are combined */
+    kind = loop_kind(args, steps, nargs);
+    if (kind != LOOP_ELEMENTWISE && itemsize == 0) {
+        func(args, dims, steps, data);
+        return;
+    }
+
+    if (limit == THRESHOLD_UNCALIBRATED) {
+        /* Not calibrated yet: time the first elements.  Calls too small
+           for that are cheap anyway and run serially. */
+        if (total <= 2 * CALIBRATION_SIZE) {
+            func(args, dims, steps, data);
+            return;
+        }
+        /* Only one call calibrates the loop; the concurrent calls run in
+           parallel meanwhile */
+        if (have_dispatch_overhead()
+            && atomic_cas(threshold, THRESHOLD_UNCALIBRATED,
+                          THRESHOLD_CALIBRATING) == THRESHOLD_UNCALIBRATED) {
+            t0 = get_time();
+            count = CALIBRATION_SIZE;
+            func(args, &count, steps, data);
+            limit = cutover_threshold((get_time() - t0) / CALIBRATION_SIZE,
+                                      nthreads);
+            atomic_cas(threshold, THRESHOLD_CALIBRATING, limit);
+            /* Carry on with the remaining elements, which are still of
+               the same kind of loop */
+            for (i = 0; i < nargs; ++i)
+                rest[i] = args[i] + CALIBRATION_SIZE * steps[i];
+            args = rest;
+            total -= CALIBRATION_SIZE;
+            if (total < limit) {
+                func(args, &total, steps, data);
+                return;
+            }
+        }
+    }
+
+    if (kind != LOOP_ELEMENTWISE) {
+        if (!parallel_scan(kind, func, args, total, steps, data, itemsize,
+                           nthreads))
+            func(args, &total, steps, data);
+        return;
+    }
+    job.func = func;
+    job.args = args;
+    job.steps = steps;
+    job.data = data;
+    job.nargs = nargs;
+    grain = total / (nthreads * UFUNC_CHUNKS_PER_THREAD);
+    parallel_for(run_ufunc_chunk, &job, total, grain);
+}
+
+/* Launch pool_size workers, with pool_lock held */
+static void
+start_workers(void)
+{
+    int cpus[MAX_CPUS];
+    int i, ncpus = 0;
+    void *arg = NULL;
+
+    if (pin_threads)
+        ncpus = allowed_cpus(cpus, MAX_CPUS);
+    for (i = 0; i < pool_size; ++i) {
+        /* The first CPU is left to the threads submitting jobs */
+        if (ncpus)
+            arg = (void *) (Py_intptr_t) (cpus[(i + 1) % ncpus] + 1);
+        if (numba_new_thread(thread_worker, arg) == NULL)
+            break;
+        num_workers++;
     }
 }
 
-static void reset_after_fork(void)
+#ifdef NUMBA_PTHREAD
+/* Hold the pool lock while forking, so that it is in a known state in
+   the child */
+static void before_fork(void)
+{
+    mutex_lock(&pool_lock);
+}
+
+static void after_fork_parent(void)
+{
+    mutex_unlock(&pool_lock);
+}
+
+/* The workers aren't inherited by children, and neither are the threads
+   which had submitted the queued jobs */
+static void after_fork_child(void)
+{
+    launch_pending = launch_pending || num_workers > 0;
+    num_workers = 0;
+    queue_head = queue_tail = NULL;
+    cond_init(&work_cond);
+    cond_init(&done_cond);
+    mutex_unlock(&pool_lock);
+}
+#endif
+
+/* Set up the pool, launching the workers now or at the first job */
+static void
+setup_pool(int count, int pin, int launch)
 {
-  free(queues);
-  queues = NULL;
+    mutex_lock(&pool_lock);
+    if (pool_size == 0 && count > 0) {
+#ifdef NUMBA_PTHREAD
+        pthread_atfork(before_fork, after_fork_parent, after_fork_child);
+#endif
+        pool_size = count;
+        pin_threads = pin;
+        if (launch)
+            start_workers();
+        else
+            launch_pending = 1;
+    }
+    else if (launch && launch_pending) {
+        launch_pending = 0;
+        start_workers();
+    }
+    mutex_unlock(&pool_lock);
+}
+
+void launch_threads(int count, int pin) {
+    setup_pool(count, pin, 1);
+}
+
+void init_threads(int count, int pin) {
+    setup_pool(count, pin, 0);
+}
+
+void set_num_threads(int count) {
+    thread_limit = count;
+}
+
+int get_num_threads(void) {
+    return thread_limit;
 }
 
 MOD_INIT(workqueue) {
@@ -234,16 +904,22 @@ MOD_INIT(workqueue) {
     if (m == NULL)
         return MOD_ERROR_VAL;
 
-    PyObject_SetAttrString(m, "set_cas",
-                           PyLong_FromVoidPtr(&set_cas));
+    mutex_init(&pool_lock);
+    cond_init(&work_cond);
+    cond_init(&done_cond);
+
     PyObject_SetAttrString(m, "launch_threads",
                            PyLong_FromVoidPtr(&launch_threads));
-    PyObject_SetAttrString(m, "synchronize",
-                           PyLong_FromVoidPtr(&synchronize));
-    PyObject_SetAttrString(m, "ready",
-                           PyLong_FromVoidPtr(&ready));
-    PyObject_SetAttrString(m, "add_task",
-                           PyLong_FromVoidPtr(&add_task));
+    PyObject_SetAttrString(m, "init_threads",
+                           PyLong_FromVoidPtr(&init_threads));
+    PyObject_SetAttrString(m, "parallel_for",
+                           PyLong_FromVoidPtr(&parallel_for));
+    PyObject_SetAttrString(m, "parallel_ufunc",
+                           PyLong_FromVoidPtr(&parallel_ufunc));
+    PyObject_SetAttrString(m, "set_num_threads",
+                           PyLong_FromVoidPtr(&set_num_threads));
+    PyObject_SetAttrString(m, "get_num_threads",
+                           PyLong_FromVoidPtr(&get_num_threads));
 
     return MOD_SUCCESS_VAL(m);
 }
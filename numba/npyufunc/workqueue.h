@@ -1,68 +1,67 @@
 typedef struct opaque_thread * thread_pointer;
 
-enum QUEUE_STATE {
-    /*
-    The queue has 4 states:
-
-    IDLE: not doing anything
-    READY: tasks enqueued; signal workers to start
-    RUNNING: workers running
-    DONE: workers completed
-    */
-    IDLE = 0, READY, RUNNING, DONE
-};
-
 /*
-sleep for a short time
+Function running iterations [start, stop) of a parallel loop, given the
+`data` pointer passed to parallel_for().
 */
-static
-void take_a_nap(int usec);
-
+typedef void range_func_t(void *data, Py_ssize_t start, Py_ssize_t stop);
 
 /*
-CAS: compare and swap function
-
-It is generated from parallel.py by LLVM to get a portable CAS function.
+Inner loop of a ufunc, as generated by ufuncbuilder.build_ufunc_wrapper().
 */
-typedef int cas_function_t(volatile int *ptr, int old, int val);
-
-/*
-Do CAS until successful.
-Spin until the value in `ptr` changes from `old` to `repl`.
-Takes a 1us nap in after each CAS failure.
-*/
-static
-void cas_wait(volatile int *ptr, const int old, const int repl);
+typedef void ufunc_func_t(char **args, Py_ssize_t *dims, Py_ssize_t *steps,
+                          void *data);
 
 /* Launch new thread */
 static
 thread_pointer numba_new_thread(void *worker, void *arg);
 
-/* Set CAS function.
-Note: During interpreter teardown, LLVM will release all function memory.
-      To protect against the fault due to calling non-executable memory,
-      Call set_cas(NULL) to disable the workqueue.
+/* Launch `count` worker threads, pinned to distinct CPUs if `pin` is
+non-zero.  The threads submitting jobs also run them, so `count` is one
+less than the desired parallelism.
+Does nothing if the workers were already launched.  In a forked child,
+the workers are launched again when the first job is submitted.
 */
 static
-void set_cas(void *ptr);
+void launch_threads(int count, int pin);
 
-/* Launch `count` number of threads and create the associated thread queue.
-Must invoke once before each add_task() is used.
-*Warning* queues memory are leaked at interpreter tear down!
+/* Same as launch_threads(), except that the workers are only launched when
+the first job is submitted.
 */
 static
-void launch_threads(int count);
+void init_threads(int count, int pin);
 
-/* Add task to queue
-Automatically assigned to queues of different thread in a round robin fashion.
+/* Set or get the maximum number of threads running a job, including the
+thread submitting it.
 */
 static
-void add_task(void *fn, void *args, void *dims, void *steps, void *data);
+void set_num_threads(int count);
+
+static
+int get_num_threads(void);
 
-/* Wait until all tasks are done */
+/* Run `func(data, start, stop)` over chunks of at most `grain` iterations
+covering [0, total), and return once all of them have run.
+The chunks are run by the worker threads and the calling thread.
+This is thread-safe, and can be called from a worker thread (e.g. from
+a chunk of another job).
+*/
 static
-void synchronize(void);
+void parallel_for(range_func_t *func, void *data, Py_ssize_t total,
+                  Py_ssize_t grain);
 
-/* Signal worker threads that tasks are added and it is ready to run */
+/* Run the ufunc inner loop `func` over dims[0] elements, in chunks running
+in parallel.  `nargs` is the number of arrays (inputs and outputs) in `args`
+and `steps`.
+Calls over less than `*threshold` elements run serially.  If `*threshold`
+is -1, it is calibrated from the time taken by the first elements of a
+large enough call (only one of the concurrent calls updates it).
+The calls made by ufunc.reduce() and ufunc.accumulate() run in parallel
+only if `itemsize` is non-zero, which asserts that the loop is binary,
+that all its arguments are `itemsize` bytes long and of the same type, and
+that the operation is associative.
+*/
 static
-void ready(void);
+void parallel_ufunc(ufunc_func_t *func, char **args, Py_ssize_t *dims,
+                    Py_ssize_t *steps, void *data, int nargs,
+                    Py_ssize_t itemsize, Py_ssize_t *threshold);
@@ -0,0 +1,358 @@
+"""
+Lowering of prange() loops (see Interpreter._find_parallel_loops()) to
+run on the task scheduler of the parallel ufunc target.
+
+The loop body is outlined into a separate function running a chunk of
+iterations.  Variables defined before the loop are shared with the body
+through pointers to the enclosing function's variable slots; variables
+written in the body are private to each chunk, except reductions whose
+partial results are combined by the enclosing function once all chunks
+have run.
+"""
+
+from __future__ import print_function, division, absolute_import
+
+import warnings
+
+from llvmlite.llvmpy.core import Constant, Type, Builder
+import llvmlite.llvmpy.core as lc
+
+from . import cgutils, config, ir, types, typing, utils
+from .lowering import Lower
+from .targets import callconv
+
+
+# Arguments of the outlined loop body: the index value of the chunk's first
+# iteration, the index step, the iteration count, the array of pointers to
+# shared variables and a pointer to the chunk's reduction results.
+def _body_argtypes(index_type):
+    return (index_type, index_type, types.intp, types.voidptr, types.voidptr)
+
+
+_reduction_identities = {'+': 0, '-': 0, '*': 1}
+# Partial results of subtractions are combined by adding them
+_reduction_combiners = {'+': '+', '-': '+', '*': '*'}
+
+_byte_ptr_t = Type.pointer(Type.int(8))
+
+_chunks_per_thread = 4
+
+
+def select_parallel_loops(lower):
+    """
+    Return the ir.ParallelLoop instances of the function being lowered by
+    *lower* which will run in parallel, as a { header offset: loop } dict.
+    Other prange() loops run serially, with a warning.
+    """
+    interp = lower.interp
+    context = lower.context
+    serial = dict(interp.serial_prange_loops)
+    if interp.parallel_loops and (not context.enable_parallel_loops
+                                  or context.aot_mode
+                                  or context.enable_nrt_nonatomic):
+        # Chunks could race on non-atomic refcounts, and compiled
+        # extensions don't have the thread pool
+        for header, loop in interp.parallel_loops.items():
+            serial[header] = (loop.loc, "not supported by the target")
+
+    loops = {}
+    for header, loop in sorted(interp.parallel_loops.items()):
+        if header in serial:
+            continue
+        # Nested prange() loops run serially inside the outer one
+        if any(header in outer.body for outer in loops.values()):
+            continue
+        bad = [name for name in sorted(loop.reductions)
+               if not isinstance(lower.typeof(name), types.Number)]
+        if bad:
+            serial[header] = (loop.loc, "cannot reduce non-numeric "
+                                        "variable '%s'" % bad[0])
+            continue
+        loops[header] = loop
+
+    for header, (loc, reason) in sorted(serial.items()):
+        warnings.warn_explicit("prange() loop will run serially: %s"
+                               % reason, config.NumbaWarning,
+                               loc.filename, loc.line)
+    return loops
+
+
+class _LoopBodyLower(Lower):
+    """
+    Lower the body of a parallel loop into *function*, which runs
+    iterations [0, count) of a chunk.  The state of the enclosing
+    function's lowering (*parent*) is shared, except for the variables.
+    """
+
+    def __init__(self, parent, loop, index_type, function):
+        self.context = parent.context
+        self.library = parent.library
+        self.fndesc = parent.fndesc
+        self.interp = parent.interp
+        self.call_conv = parent.call_conv
+        self.module = parent.module
+        self.env = parent.env
+        self.generator_info = None
+        self.genlower = None
+
+        self.loop = loop
+        self.index_type = index_type
+        self.function = function
+        self.blocks = utils.SortedMap((offset, parent.blocks[offset])
+                                      for offset in loop.body)
+        self.blkmap = {}
+        self.varmap = {}
+        self.parallel_loops = {}
+        self.outlined_blocks = set()
+        self.firstblk = min(self.blocks.keys())
+        self.loc = -1
+        self.init()
+
+    def lower(self):
+        self.entry_block = self.function.append_basic_block('entry')
+        self.builder = Builder.new(self.entry_block)
+        self.call_helper = self.call_conv.init_call_helper(self.builder)
+
+        entry_block_tail = self.lower_function_body()
+        self.builder.position_at_end(entry_block_tail)
+        self.builder.branch(self.blkmap[self.loop.header])
+
+    def pre_lower(self):
+        # Skip Lower.pre_lower(): nested prange() loops run serially
+        super(Lower, self).pre_lower()
+        builder = self.builder
+        context = self.context
+        loop = self.loop
+        index_type = self.index_type
+
+        rawargs = self.call_conv.get_arguments(self.function)
+        arginfo = context.get_arg_packer(_body_argtypes(index_type))
+        first, step, count, shared, reds = arginfo.from_arguments(builder,
+                                                                  rawargs)
+
+        # Shared variables live in the enclosing function (slot 0 is
+        # its environment)
+        shared = builder.bitcast(shared, Type.pointer(_byte_ptr_t))
+        for i, name in enumerate(loop.shared_vars):
+            ptr = builder.load(cgutils.gep(builder, shared, i + 1))
+            llty = context.get_value_type(self.typeof(name))
+            self.varmap[name] = builder.bitcast(ptr, Type.pointer(llty))
+
+        # Reductions start from the identity of their operator
+        red_names = sorted(loop.reductions)
+        for name in red_names:
+            ty = self.typeof(name)
+            ident = context.get_constant(types.intp,
+                                         _reduction_identities[
+                                             loop.reductions[name]])
+            ident = context.cast(builder, ident, types.intp, ty)
+            self.varmap[name] = cgutils.alloca_once(builder, ident.type,
+                                                    name=name)
+            builder.store(ident, self.varmap[name])
+
+        counter = cgutils.alloca_once_value(builder,
+                                            context.get_constant(types.intp,
+                                                                 0))
+        bbcheck = self.function.append_basic_block("prange.check")
+        bbiter = self.function.append_basic_block("prange.iter")
+        bbend = self.function.append_basic_block("prange.end")
+        self.blkmap[loop.header] = bbcheck
+        self.blkmap[loop.exit] = bbend
+
+        with builder.goto_block(bbcheck):
+            k = builder.load(counter)
+            builder.cbranch(builder.icmp_signed('<', k, count), bbiter, bbend)
+
+        with builder.goto_block(bbiter):
+            k = builder.load(counter)
+            builder.store(builder.add(k, Constant.int(k.type, 1)), counter)
+            offset = context.cast(builder, k, types.intp, index_type)
+            value = builder.add(first, builder.mul(offset, step))
+            for name in loop.index_vars:
+                self.storevar(context.cast(builder, value, index_type,
+                                           self.typeof(name)),
+                              name)
+            builder.branch(self.blkmap[self.interp.blocks[
+                loop.header].terminator.truebr])
+
+        with builder.goto_block(bbend):
+            if red_names:
+                llty = Type.struct([context.get_value_type(self.typeof(name))
+                                    for name in red_names])
+                reds = builder.bitcast(reds, Type.pointer(llty))
+                for i, name in enumerate(red_names):
+                    builder.store(self.loadvar(name),
+                                  cgutils.gep(builder, reds, 0, i))
+            self.call_conv.return_native_none(builder)
+
+    def lower_inst(self, inst):
+        # Shared variables are owned by the enclosing function
+        if isinstance(inst, ir.Del) and inst.value in self.loop.shared_vars:
+            return
+        super(_LoopBodyLower, self).lower_inst(inst)
+
+
+def lower_parallel_loop(lower, loop):
+    """
+    Lower the parallel *loop* at its header block, for the function being
+    lowered by *lower*: the loop's iterations are split in chunks run by
+    the scheduler of the parallel targets, and the enclosing function
+    waits for all chunks to complete before continuing at the loop exit.
+    """
+    from numba.npyufunc import parallel
+    parallel._launch_threads()
+
+    context = lower.context
+    builder = lower.builder
+    module = lower.module
+    call_conv = lower.call_conv
+
+    iterty = lower.typeof(loop.iterator)
+    index_type = iterty.yield_type
+    red_names = sorted(loop.reductions)
+    red_types = [lower.typeof(name) for name in red_names]
+
+    # Outline the loop body
+    argtypes = _body_argtypes(index_type)
+    fnty = call_conv.get_function_type(types.none, argtypes)
+    body_fn = module.add_function(fnty, name="%s.prange%d"
+                                  % (lower.fndesc.mangled_name, loop.header))
+    body_fn.linkage = lc.LINKAGE_INTERNAL
+    body_lower = _LoopBodyLower(lower, loop, index_type, body_fn)
+    body_lower.lower()
+
+    # A record per chunk holds the body's arguments and return status
+    ll_index = context.get_value_type(index_type)
+    record_t = Type.struct([ll_index, ll_index,
+                            context.get_value_type(types.intp),
+                            callconv.errcode_t, callconv.excinfo_ptr_t,
+                            Type.struct([context.get_value_type(ty)
+                                         for ty in red_types])])
+
+    # Task run by the scheduler for a range of chunks:
+    # void(job, start, stop), the job holding the shared variables' array
+    # and the records' array
+    intp_t = context.get_value_type(types.intp)
+    job_t = Type.struct([_byte_ptr_t, Type.pointer(record_t)])
+    task_fn = module.add_function(Type.function(Type.void(),
+                                                [_byte_ptr_t, intp_t, intp_t]),
+                                  name=body_fn.name + ".task")
+    task_fn.linkage = lc.LINKAGE_INTERNAL
+    task_builder = Builder.new(task_fn.append_basic_block('entry'))
+    job, start, stop = task_fn.args
+    job = task_builder.bitcast(job, Type.pointer(job_t))
+    shared = task_builder.load(cgutils.gep(task_builder, job, 0, 0))
+    records = task_builder.load(cgutils.gep(task_builder, job, 0, 1))
+    env = task_builder.load(task_builder.bitcast(shared,
+                                                 Type.pointer(_byte_ptr_t)))
+    with cgutils.for_range(task_builder,
+                           task_builder.sub(stop, start)) as chunk:
+        record = cgutils.gep(task_builder, records,
+                             task_builder.add(start, chunk.index))
+        args = [task_builder.load(cgutils.gep(task_builder, record, 0, i))
+                for i in range(3)]
+        args += [shared,
+                 task_builder.bitcast(cgutils.gep(task_builder, record, 0, 5),
+                                      _byte_ptr_t)]
+        status, _ = call_conv.call_function(task_builder, body_fn, types.none,
+                                            argtypes, args, env=env)
+        task_builder.store(status.code,
+                           cgutils.gep(task_builder, record, 0, 3))
+        task_builder.store(status.excinfoptr,
+                           cgutils.gep(task_builder, record, 0, 4))
+    task_builder.ret_void()
+
+    # Split the iterations
+    it = cgutils.create_struct_proxy(iterty)(context, builder,
+                                             value=lower.loadvar(loop.iterator))
+    first = builder.load(it.iter)
+    step = it.step
+    count = context.cast(builder, builder.load(it.count), index_type,
+                         types.intp)
+    bbexit = lower.blkmap[loop.exit]
+    bbrun = builder.append_basic_block("prange.run")
+    zero = context.get_constant(types.intp, 0)
+    builder.cbranch(builder.icmp_signed('>', count, zero), bbrun, bbexit)
+    builder.position_at_end(bbrun)
+
+    shared = cgutils.alloca_once(builder, _byte_ptr_t,
+                                 size=len(loop.shared_vars) + 1)
+    builder.store(builder.bitcast(call_conv.get_env_argument(lower.function),
+                                  _byte_ptr_t),
+                  shared)
+    for i, name in enumerate(loop.shared_vars):
+        if name not in lower.varmap:
+            llty = context.get_value_type(lower.typeof(name))
+            lower.varmap[name] = lower.alloca_lltype(name, llty)
+        builder.store(builder.bitcast(lower.varmap[name], _byte_ptr_t),
+                      cgutils.gep(builder, shared, i + 1))
+
+    # More chunks than threads, so that idle threads can steal some, but
+    # no more than iterations.  The number of threads is read at runtime,
+    # as it can be changed by set_num_threads().
+    get_num_threads = module.get_or_insert_function(
+        Type.function(Type.int(), ()), name='numba_get_num_threads')
+    nchunks_val = builder.mul(builder.sext(builder.call(get_num_threads, ()),
+                                           intp_t),
+                              context.get_constant(types.intp,
+                                                   _chunks_per_thread))
+    nchunks_val = builder.select(builder.icmp_signed('<', count, nchunks_val),
+                                 count, nchunks_val)
+    # The records are released once the loop has run, as it may itself be
+    # in a loop
+    stacksave = module.get_or_insert_function(
+        Type.function(_byte_ptr_t, ()), name='llvm.stacksave')
+    stackrestore = module.get_or_insert_function(
+        Type.function(Type.void(), [_byte_ptr_t]), name='llvm.stackrestore')
+    stack = builder.call(stacksave, ())
+    records = builder.alloca(record_t, size=nchunks_val)
+    size = builder.sdiv(count, nchunks_val)
+    rem = builder.srem(count, nchunks_val)
+    one = context.get_constant(types.intp, 1)
+    with cgutils.for_range(builder, nchunks_val) as chunk:
+        i = chunk.index
+        record = cgutils.gep(builder, records, i)
+        # The first (count % nchunks) chunks get one more iteration
+        extra = builder.icmp_signed('<', i, rem)
+        n = builder.add(size, builder.select(extra, one, zero))
+        chunk_start = builder.add(builder.mul(i, size),
+                                  builder.select(extra, i, rem))
+        offset = context.cast(builder, chunk_start, types.intp, index_type)
+        builder.store(builder.add(first, builder.mul(offset, step)),
+                      cgutils.gep(builder, record, 0, 0))
+        builder.store(step, cgutils.gep(builder, record, 0, 1))
+        builder.store(n, cgutils.gep(builder, record, 0, 2))
+
+    job = cgutils.alloca_once(builder, job_t)
+    builder.store(shared, cgutils.gep(builder, job, 0, 0))
+    builder.store(records, cgutils.gep(builder, job, 0, 1))
+    parallel_for_ty = Type.function(Type.void(),
+                                    [_byte_ptr_t, _byte_ptr_t, intp_t, intp_t])
+    parallel_for = module.get_or_insert_function(parallel_for_ty,
+                                                 name='numba_parallel_for')
+    builder.call(parallel_for, [builder.bitcast(task_fn, _byte_ptr_t),
+                                builder.bitcast(job, _byte_ptr_t),
+                                nchunks_val, one])
+
+    # Propagate the first error, in chunk order
+    with cgutils.for_range(builder, nchunks_val) as chunk:
+        record = cgutils.gep(builder, records, chunk.index)
+        status = call_conv._get_return_status(
+            builder, builder.load(cgutils.gep(builder, record, 0, 3)),
+            builder.load(cgutils.gep(builder, record, 0, 4)))
+        with cgutils.if_unlikely(builder, status.is_error):
+            call_conv.return_status_propagate(builder, status)
+
+    # Combine the partial reductions, in chunk order
+    for j, (name, ty) in enumerate(zip(red_names, red_types)):
+        op = _reduction_combiners[loop.reductions[name]]
+        impl = context.get_function(op, typing.signature(ty, ty, ty))
+        acc = cgutils.alloca_once_value(builder, lower.loadvar(name))
+        with cgutils.for_range(builder, nchunks_val) as chunk:
+            record = cgutils.gep(builder, records, chunk.index)
+            part = builder.load(cgutils.gep(builder, record, 0, 5, j))
+            builder.store(impl(builder, (builder.load(acc), part)), acc)
+        lower.storevar(builder.load(acc), name)
+
+    builder.call(stackrestore, [stack])
+    builder.branch(bbexit)
@@ -5,11 +5,14 @@ from __future__ import print_function, division, absolute_import
 
 import os
 import logging
+import shutil
 import subprocess
 import tempfile
 import sys
 
-from .compiler import Compiler, find_shared_ending, find_args, find_linker
+from .compiler import (Compiler, find_shared_ending, find_args, find_linker,
+                       find_relocatable_linker)
+from .isa import isa_variants, normalize_variants
 
 
 def get_ending(args):
@@ -41,10 +44,37 @@ def main(args=None):
     parser.add_argument('--python', action='store_true',
                         help='Emit additionally generated Python wrapper and '
                         'extension module code in output')
+    parser.add_argument('--isa', metavar='VARIANTS',
+                        help='Also compile the exported functions for the '
+                        'given comma-separated instruction set variants '
+                        '(among %s), and select the best variant supported '
+                        'by the CPU at load time' % ", ".join(isa_variants))
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='Compile the exported functions in JOBS '
+                        'parallel processes (default: 1)')
+    parser.add_argument('--cache-dir',
+                        help='Cache the objects compiled for each exported '
+                        'function in this directory, and only compile '
+                        'the changed functions on later builds')
     parser.add_argument('-d', '--debug', action='store_true',
                         help='Print extra debug information')
 
     args = parser.parse_args(args)
+    if args.isa:
+        args.isa = args.isa.split(',')
+        if args.llvm:
+            parser.error("--isa can't be used with --llvm")
+        try:
+            normalize_variants(args.isa)
+        except ValueError as e:
+            parser.error(str(e))
+
+    if args.olibs and args.isa and find_relocatable_linker() is None:
+        parser.error("--isa can't be used with -c on this platform")
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+    if args.llvm and (args.jobs > 1 or args.cache_dir):
+        parser.error("--jobs and --cache-dir can't be used with --llvm")
 
     logger = logging.getLogger(__name__)
     if args.debug:
@@ -71,13 +101,20 @@ def main(args=None):
             compiler.write_llvm_bitcode(args.output, wrap=args.python)
         elif args.olibs:
             logger.debug('emit object file')
-            compiler.write_native_object(args.output, wrap=args.python)
+            compiler.write_native_object(args.output, wrap=args.python,
+                                         isa_variants=args.isa,
+                                         jobs=args.jobs,
+                                         cache_dir=args.cache_dir)
         else:
             logger.debug('emit shared library')
-            logger.debug('write to temporary object file %s', tempfile.gettempdir())
-            temp_obj = (tempfile.gettempdir() + os.sep +
-                        os.path.basename(args.output) + '.o')
-            compiler.write_native_object(temp_obj, wrap=args.python)
-            cmdargs = (find_linker(),) + find_args() + ('-o', args.output, temp_obj)
-            subprocess.check_call(cmdargs)
-            os.remove(temp_obj)
+            tmpdir = tempfile.mkdtemp(prefix='pycc-')
+            logger.debug('write to temporary object files in %s', tmpdir)
+            try:
+                objects = compiler.write_native_objects(
+                    tmpdir, wrap=args.python, isa_variants=args.isa,
+                    jobs=args.jobs, cache_dir=args.cache_dir)
+                cmdargs = ((find_linker(),) + find_args()
+                           + ('-o', args.output) + tuple(objects))
+                subprocess.check_call(cmdargs)
+            finally:
+                shutil.rmtree(tmpdir)
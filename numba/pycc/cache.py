@@ -0,0 +1,159 @@
+"""
+A cache of the native objects compiled by pycc for each exported function,
+allowing incremental rebuilds.
+"""
+from __future__ import print_function, division, absolute_import
+
+import errno
+import hashlib
+import inspect
+import os
+import sys
+
+import llvmlite
+import llvmlite.binding as ll
+
+import numba
+from numba import config, utils
+
+
+# The global values whose repr() is part of a function's fingerprint
+_literal_types = (bool, float, complex, str, bytes, type(None), tuple,
+                  utils.INT_TYPES)
+
+# The configuration variables that affect the generated code
+_codegen_config = ('OPT', 'LOOP_VECTORIZE', 'CPU_NAME', 'CPU_FEATURES',
+                   'ENABLE_AVX', 'LINK_BY_SYMBOL', 'COMPATIBILITY_MODE')
+
+
+def _hash_code(h, code):
+    """
+    Hash the code object *code* into *h*, ignoring the line numbers so
+    that moving a function around its file doesn't change its hash.
+    """
+    h.update(code.co_code)
+    h.update(repr((code.co_names, code.co_varnames, code.co_freevars,
+                   code.co_cellvars)).encode('utf8'))
+    for const in code.co_consts:
+        if inspect.iscode(const):
+            _hash_code(h, const)
+        else:
+            h.update(repr(const).encode('utf8'))
+
+
+def _referenced_names(code):
+    """
+    Return the global names referenced by *code* and its nested code
+    objects.
+    """
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if inspect.iscode(const):
+            names |= _referenced_names(const)
+    return names
+
+
+def function_fingerprint(func):
+    """
+    Return a hex digest of the code of *func* and of the Python functions
+    (or jitted functions) it references through its globals or closure,
+    recursively, and of the literal global values it references.  Values
+    referenced as attributes of a global module (e.g. ``mod.CONSTANT``
+    or ``mod.func``) are tracked likewise.
+
+    Changes to other objects (e.g. class attributes) aren't tracked.
+    """
+    h = hashlib.sha256()
+    seen = set()
+
+    def add(name, value, names):
+        value = getattr(value, 'py_func', value)
+        if inspect.isfunction(value):
+            h.update(repr(name).encode('utf8'))
+            visit(value)
+        elif isinstance(value, _literal_types):
+            h.update(repr((name, value)).encode('utf8'))
+        elif inspect.ismodule(value) and (value, names) not in seen:
+            seen.add((value, names))
+            # The attribute names are among the names referenced by
+            # the code
+            attrs = vars(value)
+            for attr in sorted(names):
+                if attr in attrs:
+                    add((name, attr), attrs[attr], names)
+
+    def visit(func):
+        if func in seen:
+            return
+        seen.add(func)
+        _hash_code(h, func.__code__)
+        names = frozenset(_referenced_names(func.__code__))
+        values = []
+        for name in sorted(names):
+            if name in func.__globals__:
+                values.append((name, func.__globals__[name]))
+        for i, cell in enumerate(func.__closure__ or ()):
+            values.append((i, cell.cell_contents))
+        for name, value in values:
+            add(name, value, names)
+
+    visit(getattr(func, 'py_func', func))
+    return h.hexdigest()
+
+
+class ObjectCache(object):
+    """
+    A cache of native objects in the directory *path*, keyed on the code
+    of the exported function and the compilation options.
+    """
+
+    def __init__(self, path):
+        self._path = path
+
+    def make_key(self, entry, *options):
+        """
+        Return the cache key for exported function *entry* compiled with
+        the given options (a tuple of hashable values with a stable repr()).
+        The key also depends on the versions of the compiler toolchain and
+        on the configuration variables affecting the generated code.
+        """
+        import numpy
+        codegen_config = tuple((name, getattr(config, name))
+                               for name in _codegen_config)
+        data = (numba.__version__, numpy.__version__, sys.version_info[:2],
+                llvmlite.__version__, ll.llvm_version_info, codegen_config,
+                entry.symbol, str(entry.signature),
+                function_fingerprint(entry.function)) + options
+        return hashlib.sha256(repr(data).encode('utf8')).hexdigest()
+
+    def _object_path(self, key):
+        return os.path.join(self._path, '%s.o' % (key,))
+
+    def load(self, key):
+        """
+        Return the object cached under *key*, or None.
+        """
+        try:
+            with open(self._object_path(key), 'rb') as f:
+                return f.read()
+        except EnvironmentError as e:
+            if e.errno == errno.ENOENT:
+                return None
+            raise
+
+    def save(self, key, data):
+        """
+        Cache the object *data* under *key*.
+        """
+        try:
+            os.makedirs(self._path)
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+        path = self._object_path(key)
+        # Write to a temporary file, so that concurrent builds don't see
+        # partially written objects
+        tmpname = '%s.tmp.%d' % (path, os.getpid())
+        with open(tmpname, 'wb') as f:
+            f.write(data)
+        utils.file_replace(tmpname, path)
@@ -2,18 +2,25 @@
 from __future__ import print_function, division, absolute_import
 
 import logging
+import multiprocessing
 import os
+import shutil
+import subprocess
 import sys
+import tempfile
 import functools
+from types import ModuleType
 
 import llvmlite.llvmpy.core as lc
 import llvmlite.llvmpy.ee as le
 import llvmlite.llvmpy.passes as lp
 import llvmlite.binding as ll
 
-from numba import cgutils
+import numba
+from numba import cgutils, types
 from numba.utils import IS_PY3
-from . import llvm_types as lt
+from . import isa, llvm_types as lt
+from .cache import ObjectCache
 from .decorators import registry as export_registry
 from numba.compiler import compile_extra, Flags
 from numba.targets.registry import CPUTarget
@@ -21,7 +28,8 @@ from numba.targets.registry import CPUTarget
 
 logger = logging.getLogger(__name__)
 
-__all__ = ['which', 'find_linker', 'find_args', 'find_shared_ending', 'Compiler']
+__all__ = ['which', 'find_linker', 'find_args', 'find_shared_ending',
+           'find_relocatable_linker', 'Compiler']
 
 NULL = lc.Constant.null(lt._void_star)
 ZERO = lc.Constant.int(lt._int32, 0)
@@ -59,6 +67,43 @@ find_linker = functools.partial(get_configs, 0)
 find_args = functools.partial(get_configs, 1)
 find_shared_ending = functools.partial(get_configs, 2)
 
+# The linkers producing a single object file from several ones
+_relocatable_configs = {
+    'win': None,
+    'default': ("ld", ("-r",)),
+}
+
+
+def find_relocatable_linker():
+    """Return the (linker, args) combining several object files into one,
+    or None if unsupported on this platform.
+    """
+    return _relocatable_configs.get(sys.platform[:3],
+                                    _relocatable_configs['default'])
+
+
+_numba_dir = os.path.dirname(numba.__file__)
+
+#: The C sources of the runtime support embedded in all compiled code
+#: (the NRT), relative to the numba package.
+runtime_sources = ['runtime/nrt.c', 'pycc/nrtinit.c']
+
+#: The C sources of the helpers embedded in extension modules only, as
+#: they depend on Python and Numpy.
+python_sources = ['_helperlib.c', '_math_c99.c', 'runtime/_nrt_python.c',
+                  'pycc/modulemixin.c']
+
+
+def _exec_input(path):
+    """Run the input file *path* as a module, registering its exports.
+    """
+    name = '__pycc_%s__' % os.path.splitext(os.path.basename(path))[0]
+    module = ModuleType(name)
+    module.__file__ = path
+    sys.modules[name] = module
+    with open(path) as fin:
+        exec(compile(fin.read(), path, 'exec'), module.__dict__)
+
 
 def get_header():
     import numpy
@@ -124,6 +169,7 @@ class _Compiler(object):
         self.inputs = inputs
         self.module_name = module_name
         self.export_python_wrap = False
+        self.isa_variants = ()
 
     def __enter__(self):
         return self
@@ -150,33 +196,53 @@ class _Compiler(object):
 
         codegen = target_ctx.aot_codegen(self.module_name)
         library = codegen.create_library(self.module_name)
+        symbols = self._compile_exports(typing_ctx, target_ctx, library)
+        self._emit_runtime_init(library)
 
-        # Generate IR for all exported functions
-        flags = Flags()
-        flags.set("no_compile")
+        if self.export_python_wrap:
+            wrapper_module = library.create_ir_module("wrapper")
+            self._emit_python_wrapper(wrapper_module)
+            library.add_ir_module(wrapper_module)
+            symbols.append(self.module_init_definition[1])
+
+        # The NRT functions linked in from the JIT are also defined by
+        # the embedded C runtime
+        library.internalize(symbols)
+        return library
+
+    def _cull_main_library(self):
+        """Compile the library holding everything but the exported
+        functions, which are compiled separately by _compile_object():
+        the dispatching code for the instruction set variants, the
+        extension module and the initialization of the runtime.
+        """
+        self.exported_signatures = export_registry
+        self.exported_function_types = {}
 
+        target_ctx = CPUTarget.target_context.subtarget(aot_mode=True)
+        call_conv = target_ctx.call_conv
         for entry in self.exported_signatures:
-            cres = compile_extra(typing_ctx, target_ctx, entry.function,
-                                 entry.signature.args,
-                                 entry.signature.return_type, flags,
-                                 locals={}, library=library)
+            self.exported_function_types[entry] = call_conv.get_function_type(
+                entry.signature.return_type, entry.signature.args)
 
-            func_name = cres.fndesc.llvm_func_name
-            llvm_func = cres.library.get_function(func_name)
+        codegen = target_ctx.aot_codegen(self.module_name)
+        library = codegen.create_library(self.module_name)
 
+        if self.isa_variants:
             if self.export_python_wrap:
-                # XXX: unsupported (necessary?)
-                llvm_func.linkage = lc.LINKAGE_INTERNAL
-                wrappername = cres.fndesc.llvm_cpython_wrapper_name
-                wrapper = cres.library.get_function(wrappername)
-                wrapper.name = entry.symbol
-                wrapper.linkage = lc.LINKAGE_EXTERNAL
-                fnty = cres.target_context.call_conv.get_function_type(
-                    cres.fndesc.restype, cres.fndesc.argtypes)
-                self.exported_function_types[entry] = fnty
+                pyobj = target_ctx.get_argument_type(types.pyobject)
+                wrapper_type = lc.Type.function(pyobj, [pyobj] * 3)
+                exports = [(entry.symbol, wrapper_type)
+                           for entry in self.exported_signatures]
             else:
-                llvm_func.linkage = lc.LINKAGE_EXTERNAL
-                llvm_func.name = entry.symbol
+                exports = [(entry.symbol, self.exported_function_types[entry])
+                           for entry in self.exported_signatures]
+            dispatch_module = library.create_ir_module("isa_dispatch")
+            isa.emit_dispatcher(dispatch_module, self.module_name,
+                                self.isa_variants, exports)
+            library.add_ir_module(dispatch_module)
+
+        self._emit_runtime_init(library)
 
         if self.export_python_wrap:
             wrapper_module = library.create_ir_module("wrapper")
@@ -185,25 +251,230 @@ class _Compiler(object):
 
         return library
 
-    def _process_inputs(self, wrap=False, **kws):
+    def _compile_object(self, entry, variant=None):
+        """Compile the exported function *entry* (for the instruction set
+        *variant*, if given) into its own library, and return it as
+        a native object.
+        """
+        typing_ctx = CPUTarget.typing_context
+        target_ctx = CPUTarget.target_context.subtarget(aot_mode=True)
+
+        if variant is None:
+            codegen = target_ctx.aot_codegen(self.module_name)
+        else:
+            codegen = target_ctx.aot_codegen(
+                self.module_name, features=isa.get_variant_features(variant))
+        library = codegen.create_library("%s.%s" % (self.module_name,
+                                                    entry.symbol))
+        symbol, _ = self._compile_export(typing_ctx, target_ctx, library,
+                                         entry, variant)
+        # Avoid clashes between the objects' internal functions
+        library.internalize([symbol])
+        return library.emit_native_object()
+
+    def _emit_runtime_init(self, library):
+        """Emit into *library* a constructor initializing the embedded
+        NRT when the compiled code is loaded.
+        """
+        init_module = library.create_ir_module("runtime_init")
+        voidfnty = lc.Type.function(lc.Type.void(), ())
+        init_runtime = init_module.add_function(voidfnty,
+                                                "numba_pycc_init_runtime")
+        ctor = init_module.add_function(voidfnty, ".runtime_init")
+        ctor.linkage = lc.LINKAGE_INTERNAL
+        builder = lc.Builder.new(ctor.append_basic_block('entry'))
+        builder.call(init_runtime, ())
+        builder.ret_void()
+        cgutils.add_global_ctor(init_module, ctor)
+        library.add_ir_module(init_module)
+
+    def _compile_exports(self, typing_ctx, target_ctx, library):
+        """Compile the exported functions into *library*, and return
+        the list of their symbols.
+        """
+        symbols = []
+        for entry in self.exported_signatures:
+            symbol, fnty = self._compile_export(typing_ctx, target_ctx,
+                                                library, entry)
+            self.exported_function_types[entry] = fnty
+            symbols.append(symbol)
+        return symbols
+
+    def _compile_export(self, typing_ctx, target_ctx, library, entry,
+                        variant=None):
+        """Compile the exported function *entry* into *library*, and
+        return its symbol and LLVM function type.  If *variant* is given,
+        the symbol is that of this instruction set variant.
+        """
+        flags = Flags()
+        flags.set("no_compile")
+        flags.set("nrt")
+
+        cres = compile_extra(typing_ctx, target_ctx, entry.function,
+                             entry.signature.args,
+                             entry.signature.return_type, flags,
+                             locals={}, library=library)
+
+        func_name = cres.fndesc.llvm_func_name
+        llvm_func = cres.library.get_function(func_name)
+        fnty = cres.target_context.call_conv.get_function_type(
+            cres.fndesc.restype, cres.fndesc.argtypes)
+
+        if variant is None:
+            symbol = entry.symbol
+        else:
+            symbol = isa.get_variant_symbol(entry.symbol, variant)
+
+        if self.export_python_wrap:
+            # XXX: unsupported (necessary?)
+            llvm_func.linkage = lc.LINKAGE_INTERNAL
+            wrappername = cres.fndesc.llvm_cpython_wrapper_name
+            wrapper = cres.library.get_function(wrappername)
+            wrapper.name = symbol
+            wrapper.linkage = lc.LINKAGE_EXTERNAL
+        else:
+            llvm_func.linkage = lc.LINKAGE_EXTERNAL
+            llvm_func.name = symbol
+
+        return symbol, fnty
+
+    def _process_inputs(self, wrap=False, isa_variants=(), **kws):
+        # Forget the exports of any previous build in this process
+        del export_registry[:]
         for ifile in self.inputs:
-            with open(ifile) as fin:
-                exec(compile(fin.read(), ifile, 'exec'))
+            _exec_input(ifile)
 
         self.export_python_wrap = wrap
+        if isa_variants:
+            self.isa_variants = isa.normalize_variants(isa_variants)
+        else:
+            self.isa_variants = ()
 
     def write_llvm_bitcode(self, output, **kws):
+        """Write the compiled code as LLVM bitcode.  The bitcode doesn't
+        include the C runtime support, which must be linked in separately.
+        """
         self._process_inputs(**kws)
+        if self.isa_variants:
+            raise ValueError("instruction set variants can only be "
+                             "compiled to native code")
         library = self._cull_exports()
         with open(output, 'wb') as fout:
             fout.write(library.emit_bitcode())
 
     def write_native_object(self, output, **kws):
+        """Write the compiled code, and the C runtime support, as a single
+        native object file using the linker's relocatable output.  See
+        write_native_objects() for the options.
+
+        Where there is no such linker, the compiled code is written as
+        a single object without the C runtime support, which must then be
+        linked in separately; the *jobs* and *cache_dir* options are
+        ignored, and instruction set variants aren't supported.
+        """
+        relocatable = find_relocatable_linker()
+        if relocatable is None:
+            self._write_single_native_object(output, **kws)
+            return
+        tmpdir = tempfile.mkdtemp(prefix='pycc-')
+        try:
+            paths = self.write_native_objects(tmpdir, **kws)
+            linker, args = relocatable
+            subprocess.check_call((linker,) + args + ('-o', output)
+                                  + tuple(paths))
+        finally:
+            shutil.rmtree(tmpdir)
+
+    def _write_single_native_object(self, output, jobs=1, cache_dir=None,
+                                    **kws):
         self._process_inputs(**kws)
+        if self.isa_variants:
+            raise ValueError("instruction set variants need a relocatable "
+                             "linker, which isn't available on this "
+                             "platform (%s)" % (sys.platform,))
         library = self._cull_exports()
         with open(output, 'wb') as fout:
             fout.write(library.emit_native_object())
 
+    def write_native_objects(self, output_dir, jobs=1, cache_dir=None,
+                             **kws):
+        """Write the compiled code, and the C runtime support, as native
+        object files into *output_dir*, and return their paths.
+
+        Each exported function (and instruction set variant) is compiled
+        separately, in *jobs* worker processes if greater than 1.  If
+        *cache_dir* is given, the objects are cached there, and only the
+        functions whose code changed are compiled again.
+        """
+        self._process_inputs(**kws)
+        main_library = self._cull_main_library()
+
+        tasks = [(entry, variant)
+                 for entry in export_registry
+                 for variant in (self.isa_variants or [None])]
+        objects = [None] * len(tasks)
+        if cache_dir is not None:
+            cache = ObjectCache(cache_dir)
+            keys = [cache.make_key(entry, self.module_name,
+                                   self.export_python_wrap, variant,
+                                   ll.get_default_triple())
+                    for entry, variant in tasks]
+            for i, key in enumerate(keys):
+                objects[i] = cache.load(key)
+        missing = [i for i, obj in enumerate(objects) if obj is None]
+        logger.debug('compiling %d of %d objects', len(missing), len(tasks))
+
+        if jobs > 1 and len(missing) > 1:
+            pool = multiprocessing.Pool(
+                min(jobs, len(missing)), initializer=_init_worker,
+                initargs=(self.inputs, self.module_name, kws))
+            # The workers run the inputs again, so the entries are
+            # identified by their symbol and signature
+            try:
+                compiled = pool.map(_compile_in_worker,
+                                    [(tasks[i][0].symbol,
+                                      str(tasks[i][0].signature), tasks[i][1])
+                                     for i in missing])
+                pool.close()
+            finally:
+                pool.terminate()
+                pool.join()
+        else:
+            compiled = [self._compile_object(*tasks[i]) for i in missing]
+
+        for i, obj in zip(missing, compiled):
+            objects[i] = obj
+            if cache_dir is not None:
+                cache.save(keys[i], obj)
+
+        paths = []
+        for i, obj in enumerate([main_library.emit_native_object()]
+                                + objects):
+            path = os.path.join(output_dir, '%d.o' % i)
+            with open(path, 'wb') as fout:
+                fout.write(obj)
+            paths.append(path)
+        return paths + self._compile_c_support(output_dir)
+
+    def _compile_c_support(self, tmpdir):
+        """Compile the C runtime support into *tmpdir*, and return the
+        list of object files.
+        """
+        from distutils.ccompiler import new_compiler
+        from distutils.sysconfig import customize_compiler, get_python_inc
+        import numpy
+
+        sources = list(runtime_sources)
+        if self.export_python_wrap:
+            sources += python_sources
+        compiler = new_compiler()
+        customize_compiler(compiler)
+        return compiler.compile([os.path.join(_numba_dir, src)
+                                 for src in sources],
+                                output_dir=tmpdir,
+                                include_dirs=[_numba_dir, get_python_inc(),
+                                              numpy.get_include()])
+
     def emit_type(self, tyobj):
         ret_val = str(tyobj)
         if 'int' in ret_val:
@@ -223,6 +494,15 @@ class _Compiler(object):
                                  for argtype in export_entry.signature.args)
                 fout.write("extern %s %s(%s);\n" % (restype, name, args))
 
+    def _emit_python_init(self, llvm_module, builder):
+        """Emit a call initializing the embedded C helpers, and return
+        a i1 value which is true on error.
+        """
+        init_python = llvm_module.add_function(
+            lc.Type.function(lt._int32, ()), "numba_pycc_init_python")
+        status = builder.call(init_python, ())
+        return builder.icmp(lc.ICMP_NE, status, ZERO)
+
     def _emit_method_array(self, llvm_module):
         """Collect exported methods and emit a PyMethodDef array.
 
@@ -290,6 +570,8 @@ class CompilerPy2(_Compiler):
         mod_init_fn = llvm_module.add_function(*self.module_init_definition)
         entry = mod_init_fn.append_basic_block('Entry')
         builder = lc.Builder.new(entry)
+        with builder.if_then(self._emit_python_init(llvm_module, builder)):
+            builder.ret_void()
 
         # Python C API module creation function.
         create_module_fn = llvm_module.add_function(*self.module_create_definition)
@@ -438,6 +720,9 @@ class CompilerPy3(_Compiler):
         mod_init_fn = llvm_module.add_function(*self.module_init_definition)
         entry = mod_init_fn.append_basic_block('Entry')
         builder = lc.Builder.new(entry)
+        with builder.if_then(self._emit_python_init(llvm_module, builder)):
+            builder.ret(NULL.bitcast(mod_init_fn.type.pointee.return_type))
+
         mod = builder.call(create_module_fn,
                            (mod_def,
                             lc.Constant.int(lt._int32, sys.api_version)))
@@ -453,3 +738,21 @@ class CompilerPy3(_Compiler):
 
 Compiler = CompilerPy3 if IS_PY3 else CompilerPy2
 
+
+# The compiler of the worker processes of write_native_object()
+_worker_compiler = None
+
+
+def _init_worker(inputs, module_name, kws):
+    global _worker_compiler
+    _worker_compiler = Compiler(inputs, module_name=module_name)
+    _worker_compiler._process_inputs(**kws)
+
+
+def _compile_in_worker(task):
+    symbol, signature, variant = task
+    for entry in export_registry:
+        if entry.symbol == symbol and str(entry.signature) == signature:
+            return _worker_compiler._compile_object(entry, variant)
+    raise LookupError("exported function %s %s not found in worker"
+                      % (symbol, signature))
@@ -0,0 +1,253 @@
+"""
+Support for compiling the exported functions for several instruction set
+variants, and selecting the best variant supported by the CPU (using
+CPUID) when the compiled library is loaded.
+"""
+from __future__ import print_function, division, absolute_import
+
+from collections import OrderedDict
+
+import llvmlite.llvmpy.core as lc
+
+from numba import cgutils
+from . import llvm_types as lt
+
+
+#: The variant always compiled, for the CPUs supporting none of the others.
+BASELINE = 'generic'
+
+_sse42 = ('sse2', 'sse3', 'ssse3', 'sse4.1', 'sse4.2', 'popcnt')
+_avx = _sse42 + ('avx',)
+_avx2 = _avx + ('avx2', 'bmi', 'bmi2', 'f16c', 'fma', 'lzcnt', 'movbe')
+
+#: The instruction set variants, from the least to the most capable, as
+#: (LLVM features, CPU features needed at runtime).
+isa_variants = OrderedDict([
+    (BASELINE, ('', ())),
+    ('sse4.2', ('+sse4.2,+popcnt', _sse42)),
+    ('avx', ('+avx,+popcnt', _avx)),
+    ('avx2', ('+avx2,+bmi,+bmi2,+f16c,+fma,+lzcnt,+movbe,+popcnt', _avx2)),
+    ])
+
+#: The environment variable forcing the selection of a variant at load
+#: time.  The baseline is selected if the CPU doesn't support it.
+ISA_ENVVAR = 'NUMBA_PYCC_ISA'
+
+# The location of the CPU features in the results of CPUID, as (leaf,
+# register index in (eax, ebx, ecx, edx), bit, register state to be
+# enabled by the OS).  See numba/_cpufeatures.h.
+_cpuid_bits = {
+    'sse2': (1, 3, 26, None),
+    'sse3': (1, 2, 0, None),
+    'ssse3': (1, 2, 9, None),
+    'sse4.1': (1, 2, 19, None),
+    'sse4.2': (1, 2, 20, None),
+    'movbe': (1, 2, 22, None),
+    'popcnt': (1, 2, 23, None),
+    'avx': (1, 2, 28, 'avx'),
+    'f16c': (1, 2, 29, 'avx'),
+    'fma': (1, 2, 12, 'avx'),
+    'bmi': (7, 1, 3, None),
+    'bmi2': (7, 1, 8, None),
+    'avx2': (7, 1, 5, 'avx'),
+    'lzcnt': (0x80000001, 2, 5, None),
+    }
+
+# The XCR0 bits enabling the register states
+_xcr0_masks = {
+    'avx': 0x6,
+    }
+
+_EXTENDED_LEAVES = 0x80000000
+
+_int1 = lc.Type.int(1)
+_int32 = lt._int32
+_zero = lc.Constant.int(_int32, 0)
+
+
+def normalize_variants(names):
+    """
+    Return the variant names to compile for, in the order of
+    :data:`isa_variants` and starting with the baseline.
+    """
+    unknown = set(names) - set(isa_variants)
+    if unknown:
+        raise ValueError("unknown instruction set variant(s) %s "
+                         "(valid names are %s)"
+                         % (", ".join(sorted(unknown)),
+                            ", ".join(isa_variants)))
+    return [name for name in isa_variants
+            if name in names or name == BASELINE]
+
+
+def get_variant_features(name):
+    """
+    Return the LLVM features string to compile variant *name* with.
+    """
+    return isa_variants[name][0]
+
+
+def get_variant_symbol(symbol, name):
+    """
+    Return the symbol of variant *name* of the exported function *symbol*.
+    """
+    return "%s.%s" % (symbol, name)
+
+
+def _emit_cpuid(builder, leaf):
+    fnty = lc.Type.function(lc.Type.struct([_int32] * 4), [_int32, _int32])
+    cpuid = lc.InlineAsm.get(fnty, "cpuid",
+                             "={ax},={bx},={cx},={dx},{ax},{cx}")
+    regs = builder.call(cpuid, [lc.Constant.int(_int32, leaf),
+                                lc.Constant.int(_int32, 0)])
+    return [builder.extract_value(regs, i) for i in range(4)]
+
+
+def _emit_xgetbv(builder):
+    """
+    Emit code returning the low word of XCR0.
+    """
+    fnty = lc.Type.function(lc.Type.struct([_int32] * 2), [_int32])
+    # xgetbv, spelled out for old assemblers
+    xgetbv = lc.InlineAsm.get(fnty, ".byte 0x0f, 0x01, 0xd0",
+                              "={ax},={dx},{cx}")
+    regs = builder.call(xgetbv, [lc.Constant.int(_int32, 0)])
+    return builder.extract_value(regs, 0)
+
+
+def _emit_bit(builder, reg, bit):
+    return builder.trunc(builder.lshr(reg, lc.Constant.int(_int32, bit)),
+                         _int1)
+
+
+def _emit_cpu_features(builder, names):
+    """
+    Emit code detecting the CPU features *names*, and return a dict
+    mapping each name to a i1 value.
+    """
+    states = dict((state, cgutils.alloca_once_value(builder,
+                                                    cgutils.false_bit))
+                  for state in _xcr0_masks)
+    flags = dict((name, cgutils.alloca_once_value(builder, cgutils.false_bit))
+                 for name in names)
+
+    maxleaf = _emit_cpuid(builder, 0)[0]
+    # The register states enabled by the OS (OSXSAVE, then XCR0)
+    with builder.if_then(builder.icmp(lc.ICMP_UGE, maxleaf,
+                                      lc.Constant.int(_int32, 1))):
+        regs = _emit_cpuid(builder, 1)
+        with builder.if_then(_emit_bit(builder, regs[2], 27)):
+            xcr0 = _emit_xgetbv(builder)
+            for state, mask in _xcr0_masks.items():
+                mask = lc.Constant.int(_int32, mask)
+                enabled = builder.icmp(lc.ICMP_EQ,
+                                       builder.and_(xcr0, mask), mask)
+                builder.store(enabled, states[state])
+
+    leaves = sorted(set(_cpuid_bits[name][0] for name in names))
+    if any(leaf >= _EXTENDED_LEAVES for leaf in leaves):
+        maxextleaf = _emit_cpuid(builder, _EXTENDED_LEAVES)[0]
+    for leaf in leaves:
+        limit = maxextleaf if leaf >= _EXTENDED_LEAVES else maxleaf
+        with builder.if_then(builder.icmp(lc.ICMP_UGE, limit,
+                                          lc.Constant.int(_int32, leaf))):
+            regs = _emit_cpuid(builder, leaf)
+            for name in names:
+                fleaf, reg, bit, state = _cpuid_bits[name]
+                if fleaf != leaf:
+                    continue
+                flag = _emit_bit(builder, regs[reg], bit)
+                if state is not None:
+                    flag = builder.and_(flag, builder.load(states[state]))
+                builder.store(flag, flags[name])
+
+    return dict((name, builder.load(flags[name])) for name in names)
+
+
+def emit_dispatcher(llvm_module, module_name, variants, exports):
+    """
+    Emit into *llvm_module* the exported functions dispatching to the
+    best variant supported by the CPU, which is selected by a constructor
+    run when the library is loaded.  Also emit a ``<module>_get_isa()``
+    function returning the name of the selected variant.
+
+    *variants* is the list of compiled variant names (as returned by
+    normalize_variants()), *exports* a list of (symbol, LLVM function
+    type) tuples.
+    """
+    baseline = variants[0]
+    voidfnty = lc.Type.function(lc.Type.void(), ())
+
+    # A function pointer per exported function, initialized to the baseline
+    # variant in case the constructor isn't run.
+    pointers = []
+    for symbol, fnty in exports:
+        impls = dict((name, llvm_module.add_function(
+                          fnty, get_variant_symbol(symbol, name)))
+                     for name in variants)
+        ptr = llvm_module.add_global_variable(lc.Type.pointer(fnty),
+                                              ".isa_ptr.%s" % symbol)
+        ptr.linkage = lc.LINKAGE_INTERNAL
+        ptr.initializer = impls[baseline]
+        pointers.append((ptr, impls))
+
+        stub = llvm_module.add_function(fnty, symbol)
+        builder = lc.Builder.new(stub.append_basic_block('entry'))
+        builder.ret(builder.call(builder.load(ptr), stub.args))
+
+    # The name of the selected variant
+    names = {}
+    for name in variants:
+        names[name] = lc.Constant.gep(
+            cgutils.global_constant(llvm_module, ".isa_name.%s" % name,
+                                    lc.Constant.stringz(name)),
+            [_zero, _zero])
+    selected = llvm_module.add_global_variable(lt._int8_star, ".isa_name")
+    selected.linkage = lc.LINKAGE_INTERNAL
+    selected.initializer = names[baseline]
+
+    get_isa = llvm_module.add_function(lc.Type.function(lt._int8_star, ()),
+                                       "%s_get_isa" % module_name)
+    builder = lc.Builder.new(get_isa.append_basic_block('entry'))
+    builder.ret(builder.load(selected))
+
+    # The constructor selecting the variants
+    select = llvm_module.add_function(voidfnty, ".isa_select")
+    select.linkage = lc.LINKAGE_INTERNAL
+    builder = lc.Builder.new(select.append_basic_block('entry'))
+
+    needed = set()
+    for name in variants:
+        needed.update(isa_variants[name][1])
+    features = _emit_cpu_features(builder, sorted(needed))
+
+    getenv = llvm_module.get_or_insert_function(
+        lc.Type.function(lt._int8_star, [lt._int8_star]), "getenv")
+    strcmp = llvm_module.get_or_insert_function(
+        lc.Type.function(lt._int32, [lt._int8_star, lt._int8_star]),
+        "strcmp")
+    envvar = cgutils.global_constant(llvm_module, ".isa_envvar",
+                                     lc.Constant.stringz(ISA_ENVVAR))
+    forced = builder.call(getenv,
+                          [lc.Constant.gep(envvar, [_zero, _zero])])
+    is_forced = cgutils.is_not_null(builder, forced)
+
+    # Try the variants from the most capable, keeping the baseline if
+    # none is supported
+    for name in reversed(variants[1:]):
+        supported = cgutils.true_bit
+        for feature in isa_variants[name][1]:
+            supported = builder.and_(supported, features[feature])
+        # When the variant is forced, only consider that one
+        wanted = builder.select(is_forced, forced, names[name])
+        matches = builder.icmp(lc.ICMP_EQ,
+                               builder.call(strcmp, [wanted, names[name]]),
+                               _zero)
+        with builder.if_then(builder.and_(supported, matches)):
+            for ptr, impls in pointers:
+                builder.store(impls[name], ptr)
+            builder.store(names[name], selected)
+            builder.ret_void()
+    builder.ret_void()
+
+    cgutils.add_global_ctor(llvm_module, select)
@@ -0,0 +1,35 @@
+/*
+ * Initialization of the C helpers (_helperlib.c) and the NRT's Python
+ * adaptors (_nrt_python.c) embedded in the extension modules compiled by
+ * pycc.  Running the initialization functions of these modules imports
+ * the Numpy C API and seeds the random states.
+ */
+
+#include "_pymodule.h"
+
+extern void numba_pycc_init_runtime(void);
+
+MOD_INIT(_helperlib);
+MOD_INIT(_nrt_python);
+
+/*
+ * Called by the module initialization function; return 0 on success,
+ * -1 with an exception set on error.
+ */
+int
+numba_pycc_init_python(void)
+{
+    static int initialized = 0;
+    if (initialized)
+        return 0;
+    MOD_INIT_EXEC(_helperlib)
+    if (PyErr_Occurred())
+        return -1;
+    MOD_INIT_EXEC(_nrt_python)
+    if (PyErr_Occurred())
+        return -1;
+    /* Initializing _nrt_python has reset the memory system */
+    numba_pycc_init_runtime();
+    initialized = 1;
+    return 0;
+}
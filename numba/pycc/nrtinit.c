@@ -0,0 +1,68 @@
+/*
+ * Initialization of the NRT embedded in the code compiled by pycc.
+ * This doesn't depend on Python, so that libraries compiled without
+ * --python can be loaded by any program.
+ */
+
+#include <stdarg.h>
+
+#include "runtime/nrt.h"
+
+#if defined(_MSC_VER)
+    #include <windows.h>
+#endif
+
+
+static size_t
+pycc_atomic_inc(size_t *ptr)
+{
+#if defined(_MSC_VER)
+    #ifdef _WIN64
+        return (size_t) InterlockedIncrement64((LONGLONG volatile *) ptr);
+    #else
+        return (size_t) InterlockedIncrement((LONG volatile *) ptr);
+    #endif
+#else
+    return __sync_add_and_fetch(ptr, 1);
+#endif
+}
+
+static size_t
+pycc_atomic_dec(size_t *ptr)
+{
+#if defined(_MSC_VER)
+    #ifdef _WIN64
+        return (size_t) InterlockedDecrement64((LONGLONG volatile *) ptr);
+    #else
+        return (size_t) InterlockedDecrement((LONG volatile *) ptr);
+    #endif
+#else
+    return __sync_sub_and_fetch(ptr, 1);
+#endif
+}
+
+static int
+pycc_atomic_cas(void * volatile *ptr, void *cmp, void *repl, void **oldptr)
+{
+    void *old;
+#if defined(_MSC_VER)
+    old = InterlockedCompareExchangePointer(ptr, repl, cmp);
+#else
+    old = __sync_val_compare_and_swap(ptr, cmp, repl);
+#endif
+    *oldptr = old;
+    return old == cmp;
+}
+
+/*
+ * Initialize the memory system, with atomic operations implemented in C
+ * (rather than compiled by LLVM, as in the JIT).  Called when the library
+ * is loaded, and again when the NRT module code is initialized.
+ */
+void
+numba_pycc_init_runtime(void)
+{
+    NRT_MemSys_init();
+    NRT_MemSys_set_atomic_inc_dec(pycc_atomic_inc, pycc_atomic_dec);
+    NRT_MemSys_set_atomic_cas(pycc_atomic_cas);
+}
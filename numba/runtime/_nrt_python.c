@@ -327,8 +327,8 @@ static PyTypeObject MemInfoType = {
 /****** Array adaptor code ******/
 
 
-static
-int NRT_adapt_ndarray_from_python(PyObject *obj, arystruct_t* arystruct) {
+NUMBA_EXPORT_FUNC(int)
+NRT_adapt_ndarray_from_python(PyObject *obj, arystruct_t* arystruct) {
     PyArrayObject *ndary;
     int i, ndim;
     npy_intp *p;
@@ -397,7 +397,7 @@ RETURN_ARRAY_COPY:
     return NULL;
 }
 
-static PyObject *
+NUMBA_EXPORT_FUNC(PyObject *)
 NRT_adapt_ndarray_to_python(arystruct_t* arystruct, int ndim,
                             int writeable, PyArray_Descr *descr)
 {
@@ -483,7 +483,7 @@ NRT_adapt_ndarray_to_python(arystruct_t* arystruct, int ndim,
     return (PyObject *) array;
 }
 
-static void
+NUMBA_EXPORT_FUNC(void)
 NRT_adapt_buffer_from_python(Py_buffer *buf, arystruct_t *arystruct)
 {
     int i;
@@ -571,6 +571,7 @@ declmethod(MemInfo_alloc);
 declmethod(MemInfo_alloc_safe);
 declmethod(MemInfo_alloc_aligned);
 declmethod(MemInfo_alloc_safe_aligned);
+declmethod(MemInfo_alloc_tracked);
 declmethod(MemInfo_call_dtor);
 declmethod(MemInfo_varsize_alloc);
 declmethod(MemInfo_varsize_realloc);
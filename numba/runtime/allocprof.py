@@ -0,0 +1,156 @@
+"""
+Allocation profiler for the NRT.
+
+When enabled (see NUMBA_NRT_ALLOC_PROFILE), every NRT allocation emitted
+by the compiler is tagged with the source location of the Numba IR
+statement being lowered.  Each location owns a set of C counters
+(a NRT_AllocSite structure) that are updated by the runtime.
+"""
+
+from __future__ import print_function, absolute_import, division
+
+import ctypes
+import linecache
+import sys
+import threading
+from collections import namedtuple
+from contextlib import contextmanager
+
+
+_site_stats = namedtuple("nrt_site_stats",
+                         ["funcname", "filename", "lineno",
+                          "count", "bytes", "live_bytes", "peak_bytes"])
+
+
+class _AllocSiteStruct(ctypes.Structure):
+    # NOTE: if changing the layout, please update NRT_AllocSite in nrt.h
+    _fields_ = [
+        ("count", ctypes.c_size_t),
+        ("bytes", ctypes.c_size_t),
+        ("live_bytes", ctypes.c_size_t),
+        ("peak_bytes", ctypes.c_size_t),
+    ]
+
+
+class AllocSite(object):
+    """
+    An allocation site, i.e. a source location in a compiled function.
+    """
+
+    def __init__(self, funcname, filename, lineno):
+        self.funcname = funcname
+        self.filename = filename
+        self.lineno = lineno
+        # The counters must never move nor die, since compiled code
+        # references them by address.
+        self._struct = _AllocSiteStruct()
+
+    @property
+    def address(self):
+        return ctypes.addressof(self._struct)
+
+    def get_stats(self):
+        st = self._struct
+        return _site_stats(funcname=self.funcname, filename=self.filename,
+                           lineno=self.lineno, count=st.count, bytes=st.bytes,
+                           live_bytes=st.live_bytes, peak_bytes=st.peak_bytes)
+
+    def reset(self):
+        st = self._struct
+        st.count = 0
+        st.bytes = 0
+        st.peak_bytes = st.live_bytes
+
+
+class _SiteRegistry(object):
+
+    def __init__(self):
+        self._sites = {}
+        self._lock = threading.Lock()
+        self._tls = threading.local()
+
+    def get_site(self, funcname, filename, lineno):
+        key = funcname, filename, lineno
+        with self._lock:
+            try:
+                return self._sites[key]
+            except KeyError:
+                site = self._sites[key] = AllocSite(*key)
+                return site
+
+    @contextmanager
+    def location(self, fndesc, loc):
+        """
+        Make *loc* in function *fndesc* the current allocation site while
+        lowering the body of the context manager.  The yielded list gets
+        the sites actually used for allocation.
+        """
+        used = []
+        old = getattr(self._tls, 'current', None)
+        self._tls.current = fndesc, loc, used
+        try:
+            yield used
+        finally:
+            self._tls.current = old
+
+    def current_site(self):
+        """
+        Return the AllocSite for the location currently being lowered,
+        or None if there is no such location.
+        """
+        current = getattr(self._tls, 'current', None)
+        if current is None:
+            return None
+        fndesc, loc, used = current
+        site = self.get_site(fndesc.qualname, loc.filename, loc.line)
+        used.append(site)
+        return site
+
+    def sites(self):
+        with self._lock:
+            return list(self._sites.values())
+
+
+registry = _SiteRegistry()
+
+
+def get_site_stats(filename=None):
+    """
+    Return a list of per-site statistics, sorted by decreasing number of
+    bytes allocated.  If *filename* is given, only the sites in that
+    file are returned.
+    """
+    stats = [site.get_stats() for site in registry.sites()
+             if filename is None or site.filename == filename]
+    stats.sort(key=lambda st: (-st.bytes, st.filename, st.lineno))
+    return stats
+
+
+def reset_site_stats():
+    """
+    Reset the cumulative counters of all sites.  The peak is reset to
+    the number of bytes currently alive.
+    """
+    for site in registry.sites():
+        site.reset()
+
+
+def print_report(stats, file=None):
+    """
+    Print the given per-site statistics (as returned by get_site_stats())
+    annotated with the corresponding source lines.
+    """
+    if file is None:
+        file = sys.stdout
+    header = "%-8s %-12s %-12s %-12s  %s" % ("count", "bytes", "live",
+                                             "peak", "source")
+    print(header, file=file)
+    print('-' * 80, file=file)
+    for st in stats:
+        source = linecache.getline(st.filename, st.lineno).strip()
+        print("%-8d %-12d %-12d %-12d  %s:%d (%s)"
+              % (st.count, st.bytes, st.live_bytes, st.peak_bytes,
+                 st.filename, st.lineno, st.funcname), file=file)
+        if source:
+            print("%-50s  # %s" % ('', source), file=file)
+    print('=' * 80, file=file)
@@ -1,11 +1,8 @@
 from __future__ import print_function, absolute_import, division
 
-import re
-from collections import defaultdict, deque
-
 from numba.config import MACHINE_BITS
 from numba import cgutils
-from llvmlite import ir, binding as llvm
+from llvmlite import ir
 
 
 _word_type = ir.IntType(MACHINE_BITS)
@@ -38,12 +35,12 @@ def _define_nrt_meminfo_data(module):
     builder.ret(data_ptr)
 
 
-def _define_nrt_incref(module, atomic_incr):
+def _define_nrt_incref(module, atomic_incr, name="NRT_incref"):
     """
-    Implement NRT_incref in the module
+    Implement NRT_incref (or the function *name*) in the module
     """
     fn_incref = module.get_or_insert_function(incref_decref_ty,
-                                              name="NRT_incref")
+                                              name=name)
     builder = ir.IRBuilder(fn_incref.append_basic_block())
     [ptr] = fn_incref.args
     is_null = builder.icmp_unsigned("==", ptr, cgutils.get_null_value(ptr.type))
@@ -53,14 +50,15 @@ def _define_nrt_incref(module, atomic_incr):
     builder.ret_void()
 
 
-def _define_nrt_decref(module, atomic_decr):
+def _define_nrt_decref(module, atomic_decr, name="NRT_decref"):
     """
-    Implement NRT_decref in the module
+    Implement NRT_decref (or the function *name*) in the module
     """
     fn_decref = module.get_or_insert_function(incref_decref_ty,
-                                              name="NRT_decref")
-    calldtor = module.add_function(ir.FunctionType(ir.VoidType(), [_pointer_type]),
-                                   name="NRT_MemInfo_call_dtor")
+                                              name=name)
+    calldtor = module.get_or_insert_function(
+        ir.FunctionType(ir.VoidType(), [_pointer_type]),
+        name="NRT_MemInfo_call_dtor")
 
     builder = ir.IRBuilder(fn_decref.append_basic_block())
     [ptr] = fn_decref.args
@@ -109,6 +107,29 @@ def _define_atomic_inc_dec(module, op, ordering):
     return fn_atomic
 
 
+def _define_nonatomic_inc_dec(module, op):
+    """Define a llvm function for non-atomic increment/decrement to the given
+    module.  Argument ``op`` is the operation "add"/"sub".  The generated
+    function returns the new value.
+
+    This is only valid for refcounts which are never touched concurrently
+    by several threads.
+    """
+    ftype = ir.FunctionType(_word_type, [_word_type.as_pointer()])
+    fn = ir.Function(module, ftype, name="nrt_nonatomic_{0}".format(op))
+
+    [ptr] = fn.args
+    bb = fn.append_basic_block()
+    builder = ir.IRBuilder(bb)
+    ONE = ir.Constant(_word_type, 1)
+    oldval = builder.load(ptr)
+    newval = getattr(builder, op)(oldval, ONE)
+    builder.store(newval, ptr)
+    builder.ret(newval)
+
+    return fn
+
+
 def _define_atomic_cmpxchg(module, ordering):
     """Define a llvm function for atomic compare-and-swap.
     The generated function is a direct wrapper of the LLVM cmpxchg with the
@@ -155,85 +176,13 @@ def compile_nrt_functions(ctx):
     _define_nrt_incref(ir_mod, atomic_inc)
     _define_nrt_decref(ir_mod, atomic_dec)
 
+    # Variants for refcounts which are known not to be shared between threads
+    nonatomic_inc = _define_nonatomic_inc_dec(ir_mod, "add")
+    nonatomic_dec = _define_nonatomic_inc_dec(ir_mod, "sub")
+    _define_nrt_incref(ir_mod, nonatomic_inc, name="NRT_incref_nonatomic")
+    _define_nrt_decref(ir_mod, nonatomic_dec, name="NRT_decref_nonatomic")
+
     library.add_ir_module(ir_mod)
     library.finalize()
 
     return library
-
-
-_regex_incref = re.compile(r'call void @NRT_incref\((.*)\)')
-_regex_decref = re.compile(r'call void @NRT_decref\((.*)\)')
-_regex_bb = re.compile(r'[-a-zA-Z$._][-a-zA-Z$._0-9]*:')
-
-
-def remove_redundant_nrt_refct(ll_module):
-    """
-    Remove redundant reference count operations from the
-    `llvmlite.binding.ModuleRef`. This parses the ll_module as a string and
-    line by line to remove the unnecessary nrt refct pairs within each block.
-
-    Note
-    -----
-    Should replace this.  Not efficient.
-    """
-    # Early escape if NRT_incref is not used
-    try:
-        ll_module.get_function('NRT_incref')
-    except NameError:
-        return ll_module
-
-
-    incref_map = defaultdict(deque)
-    decref_map = defaultdict(deque)
-    scopes = []
-
-    # Parse IR module as text
-    llasm = str(ll_module)
-    lines = llasm.splitlines()
-
-    # Phase 1:
-    # Find all refct ops and what they are operating on
-    for lineno, line in enumerate(lines):
-        # Match NRT_incref calls
-        m = _regex_incref.match(line.strip())
-        if m is not None:
-            incref_map[m.group(1)].append(lineno)
-            continue
-
-        # Match NRT_decref calls
-        m = _regex_decref.match(line.strip())
-        if m is not None:
-            decref_map[m.group(1)].append(lineno)
-            continue
-
-        # Split at BB boundaries
-        m = _regex_bb.match(line)
-        if m is not None:
-            # Push
-            scopes.append((incref_map, decref_map))
-            # Reset
-            incref_map = defaultdict(deque)
-            decref_map = defaultdict(deque)
-
-
-    # Phase 2:
-    # Determine which refct ops are unnecessary
-    to_remove = set()
-    for incref_map, decref_map in scopes:
-        # For each value being refct-ed
-        for val in incref_map.keys():
-            increfs = incref_map[val]
-            decrefs = decref_map[val]
-            # Mark the incref/decref pairs from the tail for removal
-            ref_pair_ct = min(len(increfs), len(decrefs))
-            for _ in range(ref_pair_ct):
-                to_remove.add(increfs.pop())
-                to_remove.add(decrefs.popleft())
-
-    # Phase 3
-    # Remove all marked instructions
-    newll = '\n'.join(ln for lno, ln in enumerate(lines) if lno not in
-                      to_remove)
-
-    # Regenerate the LLVM module
-    return llvm.parse_assembly(newll)
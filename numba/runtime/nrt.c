@@ -234,11 +234,9 @@ MemInfo* NRT_MemInfo_alloc_safe(size_t size) {
 }
 
 static
-void* nrt_allocate_meminfo_and_data_align(size_t size, unsigned align,
-                                         MemInfo **mi)
+char *nrt_align_pointer(char *base, unsigned align)
 {
     size_t offset, intptr, remainder;
-    char *base = nrt_allocate_meminfo_and_data(size + 2 * align, mi);
     intptr = (size_t) base;
     /* See if we are aligned */
     remainder = intptr % align;
@@ -250,6 +248,14 @@ void* nrt_allocate_meminfo_and_data_align(size_t size, unsigned align,
     return base + offset;
 }
 
+static
+void* nrt_allocate_meminfo_and_data_align(size_t size, unsigned align,
+                                         MemInfo **mi)
+{
+    char *base = nrt_allocate_meminfo_and_data(size + 2 * align, mi);
+    return nrt_align_pointer(base, align);
+}
+
 MemInfo* NRT_MemInfo_alloc_aligned(size_t size, unsigned align) {
     MemInfo *mi;
     void *data = nrt_allocate_meminfo_and_data_align(size, align, &mi);
@@ -270,6 +276,72 @@ MemInfo* NRT_MemInfo_alloc_safe_aligned(size_t size, unsigned align) {
     return mi;
 }
 
+/*
+ * Allocation profiling.
+ */
+
+/* Atomically add `val` to `*ptr` and return the new value */
+static
+size_t nrt_atomic_add_size(size_t *ptr, size_t val) {
+    void *old = (void *) *ptr;
+    void *repl;
+    do {
+        repl = (void *) ((size_t) old + val);
+    } while (!TheMSys.atomic_cas((void **) ptr, old, repl, &old));
+    return (size_t) repl;
+}
+
+/* Atomically set `*ptr` to `val` if `val` is larger */
+static
+void nrt_atomic_max_size(size_t *ptr, size_t val) {
+    void *old = (void *) *ptr;
+    while ((size_t) old < val) {
+        if (TheMSys.atomic_cas((void **) ptr, old, (void *) val, &old))
+            break;
+    }
+}
+
+/* Stored in front of the data area of tracked allocations */
+typedef struct {
+    NRT_AllocSite *site;
+    size_t         size;
+} nrt_tracked_info;
+
+static
+void nrt_internal_dtor_tracked(void *ptr, void *info) {
+    nrt_tracked_info *tinfo = info;
+    NRT_Debug(nrt_debug_print("nrt_internal_dtor_tracked %p, %p\n",
+                              ptr, info));
+    nrt_atomic_add_size(&tinfo->site->live_bytes, (size_t) 0 - tinfo->size);
+    /* See NRT_MemInfo_alloc_safe() */
+    memset(ptr, 0xDE, MIN(tinfo->size, 256));
+}
+
+MemInfo* NRT_MemInfo_alloc_tracked(size_t size, unsigned align,
+                                   NRT_AllocSite *site)
+{
+    MemInfo *mi;
+    nrt_tracked_info *tinfo;
+    void *data;
+    size_t live;
+    char *base = nrt_allocate_meminfo_and_data(
+        sizeof(nrt_tracked_info) + size + 2 * align, &mi);
+    tinfo = (nrt_tracked_info *) base;
+    tinfo->site = site;
+    tinfo->size = size;
+    data = nrt_align_pointer(base + sizeof(nrt_tracked_info), align);
+    memset(data, 0xCB, MIN(size, 256));
+    NRT_Debug(nrt_debug_print("NRT_MemInfo_alloc_tracked %p %zu site=%p\n",
+                              data, size, site));
+    NRT_MemInfo_init(mi, data, size, nrt_internal_dtor_tracked, tinfo);
+    /* Update the site counters */
+    TheMSys.atomic_inc(&site->count);
+    nrt_atomic_add_size(&site->bytes, size);
+    live = nrt_atomic_add_size(&site->live_bytes, size);
+    nrt_atomic_max_size(&site->peak_bytes, live);
+    return mi;
+}
+
 void NRT_MemInfo_destroy(MemInfo *mi) {
     NRT_Free(mi);
     TheMSys.atomic_inc(&TheMSys.stats_mi_free);
@@ -36,6 +36,14 @@ typedef int (*atomic_cas_func)(void * volatile *ptr, void *cmp, void *repl,
 typedef struct MemInfo MemInfo;
 typedef struct MemSys MemSys;
 
+/* Per-callsite allocation counters, see NRT_MemInfo_alloc_tracked() */
+typedef struct {
+    size_t count;       /* number of allocations */
+    size_t bytes;       /* total number of bytes allocated */
+    size_t live_bytes;  /* number of bytes currently alive */
+    size_t peak_bytes;  /* maximum of live_bytes */
+} NRT_AllocSite;
+
 typedef void *(*NRT_malloc_func)(size_t size);
 typedef void *(*NRT_realloc_func)(void *ptr, size_t new_size);
 typedef void (*NRT_free_func)(void *ptr);
@@ -125,6 +133,14 @@ MemInfo* NRT_MemInfo_alloc_safe(size_t size);
 MemInfo* NRT_MemInfo_alloc_aligned(size_t size, unsigned align);
 MemInfo* NRT_MemInfo_alloc_safe_aligned(size_t size, unsigned align);
 
+/*
+ * Like NRT_MemInfo_alloc_safe_aligned(), but also account the allocation
+ * and its eventual release in the given `site` counters.
+ * This is used by the allocation profiler.
+ */
+MemInfo* NRT_MemInfo_alloc_tracked(size_t size, unsigned align,
+                                   NRT_AllocSite *site);
+
 /*
  * Internal API.
  * Release a MemInfo. Calls NRT_MemSys_insert_meminfo.
@@ -2,7 +2,7 @@ from __future__ import print_function, absolute_import, division
 
 from collections import namedtuple
 
-from . import atomicops
+from . import allocprof, atomicops
 from llvmlite import binding as ll
 
 from numba.utils import finalize as _finalize
@@ -94,6 +94,22 @@ class _Runtime(object):
                            mi_alloc=_nrt.memsys_get_stats_mi_alloc(),
                            mi_free=_nrt.memsys_get_stats_mi_free())
 
+    def get_allocation_site_stats(self, filename=None):
+        """
+        Returns a list of namedtuples of (funcname, filename, lineno, count,
+        bytes, live_bytes, peak_bytes), one for each allocation site
+        instrumented by the allocation profiler (see NUMBA_NRT_ALLOC_PROFILE).
+        If *filename* is given, only the sites in that file are returned.
+        """
+        return allocprof.get_site_stats(filename)
+
+    def reset_allocation_site_stats(self):
+        """
+        Reset the counters of all sites instrumented by the allocation
+        profiler.
+        """
+        allocprof.reset_site_stats()
+
 
 # Alias to _nrt_python._MemInfo
 MemInfo = _nrt._MemInfo
@@ -0,0 +1,516 @@
+"""
+Reference count pruning on llvmlite IR, before it is handed to LLVM.
+
+The lowering emits NRT_incref / NRT_decref calls naively: every load of
+a variable is incref'ed when bound to a new variable, and decref'ed when
+the variable dies.  Many of those operations cancel out.
+"""
+
+from __future__ import print_function, absolute_import, division
+
+from collections import defaultdict
+
+from llvmlite import ir
+from llvmlite.ir.instructions import (AllocaInstr, CallInstr, CastInstr,
+                                      ExtractValue, LoadInstr, StoreInstr)
+
+
+_incref_names = frozenset(['NRT_incref', 'NRT_incref_nonatomic'])
+_decref_names = frozenset(['NRT_decref', 'NRT_decref_nonatomic'])
+
+# Functions which can neither observe nor change a refcount
+_harmless_names = frozenset(['NRT_MemInfo_data'])
+
+
+def _called_name(instr):
+    """
+    Return the name of the function called by *instr*, or None if *instr*
+    isn't a call instruction.
+    """
+    if isinstance(instr, CallInstr):
+        return getattr(instr.callee, 'name', '')
+    return None
+
+
+def _is_harmless_call(name):
+    return (name in _incref_names or name in _harmless_names
+            or name.startswith('llvm.'))
+
+
+def _find_escaped_allocas(func):
+    """
+    Return the ids of the allocas in *func* whose address is used otherwise
+    than as the pointer operand of a load or store.  Those can be written
+    to behind our back.
+    """
+    escaped = set()
+    for block in func.blocks:
+        for instr in block.instructions:
+            for i, op in enumerate(instr.operands):
+                if not isinstance(op, AllocaInstr):
+                    continue
+                if isinstance(instr, LoadInstr):
+                    continue
+                if isinstance(instr, StoreInstr) and i == 1:
+                    continue
+                escaped.add(id(op))
+    return escaped
+
+
+def _successors(block):
+    """
+    Return the list of successor blocks of *block*.
+    """
+    if not block.instructions:
+        return []
+    term = block.instructions[-1]
+    succs = [op for op in term.operands if isinstance(op, ir.Block)]
+    default = getattr(term, 'default', None)
+    if isinstance(default, ir.Block):
+        succs.append(default)
+    for _, target in getattr(term, 'cases', ()):
+        succs.append(target)
+    # Remove duplicates, keep order
+    unique = []
+    for b in succs:
+        if not any(b is u for u in unique):
+            unique.append(b)
+    return unique
+
+
+class _CFG(object):
+    """
+    Control flow graph of a llvmlite function, with dominator and
+    post-dominator trees.  Blocks are identified by their index in
+    the function.
+    """
+
+    def __init__(self, func):
+        self.blocks = list(func.blocks)
+        index = dict((id(b), i) for i, b in enumerate(self.blocks))
+        self.succs = [[index[id(s)] for s in _successors(b)]
+                      for b in self.blocks]
+        self.preds = [[] for _ in self.blocks]
+        for i, succs in enumerate(self.succs):
+            for j in succs:
+                self.preds[j].append(i)
+        n = len(self.blocks)
+        # The post-dominator tree is rooted at a virtual exit node *n*
+        exits = [i for i, succs in enumerate(self.succs) if not succs]
+        rsuccs = self.preds + [exits]
+        rpreds = [list(s) for s in self.succs] + [[]]
+        for i in exits:
+            rpreds[i].append(n)
+        self.idom = self._immediate_dominators(0, self.succs, self.preds)
+        self.ipdom = self._immediate_dominators(n, rsuccs, rpreds)
+
+    @staticmethod
+    def _immediate_dominators(entry, succs, preds):
+        """
+        Compute immediate dominators using the algorithm by Cooper,
+        Harvey and Kennedy.  Unreachable nodes get None.
+        """
+        # Reverse postorder, iteratively
+        order = []
+        seen = set([entry])
+        stack = [(entry, iter(succs[entry]))]
+        while stack:
+            node, it = stack[-1]
+            for succ in it:
+                if succ not in seen:
+                    seen.add(succ)
+                    stack.append((succ, iter(succs[succ])))
+                    break
+            else:
+                stack.pop()
+                order.append(node)
+        order.reverse()
+        rpo = dict((node, i) for i, node in enumerate(order))
+
+        idom = [None] * len(succs)
+        idom[entry] = entry
+
+        def intersect(a, b):
+            while a != b:
+                while rpo[a] > rpo[b]:
+                    a = idom[a]
+                while rpo[b] > rpo[a]:
+                    b = idom[b]
+            return a
+
+        changed = True
+        while changed:
+            changed = False
+            for node in order[1:]:
+                new = None
+                for pred in preds[node]:
+                    if pred not in rpo or idom[pred] is None:
+                        continue
+                    new = pred if new is None else intersect(pred, new)
+                if idom[node] != new:
+                    idom[node] = new
+                    changed = True
+        return idom
+
+    @staticmethod
+    def _tree_dominates(idom, a, b):
+        if idom[b] is None:
+            return False
+        while True:
+            if a == b:
+                return True
+            parent = idom[b]
+            if parent == b:
+                return False
+            b = parent
+
+    def dominates(self, a, b):
+        return self._tree_dominates(self.idom, a, b)
+
+    def post_dominates(self, a, b):
+        return self._tree_dominates(self.ipdom, a, b)
+
+    def cyclic_blocks(self):
+        """
+        Return the set of blocks which are part of a cycle, i.e. which
+        belong to a non-trivial strongly connected component (computed
+        with Kosaraju's algorithm).
+        """
+        n = len(self.blocks)
+        order = []
+        seen = set()
+        for root in range(n):
+            if root in seen:
+                continue
+            seen.add(root)
+            stack = [(root, iter(self.succs[root]))]
+            while stack:
+                node, it = stack[-1]
+                for succ in it:
+                    if succ not in seen:
+                        seen.add(succ)
+                        stack.append((succ, iter(self.succs[succ])))
+                        break
+                else:
+                    stack.pop()
+                    order.append(node)
+        component = [None] * n
+        for root in reversed(order):
+            if component[root] is not None:
+                continue
+            component[root] = root
+            todo = [root]
+            while todo:
+                node = todo.pop()
+                for pred in self.preds[node]:
+                    if component[pred] is None:
+                        component[pred] = root
+                        todo.append(pred)
+        sizes = defaultdict(int)
+        for c in component:
+            sizes[c] += 1
+        return set(i for i in range(n)
+                   if sizes[component[i]] > 1 or i in self.succs[i])
+
+    def reachable_avoiding(self, start, avoid):
+        """
+        Return the set of blocks reachable from the successors of *start*
+        without going through *avoid*.
+        """
+        seen = set()
+        todo = [s for s in self.succs[start] if s != avoid]
+        while todo:
+            node = todo.pop()
+            if node in seen:
+                continue
+            seen.add(node)
+            todo.extend(s for s in self.succs[node] if s != avoid)
+        return seen
+
+
+class _ValueKeys(object):
+    """
+    Assign canonical keys to the operands of refcount operations, so that
+    several loads of the same variable compare equal when they are
+    reached by the same single store.  This is computed using a classic
+    reaching definitions analysis over the non-escaping allocas.
+    """
+
+    def __init__(self, func, cfg):
+        self._escaped = _find_escaped_allocas(func)
+        self._stores = {}
+        self._load_stores = {}
+        self._keys = {}
+        self._compute_reaching_stores(cfg)
+
+    def _tracked(self, ptr):
+        return isinstance(ptr, AllocaInstr) and id(ptr) not in self._escaped
+
+    def _transfer(self, block, state, record):
+        state = dict(state)
+        for instr in block.instructions:
+            if isinstance(instr, StoreInstr):
+                ptr = instr.operands[1]
+                if self._tracked(ptr):
+                    self._stores[id(instr)] = instr
+                    state[id(ptr)] = frozenset([id(instr)])
+            elif record and isinstance(instr, LoadInstr):
+                ptr = instr.operands[0]
+                if self._tracked(ptr):
+                    self._load_stores[id(instr)] = state.get(id(ptr),
+                                                             frozenset())
+        return state
+
+    def _compute_reaching_stores(self, cfg):
+        n = len(cfg.blocks)
+        outs = [None] * n
+        changed = True
+        while changed:
+            changed = False
+            for i, block in enumerate(cfg.blocks):
+                state = self._merge([outs[p] for p in cfg.preds[i]])
+                out = self._transfer(block, state, record=False)
+                if out != outs[i]:
+                    outs[i] = out
+                    changed = True
+        for i, block in enumerate(cfg.blocks):
+            state = self._merge([outs[p] for p in cfg.preds[i]])
+            self._transfer(block, state, record=True)
+
+    @staticmethod
+    def _merge(states):
+        merged = defaultdict(frozenset)
+        for state in states:
+            if state is None:
+                continue
+            for ptr, stores in state.items():
+                merged[ptr] = merged[ptr] | stores
+        return dict(merged)
+
+    def key(self, value):
+        try:
+            return self._keys[id(value)]
+        except KeyError:
+            pass
+        key = self._compute_key(value)
+        self._keys[id(value)] = key
+        return key
+
+    def _compute_key(self, value):
+        if isinstance(value, LoadInstr):
+            stores = self._load_stores.get(id(value), ())
+            if len(stores) == 1:
+                [store] = stores
+                return self.key(self._stores[store].operands[0])
+        elif isinstance(value, ExtractValue):
+            return ('extract', self.key(value.aggregate),
+                    tuple(value.indices))
+        elif isinstance(value, CastInstr) and value.opname == 'bitcast':
+            return self.key(value.operands[0])
+        return ('value', id(value))
+
+
+class _RefctOp(object):
+    __slots__ = ('instr', 'block', 'pos', 'key', 'is_incref')
+
+    def __init__(self, instr, block, pos, key, is_incref):
+        self.instr = instr
+        self.block = block
+        self.pos = pos
+        self.key = key
+        self.is_incref = is_incref
+
+
+class _FunctionPruner(object):
+
+    def __init__(self, func):
+        self.func = func
+        self.cfg = _CFG(func)
+        self.keys = _ValueKeys(func, self.cfg)
+        self.removed = set()
+        # Per block: positions of the opaque calls, and the refct ops
+        self.barriers = []
+        self.ops = []
+        for i, block in enumerate(self.cfg.blocks):
+            barriers = []
+            ops = []
+            for pos, instr in enumerate(block.instructions):
+                name = _called_name(instr)
+                if name is None:
+                    continue
+                if name in _incref_names or name in _decref_names:
+                    [arg] = instr.args
+                    ops.append(_RefctOp(instr, i, pos, self.keys.key(arg),
+                                        name in _incref_names))
+                elif not _is_harmless_call(name):
+                    barriers.append(pos)
+            self.barriers.append(barriers)
+            self.ops.append(ops)
+
+    def _remove_pair(self, incref, decref):
+        self.removed.add(id(incref.instr))
+        self.removed.add(id(decref.instr))
+
+    def prune_blocks(self):
+        """
+        Remove incref / decref pairs on the same value inside each block,
+        provided no opaque call or other decref lies in-between.
+        """
+        for ops, barriers in zip(self.ops, self.barriers):
+            pending = defaultdict(list)
+            barriers = iter(barriers + [None])
+            next_barrier = next(barriers)
+            for op in ops:
+                while next_barrier is not None and next_barrier < op.pos:
+                    # An opaque call may observe or change refcounts
+                    pending.clear()
+                    next_barrier = next(barriers)
+                if op.is_incref:
+                    pending[op.key].append(op)
+                else:
+                    increfs = pending.get(op.key)
+                    if increfs:
+                        self._remove_pair(increfs.pop(), op)
+                    else:
+                        # The value may alias (under another key) the one
+                        # of a pending incref, and be freed here
+                        pending.clear()
+
+    def _block_events(self, block):
+        """
+        Return the alive refct ops and the opaque calls of *block*,
+        as (op or None) in instruction order.
+        """
+        events = [(pos, None) for pos in self.barriers[block]]
+        events += [(op.pos, op) for op in self.ops[block]
+                   if id(op.instr) not in self.removed]
+        events.sort(key=lambda e: e[0])
+        return [op for _, op in events]
+
+    @staticmethod
+    def _transfer(events, state):
+        """
+        The availability of increfs after the given block *events*,
+        starting from *state*.
+        """
+        state = set(state)
+        for op in events:
+            if op is not None and op.is_incref:
+                state.add(op)
+            else:
+                # Any opaque call or decref is a barrier
+                state.clear()
+        return frozenset(state)
+
+    def _available_increfs(self):
+        """
+        Compute, for each block, the increfs executed on all paths from
+        the function entry to the block's entry, with no opaque call nor
+        decref since.  This is a single forward "must" dataflow pass.
+        """
+        cfg = self.cfg
+        n = len(cfg.blocks)
+        events = [self._block_events(i) for i in range(n)]
+        # None stands for "all increfs" (not computed yet)
+        outs = [None] * n
+        ins = [frozenset()] * n
+
+        changed = True
+        while changed:
+            changed = False
+            for i in range(n):
+                if i == 0 or not cfg.preds[i]:
+                    state = frozenset()
+                else:
+                    state = None
+                    for p in cfg.preds[i]:
+                        if outs[p] is None:
+                            continue
+                        state = outs[p] if state is None else state & outs[p]
+                    if state is None:
+                        continue
+                ins[i] = state
+                out = self._transfer(events[i], state)
+                if out != outs[i]:
+                    outs[i] = out
+                    changed = True
+        return ins, events
+
+    def prune_across_blocks(self):
+        """
+        Remove incref / decref pairs on the same value in different blocks,
+        when the decref's block is always executed after the incref's
+        block, the same number of times, and no opaque call nor other
+        decref may intervene.
+        """
+        cfg = self.cfg
+        cyclic = cfg.cyclic_blocks()
+        same_frequency = {}
+
+        def executed_alike(a, b):
+            # Both blocks must execute the same number of times: no cycle
+            # may go through one of them while avoiding the other.
+            if a not in cyclic and b not in cyclic:
+                return True
+            try:
+                return same_frequency[a, b]
+            except KeyError:
+                res = (a not in cfg.reachable_avoiding(a, b) and
+                       b not in cfg.reachable_avoiding(b, a))
+                same_frequency[a, b] = res
+                return res
+
+        ins, events = self._available_increfs()
+        for b in range(len(cfg.blocks)):
+            available = set(ins[b])
+            for op in events[b]:
+                if op is not None and op.is_incref:
+                    available.add(op)
+                    continue
+                if op is not None:
+                    for incref in available:
+                        if (incref.key == op.key and incref.block != b
+                            and cfg.post_dominates(b, incref.block)
+                            and executed_alike(incref.block, b)):
+                            self._remove_pair(incref, op)
+                            available.discard(incref)
+                            break
+                    else:
+                        available.clear()
+                else:
+                    available.clear()
+
+    def apply(self):
+        if not self.removed:
+            return 0
+        for block in self.cfg.blocks:
+            block.instructions[:] = [instr for instr in block.instructions
+                                     if id(instr) not in self.removed]
+        return len(self.removed) // 2
+
+
+def _uses_refct(module):
+    for name in _incref_names:
+        if name in module.globals:
+            return True
+    return False
+
+
+def prune_refct_ops(module):
+    """
+    Remove redundant incref / decref pairs in the functions defined in the
+    llvmlite *module*, both inside basic blocks and across the control
+    flow graph.  The module is modified in-place.  Return the number of
+    removed pairs.
+    """
+    if not _uses_refct(module):
+        return 0
+    count = 0
+    for func in module.functions:
+        if func.is_declaration:
+            continue
+        pruner = _FunctionPruner(func)
+        pruner.prune_blocks()
+        pruner.prune_across_blocks()
+        count += pruner.apply()
+    return count
@@ -3,4 +3,13 @@ from __future__ import print_function, division, absolute_import
 from .typing.typeof import typeof
 
 
-__all__ = ['typeof']
+def prange(*args):
+    """
+    Equivalent to range(), but marks a loop whose iterations are
+    independent of each other, so that compiled code can run them in
+    parallel.
+    """
+    return range(*args)
+
+
+__all__ = ['typeof', 'prange']
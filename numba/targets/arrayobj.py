@@ -547,7 +547,7 @@ builtin_attr(impl_attribute(types.Kind(types.Array), 'T')(array_T))
 def _attempt_nocopy_reshape(context, builder, aryty, ary, newnd, newshape,
                             newstrides):
     """
-    Call into Numba_attempt_nocopy_reshape() for the given array type
+    Call into numba_attempt_nocopy_reshape() for the given array type
     and instance, and the specified new shape.  The array pointed to
     by *newstrides* will be filled up if successful.
     """
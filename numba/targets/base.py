@@ -10,7 +10,7 @@ import llvmlite.llvmpy.core as lc
 from llvmlite.llvmpy.core import Type, Constant, LLVMException
 import llvmlite.binding as ll
 
-from numba import types, utils, cgutils, typing
+from numba import config, types, utils, cgutils, typing
 from numba import _dynfunc, _helperlib
 from numba.pythonapi import PythonAPI
 from numba.targets.imputils import (user_function, user_generator,
@@ -153,9 +153,19 @@ class BaseContext(object):
     # NRT
     enable_nrt = False
 
+    # Use non-atomic refcount operations (values are confined to a thread)
+    enable_nrt_nonatomic = False
+
+    # Let LLVM reorder floating-point operations (e.g. to vectorize
+    # reductions) and assume there are no NaNs or infinities
+    enable_fastmath = False
+
     # PYCC
     aot_mode = False
 
+    # Run prange() loops on the thread pool
+    enable_parallel_loops = False
+
     def __init__(self, typing_context):
         _load_global_helpers()
         self.address_size = utils.MACHINE_BITS
@@ -163,6 +173,11 @@ class BaseContext(object):
 
         self.defns = defaultdict(Overloads)
         self.attrs = defaultdict(Overloads)
+        # Installed registries, and the function keys and attribute
+        # names whose implementations were already taken from them
+        self._registries = []
+        self._resolved_funcs = set()
+        self._resolved_attrs = set()
         self.generators = {}
         self.special_ops = {}
 
@@ -199,10 +214,45 @@ class BaseContext(object):
     def install_registry(self, registry):
         """
         Install a *registry* (a imputils.Registry instance) of function
-        and attribute implementations.
-        """
-        self.insert_func_defn(registry.functions)
-        self.insert_attr_defn(registry.attributes)
+        and attribute implementations.  Implementations are only looked
+        up in the registry when their function or attribute is first
+        needed (see get_overloads() and get_attr_overloads()).
+        """
+        self._registries.append(registry)
+        # Keys already looked up won't be looked up again
+        for key in self._resolved_funcs:
+            for impl, sig in registry.get_functions(key):
+                self.defns[key].append(impl, sig)
+        for attr in self._resolved_attrs:
+            for impl in registry.get_attributes(attr):
+                self.attrs[attr].append(impl, impl.signature)
+
+    def get_overloads(self, key):
+        """
+        Return the Overloads instance for function *key*, after
+        populating it from the installed registries on first use.
+        """
+        if key not in self._resolved_funcs:
+            self._resolved_funcs.add(key)
+            versions = [(sig, impl)
+                        for registry in self._registries
+                        for impl, sig in registry.get_functions(key)]
+            # Registry implementations come before any inserted directly
+            self.defns[key].versions[:0] = versions
+        return self.defns[key]
+
+    def get_attr_overloads(self, attr):
+        """
+        Return the Overloads instance for attribute *attr*, after
+        populating it from the installed registries on first use.
+        """
+        if attr not in self._resolved_attrs:
+            self._resolved_attrs.add(attr)
+            versions = [(impl.signature, impl)
+                        for registry in self._registries
+                        for impl in registry.get_attributes(attr)]
+            self.attrs[attr].versions[:0] = versions
+        return self.attrs[attr]
 
     def insert_func_defn(self, defns):
         for impl, func_sigs in defns:
@@ -235,6 +285,8 @@ class BaseContext(object):
         KeyError is raised if the function isn't known to us.
         """
         del self.defns[func]
+        # Don't keep the function alive through the resolution cache
+        self._resolved_funcs.discard(func)
 
     def get_external_function_type(self, fndesc):
         argtypes = [self.get_argument_type(aty)
@@ -408,6 +460,16 @@ class BaseContext(object):
             consts = [self.get_constant(ty.dtype, v) for v in val]
             return Constant.array(consts[0].type, consts)
 
+        elif isinstance(ty, (types.CharSeq, types.UnicodeCharSeq)):
+            if isinstance(ty, types.CharSeq):
+                codes = list(bytearray(val))
+            else:
+                codes = [ord(c) for c in val]
+            # Pad with NULs up to the sequence width
+            codes += [0] * (ty.count - len(codes))
+            consts = [Constant.int(lty.element, c) for c in codes]
+            return Constant.array(lty.element, consts)
+
         raise NotImplementedError("cannot lower constant of type '%s'" % (ty,))
 
     def get_constant_undef(self, ty):
@@ -446,21 +508,21 @@ class BaseContext(object):
             key = fn.template.key
 
             if isinstance(key, MethodType):
-                overloads = self.defns[key.im_func]
+                overloads = self.get_overloads(key.im_func)
 
             elif sig.recvr:
                 sig = typing.signature(sig.return_type,
                                        *((sig.recvr,) + sig.args))
-                overloads = self.defns[key]
+                overloads = self.get_overloads(key)
             else:
-                overloads = self.defns[key]
+                overloads = self.get_overloads(key)
 
         elif isinstance(fn, types.Dispatcher):
             key = fn.overloaded.get_overload(sig.args)
-            overloads = self.defns[key]
+            overloads = self.get_overloads(key)
         else:
             key = fn
-            overloads = self.defns[key]
+            overloads = self.get_overloads(key)
         try:
             return _wrap_impl(overloads.find(sig), self, sig)
         except NotImplementedError:
@@ -543,13 +605,13 @@ class BaseContext(object):
             return None
 
         # Lookup specific attribute implementation for this type
-        overloads = self.attrs[attr]
+        overloads = self.get_attr_overloads(attr)
         try:
             return overloads.find(typing.signature(types.Any, typ))
         except NotImplementedError:
             pass
         # Lookup generic getattr implementation for this type
-        overloads = self.attrs[None]
+        overloads = self.get_attr_overloads(None)
         try:
             return overloads.find(typing.signature(types.Any, typ))
         except NotImplementedError:
@@ -889,6 +951,26 @@ class BaseContext(object):
             self.call_conv.return_status_propagate(builder, status)
         return res
 
+    def call_first_class_function(self, builder, fnty, sig, func, args):
+        """Emit an indirect call to the specialization of the first-class
+        function *func* of type *fnty* resolved for signature *sig*, with
+        the given arguments.
+        """
+        index = fnty.get_signature_index(sig)
+        sig = fnty.sigs[index]
+        funcval = cgutils.create_struct_proxy(fnty)(self, builder, value=func)
+        addr = builder.extract_value(funcval.addrs, index)
+        env = builder.extract_value(funcval.envs, index)
+        llfnty = self.call_conv.get_function_type(sig.return_type, sig.args)
+        fnptr = builder.bitcast(addr, llfnty.as_pointer())
+        status, res = self.call_conv.call_function(builder, fnptr,
+                                                   sig.return_type, sig.args,
+                                                   args, env=env)
+
+        with cgutils.if_unlikely(builder, status.is_error):
+            self.call_conv.return_status_propagate(builder, status)
+        return res
+
     def get_executable(self, func, fndesc):
         raise NotImplementedError
 
@@ -1013,6 +1095,10 @@ class BaseContext(object):
         """
         if not self.enable_nrt:
             raise Exception("Require NRT")
+        if config.NRT_ALLOC_PROFILE:
+            tracked = self._nrt_meminfo_alloc_tracked(builder, size, 1)
+            if tracked is not None:
+                return tracked
         mod = builder.module
         fnty = llvmir.FunctionType(void_ptr,
                                    [self.get_value_type(types.intp)])
@@ -1041,8 +1127,37 @@ class BaseContext(object):
             align = self.get_constant(types.uint32, align)
         else:
             assert align.type == u32, "align must be a uint32"
+        if config.NRT_ALLOC_PROFILE:
+            tracked = self._nrt_meminfo_alloc_tracked(builder, size, align)
+            if tracked is not None:
+                return tracked
         return builder.call(fn, [size, align])
 
+    def _nrt_meminfo_alloc_tracked(self, builder, size, align):
+        """
+        Allocate a new MemInfo accounted in the allocation site currently
+        being lowered (see numba.runtime.allocprof).  None is returned if
+        there is no current allocation site.
+        """
+        from numba.runtime import allocprof
+
+        site = allocprof.registry.current_site()
+        if site is None:
+            return None
+        mod = builder.module
+        intp = self.get_value_type(types.intp)
+        u32 = self.get_value_type(types.uint32)
+        fnty = llvmir.FunctionType(void_ptr, [intp, u32, void_ptr])
+        fn = mod.get_or_insert_function(fnty,
+                                        name="NRT_MemInfo_alloc_tracked")
+        fn.return_value.add_attribute("noalias")
+        if isinstance(align, int):
+            align = self.get_constant(types.uint32, align)
+        siteptr = builder.inttoptr(self.get_constant(types.uintp,
+                                                     site.address),
+                                   void_ptr)
+        return builder.call(fn, [size, align, siteptr])
+
     def nrt_meminfo_varsize_alloc(self, builder, size):
         """
         Allocate a MemInfo pointing to a variable-sized data area.  The area
@@ -1116,13 +1231,19 @@ class BaseContext(object):
         """
         Recursively incref the given *value* and its members.
         """
-        self._call_nrt_incref_decref(builder, typ, typ, value, "NRT_incref")
+        funcname = "NRT_incref"
+        if self.enable_nrt_nonatomic:
+            funcname = "NRT_incref_nonatomic"
+        self._call_nrt_incref_decref(builder, typ, typ, value, funcname)
 
     def nrt_decref(self, builder, typ, value):
         """
         Recursively decref the given *value* and its members.
         """
-        self._call_nrt_incref_decref(builder, typ, typ, value, "NRT_decref")
+        funcname = "NRT_decref"
+        if self.enable_nrt_nonatomic:
+            funcname = "NRT_decref_nonatomic"
+        self._call_nrt_incref_decref(builder, typ, typ, value, funcname)
 
 
 class _wrap_impl(object):
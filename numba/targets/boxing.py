@@ -281,6 +281,13 @@ def box_array(c, typ, val):
     nativeary = nativearycls(c.context, c.builder, value=val)
     if c.context.enable_nrt:
         np_dtype = numpy_support.as_dtype(typ.dtype)
+        if c.env_manager is None:
+            # No environment in AOT-compiled code: unpickle the dtype
+            dtypeptr = c.pyapi.unserialize(c.pyapi.serialize_object(np_dtype))
+            # Steals NRT ref
+            newary = c.pyapi.nrt_adapt_ndarray_to_python(typ, val, dtypeptr)
+            c.pyapi.decref(dtypeptr)
+            return newary
         dtypeptr = c.env_manager.read_const(c.env_manager.add_const(np_dtype))
         # Steals NRT ref
         newary = c.pyapi.nrt_adapt_ndarray_to_python(typ, val, dtypeptr)
@@ -466,6 +473,33 @@ def unbox_pyobject(c, typ, obj):
     return NativeValue(obj)
 
 
+@unbox(types.FunctionType)
+def unbox_function(c, typ, obj):
+    """
+    Convert a dispatcher to a first-class function, from the addresses
+    in its _native_entries attribute.  The specializations are compiled
+    in order, so those of *typ* come first.
+    """
+    n = len(typ.sigs)
+    func = cgutils.create_struct_proxy(typ)(c.context, c.builder)
+    addrs = cgutils.get_null_value(func.addrs.type)
+    envs = cgutils.get_null_value(func.envs.type)
+    entries = c.pyapi.object_getattr_string(obj, "_native_entries")
+    with cgutils.if_likely(c.builder, cgutils.is_not_null(c.builder, entries)):
+        for i in range(n):
+            addr = c.pyapi.long_as_voidptr(
+                c.pyapi.tuple_getitem(entries, 2 * i))
+            env = c.pyapi.long_as_voidptr(
+                c.pyapi.tuple_getitem(entries, 2 * i + 1))
+            addrs = c.builder.insert_value(addrs, addr, i)
+            envs = c.builder.insert_value(
+                envs, c.builder.bitcast(env, c.pyapi.pyobj), i)
+        c.pyapi.decref(entries)
+    func.addrs = addrs
+    func.envs = envs
+    return NativeValue(func._getvalue(), is_error=c.pyapi.c_api_error())
+
+
 @unbox(types.ExternalFunctionPointer)
 def unbox_funcptr(c, typ, obj):
     if typ.get_pointer is None:
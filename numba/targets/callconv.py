@@ -375,7 +375,8 @@ class CPUCallConv(BaseCallConv):
             # (nopython functions).
             env = cgutils.get_null_value(PYOBJECT)
         is_generator_function = isinstance(resty, types.Generator)
-        retty = self._get_return_argument(callee).type.pointee
+        # *callee* may also be a function pointer
+        retty = callee.function_type.args[0].pointee
         retvaltmp = cgutils.alloca_once(builder, retty)
         # initialize return value to zeros
         builder.store(cgutils.get_null_value(retty), retvaltmp)
@@ -0,0 +1,195 @@
+"""
+Implementation of operations on fixed-width character sequences
+(numpy's 'S' and 'U' record fields and scalars).
+
+Like in numpy, a sequence is padded with NUL characters up to its width,
+and trailing NULs aren't part of the logical string.  All operations
+work on the native representation, without creating Python objects.
+"""
+
+from __future__ import print_function, absolute_import, division
+
+from llvmlite import ir
+
+from numba import types, cgutils
+from numba.targets.imputils import implement, Registry, impl_ret_untracked
+from numba.targets import slicing
+
+registry = Registry()
+register = registry.register
+
+_charseq_kinds = (types.Kind(types.CharSeq), types.Kind(types.UnicodeCharSeq))
+
+# FNV-1a parameters, see http://www.isthe.com/chongo/tech/comp/fnv/
+_FNV_OFFSET_BASIS = 0xcbf29ce484222325
+_FNV_PRIME = 0x100000001b3
+
+
+def get_chars_pointer(builder, val, count=None):
+    """
+    Spill the character sequence *val* to the stack and return a pointer
+    to its first character.  If *count* is larger than the width of *val*,
+    the stack slot is extended with NULs up to *count* characters.
+    """
+    arrty = val.type
+    if count is not None and count > arrty.count:
+        padded = ir.ArrayType(arrty.element, count)
+        slot = cgutils.alloca_once_value(builder, ir.Constant(padded, None))
+        builder.store(val, builder.bitcast(slot, arrty.as_pointer()))
+    else:
+        slot = cgutils.alloca_once_value(builder, val)
+    return builder.bitcast(slot, arrty.element.as_pointer())
+
+
+def get_chars_length(context, builder, ptr, count):
+    """
+    Return the length of the *count*-character sequence at *ptr*,
+    excluding trailing NULs.
+    """
+    intp_t = context.get_value_type(types.intp)
+    one = ir.Constant(intp_t, 1)
+    length = cgutils.alloca_once_value(builder, ir.Constant(intp_t, 0))
+    with cgutils.for_range(builder, ir.Constant(intp_t, count)) as loop:
+        ch = builder.load(builder.gep(ptr, [loop.index]))
+        with builder.if_then(cgutils.is_not_null(builder, ch)):
+            builder.store(builder.add(loop.index, one), length)
+    return builder.load(length)
+
+
+def compare_chars(context, builder, sig, args):
+    """
+    Compare two character sequences lexicographically (the shorter one
+    being padded with NULs).  Return -1, 0 or 1 as an int32.
+    """
+    lty, rty = sig.args
+    count = max(lty.count, rty.count)
+    lptr = get_chars_pointer(builder, args[0], count)
+    rptr = get_chars_pointer(builder, args[1], count)
+
+    int32_t = ir.IntType(32)
+    res = cgutils.alloca_once_value(builder, ir.Constant(int32_t, 0))
+    intp_t = context.get_value_type(types.intp)
+    with cgutils.for_range(builder, ir.Constant(intp_t, count)) as loop:
+        lch = builder.load(builder.gep(lptr, [loop.index]))
+        rch = builder.load(builder.gep(rptr, [loop.index]))
+        with builder.if_then(builder.icmp_unsigned('!=', lch, rch)):
+            is_lt = builder.icmp_unsigned('<', lch, rch)
+            builder.store(builder.select(is_lt, ir.Constant(int32_t, -1),
+                                         ir.Constant(int32_t, 1)),
+                          res)
+            loop.do_break()
+    return builder.load(res)
+
+
+def _make_charseq_cmp(op):
+    def charseq_cmp_impl(context, builder, sig, args):
+        cmp = compare_chars(context, builder, sig, args)
+        res = builder.icmp_signed(op, cmp, ir.Constant(cmp.type, 0))
+        return impl_ret_untracked(context, builder, sig.return_type, res)
+    return charseq_cmp_impl
+
+
+for _kind in _charseq_kinds:
+    for _op in ('==', '!=', '<', '<=', '>', '>='):
+        register(implement(_op, _kind, _kind)(_make_charseq_cmp(_op)))
+
+
+@register
+@implement(types.len_type, types.Kind(types.CharSeq))
+@implement(types.len_type, types.Kind(types.UnicodeCharSeq))
+def charseq_len(context, builder, sig, args):
+    [ty] = sig.args
+    [val] = args
+    ptr = get_chars_pointer(builder, val)
+    res = get_chars_length(context, builder, ptr, ty.count)
+    return impl_ret_untracked(context, builder, sig.return_type, res)
+
+
+@register
+@implement(hash, types.Kind(types.CharSeq))
+@implement(hash, types.Kind(types.UnicodeCharSeq))
+def charseq_hash(context, builder, sig, args):
+    """
+    FNV-1a hash of the characters, excluding trailing NULs, so that
+    equal strings of different widths hash equally.  Note the result
+    doesn't match Python's hash() of the corresponding str or bytes.
+    """
+    [ty] = sig.args
+    [val] = args
+    ptr = get_chars_pointer(builder, val)
+    length = get_chars_length(context, builder, ptr, ty.count)
+
+    int64_t = ir.IntType(64)
+    h = cgutils.alloca_once_value(builder,
+                                  ir.Constant(int64_t, _FNV_OFFSET_BASIS))
+    with cgutils.for_range(builder, length) as loop:
+        ch = builder.load(builder.gep(ptr, [loop.index]))
+        ch = builder.zext(ch, int64_t)
+        newh = builder.mul(builder.xor(builder.load(h), ch),
+                           ir.Constant(int64_t, _FNV_PRIME))
+        builder.store(newh, h)
+
+    res = builder.load(h)
+    intp_t = context.get_value_type(types.intp)
+    if intp_t.width < int64_t.width:
+        res = builder.trunc(res, intp_t)
+    return impl_ret_untracked(context, builder, sig.return_type, res)
+
+
+@register
+@implement('getitem', types.Kind(types.CharSeq), types.slice3_type)
+@implement('getitem', types.Kind(types.UnicodeCharSeq), types.slice3_type)
+def charseq_getslice(context, builder, sig, args):
+    ty = sig.args[0]
+    val, sliceval = args
+    src = get_chars_pointer(builder, val)
+    length = get_chars_length(context, builder, src, ty.count)
+
+    slice = slicing.Slice(context, builder, value=sliceval)
+    cgutils.guard_invalid_slice(context, builder, slice)
+    slicing.fix_slice(builder, slice, length)
+
+    # The result has the same width and is NUL-padded
+    slot = cgutils.alloca_once_value(builder, ir.Constant(val.type, None))
+    dest = builder.bitcast(slot, val.type.element.as_pointer())
+    with cgutils.for_range_slice_generic(builder, slice.start, slice.stop,
+                                         slice.step) as (pos_range, neg_range):
+        with pos_range as (idx, count):
+            ch = builder.load(builder.gep(src, [idx]))
+            builder.store(ch, builder.gep(dest, [count]))
+        with neg_range as (idx, count):
+            ch = builder.load(builder.gep(src, [idx]))
+            builder.store(ch, builder.gep(dest, [count]))
+
+    res = builder.load(slot)
+    return impl_ret_untracked(context, builder, sig.return_type, res)
+
+
+@register
+@implement("charseq.startswith", types.Kind(types.CharSeq),
+           types.Kind(types.CharSeq))
+@implement("charseq.startswith", types.Kind(types.UnicodeCharSeq),
+           types.Kind(types.UnicodeCharSeq))
+def charseq_startswith(context, builder, sig, args):
+    ty, prefty = sig.args
+    val, prefix = args
+    ptr = get_chars_pointer(builder, val)
+    prefptr = get_chars_pointer(builder, prefix)
+    preflen = get_chars_length(context, builder, prefptr, prefty.count)
+
+    res = cgutils.alloca_once_value(builder, cgutils.true_bit)
+    fits = builder.icmp_signed('<=', preflen,
+                               context.get_constant(types.intp, ty.count))
+    with builder.if_else(fits) as (then, otherwise):
+        with then:
+            with cgutils.for_range(builder, preflen) as loop:
+                ch = builder.load(builder.gep(ptr, [loop.index]))
+                prefch = builder.load(builder.gep(prefptr, [loop.index]))
+                with builder.if_then(builder.icmp_unsigned('!=', ch, prefch)):
+                    builder.store(cgutils.false_bit, res)
+                    loop.do_break()
+        with otherwise:
+            builder.store(cgutils.false_bit, res)
+
+    return impl_ret_untracked(context, builder, sig.return_type,
+                              builder.load(res))
@@ -9,8 +9,17 @@ import llvmlite.llvmpy.passes as lp
 import llvmlite.binding as ll
 import llvmlite.ir as llvmir
 
-from numba import config, utils
-from numba.runtime.atomicops import remove_redundant_nrt_refct
+from numba import config, utils, _helperlib
+from numba.runtime.refctopt import prune_refct_ops
+
+
+# The instruction set extensions detected by _helperlib.get_cpu_features().
+# Keep this in sync with _cpufeatures.h.
+_detectable_cpu_features = frozenset([
+    'sse2', 'sse3', 'ssse3', 'sse4.1', 'sse4.2', 'popcnt', 'avx', 'f16c',
+    'fma', 'movbe', 'bmi', 'bmi2', 'lzcnt', 'avx2',
+    'avx512f', 'avx512cd', 'avx512dq', 'avx512bw', 'avx512vl',
+    ])
 
 _x86arch = frozenset(['x86', 'i386', 'i486', 'i586', 'i686', 'i786',
                       'i886', 'i986'])
@@ -20,6 +29,11 @@ def _is_x86(triple):
     return arch in _x86arch
 
 
+# Libraries with fewer LLVM instructions than this are always linked as IR
+# into their callers, so that they can be inlined.
+_INLINE_SIZE_THRESHOLD = 100
+
+
 def dump(header, body):
     print(header.center(80, '-'))
     print(body)
@@ -34,11 +48,16 @@ class CodeLibrary(object):
     """
 
     _finalized = False
+    _linked = False
+    _optimized = False
     _object_caching_enabled = False
 
-    def __init__(self, codegen, name):
+    def __init__(self, codegen, name, opt=None, loop_vectorize=None):
         self._codegen = codegen
         self._name = name
+        # Optimization options overriding the configuration, if not None
+        self._opt = opt
+        self._loop_vectorize = loop_vectorize
         self._linking_libraries = set()
         self._final_module = ll.parse_assembly(
             str(self._codegen._create_empty_module(self._name)))
@@ -46,6 +65,11 @@ class CodeLibrary(object):
         # Remember this on the module, for the object cache hooks
         self._final_module.__library = weakref.proxy(self)
         self._shared_module = None
+        # Number of LLVM instructions added to this library, and whether
+        # some of its functions should always be inlined
+        self._ir_size = 0
+        self._has_inline_functions = False
+        self._links_by_symbol = False
 
     @property
     def codegen(self):
@@ -54,6 +78,15 @@ class CodeLibrary(object):
         """
         return self._codegen
 
+    @property
+    def links_by_symbol(self):
+        """
+        Whether this library's code calls functions of other libraries
+        through symbol lookup, rather than having them linked in.  Such
+        a library can only run alongside the libraries it calls.
+        """
+        return self._links_by_symbol
+
     def __repr__(self):
         return "<Library %r at 0x%x>" % (self._name, id(self))
 
@@ -72,7 +105,8 @@ class CodeLibrary(object):
         """
         # Enforce data layout to enable layout-specific optimizations
         ll_module.data_layout = self._codegen._data_layout
-        with self._codegen._function_pass_manager(ll_module) as fpm:
+        with self._codegen._function_pass_manager(
+                ll_module, self._opt, self._loop_vectorize) as fpm:
             # Run function-level optimizations to reduce memory usage and improve
             # module-level optimization.
             for func in ll_module.functions:
@@ -84,7 +118,9 @@ class CodeLibrary(object):
         """
         Internal: optimize this library's final module.
         """
-        self._codegen._mpm.run(self._final_module)
+        mpm = self._codegen._get_module_pass_manager(self._opt,
+                                                     self._loop_vectorize)
+        mpm.run(self._final_module)
 
     def _get_module_for_linking(self):
         """
@@ -120,6 +156,13 @@ class CodeLibrary(object):
         self._shared_module = mod
         return mod
 
+    def _can_link_by_symbol(self):
+        """
+        Internal: whether callers can resolve calls to this library's
+        functions by symbol lookup, instead of linking its module.
+        """
+        return False
+
     def create_ir_module(self, name):
         """
         Create a LLVM IR module for use by this library.
@@ -142,6 +185,14 @@ class CodeLibrary(object):
         """
         self._raise_if_finalized()
         assert isinstance(ir_module, llvmir.Module)
+        # Remove redundant refcount operations before LLVM sees them
+        prune_refct_ops(ir_module)
+        for fn in ir_module.functions:
+            if not fn.is_declaration:
+                if 'alwaysinline' in fn.attributes:
+                    self._has_inline_functions = True
+                self._ir_size += sum(len(block.instructions)
+                                     for block in fn.blocks)
         ll_module = ll.parse_assembly(str(ir_module))
         ll_module.name = ir_module.name
         ll_module.verify()
@@ -149,8 +200,6 @@ class CodeLibrary(object):
 
     def add_llvm_module(self, ll_module):
         self._optimize_functions(ll_module)
-        # TODO: we shouldn't need to recreate the LLVM module object
-        ll_module = remove_redundant_nrt_refct(ll_module)
         self._final_module.link_in(ll_module)
 
     def finalize(self):
@@ -160,24 +209,65 @@ class CodeLibrary(object):
         linking.
         """
         self._raise_if_finalized()
+        self.link()
+
+        # Optimize the module after all dependences are linked in, to
+        # allow for inlining.
+        if not self._optimized:
+            self._optimize_final_module()
+            self._optimized = True
+
+        self._final_module.verify()
+        self._finalize_final_module()
+
+    def link(self):
+        """
+        Link the libraries this library depends on into its module, which
+        is the first stage of finalize().  Nothing should be added
+        afterwards.
+        """
+        self._raise_if_finalized()
+        if self._linked:
+            return
 
         if config.DUMP_FUNC_OPT:
             dump("FUNCTION OPTIMIZED DUMP %s" % self._name, self.get_llvm_str())
 
         # Link libraries for shared code
         for library in self._linking_libraries:
+            if (library._codegen is self._codegen
+                and library._can_link_by_symbol()):
+                # Calls to the library are resolved by the execution
+                # engine, which already has its compiled code.
+                self._links_by_symbol = True
+                continue
             self._final_module.link_in(
                 library._get_module_for_linking(), preserve=True)
+            self._links_by_symbol |= library._links_by_symbol
         for library in self._codegen._libraries:
             self._final_module.link_in(
                 library._get_module_for_linking(), preserve=True)
+            self._links_by_symbol |= library._links_by_symbol
+        self._linked = True
 
-        # Optimize the module after all dependences are linked in above,
-        # to allow for inlining.
-        self._optimize_final_module()
-
-        self._final_module.verify()
-        self._finalize_final_module()
+    def optimize(self):
+        """
+        Optimize this library's module, which is the second stage of
+        finalize(), after link().  Unlike the other stages, this doesn't
+        use the state shared with the codegen's other libraries (the
+        pass managers are this call's own), so that it can run without
+        holding the compiler lock.
+        """
+        self._raise_if_finalized()
+        if not self._linked:
+            raise RuntimeError("library %r must be linked before being "
+                               "optimized" % (self,))
+        if self._optimized:
+            return
+        mpm = self._codegen._module_pass_manager(self._opt,
+                                                 self._loop_vectorize)
+        mpm.run(self._final_module)
+        self._optimized = True
 
     def _finalize_final_module(self):
         """
@@ -351,6 +441,23 @@ class AOTCodeLibrary(CodeLibrary):
         self._ensure_finalized()
         return self._final_module.as_bitcode()
 
+    def internalize(self, keep=()):
+        """
+        Give internal linkage to the functions and global variables
+        defined by this library, except those named in *keep*.  This allows
+        linking together several objects compiled from the same code.
+
+        This function implicitly calls .finalize().
+        """
+        self._ensure_finalized()
+        keep = set(keep)
+        mod = self._final_module
+        for gv in list(mod.functions) + list(mod.global_variables):
+            if (gv.is_declaration or gv.name in keep
+                or gv.name.startswith('llvm.')):
+                continue
+            gv.linkage = ll.Linkage.internal
+
     def _finalize_specific(self):
         pass
 
@@ -367,6 +474,15 @@ class JITCodeLibrary(CodeLibrary):
         self._ensure_finalized()
         return self._codegen._engine.get_function_address(name)
 
+    def _can_link_by_symbol(self):
+        # The library's module stays in the execution engine as long as
+        # the library is alive, which callers ensure by referencing it.
+        # Small libraries and functions marked "alwaysinline" are still
+        # linked as IR, so that they can be inlined.
+        return (config.LINK_BY_SYMBOL and self._finalized
+                and not self._has_inline_functions
+                and self._ir_size >= _INLINE_SIZE_THRESHOLD)
+
     def _finalize_specific(self):
         self._codegen._engine.finalize_object()
 
@@ -391,12 +507,18 @@ class BaseCPUCodegen(object):
         engine = ll.create_mcjit_compiler(llvm_module, tm)
         tli = ll.create_target_library_info(llvm_module.triple)
 
+        self._magic = (llvm_module.triple, self._get_host_cpu_name(),
+                       self._get_host_cpu_features(),
+                       self._get_isa_features())
         self._tli = tli
         self._tm = tm
         self._engine = engine
         self._target_data = engine.target_data
         self._data_layout = str(self._target_data)
         self._mpm = self._module_pass_manager()
+        # Module pass managers for libraries overriding the optimization
+        # options, by (opt, loop_vectorize)
+        self._custom_mpms = {}
 
         self._engine.set_object_cache(self._library_class._object_compiled_hook,
                                       self._library_class._object_getbuffer_hook)
@@ -423,54 +545,139 @@ class BaseCPUCodegen(object):
         library._ensure_finalized()
         self._libraries.add(library)
 
-    def create_library(self, name):
+    def create_library(self, name, opt=None, loop_vectorize=None):
         """
         Create a :class:`CodeLibrary` object for use with this codegen
-        instance.
+        instance.  *opt* and *loop_vectorize* override the NUMBA_OPT and
+        NUMBA_LOOP_VECTORIZE settings for the library's code, if not None.
         """
-        return self._library_class(self, name)
+        return self._library_class(self, name, opt=opt,
+                                   loop_vectorize=loop_vectorize)
 
     def unserialize_library(self, serialized):
         return self._library_class._unserialize(self, serialized)
 
-    def _module_pass_manager(self):
+    def _module_pass_manager(self, opt=None, loop_vectorize=None):
         pm = ll.create_module_pass_manager()
         dl = ll.create_target_data(self._data_layout)
         dl.add_pass(pm)
         self._tli.add_pass(pm)
         self._tm.add_analysis_passes(pm)
-        with self._pass_manager_builder() as pmb:
+        with self._pass_manager_builder(opt, loop_vectorize) as pmb:
             pmb.populate(pm)
         return pm
 
-    def _function_pass_manager(self, llvm_module):
+    def _get_module_pass_manager(self, opt, loop_vectorize):
+        """
+        Return the module pass manager for the given optimization
+        options (None meaning the configured value).
+        """
+        if opt is None and loop_vectorize is None:
+            return self._mpm
+        key = opt, loop_vectorize
+        try:
+            return self._custom_mpms[key]
+        except KeyError:
+            mpm = self._module_pass_manager(opt, loop_vectorize)
+            self._custom_mpms[key] = mpm
+            return mpm
+
+    def _function_pass_manager(self, llvm_module, opt=None,
+                               loop_vectorize=None):
         pm = ll.create_function_pass_manager(llvm_module)
         self._target_data.add_pass(pm)
         self._tli.add_pass(pm)
         self._tm.add_analysis_passes(pm)
-        with self._pass_manager_builder() as pmb:
+        with self._pass_manager_builder(opt, loop_vectorize) as pmb:
             pmb.populate(pm)
         return pm
 
-    def _pass_manager_builder(self):
+    def _pass_manager_builder(self, opt=None, loop_vectorize=None):
         """
-        Create a PassManagerBuilder.
+        Create a PassManagerBuilder.  *opt* and *loop_vectorize* default
+        to the NUMBA_OPT and NUMBA_LOOP_VECTORIZE settings.
 
         Note: a PassManagerBuilder seems good only for one use, so you
         should call this method each time you want to populate a module
         or function pass manager.  Otherwise some optimizations will be
         missed...
         """
+        if opt is None:
+            opt = config.OPT
+        if loop_vectorize is None:
+            loop_vectorize = config.LOOP_VECTORIZE
         pmb = lp.create_pass_manager_builder(
-            opt=config.OPT, loop_vectorize=config.LOOP_VECTORIZE)
+            opt=opt, loop_vectorize=loop_vectorize)
         return pmb
 
+    def _get_host_cpu_name(self):
+        """
+        Return the name of the CPU the code is compiled for.
+        """
+        return config.CPU_NAME or ll.get_host_cpu_name()
+
+    def _get_host_cpu_features(self):
+        """
+        Return the LLVM features string of the CPU the code is compiled for.
+        """
+        features = []
+        if config.CPU_FEATURES:
+            features.append(config.CPU_FEATURES)
+        # There are various performance issues with AVX and LLVM 3.5
+        # (list at http://llvm.org/bugs/buglist.cgi?quicksearch=avx).
+        # For now we'd rather disable it, since it can pessimize the code.
+        if not config.ENABLE_AVX:
+            features.append('-avx')
+        return ','.join(features)
+
+    def _get_isa_features(self):
+        """
+        Return the instruction set extensions the compiled code may use
+        (as a sorted tuple of names) if it can run on other CPUs of the
+        same architecture supporting them, otherwise None.
+
+        Only code compiled for the generic CPU model is portable, and
+        only if all the features enabled on top of it can be detected
+        at runtime.  Code compiled for a given CPU model (e.g. the host's)
+        may use any instruction of that model.
+        """
+        if config.CPU_NAME != 'generic':
+            return None
+        isa = set()
+        for feature in (config.CPU_FEATURES or '').split(','):
+            feature = feature.strip()
+            if not feature or feature.startswith('-'):
+                continue
+            name = feature.lstrip('+')
+            if name not in _detectable_cpu_features:
+                return None
+            isa.add(name)
+        return tuple(sorted(isa))
+
     def magic_tuple(self):
         """
         Return a tuple unambiguously describing the codegen behaviour.
         """
-        return (self._llvm_module.triple, ll.get_host_cpu_name(),
-                config.ENABLE_AVX)
+        return self._magic
+
+    def is_compatible_magic(self, magic):
+        """
+        Whether code compiled with the given magic tuple (from another
+        codegen, e.g. on another machine) can run on this host.
+        """
+        try:
+            triple, cpu_name, features, isa = magic
+        except ValueError:
+            # Older format
+            return False
+        if triple != self._llvm_module.triple:
+            return False
+        if isa is not None:
+            return set(isa) <= set(_helperlib.get_cpu_features())
+        # Otherwise, only the same CPU model is known to be compatible
+        return (cpu_name == ll.get_host_cpu_name() and
+                not any(f.strip().startswith('+')
+                        for f in features.split(',')))
 
 
 class AOTCPUCodegen(BaseCPUCodegen):
@@ -481,7 +688,16 @@ class AOTCPUCodegen(BaseCPUCodegen):
 
     _library_class = AOTCodeLibrary
 
+    def __init__(self, module_name, cpu_name=None, features=None):
+        # The CPU model and features to compile for; by default, the
+        # generic model of the architecture.
+        self._cpu_name = cpu_name or ''
+        self._features = features or ''
+        BaseCPUCodegen.__init__(self, module_name)
+
     def _customize_tm_options(self, options):
+        options['cpu'] = self._cpu_name
+        options['features'] = self._features
         options['reloc'] = 'pic'
         options['codemodel'] = 'default'
 
@@ -497,23 +713,15 @@ class JITCPUCodegen(BaseCPUCodegen):
     _library_class = JITCodeLibrary
 
     def _customize_tm_options(self, options):
-        features = []
-
         # As long as we don't want to ship the code to another machine,
-        # we can specialize for this CPU.
-        options['cpu'] = ll.get_host_cpu_name()
+        # we can specialize for this CPU (unless NUMBA_CPU_NAME is set).
+        options['cpu'] = self._get_host_cpu_name()
 
         options['reloc'] = 'default'
         options['codemodel'] = 'jitdefault'
 
-        # There are various performance issues with AVX and LLVM 3.5
-        # (list at http://llvm.org/bugs/buglist.cgi?quicksearch=avx).
-        # For now we'd rather disable it, since it can pessimize the code.
-        if not config.ENABLE_AVX:
-            features.append('-avx')
-
         # Set feature attributes
-        options['features'] = ','.join(features)
+        options['features'] = self._get_host_cpu_features()
 
         # Enable JIT debug
         options['jitdebug'] = True
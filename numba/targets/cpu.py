@@ -11,9 +11,7 @@ from numba.callwrapper import PyCallWrapper
 from .base import BaseContext, PYOBJECT
 from numba import utils, cgutils, types
 from numba.utils import cached_property
-from numba.targets import (
-    callconv, codegen, externals, intrinsics, listobj, cmathimpl, mathimpl,
-    npyimpl, operatorimpl, printimpl, randomimpl)
+from numba.targets import callconv, codegen, externals, intrinsics, listobj
 from .options import TargetOptions
 from numba.runtime import rtsys
 
@@ -34,6 +32,8 @@ class CPUContext(BaseContext):
     """
     Changes BaseContext calling convention
     """
+    enable_parallel_loops = True
+
     # Overrides
     def create_module(self, name):
         return self._internal_codegen._create_empty_module(name)
@@ -46,7 +46,12 @@ class CPUContext(BaseContext):
         externals.c_math_functions.install(self)
         externals.c_numpy_functions.install(self)
 
-        # Add target specific implementations
+        # Add target specific implementations.  Those modules are imported
+        # here as some of them (e.g. npyimpl, which fills the ufunc database)
+        # are expensive to import.
+        from numba.targets import (charseqimpl, cmathimpl, mathimpl, npyimpl,
+                                   operatorimpl, printimpl, randomimpl)
+        self.install_registry(charseqimpl.registry)
         self.install_registry(cmathimpl.registry)
         self.install_registry(mathimpl.registry)
         self.install_registry(npyimpl.registry)
@@ -57,12 +62,17 @@ class CPUContext(BaseContext):
         # Initialize NRT runtime
         rtsys.initialize(self)
 
+        # Register the parallel scheduler, which prange() loops call even
+        # when they are loaded from the cache
+        from numba.npyufunc import parallel
+
     @property
     def target_data(self):
         return self._internal_codegen.target_data
 
-    def aot_codegen(self, name):
-        return codegen.AOTCPUCodegen(name)
+    def aot_codegen(self, name, cpu_name=None, features=None):
+        return codegen.AOTCPUCodegen(name, cpu_name=cpu_name,
+                                     features=features)
 
     def jit_codegen(self):
         return self._internal_codegen
@@ -115,6 +125,9 @@ class CPUContext(BaseContext):
             # calls to compiler-rt
             intrinsics.fix_divmod(mod)
 
+        if self.enable_fastmath:
+            intrinsics.set_fastmath_flags(mod)
+
         library.add_linking_library(rtsys.library)
 
     def create_cpython_wrapper(self, library, fndesc, env, call_helper,
@@ -128,6 +141,58 @@ class CPUContext(BaseContext):
         builder.build()
         library.add_ir_module(wrapper_module)
 
+    def create_cfunc_wrapper(self, library, fndesc, env, call_helper):
+        """
+        Create a wrapper with a C calling convention around the nopython
+        function described by *fndesc*.  Python is only involved when
+        an error has to be reported (the error is then printed, as the
+        C caller can't handle it, and a zero value is returned).
+        """
+        wrapper_module = self.create_module("cfunc_wrapper")
+        fnty = self.call_conv.get_function_type(fndesc.restype, fndesc.argtypes)
+        wrapper_callee = wrapper_module.add_function(fnty, fndesc.llvm_func_name)
+
+        ll_argtypes = [self.get_value_type(ty) for ty in fndesc.argtypes]
+        if fndesc.restype == types.none:
+            ll_restype = lc.Type.void()
+        else:
+            ll_restype = self.get_value_type(fndesc.restype)
+        wrapty = lc.Type.function(ll_restype, ll_argtypes)
+        wrapfn = wrapper_module.add_function(wrapty,
+                                             fndesc.llvm_cfunc_wrapper_name)
+        builder = lc.Builder.new(wrapfn.append_basic_block('entry'))
+
+        status, out = self.call_conv.call_function(
+            builder, wrapper_callee, fndesc.restype, fndesc.argtypes,
+            wrapfn.args)
+
+        with cgutils.if_unlikely(builder, status.is_error):
+            api = self.get_python_api(builder)
+            gil_state = api.gil_ensure()
+            with builder.if_else(status.is_user_exc) as (user_exc, other):
+                with user_exc:
+                    exc = api.unserialize(status.excinfoptr)
+                    with cgutils.if_likely(builder,
+                                           cgutils.is_not_null(builder, exc)):
+                        api.raise_object(exc)  # steals ref
+                with other:
+                    with builder.if_then(builder.not_(status.is_python_exc)):
+                        msg = ("unknown error in native function: %s"
+                               % fndesc.mangled_name)
+                        api.err_set_string("PyExc_SystemError", msg)
+            # The object the error is reported in the context of
+            cfunc_name = api.string_from_constant_string(
+                "<numba.cfunc %s>" % fndesc.qualname)
+            api.err_write_unraisable(cfunc_name)
+            api.decref(cfunc_name)
+            api.gil_release(gil_state)
+
+        if fndesc.restype == types.none:
+            builder.ret_void()
+        else:
+            builder.ret(out)
+        library.add_ir_module(wrapper_module)
+
     def get_executable(self, library, fndesc, env):
         """
         Returns
@@ -174,7 +239,11 @@ class CPUTargetOptions(TargetOptions):
         "wraparound": bool,
         "boundcheck": bool,
         "_nrt": bool,
+        "nonatomic_refct": bool,
         "no_rewrites": bool,
+        "fastmath": bool,
+        "opt": int,
+        "loop_vectorize": bool,
     }
 
 
@@ -4,6 +4,7 @@ Utilities to simplify the boilerplate for native lowering.
 
 from __future__ import print_function, absolute_import, division
 
+from collections import defaultdict
 import inspect
 import functools
 
@@ -216,20 +217,41 @@ class Registry(object):
     def __init__(self):
         self.functions = []
         self.attributes = []
+        # Indices of the above by function key and attribute name, for
+        # target contexts looking up implementations on demand
+        self._functions_by_key = defaultdict(list)
+        self._attributes_by_name = defaultdict(list)
 
     def register(self, impl):
         sigs = impl.function_signatures
         impl.function_signatures = []
         self.functions.append((impl, sigs))
+        for func, sig in sigs:
+            self._functions_by_key[func].append((impl, sig))
         return impl
 
     def register_attr(self, item):
         curr_item = item
         while hasattr(curr_item, '__wrapped__'):
             self.attributes.append(curr_item)
+            self._attributes_by_name[curr_item.attr].append(curr_item)
             curr_item = curr_item.__wrapped__
         return item
 
+    def get_functions(self, key):
+        """
+        Return a list of (implementation, signature) pairs for
+        function *key*, in registration order.
+        """
+        return self._functions_by_key.get(key, ())
+
+    def get_attributes(self, attr):
+        """
+        Return a list of implementations for attribute *attr*
+        (None for generic attribute implementations), in registration order.
+        """
+        return self._attributes_by_name.get(attr, ())
+
 
 builtin_registry = Registry()
 builtin = builtin_registry.register
@@ -29,6 +29,20 @@ def fix_divmod(mod):
     _DivmodFixer().visit(mod)
 
 
+class _FastMathSetter(ir.Visitor):
+    opnames = frozenset(['fadd', 'fsub', 'fmul', 'fdiv', 'frem'])
+
+    def visit_Instruction(self, instr):
+        if instr.opname in self.opnames and 'fast' not in instr.flags:
+            instr.flags.append('fast')
+
+
+def set_fastmath_flags(mod):
+    """Set the "fast" flag on the floating-point arithmetic instructions
+    """
+    _FastMathSetter().visit(mod)
+
+
 class IntrinsicMapping(object):
     def __init__(self, context, mapping=None, availintr=None):
         """
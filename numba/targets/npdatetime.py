@@ -6,6 +6,7 @@ from llvmlite.llvmpy.core import Type, Constant
 import llvmlite.llvmpy.core as lc
 
 from numba import npdatetime, types, cgutils
+from numba.typing import signature
 from numba.targets.imputils import (builtin, implement, type_factory,
                                     impl_ret_untracked)
 
@@ -643,3 +644,212 @@ def timedelta_min_impl(context, builder, sig, args):
     res = builder.select(in2_not_nat, res, in1)
 
     return impl_ret_untracked(context, builder, sig.return_type, res)
+
+
+# Calendar fields and rounding of datetime64.
+# See numba.npdatetime for the reference implementations.
+
+def floor_divmod(builder, val, divisor):
+    """
+    Compute the (quotient, remainder) of *val* divided by the positive
+    *divisor*, with Python's floor semantics.  Unlike
+    cgutils.divmod_by_constant(), this doesn't branch, which lets LLVM
+    vectorize loops over arrays.
+    """
+    zero = Constant.int(val.type, 0)
+    one = Constant.int(val.type, 1)
+    quot = builder.sdiv(val, divisor)
+    rem = builder.srem(val, divisor)
+    is_neg = builder.icmp(lc.ICMP_SLT, rem, zero)
+    quot = builder.select(is_neg, builder.sub(quot, one), quot)
+    rem = builder.select(is_neg, builder.add(rem, divisor), rem)
+    return quot, rem
+
+def floor_divmod_by_constant(builder, val, divisor):
+    return floor_divmod(builder, val, Constant.int(val.type, divisor))
+
+def datetime_days_and_ticks(builder, dt_val, unit):
+    """
+    Split datetime *dt_val* of *unit* into (days since the 1970 epoch,
+    ticks of *unit* since the start of the day).
+    """
+    unit_code = npdatetime.DATETIME_UNITS[unit]
+    zero = Constant.int(DATETIME64, 0)
+    if unit_code < 2:
+        days, _ = reduce_datetime_for_unit(builder, dt_val, unit, 'D')
+        return days, zero
+    elif unit_code == 2:
+        return scale_by_constant(builder, dt_val, 7), zero
+    ticks_per_day = npdatetime.get_ticks_per_day(unit)
+    return floor_divmod_by_constant(builder, dt_val, ticks_per_day)
+
+def civil_from_days(builder, days):
+    """
+    Compute the (year, month, day) of the proleptic Gregorian calendar
+    for *days* since the 1970 epoch.
+    """
+    def const(v):
+        return Constant.int(DATETIME64, v)
+
+    def udiv(val, divisor):
+        # All operands below the era computation are non-negative
+        return builder.udiv(val, const(divisor))
+
+    z = add_constant(builder, days, 719468)
+    era, doe = floor_divmod_by_constant(builder, z, 146097)
+    # Year of era, in [0, 399]
+    yoe = builder.sub(doe, udiv(doe, 1460))
+    yoe = builder.add(yoe, udiv(doe, 36524))
+    yoe = builder.sub(yoe, udiv(doe, 146096))
+    yoe = udiv(yoe, 365)
+    # Day of year (starting from March 1st), in [0, 365]
+    doy = builder.add(scale_by_constant(builder, yoe, 365), udiv(yoe, 4))
+    doy = builder.sub(doy, udiv(yoe, 100))
+    doy = builder.sub(doe, doy)
+    # Month (starting from March), in [0, 11]
+    mp = udiv(add_constant(builder, scale_by_constant(builder, doy, 5), 2),
+              153)
+    day = udiv(add_constant(builder, scale_by_constant(builder, mp, 153), 2),
+               5)
+    day = add_constant(builder, builder.sub(doy, day), 1)
+    month = builder.add(mp, builder.select(
+        builder.icmp(lc.ICMP_SLT, mp, const(10)), const(3), const(-9)))
+    year = builder.add(yoe, scale_by_constant(builder, era, 400))
+    year = builder.add(year, builder.zext(
+        builder.icmp(lc.ICMP_SLE, month, const(2)), DATETIME64))
+    return year, month, day
+
+def _time_field(field_unit, modulo):
+    def compute(builder, days, ticks, unit):
+        factor = npdatetime.get_timedelta_conversion_factor(field_unit, unit)
+        if factor is None:
+            # Unit coarser than the field
+            return Constant.int(DATETIME64, 0)
+        val = builder.udiv(ticks, Constant.int(DATETIME64, factor))
+        return builder.urem(val, Constant.int(DATETIME64, modulo))
+    return compute
+
+def _weekday(builder, days, ticks, unit):
+    # 1970-01-01 is a Thursday
+    _, wd = floor_divmod_by_constant(builder, add_constant(builder, days, 3), 7)
+    return wd
+
+_field_computations = {
+    npdatetime.year: lambda builder, days, ticks, unit:
+        civil_from_days(builder, days)[0],
+    npdatetime.month: lambda builder, days, ticks, unit:
+        civil_from_days(builder, days)[1],
+    npdatetime.day: lambda builder, days, ticks, unit:
+        civil_from_days(builder, days)[2],
+    npdatetime.weekday: _weekday,
+    npdatetime.hour: _time_field('h', 24),
+    npdatetime.minute: _time_field('m', 60),
+    npdatetime.second: _time_field('s', 60),
+}
+
+def _make_datetime_field_impl(compute):
+    def datetime_field_impl(context, builder, sig, args):
+        [val] = args
+        res = _datetime_field(builder, val, sig.args[0].unit, compute)
+        return impl_ret_untracked(context, builder, sig.return_type, res)
+    return datetime_field_impl
+
+def _datetime_field(builder, val, unit, compute):
+    days, ticks = datetime_days_and_ticks(builder, val, unit)
+    res = compute(builder, days, ticks, unit)
+    # Fields of NaT are -1
+    return builder.select(is_not_nat(builder, val), res,
+                          Constant.int(DATETIME64, -1))
+
+def _make_array_field_impl(compute):
+    def array_field_impl(context, builder, sig, args):
+        from numba.targets import npyimpl
+
+        class FieldKernel(npyimpl._Kernel):
+            def generate(self, val):
+                unit = self.outer_sig.args[0].unit
+                return _datetime_field(self.builder, val, unit, compute)
+
+        return npyimpl.numpy_ufunc_kernel(context, builder, sig, args,
+                                          FieldKernel, explicit_output=False)
+    return array_field_impl
+
+for _func, _compute in _field_computations.items():
+    builtin(implement(_func, types.Kind(types.NPDatetime))(
+        _make_datetime_field_impl(_compute)))
+    builtin(implement(_func, types.Kind(types.Array))(
+        _make_array_field_impl(_compute)))
+
+
+def _check_rounding_step(context, builder, td_arg):
+    """
+    Raise ValueError if timedelta *td_arg* isn't positive, unless it
+    is NaT (as with the Python implementation).
+    """
+    is_invalid = builder.and_(
+        is_not_nat(builder, td_arg),
+        builder.icmp(lc.ICMP_SLE, td_arg, Constant.int(TIMEDELTA64, 0)))
+    with cgutils.if_unlikely(builder, is_invalid):
+        context.call_conv.return_user_exc(
+            builder, ValueError, ("rounding frequency must be positive",))
+
+def _round_datetime(builder, dt_arg, td_arg, dt_type, td_type, unit, ceil):
+    """
+    Round datetime *dt_arg* to a multiple of timedelta *td_arg*, in
+    *unit*.  This doesn't branch, so that loops over arrays can be
+    vectorized; *td_arg* must have been checked with
+    _check_rounding_step().
+    """
+    not_nat = are_not_nat(builder, [dt_arg, td_arg])
+    dt_arg = convert_datetime_for_arith(builder, dt_arg, dt_type.unit, unit)
+    td_factor = npdatetime.get_timedelta_conversion_factor(td_type.unit, unit)
+    step = scale_by_constant(builder, td_arg, td_factor)
+    # Don't divide by the scaled NaT, whose result is discarded anyway
+    step = builder.select(is_not_nat(builder, td_arg), step,
+                          Constant.int(TIMEDELTA64, 1))
+    if ceil:
+        _, rem = floor_divmod(builder, builder.neg(dt_arg), step)
+        res = builder.add(dt_arg, rem)
+    else:
+        _, rem = floor_divmod(builder, dt_arg, step)
+        res = builder.sub(dt_arg, rem)
+    return builder.select(not_nat, res, NAT)
+
+def _make_datetime_round_impl(ceil):
+    def datetime_round_impl(context, builder, sig, args):
+        dt_arg, td_arg = args
+        dt_type, td_type = sig.args
+        _check_rounding_step(context, builder, td_arg)
+        res = _round_datetime(builder, dt_arg, td_arg, dt_type, td_type,
+                              sig.return_type.unit, ceil)
+        return impl_ret_untracked(context, builder, sig.return_type, res)
+    return datetime_round_impl
+
+def _make_array_round_impl(ceil):
+    def array_round_impl(context, builder, sig, args):
+        from numba.targets import npyimpl
+
+        arr, td_arg = args
+        arrty, td_type = sig.args
+
+        class RoundKernel(npyimpl._Kernel):
+            def generate(self, dt_arg):
+                return _round_datetime(self.builder, dt_arg, td_arg,
+                                       arrty.dtype, td_type,
+                                       sig.return_type.dtype.unit, ceil)
+
+        # Check the frequency once, outside of the loop, and iterate over
+        # the datetimes only
+        _check_rounding_step(context, builder, td_arg)
+        return npyimpl.numpy_ufunc_kernel(
+            context, builder, signature(sig.return_type, arrty), [arr],
+            RoundKernel, explicit_output=False)
+    return array_round_impl
+
+for _func, _ceil in [(npdatetime.floor, False), (npdatetime.ceil, True)]:
+    builtin(implement(_func, types.Kind(types.NPDatetime),
+                      types.Kind(types.NPTimedelta))(
+        _make_datetime_round_impl(_ceil)))
+    builtin(implement(_func, types.Kind(types.Array),
+                      types.Kind(types.NPTimedelta))(
+        _make_array_round_impl(_ceil)))
@@ -52,6 +52,9 @@ class TargetOptions(object):
         if kws.pop('_nrt', True):
             flags.set("nrt")
 
+        if kws.pop('nonatomic_refct', False):
+            flags.set("nrt_nonatomic")
+
         if kws.pop('debug', False):
             flags.set("boundcheck")
 
@@ -61,6 +64,19 @@ class TargetOptions(object):
         if kws.pop('no_rewrites', False):
             flags.set('no_rewrites')
 
+        if kws.pop('fastmath', False):
+            flags.set('fastmath')
+
+        if 'opt' in kws:
+            opt = kws.pop('opt')
+            if opt not in (0, 1, 2, 3):
+                raise ValueError("opt must be between 0 and 3, got %r"
+                                 % (opt,))
+            flags.set_value('opt', opt)
+
+        if 'loop_vectorize' in kws:
+            flags.set_value('loop_vectorize', kws.pop('loop_vectorize'))
+
         flags.set("enable_pyobject_looplift")
 
         if kws:
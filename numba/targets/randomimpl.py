@@ -38,6 +38,10 @@ def random_init():
     for n in ('py_random_state', 'np_random_state'):
         _helperlib.rnd_seed(_helperlib.c_helpers[n], b)
 
+# Process initialization: this module is imported by the CPU target before
+# any compiled code can use the random states.
+random_init()
+
 
 # This is the same struct as rnd_state_t in _helperlib.c.
 rnd_state_t = ir.LiteralStructType(
@@ -1,5 +1,7 @@
 from __future__ import print_function, division, absolute_import
 
+import threading
+
 from . import cpu
 from .descriptors import TargetDescriptor
 from .. import dispatcher, utils, typing
@@ -8,10 +10,33 @@ from .. import dispatcher, utils, typing
 # Default CPU target descriptors
 
 
+class _LazyContext(object):
+    """
+    A descriptor for a context created by calling *factory* on first
+    access, either from a target descriptor class or an instance.  The
+    context is shared by all subclasses.
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._context = None
+        self._lock = threading.Lock()
+
+    def __get__(self, obj, objtype=None):
+        if self._context is None:
+            with self._lock:
+                if self._context is None:
+                    self._context = self._factory()
+        return self._context
+
+
 class CPUTarget(TargetDescriptor):
     options = cpu.CPUTargetOptions
-    typing_context = typing.Context()
-    target_context = cpu.CPUContext(typing_context)
+    # Creating the contexts is expensive (the target context compiles the
+    # NRT module, for example), so it is deferred until they are needed.
+    typing_context = _LazyContext(typing.Context)
+    target_context = _LazyContext(
+        lambda: cpu.CPUContext(CPUTarget.typing_context))
 
 
 class CPUOverloaded(dispatcher.Overloaded):
@@ -39,5 +64,20 @@ class TargetRegistry(utils.UniqueDict):
         return super(TargetRegistry, self).__getitem__(item)
 
 
+def _init_cuda_target():
+    from numba.cuda.initialize import init_jit
+    return init_jit()
+
+
+def _init_npyufunc_target():
+    from numba.npyufunc.ufuncbuilder import UFuncDispatcher
+    return UFuncDispatcher
+
+
 target_registry = TargetRegistry()
 target_registry['cpu'] = CPUOverloaded
+# Other targets are loaded on first use, so that their subpackages
+# needn't be imported by "import numba".
+target_registry.ondemand['gpu'] = _init_cuda_target
+target_registry.ondemand['cuda'] = _init_cuda_target
+target_registry.ondemand['npyufunc'] = _init_npyufunc_target
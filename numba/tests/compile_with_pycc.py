@@ -1,3 +1,5 @@
+import numpy as np
+
 from numba import exportmany, export
 
 
@@ -5,7 +7,16 @@ def mult(a, b):
     return a * b
 
 
+def halves(n):
+    # Needs the NRT to allocate the returned array
+    a = np.empty(n)
+    for i in range(n):
+        a[i] = i * 0.5
+    return a
+
+
 exportmany(['multf f4(f4,f4)', 'multi i4(i4,i4)'])(mult)
 # Needs to link to helperlib to due with complex arguments
 # export('multc c16(c16,c16)')(mult)
 export('mult f8(f8, f8)')(mult)
+export('halves f8[:](i4)')(halves)
@@ -1,9 +1,14 @@
 from __future__ import print_function, absolute_import, division
 
+import os
+import subprocess
+import sys
+import threading
+import time
+
 from numba import unittest_support as unittest
 from numba import vectorize
 import numpy as np
-import time
 
 class TestParUfuncIssues(unittest.TestCase):
     def test_thread_response(self):
@@ -26,6 +31,178 @@ class TestParUfuncIssues(unittest.TestCase):
             # Reduce sleep time
             sleep_time /= 2
 
+    def test_concurrent_callers(self):
+        """
+        Several threads can call parallel ufuncs at once.
+        """
+        @vectorize('float64(float64, float64)', target='parallel')
+        def fnv(a, b):
+            return a * b
+
+        errors = []
+        def run(k):
+            try:
+                for n in (1, 100, 10**5):
+                    a = np.arange(n, dtype=np.float64)
+                    np.testing.assert_equal(fnv(a, k), a * k)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=run, args=(k,)) for k in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(errors, [])
+
+    def test_parallel_threshold(self):
+        """
+        Results don't depend on the serial/parallel cutover.
+        """
+        def axpy(a, x, y):
+            return a * x + y
+
+        sig = 'float64(float64, float64, float64)'
+        for threshold in (None, 0, 1000, 10**9):
+            fnv = vectorize(sig, target='parallel',
+                            parallel_threshold=threshold)(axpy)
+            for n in (0, 1, 2048, 2049, 10**5, 10**5 + 7):
+                x = np.arange(n, dtype=np.float64)
+                y = np.ones(n)
+                np.testing.assert_equal(fnv(2.0, x, y), 2.0 * x + y)
+                # Non-contiguous arguments
+                np.testing.assert_equal(fnv(2.0, x[::2], y[::2]),
+                                        2.0 * x[::2] + y[::2])
+
+        with self.assertRaises(ValueError):
+            vectorize(sig, target='parallel', parallel_threshold=-1)(axpy)
+
+    def test_threshold_global(self):
+        """
+        The cutover threshold is kept in a global of the generated code,
+        rather than at an address of this process.
+        """
+        from numba.npyufunc.parallel import ParallelUFuncBuilder
+
+        def add(a, b):
+            return a + b
+
+        options = {'nopython': True, 'parallel_threshold': 123}
+        ufb = ParallelUFuncBuilder(add, targetoptions=options)
+        ufb.add('float64(float64, float64)')
+        fnv = ufb.build_ufunc()
+        a = np.arange(10**4, dtype=np.float64)
+        np.testing.assert_equal(fnv(a, a), a + a)
+        cres, = ufb._cres.values()
+        llvm_ir = cres.library.get_llvm_str()
+        self.assertRegexpMatches(llvm_ir, r"@\.threshold[.\d]* = internal "
+                                          r"[\w ]*global i(32|64) 123")
+
+    def test_reduce_accumulate(self):
+        """
+        Reductions and accumulations give the same results as serially,
+        whether they run in parallel (with an identity) or not.
+        """
+        def add(a, b):
+            return a + b
+
+        # Integer additions are exact, whatever the grouping
+        for identity in (0, None):
+            for threshold in (None, 0, 10**9):
+                fnv = vectorize('int64(int64, int64)', target='parallel',
+                                identity=identity,
+                                parallel_threshold=threshold)(add)
+                for n in (1, 2, 2049, 10**5 + 7):
+                    a = np.arange(n, dtype=np.int64)
+                    self.assertEqual(fnv.reduce(a), a.sum())
+                    np.testing.assert_equal(fnv.accumulate(a), a.cumsum())
+                    np.testing.assert_equal(fnv.accumulate(a[::-3]),
+                                            a[::-3].cumsum())
+                b = np.arange(3 * 10**4, dtype=np.int64).reshape(3, -1)
+                np.testing.assert_equal(fnv.reduce(b, axis=1), b.sum(axis=1))
+                np.testing.assert_equal(fnv.reduce(b, axis=0), b.sum(axis=0))
+                np.testing.assert_equal(fnv.accumulate(b, axis=1),
+                                        b.cumsum(axis=1))
+
+    def test_num_threads_env(self):
+        """
+        The number of threads can be set with NUMBA_NUM_THREADS.
+        """
+        code = """if 1:
+            import numpy as np
+            from numba import vectorize
+            from numba.npyufunc import parallel
+
+            @vectorize('int64(int64)', target='parallel')
+            def inc(a):
+                return a + 1
+
+            a = np.arange(10**5)
+            assert (inc(a) == a + 1).all()
+            print(parallel.NUM_THREADS)
+            """
+        for num_threads in ('1', '3'):
+            env = dict(os.environ, NUMBA_NUM_THREADS=num_threads)
+            out = subprocess.check_output([sys.executable, '-c', code],
+                                          env=env)
+            self.assertEqual(out.decode().strip(), num_threads)
+
+    def test_set_num_threads(self):
+        from numba import set_num_threads, get_num_threads
+        from numba.npyufunc.parallel import NUM_THREADS
+
+        @vectorize('float64(float64, float64)', target='parallel',
+                   parallel_threshold=0)
+        def fnv(a, b):
+            return a + b
+
+        a = np.arange(10**5, dtype=np.float64)
+        self.assertEqual(get_num_threads(), NUM_THREADS)
+        try:
+            for n in sorted(set([1, min(2, NUM_THREADS), NUM_THREADS])):
+                set_num_threads(n)
+                self.assertEqual(get_num_threads(), n)
+                np.testing.assert_equal(fnv(a, a), a + a)
+        finally:
+            set_num_threads(NUM_THREADS)
+        for n in (0, NUM_THREADS + 1, 1.5):
+            with self.assertRaises(ValueError):
+                set_num_threads(n)
+        self.assertEqual(get_num_threads(), NUM_THREADS)
+
+    @unittest.skipIf(not hasattr(os, 'fork'), "needs os.fork()")
+    def test_fork(self):
+        """
+        Parallel ufuncs keep working in forked children, which launch the
+        worker threads again.
+        """
+        code = """if 1:
+            import os
+            import numpy as np
+            from numba import vectorize
+
+            @vectorize('int64(int64)', target='parallel', parallel_threshold=0)
+            def inc(a):
+                return a + 1
+
+            a = np.arange(10**5)
+            assert (inc(a) == a + 1).all()
+            pid = os.fork()
+            if pid == 0:
+                ok = (inc(a) == a + 1).all()
+                if os.path.isdir('/proc/self/task'):
+                    # The workers were launched again
+                    ok = ok and len(os.listdir('/proc/self/task')) >= 3
+                os._exit(0 if ok else 1)
+            _, status = os.waitpid(pid, 0)
+            assert status == 0, status
+            assert (inc(a) == a + 1).all()
+            print("ok")
+            """
+        env = dict(os.environ, NUMBA_NUM_THREADS='3')
+        out = subprocess.check_output([sys.executable, '-c', code], env=env)
+        self.assertEqual(out.decode().strip(), "ok")
+
 
 if __name__ == '__main__':
     unittest.main()
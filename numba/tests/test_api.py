@@ -1,5 +1,8 @@
 from __future__ import division
 
+import subprocess
+import sys
+
 import numba
 
 from numba import unittest_support as unittest
@@ -33,6 +36,29 @@ class TestNumbaModule(TestCase):
         # misc
         numba.__version__  # not in __all__
 
+    @unittest.skipIf(sys.version_info < (3, 7),
+                     "needs module __getattr__ (PEP 562)")
+    def test_lazy_imports(self):
+        # Heavy subpackages are only imported on first access
+        code = """if 1:
+            import sys
+            import numba
+            lazy = ['numba.cuda', 'numba.hsa', 'numba.pycc',
+                    'numba.npyufunc', 'numba.targets.cpu']
+            print(sorted(m for m in lazy if m in sys.modules))
+            numba.vectorize, numba.export
+            print('numba.npyufunc' in sys.modules,
+                  'numba.pycc' in sys.modules)
+            """
+        popen = subprocess.Popen([sys.executable, "-c", code],
+                                 stdout=subprocess.PIPE,
+                                 stderr=subprocess.PIPE)
+        out, err = popen.communicate()
+        if popen.returncode != 0:
+            raise AssertionError("process failed with code %s: stderr follows\n%s\n"
+                                 % (popen.returncode, err.decode()))
+        self.assertEqual(out.decode().splitlines(), ["[]", "True True"])
+
 
 if __name__ == '__main__':
     unittest.main()
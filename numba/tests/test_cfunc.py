@@ -0,0 +1,119 @@
+"""
+Tests for @cfunc and C callbacks.
+"""
+
+from __future__ import division, absolute_import, print_function
+
+import ctypes
+
+import numpy as np
+
+import numba.unittest_support as unittest
+from numba import cfunc, njit, types
+from numba.errors import TypingError
+from numba.typing.ctypes_utils import to_ctypes
+from .support import TestCase, captured_stderr
+
+
+def add_usecase(a, b):
+    return a + b
+
+def div_usecase(a, b):
+    return a / b
+
+def square_usecase(x):
+    return x * x
+
+def sum_usecase(data, n):
+    s = 0.0
+    for i in range(n):
+        s += data[i]
+    return s
+
+def double_usecase(data, n):
+    for i in range(n):
+        data[i] *= 2
+
+def objmode_usecase(x):
+    return object()
+
+def apply_usecase(x):
+    return square_ctypes(x) + 1.0
+
+
+add_sig = "float64(float64, float64)"
+div_sig = "float64(int64, int64)"
+square_sig = "float64(float64)"
+sum_sig = types.float64(types.CPointer(types.float64), types.intc)
+double_sig = types.void(types.CPointer(types.float64), types.intc)
+
+
+class TestCFunc(TestCase):
+
+    def test_basic(self):
+        f = cfunc(add_sig)(add_usecase)
+        self.assertPreciseEqual(f.ctypes(4.0, 5.5), 9.5)
+        # The object is callable too, for convenience
+        self.assertPreciseEqual(f(4.0, 5.5), 9.5)
+        self.assertEqual(f.__name__, 'add_usecase')
+        self.assertEqual(f.signature.return_type, types.float64)
+
+    def test_address(self):
+        f = cfunc(square_sig)(square_usecase)
+        self.assertEqual(ctypes.cast(f.ctypes, ctypes.c_void_p).value,
+                         f.address)
+        # The address can be used from any foreign function interface
+        functype = ctypes.CFUNCTYPE(ctypes.c_double, ctypes.c_double)
+        self.assertPreciseEqual(functype(f.address)(3.0), 9.0)
+
+    def test_native_function(self):
+        f = cfunc(square_sig)(square_usecase)
+        self.assertTrue(f.native_name.startswith('cfunc.'))
+        llvm_ir = f.inspect_llvm()
+        self.assertIn(f.native_name, llvm_ir)
+        # No CPython wrapper is generated
+        self.assertNotIn("PyArg_UnpackTuple", llvm_ir)
+
+    def test_pointers(self):
+        f = cfunc(sum_sig)(sum_usecase)
+        arr = np.arange(10, dtype=np.float64)
+        ptr = arr.ctypes.data_as(ctypes.POINTER(ctypes.c_double))
+        self.assertPreciseEqual(f.ctypes(ptr, arr.size), 45.0)
+
+        f = cfunc(double_sig)(double_usecase)
+        ptr = arr.ctypes.data_as(ctypes.POINTER(ctypes.c_double))
+        self.assertIs(f.ctypes(ptr, arr.size), None)
+        self.assertPreciseEqual(arr, np.arange(10, dtype=np.float64) * 2)
+
+    def test_call_from_jit(self):
+        global square_ctypes
+        square_ctypes = cfunc(square_sig)(square_usecase).ctypes
+        try:
+            self.assertPreciseEqual(njit(apply_usecase)(3.0), 10.0)
+        finally:
+            del square_ctypes
+
+    def test_errors(self):
+        f = cfunc(div_sig)(div_usecase)
+        self.assertPreciseEqual(f.ctypes(7, 2), 3.5)
+        with captured_stderr() as err:
+            self.assertPreciseEqual(f.ctypes(5, 0), 0.0)
+        err = err.getvalue()
+        self.assertIn("ZeroDivisionError", err)
+        self.assertIn("<numba.cfunc div_usecase>", err)
+
+    def test_nopython_only(self):
+        with self.assertRaises(TypingError):
+            cfunc("float64(float64)")(objmode_usecase)
+
+    def test_to_ctypes(self):
+        self.assertIs(to_ctypes(types.float64), ctypes.c_double)
+        self.assertIs(to_ctypes(types.none), None)
+        self.assertIs(to_ctypes(types.CPointer(types.int32)),
+                      ctypes.POINTER(ctypes.c_int32))
+        with self.assertRaises(TypeError):
+            to_ctypes(types.float64[:])
+
+
+if __name__ == '__main__':
+    unittest.main()
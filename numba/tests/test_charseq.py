@@ -0,0 +1,161 @@
+"""
+Tests for operations on fixed-width character sequences (numpy 'S' and
+'U' record fields).
+"""
+
+from __future__ import print_function, division, absolute_import
+
+import itertools
+
+import numpy as np
+
+from numba import njit
+from numba import unittest_support as unittest
+from .support import TestCase
+
+
+recordwithstrings = np.dtype([('sym', 'S6'),
+                              ('code', 'U4'),
+                              ('value', np.float64)])
+
+PREFIX = np.bytes_(b'AB')
+UPREFIX = np.str_(u'x\xe9')
+
+
+def eq_usecase(a, i, j):
+    return a[i].sym == a[j].sym
+
+def ne_usecase(a, i, j):
+    return a[i].sym != a[j].sym
+
+def lt_usecase(a, i, j):
+    return a[i].sym < a[j].sym
+
+def le_usecase(a, i, j):
+    return a[i].sym <= a[j].sym
+
+def gt_usecase(a, i, j):
+    return a[i].sym > a[j].sym
+
+def ge_usecase(a, i, j):
+    return a[i].sym >= a[j].sym
+
+def unicode_eq_usecase(a, i, j):
+    return a[i].code == a[j].code
+
+def unicode_lt_usecase(a, i, j):
+    return a[i].code < a[j].code
+
+def len_usecase(a, i):
+    return len(a[i].sym)
+
+def unicode_len_usecase(a, i):
+    return len(a[i].code)
+
+def startswith_usecase(a, i):
+    return a[i].sym.startswith(PREFIX)
+
+def unicode_startswith_usecase(a, i):
+    return a[i].code.startswith(UPREFIX)
+
+def slice_usecase(a, i, start, stop, step):
+    return a[i].sym[start:stop:step]
+
+def slice_tail_usecase(a, i):
+    return a[i].sym[-2:]
+
+def hash_usecase(a, i):
+    return hash(a[i].sym)
+
+def count_matching_usecase(a, i):
+    # A typical group-by kernel: count the rows sharing a row's key
+    key = a[i].sym
+    h = hash(key)
+    n = 0
+    for j in range(a.shape[0]):
+        if hash(a[j].sym) == h and a[j].sym == key:
+            n += 1
+    return n
+
+
+class TestCharSeq(TestCase):
+
+    def setUp(self):
+        self.arr = np.zeros(6, dtype=recordwithstrings)
+        self.arr['sym'] = [b'ABC', b'ABCDEF', b'AB', b'', b'XYZ', b'ABC']
+        self.arr['code'] = [u'x\xe9', u'x\xe9z', u'', u'xy', u'\u4e2d', u'x\xe9']
+        # Python functions need attribute access to the fields
+        self.rec = self.arr.view(np.recarray)
+
+    def check_binary(self, pyfunc, field):
+        cfunc = njit(pyfunc)
+        n = len(self.arr)
+        for i, j in itertools.product(range(n), range(n)):
+            expected = pyfunc(self.rec, i, j)
+            got = cfunc(self.arr, i, j)
+            self.assertPreciseEqual(got, expected,
+                                    msg="%r, %r" % (self.arr[i][field],
+                                                    self.arr[j][field]))
+
+    def check_unary(self, pyfunc):
+        cfunc = njit(pyfunc)
+        for i in range(len(self.arr)):
+            self.assertPreciseEqual(cfunc(self.arr, i), pyfunc(self.rec, i))
+
+    def test_compare(self):
+        for pyfunc in (eq_usecase, ne_usecase, lt_usecase, le_usecase,
+                       gt_usecase, ge_usecase):
+            self.check_binary(pyfunc, 'sym')
+
+    def test_unicode_compare(self):
+        for pyfunc in (unicode_eq_usecase, unicode_lt_usecase):
+            self.check_binary(pyfunc, 'code')
+
+    def test_compare_different_widths(self):
+        @njit
+        def cfunc(a, i, s):
+            return a[i].sym == s, a[i].sym < s
+
+        for i in range(len(self.arr)):
+            for s in (b'ABC', b'AB', b'ZZ', b''):
+                sym = self.rec[i].sym
+                self.assertEqual(cfunc(self.arr, i, np.bytes_(s)),
+                                 (sym == s, sym < s))
+
+    def test_len(self):
+        self.check_unary(len_usecase)
+        self.check_unary(unicode_len_usecase)
+
+    def test_startswith(self):
+        self.check_unary(startswith_usecase)
+        self.check_unary(unicode_startswith_usecase)
+
+    def test_slice(self):
+        cfunc = njit(slice_usecase)
+        starts = stops = (-10, -1, 0, 1, 3, 10)
+        for i in range(len(self.arr)):
+            for start, stop, step in itertools.product(starts, stops,
+                                                       (1, 2, -1, -2)):
+                expected = slice_usecase(self.rec, i, start, stop, step)
+                got = cfunc(self.arr, i, start, stop, step)
+                self.assertEqual(got, expected)
+        self.check_unary(slice_tail_usecase)
+
+    def test_hash(self):
+        cfunc = njit(hash_usecase)
+        hashes = [cfunc(self.arr, i) for i in range(len(self.arr))]
+        # Equal strings hash equally, the others (here) don't collide
+        self.assertEqual(hashes[0], hashes[5])
+        self.assertEqual(len(set(hashes)), len(self.arr) - 1)
+
+        @njit
+        def hash_const():
+            return hash(PREFIX)
+        self.assertEqual(hash_const(), cfunc(self.arr, 2))
+
+    def test_group_by(self):
+        self.check_unary(count_matching_usecase)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -96,6 +96,19 @@ class JITCPUCodegenTestCase(TestCase):
         cfunc = ctypes_sum_ty(ptr)
         self.assertEqual(cfunc(2, 3), 5)
 
+    def test_finalize_in_stages(self):
+        # The stages of finalize() can be run separately
+        library = self.compile_module(asm_sum_outer, asm_sum_inner)
+        with self.assertRaises(RuntimeError):
+            library.optimize()
+        library.link()
+        library.optimize()
+        library.finalize()
+        cfunc = ctypes_sum_ty(library.get_pointer_to_function("sum"))
+        self.assertEqual(cfunc(2, 3), 5)
+        with self.assertRaises(RuntimeError):
+            library.optimize()
+
     def test_magic_tuple(self):
         tup = self.codegen.magic_tuple()
         pickle.dumps(tup)
@@ -15,7 +15,7 @@ import numpy as np
 from numba import unittest_support as unittest
 from numba import utils, vectorize, jit
 from numba.config import NumbaWarning
-from .support import TestCase
+from .support import TestCase, override_config
 
 
 def dummy(x):
@@ -380,6 +380,104 @@ class TestDispatcherMethods(TestCase):
         self.assertEqual(exp_f, got_f)
 
 
+def big_callee(arr):
+    s = 0.0
+    for i in range(arr.size):
+        x = arr[i]
+        if x > 0.5:
+            s += x * x - 1.0
+        elif x < -0.5:
+            s -= x / 2.0 + 3.0
+        else:
+            s += abs(x) ** 2
+    return s
+
+def small_callee(x):
+    return x + 1
+
+def link_caller(arr, x):
+    return big_callee_jit(arr) + small_callee_jit(x)
+
+
+class TestTieredCompilation(TestCase):
+
+    def test_tiered(self):
+        @jit(nopython=True, tiered=True)
+        def foo(x):
+            return x + 1
+
+        self.assertPreciseEqual(foo(1), 2)
+        [sig] = foo.signatures
+        quick = foo.overloads[sig]
+        foo.wait_for_optimized()
+        # The quick version was replaced
+        self.assertEqual(foo.signatures, [sig])
+        self.assertIsNot(foo.overloads[sig], quick)
+        self.assertPreciseEqual(foo(1), 2)
+        self.assertPreciseEqual(foo(1.5), 2.5)
+        foo.wait_for_optimized()
+        self.assertEqual(len(foo.signatures), 2)
+
+        # Callers use the optimized version
+        @jit(nopython=True)
+        def bar(x):
+            return foo(x) * 2
+
+        self.assertPreciseEqual(bar(1), 4)
+
+    def test_explicit_opt(self):
+        # No tiered compilation if the optimization level is given
+        @jit(nopython=True, tiered=True, opt=2)
+        def foo(x):
+            return x + 1
+
+        self.assertPreciseEqual(foo(1), 2)
+        [sig] = foo.signatures
+        entry_point = foo.overloads[sig]
+        foo.wait_for_optimized()
+        self.assertIs(foo.overloads[sig], entry_point)
+
+
+class TestLinkBySymbol(TestCase):
+    """
+    Test calling other compiled functions with NUMBA_LINK_BY_SYMBOL.
+    """
+
+    def compile_caller(self):
+        global big_callee_jit, small_callee_jit
+        big_callee_jit = jit(nopython=True)(big_callee)
+        small_callee_jit = jit(nopython=True)(small_callee)
+        return jit(nopython=True)(link_caller)
+
+    def mangled_name(self, dispatcher):
+        [cres] = dispatcher.overloads.values()
+        return cres.fndesc.mangled_name
+
+    def test_link_by_symbol(self):
+        arr = np.linspace(-1, 1, 11)
+        with override_config('LINK_BY_SYMBOL', 1):
+            cfunc = self.compile_caller()
+            self.assertPreciseEqual(cfunc(arr, 2), link_caller(arr, 2))
+        [cres] = cfunc.overloads.values()
+        self.assertTrue(cres.library.links_by_symbol)
+        llvm_ir = cfunc.inspect_llvm(cfunc.signatures[0])
+        # The big callee is only declared...
+        big_name = self.mangled_name(big_callee_jit)
+        declared = [line for line in llvm_ir.splitlines()
+                    if line.startswith('declare') and big_name in line]
+        self.assertEqual(len(declared), 1)
+        # ... while the small callee is linked, and inlined.
+        small_name = self.mangled_name(small_callee_jit)
+        self.assertNotIn(small_name, llvm_ir)
+
+    def test_link_as_ir(self):
+        arr = np.linspace(-1, 1, 11)
+        cfunc = self.compile_caller()
+        self.assertPreciseEqual(cfunc(arr, 2), link_caller(arr, 2))
+        [cres] = cfunc.overloads.values()
+        self.assertFalse(cres.library.links_by_symbol)
+
+
 class TestCache(TestCase):
 
     here = os.path.dirname(__file__)
@@ -508,6 +606,60 @@ class TestCache(TestCase):
         # Check the code runs ok from another process
         self.run_in_separate_process()
 
+    def test_multi_isa(self):
+        # Populate the cache with code compiled for a generic CPU
+        code = """if 1:
+            import sys
+
+            sys.path.insert(0, %(tempdir)r)
+            mod = __import__(%(modname)r)
+            assert mod.add_usecase(2, 3) == 6
+            """ % dict(tempdir=self.tempdir, modname=self.modname)
+        env = os.environ.copy()
+        env['NUMBA_CPU_NAME'] = 'generic'
+        env.pop('NUMBA_CPU_FEATURES', None)
+        subprocess.check_call([sys.executable, "-c", code], env=env)
+        self.check_cache(2)  # 1 index, 1 data
+
+        # The generic version can be loaded on this host
+        with override_config('CACHE_MULTI_ISA', 1):
+            mod = self.import_module()
+            f = mod.add_usecase
+            self.assertPreciseEqual(f(2, 3), 6)
+        self.check_cache(2)
+        # Without the option, a version is compiled for this host
+        mod = self.import_module()
+        f = mod.add_usecase
+        self.assertPreciseEqual(f(2, 3), 6)
+        self.check_cache(3)
+
+    def test_compatible_magic(self):
+        from numba import _helperlib
+        from numba.targets.registry import CPUTarget
+        import llvmlite.binding as ll
+
+        codegen = CPUTarget.target_context.jit_codegen()
+        triple = codegen.magic_tuple()[0]
+        host_isa = tuple(sorted(_helperlib.get_cpu_features()))
+        host_cpu = ll.get_host_cpu_name()
+        # Portable code for the generic CPU model
+        self.assertTrue(codegen.is_compatible_magic(
+            (triple, 'generic', '', ())))
+        self.assertTrue(codegen.is_compatible_magic(
+            (triple, 'generic', ','.join('+' + f for f in host_isa),
+             host_isa)))
+        self.assertFalse(codegen.is_compatible_magic(
+            ('other-triple', 'generic', '', ())))
+        self.assertFalse(codegen.is_compatible_magic(
+            (triple, 'generic', '+unknown', ('unknown',))))
+        # Code for a given CPU model only runs on that model
+        self.assertTrue(codegen.is_compatible_magic(
+            (triple, host_cpu, '', None)))
+        self.assertFalse(codegen.is_compatible_magic(
+            (triple, host_cpu, '+avx512vbmi', None)))
+        self.assertFalse(codegen.is_compatible_magic(
+            (triple, 'other-cpu', '', None)))
+
     def test_inner_then_outer(self):
         # Caching inner then outer function is ok
         mod = self.import_module()
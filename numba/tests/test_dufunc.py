@@ -79,5 +79,38 @@ class TestDUFunc(MemoryLeakMixin, unittest.TestCase):
         self.assertEqual(duadd.ntypes, 1)
         self.assertEqual(duadd.ntypes, len(duadd.types))
 
+    def test_reduce(self):
+        duadd = dufunc.DUFunc(pyuadd, nopython=True, identity=0)
+        for a in (np.arange(10.), np.arange(10, dtype=np.int64)[::-2]):
+            got = duadd.reduce(a)
+            expected = np.add.reduce(a, dtype=a.dtype)
+            self.assertEqual(got, expected)
+            self.assertEqual(type(got), type(expected))
+        a = np.arange(12).reshape(3, 4)
+        self.assertEqual(duadd.reduce(a, axis=None), a.sum())
+        # Handled by NumPy
+        np.testing.assert_array_equal(duadd.reduce(a), a.sum(axis=0))
+        np.testing.assert_array_equal(duadd.reduce(a, axis=1), a.sum(axis=1))
+        self.assertEqual(duadd.reduce(np.arange(0.)), 0.)
+
+    def test_accumulate(self):
+        duadd = dufunc.DUFunc(pyuadd, nopython=True, identity=0)
+        for a in (np.arange(10.), np.arange(10, dtype=np.int64)[::-2]):
+            got = duadd.accumulate(a)
+            expected = np.add.accumulate(a, dtype=a.dtype)
+            np.testing.assert_array_equal(got, expected)
+            self.assertEqual(got.dtype, expected.dtype)
+        a = np.arange(12).reshape(3, 4)
+        np.testing.assert_array_equal(duadd.accumulate(a, axis=1),
+                                      a.cumsum(axis=1))
+
+    def test_reduce_without_identity(self):
+        # Reductions are left to NumPy, which only knows the loops
+        # compiled so far
+        duadd = dufunc.DUFunc(pyuadd, nopython=True)
+        a = np.arange(10.)
+        duadd(a, a)
+        self.assertEqual(duadd.reduce(a), a.sum())
+
 if __name__ == "__main__":
     unittest.main()
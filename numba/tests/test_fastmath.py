@@ -0,0 +1,78 @@
+"""
+Tests for the fastmath, opt and loop_vectorize options of @jit.
+"""
+
+from __future__ import division, absolute_import, print_function
+
+import math
+
+import numpy as np
+
+import numba.unittest_support as unittest
+from numba import njit
+from numba.compiler import Flags
+from .support import TestCase
+
+
+def array_sum(arr):
+    s = 0.0
+    for i in range(arr.size):
+        s += arr[i]
+    return s
+
+def poly(x, y):
+    return (x * y + 1.5) / (x - y) - math.sqrt(x)
+
+
+class TestFastMath(TestCase):
+
+    def test_fastmath(self):
+        arr = np.linspace(0, 1, 1001)
+        cfunc = njit(fastmath=True)(array_sum)
+        # The sum may be reassociated
+        self.assertAlmostEqual(cfunc(arr), array_sum(arr), places=10)
+        cfunc = njit(fastmath=True)(poly)
+        self.assertPreciseEqual(cfunc(4.0, 2.5), poly(4.0, 2.5),
+                                prec='double')
+
+    def test_fastmath_flags(self):
+        cfunc = njit("(float64, float64)", fastmath=True)(poly)
+        llvm_ir = cfunc.inspect_llvm(cfunc.signatures[0])
+        self.assertIn("fmul fast", llvm_ir)
+        self.assertIn("fdiv fast", llvm_ir)
+        # Without the option, no fast flags are emitted
+        cfunc = njit("(float64, float64)")(poly)
+        llvm_ir = cfunc.inspect_llvm(cfunc.signatures[0])
+        self.assertNotIn(" fast ", llvm_ir)
+
+    def test_opt_options(self):
+        arr = np.linspace(0, 1, 11)
+        for opt in range(4):
+            for loop_vectorize in (False, True):
+                cfunc = njit(opt=opt,
+                             loop_vectorize=loop_vectorize)(array_sum)
+                self.assertPreciseEqual(cfunc(arr), array_sum(arr))
+
+    def test_invalid_opt(self):
+        for opt in (-1, 4):
+            with self.assertRaises(ValueError) as raises:
+                njit(opt=opt)(array_sum).compile("(float64[:],)")
+            self.assertIn("opt must be between 0 and 3",
+                          str(raises.exception))
+
+    def test_flags_values(self):
+        flags = Flags()
+        self.assertIs(flags.opt, None)
+        other = flags.copy()
+        other.set_value('opt', 1)
+        self.assertEqual(other.opt, 1)
+        self.assertIs(flags.opt, None)
+        self.assertNotEqual(flags, other)
+        self.assertEqual(other, other.copy())
+        self.assertEqual(hash(other), hash(other.copy()))
+        with self.assertRaises(NameError):
+            flags.set_value('foo', 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+"""
+Tests for first-class functions (dispatchers passed as arguments).
+"""
+
+from __future__ import division, absolute_import, print_function
+
+import numpy as np
+
+import numba.unittest_support as unittest
+from numba import njit, types
+from numba.errors import TypingError
+from numba.typing import typeof
+from .support import TestCase
+
+
+def apply(f, x):
+    return f(x)
+
+def apply_twice(f, x):
+    return f(f(x))
+
+def select(funcs, i, x):
+    return funcs[i](x)
+
+def apply_array(f, arr):
+    s = 0.0
+    for i in range(arr.size):
+        s += f(arr[i])
+    return s
+
+def square(x):
+    return x * x
+
+def cube(x):
+    return x * x * x
+
+def inverse(x):
+    return 1.0 / x
+
+def array_sum(arr):
+    return arr.sum()
+
+
+class TestFunctionType(TestCase):
+
+    def test_typeof(self):
+        f = njit("float64(float64)")(square)
+        ty = typeof.typeof(f, typeof.Purpose.argument)
+        self.assertEqual(ty, types.FunctionType(f.nopython_signatures))
+        # Dispatchers used as constants are resolved at compile time
+        self.assertIs(typeof.typeof(f, typeof.Purpose.constant), None)
+        # Without a specialization, the signatures are unknown
+        self.assertIs(typeof.typeof(njit(square), typeof.Purpose.argument),
+                      None)
+        g = njit(["float64(float64)", "int64(int64)"])(square)
+        ty = typeof.typeof(g, typeof.Purpose.argument)
+        self.assertEqual(ty.sigs, tuple(g.nopython_signatures))
+        self.assertEqual(len(ty.sigs), 2)
+
+    def test_shared_template(self):
+        # Equal types share the template their calls are resolved with
+        sigs = njit("float64(float64)")(square).nopython_signatures
+        self.assertIs(types.FunctionType(sigs).template,
+                      types.FunctionType(sigs).template)
+
+    def test_apply(self):
+        f = njit("float64(float64)")(square)
+        g = njit("float64(float64)")(cube)
+        cfunc = njit(apply)
+        self.assertPreciseEqual(cfunc(f, 3.0), 9.0)
+        self.assertPreciseEqual(cfunc(g, 3.0), 27.0)
+        # Both functions share a specialization
+        self.assertEqual(len(cfunc.overloads), 1)
+        self.assertPreciseEqual(njit(apply_twice)(g, 2.0), 512.0)
+
+    def test_argument_conversion(self):
+        f = njit("float64(float64)")(square)
+        self.assertPreciseEqual(njit(apply)(f, 3), 9.0)
+
+    def test_lazy_function(self):
+        # A function compiled once, lazily, can be passed too
+        f = njit(cube)
+        f(2)
+        self.assertPreciseEqual(njit(apply)(f, 3), 27)
+
+    def test_tuple_of_functions(self):
+        funcs = (njit("float64(float64)")(square),
+                 njit("float64(float64)")(cube),
+                 njit("float64(float64)")(inverse))
+        cfunc = njit(select)
+        for i, expected in enumerate([4.0, 8.0, 0.5]):
+            self.assertPreciseEqual(cfunc(funcs, i, 2.0), expected)
+
+    def test_arrays(self):
+        f = njit("float64(float64)")(square)
+        arr = np.arange(5.0)
+        self.assertPreciseEqual(njit(apply_array)(f, arr), 30.0)
+        g = njit("float64(float64[:])")(array_sum)
+        self.assertPreciseEqual(njit(apply)(g, arr), 10.0)
+
+    def test_exception(self):
+        f = njit("float64(float64)")(inverse)
+        with self.assertRaises(ZeroDivisionError):
+            njit(apply)(f, 0.0)
+
+    def test_several_signatures(self):
+        f = njit(["int64(int64)", "float64(float64)"])(square)
+        cfunc = njit(apply)
+        # Each call is resolved to the matching specialization
+        self.assertPreciseEqual(cfunc(f, 3), 9)
+        self.assertPreciseEqual(cfunc(f, 1.5), 2.25)
+        # The entry points are computed once
+        entries = f._native_entries
+        self.assertEqual(len(entries), 4)
+        self.assertIs(f._native_entries, entries)
+        # ... until the function is specialized again
+        f.compile("complex128(complex128)")
+        self.assertEqual(len(f._native_entries), 6)
+        self.assertPreciseEqual(cfunc(f, 1j), -1 + 0j)
+
+    def test_unknown_signature(self):
+        with self.assertRaises(TypingError):
+            njit(apply)(njit(square), 2.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
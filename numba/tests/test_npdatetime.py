@@ -67,6 +67,26 @@ def abs_usecase(x):
     return abs(x)
 
 
+def fields_usecase(x):
+    return (npdatetime.year(x), npdatetime.month(x), npdatetime.day(x),
+            npdatetime.weekday(x), npdatetime.hour(x), npdatetime.minute(x),
+            npdatetime.second(x))
+
+def floor_usecase(x, freq):
+    return npdatetime.floor(x, freq)
+
+def ceil_usecase(x, freq):
+    return npdatetime.ceil(x, freq)
+
+def hourly_counts_usecase(arr):
+    # Bucket timestamps by hour of the day
+    counts = np.zeros(24, np.int64)
+    for i in range(arr.shape[0]):
+        h = npdatetime.hour(arr[i])
+        if h >= 0:
+            counts[h] += 1
+    return counts
+
 def make_add_constant(const):
     def add_constant(x):
         return x + const
@@ -694,6 +714,99 @@ class TestDatetimeArithmeticNoPython(TestDatetimeArithmetic):
     jitargs = dict(nopython=True)
 
 
+@skip_on_numpy_16
+class TestDatetimeFields(TestCase):
+    """
+    Test calendar field extraction and rounding of datetime64 values.
+    """
+
+    def sample_values(self, unit):
+        dates = np.array(['1600-02-29T23:59:59', '1969-12-31T23:59:59',
+                          '1970-01-01T00:00:00', '2000-02-29T12:34:56',
+                          '2016-03-01T01:02:03', '2100-12-31T13:00:01',
+                          'NaT'], dtype='M8[s]')
+        return dates.astype('M8[%s]' % unit)
+
+    def test_fields_python(self):
+        # Check the reference implementation against the datetime module
+        values = self.sample_values('us')
+        for v in values[:-1]:
+            d = v.item()
+            self.assertEqual(fields_usecase(v),
+                             (d.year, d.month, d.day, d.weekday(),
+                              d.hour, d.minute, d.second))
+        self.assertEqual(fields_usecase(values[-1]), (-1,) * 7)
+
+    def test_fields(self):
+        cfunc = jit(nopython=True)(fields_usecase)
+        for unit in ('Y', 'M', 'W', 'D', 'h', 'm', 's', 'ms', 'us', 'ns'):
+            for v in self.sample_values(unit):
+                expected = tuple(int(x) for x in fields_usecase(v))
+                self.assertEqual(cfunc(v), expected, (unit, v))
+
+    def test_fields_array(self):
+        cfunc = jit(nopython=True)(fields_usecase)
+        arr = self.sample_values('ns').reshape((7, 1))
+        for got, expected in zip(cfunc(arr), fields_usecase(arr)):
+            self.assertEqual(got.dtype, np.int64)
+            self.assertPreciseEqual(got, expected)
+
+    def test_unsupported_unit(self):
+        cfunc = jit(nopython=True)(fields_usecase)
+        with self.assertTypingError():
+            cfunc(DT(1, 'as'))
+
+    def check_rounding(self, pyfunc):
+        cfunc = jit(nopython=True)(pyfunc)
+        for unit, step, freq_unit in [('s', 15, 'm'), ('ns', 1, 'h'),
+                                      ('m', 1, 'D'), ('D', 1, 'W'),
+                                      ('M', 1, 'Y'), ('s', 10, 's')]:
+            values = self.sample_values(unit)
+            for freq in (TD(step, freq_unit), TD('NaT', freq_unit)):
+                for v in values:
+                    self.assertPreciseEqual(cfunc(v, freq), pyfunc(v, freq))
+                self.assertPreciseEqual(cfunc(values, freq),
+                                        pyfunc(values, freq))
+        with self.assertRaises(ValueError):
+            cfunc(DT(5, 's'), TD(0, 's'))
+
+    def check_invalid_rounding_step(self, pyfunc):
+        cfunc = jit(nopython=True)(pyfunc)
+        values = self.sample_values('s')
+        # The frequency is checked even for NaT values and empty arrays
+        for x in (DT('NaT', 's'), values[-1:], values[:0], values[::2]):
+            for freq in (TD(0, 's'), TD(-1, 'm')):
+                for func in (pyfunc, cfunc):
+                    with self.assertRaises(ValueError):
+                        func(x, freq)
+
+    def test_floor(self):
+        self.check_rounding(floor_usecase)
+
+    def test_ceil(self):
+        self.check_rounding(ceil_usecase)
+
+    def test_invalid_rounding_step(self):
+        self.check_invalid_rounding_step(floor_usecase)
+        self.check_invalid_rounding_step(ceil_usecase)
+
+    def test_rounding_non_contiguous(self):
+        cfunc = jit(nopython=True)(floor_usecase)
+        arr = self.sample_values('s')[::2]
+        freq = TD(15, 'm')
+        self.assertPreciseEqual(cfunc(arr, freq), floor_usecase(arr, freq))
+
+    def test_incompatible_rounding_units(self):
+        cfunc = jit(nopython=True)(floor_usecase)
+        with self.assertTypingError():
+            cfunc(DT(5, 'D'), TD(1, 'M'))
+
+    def test_hourly_counts(self):
+        cfunc = jit(nopython=True)(hourly_counts_usecase)
+        arr = np.arange(0, 10**6, 997).astype('M8[m]')
+        self.assertPreciseEqual(cfunc(arr), hourly_counts_usecase(arr))
+
+
 @skip_on_numpy_16
 class TestMetadataScalingFactor(TestCase):
     """
@@ -10,7 +10,7 @@ from numba import unittest_support as unittest
 from numba import njit
 from numba.runtime import rtsys
 from numba.config import PYVERSION
-from .support import MemoryLeakMixin
+from .support import MemoryLeakMixin, override_config, captured_stdout
 
 
 class Dummy(object):
@@ -275,5 +275,61 @@ class TestNRTIssue(MemoryLeakMixin, unittest.TestCase):
         np.testing.assert_almost_equal(expected, got)
 
 
+class TestAllocationProfiler(MemoryLeakMixin, unittest.TestCase):
+    """
+    Test the per-site allocation profiler (NUMBA_NRT_ALLOC_PROFILE).
+    """
+
+    def test_site_stats(self):
+        def alloc_arrays(n):
+            a = np.empty(n, dtype=np.int8)
+            b = np.empty(n * 2, dtype=np.int8)
+            return a.sum() + b.sum()
+
+        lineno = alloc_arrays.__code__.co_firstlineno
+        with override_config('NRT_ALLOC_PROFILE', 1):
+            cfunc = njit(alloc_arrays)
+            cfunc(10)
+        rtsys.reset_allocation_site_stats()
+        for _ in range(3):
+            cfunc(100)
+
+        stats = rtsys.get_allocation_site_stats(__file__)
+        sites = dict((st.lineno, st) for st in stats
+                     if st.funcname.endswith('alloc_arrays'))
+        site_a = sites[lineno + 1]
+        site_b = sites[lineno + 2]
+        self.assertEqual(site_a.count, 3)
+        self.assertEqual(site_a.bytes, 300)
+        self.assertEqual(site_a.live_bytes, 0)
+        self.assertEqual(site_a.peak_bytes, 100)
+        self.assertEqual(site_b.count, 3)
+        self.assertEqual(site_b.bytes, 600)
+        self.assertEqual(site_b.peak_bytes, 200)
+        # Sorted by decreasing number of bytes
+        self.assertLess(stats.index(site_b), stats.index(site_a))
+
+        with captured_stdout() as out:
+            cfunc.inspect_allocations()
+        self.assertIn("np.empty(n * 2, dtype=np.int8)", out.getvalue())
+
+    def test_live_bytes(self):
+        def alloc_array(n):
+            return np.empty(n, dtype=np.int8)
+
+        with override_config('NRT_ALLOC_PROFILE', 1):
+            cfunc = njit(alloc_array)
+            arr = cfunc(1000)
+        stats = [st for st in rtsys.get_allocation_site_stats(__file__)
+                 if st.funcname.endswith('alloc_array')]
+        self.assertEqual(len(stats), 1)
+        self.assertEqual(stats[0].live_bytes, 1000)
+        del arr
+        [st] = [st for st in rtsys.get_allocation_site_stats(__file__)
+                if st.funcname.endswith('alloc_array')]
+        self.assertEqual(st.live_bytes, 0)
+        self.assertEqual(st.peak_bytes, 1000)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -4,10 +4,16 @@ Tests issues or edge cases for producing invalid NRT refct
 
 from __future__ import division, absolute_import, print_function
 
+import re
+
+from llvmlite import ir
+
 import numba.unittest_support as unittest
 import numpy as np
 from numba import njit
 from numba.runtime import rtsys
+from numba.runtime.atomicops import incref_decref_ty
+from numba.runtime.refctopt import prune_refct_ops
 
 
 class TestNrtRefCt(unittest.TestCase):
@@ -53,6 +59,170 @@ class TestNrtRefCt(unittest.TestCase):
         self.assertEqual(cur_stats.alloc - init_stats.alloc, 1)
         self.assertEqual(cur_stats.free - init_stats.free, 1)
 
+    def test_nonatomic_refct(self):
+        def g(n):
+            x = np.zeros((n, 2))
+            for i in range(n):
+                y = x[i]
+                y[0] = i
+            return x
+
+        cfunc = njit(nonatomic_refct=True)(g)
+        init_stats = rtsys.get_allocation_stats()
+        res = cfunc(10)
+        np.testing.assert_equal(res, g(10))
+        del res
+        cur_stats = rtsys.get_allocation_stats()
+        self.assertEqual(cur_stats.alloc - init_stats.alloc, 1)
+        self.assertEqual(cur_stats.free - init_stats.free, 1)
+        [llvm_ir] = cfunc.inspect_llvm().values()
+        self.assertIn("NRT_decref_nonatomic", llvm_ir)
+
+
+class TestRefCtPruning(unittest.TestCase):
+    """
+    Test the pruning of refcount operations on llvmlite IR.
+    """
+
+    def make_function(self, nargs=1):
+        mod = ir.Module()
+        ptrty = incref_decref_ty.args[0]
+        fnty = ir.FunctionType(ir.VoidType(), [ptrty] * nargs)
+        fn = ir.Function(mod, fnty, name="foo")
+        incref = ir.Function(mod, incref_decref_ty, name="NRT_incref")
+        decref = ir.Function(mod, incref_decref_ty, name="NRT_decref")
+        opaque = ir.Function(mod, incref_decref_ty, name="opaque")
+        builder = ir.IRBuilder(fn.append_basic_block())
+        var = builder.alloca(ptrty)
+        builder.store(fn.args[0], var)
+        return mod, builder, var, incref, decref, opaque
+
+    def count_calls(self, mod, name):
+        # Depending on the llvmlite version, symbol names may be quoted
+        pat = r'call void @"?%s"?\(' % re.escape(name)
+        return len(re.findall(pat, str(mod)))
+
+    def test_prune_pair(self):
+        mod, builder, var, incref, decref, opaque = self.make_function()
+        builder.call(incref, [builder.load(var)])
+        builder.call(decref, [builder.load(var)])
+        builder.ret_void()
+        self.assertEqual(prune_refct_ops(mod), 1)
+        self.assertEqual(self.count_calls(mod, "NRT_incref"), 0)
+        self.assertEqual(self.count_calls(mod, "NRT_decref"), 0)
+
+    def test_no_prune_after_store(self):
+        mod, builder, var, incref, decref, opaque = self.make_function()
+        builder.call(incref, [builder.load(var)])
+        builder.store(ir.Constant(var.type.pointee, None), var)
+        builder.call(decref, [builder.load(var)])
+        builder.ret_void()
+        self.assertEqual(prune_refct_ops(mod), 0)
+
+    def test_no_prune_across_call(self):
+        mod, builder, var, incref, decref, opaque = self.make_function()
+        builder.call(incref, [builder.load(var)])
+        builder.call(opaque, [builder.load(var)])
+        builder.call(decref, [builder.load(var)])
+        builder.ret_void()
+        self.assertEqual(prune_refct_ops(mod), 0)
+        self.assertEqual(self.count_calls(mod, "NRT_incref"), 1)
+        self.assertEqual(self.count_calls(mod, "NRT_decref"), 1)
+
+    def test_prune_across_blocks(self):
+        mod, builder, var, incref, decref, opaque = self.make_function()
+        builder.call(incref, [builder.load(var)])
+        middle = builder.append_basic_block()
+        end = builder.append_basic_block()
+        builder.branch(middle)
+        builder.position_at_end(middle)
+        builder.branch(end)
+        builder.position_at_end(end)
+        builder.call(decref, [builder.load(var)])
+        builder.ret_void()
+        self.assertEqual(prune_refct_ops(mod), 1)
+        self.assertEqual(self.count_calls(mod, "NRT_incref"), 0)
+        self.assertEqual(self.count_calls(mod, "NRT_decref"), 0)
+
+    def test_no_prune_conditional(self):
+        # The decref only happens on one branch
+        mod, builder, var, incref, decref, opaque = self.make_function()
+        builder.call(incref, [builder.load(var)])
+        pred = builder.icmp_unsigned('==', builder.load(var),
+                                     ir.Constant(var.type.pointee, None))
+        with builder.if_then(pred):
+            builder.call(decref, [builder.load(var)])
+        builder.ret_void()
+        self.assertEqual(prune_refct_ops(mod), 0)
+
+    def test_no_prune_loop(self):
+        # The decref is executed more times than the incref
+        mod, builder, var, incref, decref, opaque = self.make_function()
+        builder.call(incref, [builder.load(var)])
+        loop = builder.append_basic_block()
+        end = builder.append_basic_block()
+        builder.branch(loop)
+        builder.position_at_end(loop)
+        builder.call(decref, [builder.load(var)])
+        pred = builder.icmp_unsigned('==', builder.load(var),
+                                     ir.Constant(var.type.pointee, None))
+        builder.cbranch(pred, loop, end)
+        builder.position_at_end(end)
+        builder.ret_void()
+        self.assertEqual(prune_refct_ops(mod), 0)
+
+    def test_no_prune_call_in_between_blocks(self):
+        mod, builder, var, incref, decref, opaque = self.make_function()
+        builder.call(incref, [builder.load(var)])
+        middle = builder.append_basic_block()
+        end = builder.append_basic_block()
+        builder.branch(middle)
+        builder.position_at_end(middle)
+        builder.call(opaque, [builder.load(var)])
+        builder.branch(end)
+        builder.position_at_end(end)
+        builder.call(decref, [builder.load(var)])
+        builder.ret_void()
+        self.assertEqual(prune_refct_ops(mod), 0)
+
+    def test_no_prune_across_alias_decref(self):
+        # The second argument may be the same meminfo as the first one,
+        # and be freed by the decref in-between
+        mod, builder, var, incref, decref, opaque = self.make_function(2)
+        other = builder.function.args[1]
+        builder.call(incref, [builder.load(var)])
+        builder.call(decref, [other])
+        builder.call(decref, [builder.load(var)])
+        builder.ret_void()
+        self.assertEqual(prune_refct_ops(mod), 0)
+        self.assertEqual(self.count_calls(mod, "NRT_incref"), 1)
+        self.assertEqual(self.count_calls(mod, "NRT_decref"), 2)
+
+    def test_no_prune_alias_decref_in_between_blocks(self):
+        mod, builder, var, incref, decref, opaque = self.make_function(2)
+        other = builder.function.args[1]
+        builder.call(incref, [builder.load(var)])
+        middle = builder.append_basic_block()
+        end = builder.append_basic_block()
+        builder.branch(middle)
+        builder.position_at_end(middle)
+        builder.call(decref, [other])
+        builder.branch(end)
+        builder.position_at_end(end)
+        builder.call(decref, [builder.load(var)])
+        builder.ret_void()
+        self.assertEqual(prune_refct_ops(mod), 0)
+
+    def test_prune_nested_pairs(self):
+        mod, builder, var, incref, decref, opaque = self.make_function(2)
+        other = builder.function.args[1]
+        builder.call(incref, [builder.load(var)])
+        builder.call(incref, [other])
+        builder.call(decref, [other])
+        builder.call(decref, [builder.load(var)])
+        builder.ret_void()
+        self.assertEqual(prune_refct_ops(mod), 2)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,211 @@
+from __future__ import print_function, division, absolute_import
+
+import threading
+import warnings
+
+import numpy as np
+
+import numba.unittest_support as unittest
+from numba import jit, prange
+from numba.config import NumbaWarning
+from .support import TestCase, MemoryLeakMixin
+
+
+def scale_usecase(a, out):
+    for i in prange(a.shape[0]):
+        out[i] = a[i] * 2
+
+
+def rows_usecase(a, out):
+    n, m = a.shape
+    for i in prange(1, n - 1):
+        s = 0.0
+        for j in range(m):
+            s += a[i - 1, j] + a[i + 1, j]
+        out[i] = s
+
+
+def step_usecase(out, start, stop, step):
+    for i in prange(start, stop, step):
+        out[i] = i
+
+
+def sum_usecase(a):
+    s = 0
+    for i in prange(a.shape[0]):
+        s += a[i]
+    return s
+
+
+sum_jitted = jit(nopython=True)(sum_usecase)
+
+
+def nested_usecase(a, out):
+    for i in prange(a.shape[0]):
+        out[i] = sum_jitted(a[i])
+
+
+def reductions_usecase(a):
+    s = 10.0
+    p = 1
+    for i in prange(a.shape[0]):
+        s -= a[i]
+        p = p * (i % 3 + 1)
+    return s, p
+
+
+def carried_usecase(a):
+    prev = 0.0
+    for i in prange(a.shape[0]):
+        a[i] += prev
+        prev = a[i]
+    return prev
+
+
+def break_usecase(a):
+    for i in prange(a.shape[0]):
+        if a[i] < 0:
+            break
+        a[i] = 1
+
+
+def raise_usecase(a):
+    for i in prange(a.shape[0]):
+        if a[i] < 0:
+            raise ValueError("negative value")
+        a[i] *= 2
+
+
+class TestPrange(MemoryLeakMixin, TestCase):
+
+    def check_no_warnings(self, cfunc, *args):
+        with warnings.catch_warnings(record=True) as w:
+            warnings.simplefilter('always', NumbaWarning)
+            res = cfunc(*args)
+        self.assertEqual([str(x.message) for x in w], [])
+        return res
+
+    def check_serial_warning(self, cfunc, args, reason):
+        with warnings.catch_warnings(record=True) as w:
+            warnings.simplefilter('always', NumbaWarning)
+            res = cfunc(*args)
+        self.assertEqual(len(w), 1)
+        self.assertEqual(str(w[0].message),
+                         "prange() loop will run serially: %s" % reason)
+        return res
+
+    def test_prange_is_range(self):
+        self.assertEqual(list(prange(2, 10, 3)), list(range(2, 10, 3)))
+
+    def test_elementwise(self):
+        cfunc = jit(nopython=True)(scale_usecase)
+        for n in (0, 1, 7, 1001):
+            a = np.arange(n, dtype=np.float64)
+            out = np.zeros_like(a)
+            self.check_no_warnings(cfunc, a, out)
+            self.assertPreciseEqual(out, a * 2)
+
+    def test_shared_and_private_variables(self):
+        cfunc = jit(nopython=True)(rows_usecase)
+        a = np.arange(60, dtype=np.float64).reshape(12, 5)
+        expected = np.zeros(12)
+        got = np.zeros(12)
+        rows_usecase(a, expected)
+        self.check_no_warnings(cfunc, a, got)
+        self.assertPreciseEqual(got, expected)
+
+    def test_step(self):
+        cfunc = jit(nopython=True)(step_usecase)
+        for args in [(1, 50, 3), (49, 2, -5), (3, 3, 1), (10, 2, 1)]:
+            expected = np.zeros(50, dtype=np.intp)
+            got = np.zeros(50, dtype=np.intp)
+            step_usecase(expected, *args)
+            cfunc(got, *args)
+            self.assertPreciseEqual(got, expected)
+
+    def test_sum_reduction(self):
+        cfunc = jit(nopython=True)(sum_usecase)
+        for n in (0, 1, 5, 1000):
+            a = np.arange(n, dtype=np.int64)
+            self.assertPreciseEqual(self.check_no_warnings(cfunc, a),
+                                    sum_usecase(a))
+
+    def test_other_reductions(self):
+        cfunc = jit(nopython=True)(reductions_usecase)
+        a = np.arange(30, dtype=np.float64)
+        self.assertPreciseEqual(self.check_no_warnings(cfunc, a),
+                                reductions_usecase(a))
+
+    def test_nested_parallel_calls(self):
+        # A prange() loop calling a function with a prange() loop
+        cfunc = jit(nopython=True)(nested_usecase)
+        a = np.arange(2000, dtype=np.int64).reshape(40, 50)
+        out = np.zeros(40, dtype=np.int64)
+        self.check_no_warnings(cfunc, a, out)
+        self.assertPreciseEqual(out, a.sum(axis=1))
+
+    def test_concurrent_callers(self):
+        cfunc = jit(nopython=True, nogil=True)(sum_usecase)
+        a = np.arange(10**5, dtype=np.int64)
+        expected = a.sum()
+        results = []
+
+        def run():
+            results.extend(cfunc(a) for i in range(20))
+
+        threads = [threading.Thread(target=run) for i in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(results, [expected] * 80)
+
+    def test_num_threads(self):
+        # The chunks are split according to the current number of threads
+        from numba import set_num_threads
+        from numba.npyufunc.parallel import NUM_THREADS
+
+        cfunc = jit(nopython=True)(sum_usecase)
+        a = np.arange(1000, dtype=np.int64)
+        try:
+            for n in sorted(set([1, NUM_THREADS])):
+                set_num_threads(n)
+                self.assertPreciseEqual(cfunc(a), sum_usecase(a))
+        finally:
+            set_num_threads(NUM_THREADS)
+        # Nothing specific to this process is embedded in the code, so
+        # that it can be cached
+        [cres] = cfunc._compileinfos.values()
+        self.assertFalse(cres.has_dynamic_globals)
+
+    def test_carried_variable(self):
+        cfunc = jit(nopython=True)(carried_usecase)
+        a = np.arange(10, dtype=np.float64)
+        b = a.copy()
+        expected = carried_usecase(a)
+        got = self.check_serial_warning(
+            cfunc, (b,), "variable 'prev' is carried across iterations")
+        self.assertPreciseEqual(got, expected)
+        self.assertPreciseEqual(b, a)
+
+    def test_break(self):
+        cfunc = jit(nopython=True)(break_usecase)
+        a = np.array([3.0, 2.0, -1.0, 5.0])
+        b = a.copy()
+        break_usecase(a)
+        self.check_serial_warning(cfunc, (b,), "the loop has several exits")
+        self.assertPreciseEqual(b, a)
+
+    def test_exception(self):
+        cfunc = jit(nopython=True)(raise_usecase)
+        a = np.ones(100)
+        cfunc(a)
+        self.assertPreciseEqual(a, np.ones(100) * 2)
+        a[77] = -1
+        with self.assertRaises(ValueError) as raises:
+            cfunc(a)
+        self.assertEqual(str(raises.exception), "negative value")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,14 +1,39 @@
 from __future__ import print_function
 import os
+import platform
+import shutil
 import tempfile
 import sys
 from ctypes import *
-from numba import unittest_support as unittest
-from numba.pycc import find_shared_ending, main
+from types import ModuleType
+
+import numpy as np
+
+from numba import _helperlib, config, unittest_support as unittest
+from numba.pycc import find_shared_ending, isa, main
+from numba.pycc.cache import ObjectCache, function_fingerprint
+from numba.pycc.decorators import ExportEntry
 
 base_path = os.path.dirname(os.path.abspath(__file__))
 
 
+def callee(x):
+    return x + 1
+
+def caller(x):
+    return callee(x) * 2
+
+def other_callee(x):
+    return x - 1
+
+consts = ModuleType('consts')
+consts.FACTOR = 2
+consts.callee = callee
+
+def module_caller(x):
+    return consts.callee(x) * consts.FACTOR
+
+
 def unset_macosx_deployment_target():
     """Unset MACOSX_DEPLOYMENT_TARGET because we are not building portable
     libraries
@@ -82,11 +107,219 @@ class TestPYCC(unittest.TestCase):
 
                 res = lib.multf(987, 321)
                 assert res == 987 * 321
+
+                # Arrays allocated by the embedded NRT
+                res = lib.halves(5)
+                self.assertIsInstance(res, np.ndarray)
+                self.assertEqual(res.dtype, np.float64)
+                self.assertEqual(list(res), [0.0, 0.5, 1.0, 1.5, 2.0])
+                self.assertEqual(len(lib.halves(0)), 0)
             finally:
                 del lib
         finally:
             sys.path.remove(tmpdir)
 
+    @unittest.skipUnless(platform.machine() in ('x86_64', 'AMD64', 'i386',
+                                                'i686'),
+                         "instruction set variants are x86-specific")
+    def test_pycc_isa_variants(self):
+        """
+        Test a C shared library compiled by pycc for several instruction
+        set variants, forcing the selection of each variant in turn.
+        """
+        unset_macosx_deployment_target()
+
+        modulename = os.path.join(base_path, 'compile_with_pycc')
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        out_modulename = os.path.join(tmpdir, 'isa_variants'
+                                      + find_shared_ending())
+
+        main(args=['--isa', 'sse4.2,avx,avx2', '-o', out_modulename,
+                   modulename + '.py'])
+
+        host_features = set(_helperlib.get_cpu_features())
+        old_env = os.environ.get(isa.ISA_ENVVAR)
+
+        def _restore_env():
+            if old_env is None:
+                os.environ.pop(isa.ISA_ENVVAR, None)
+            else:
+                os.environ[isa.ISA_ENVVAR] = old_env
+        self.addCleanup(_restore_env)
+
+        for variant, (_, needed) in isa.isa_variants.items():
+            if set(needed) <= host_features:
+                expected = variant
+            else:
+                expected = isa.BASELINE
+            # The variant is selected when the library is loaded, so
+            # load a distinct copy each time
+            path = os.path.join(tmpdir, 'isa_%s%s' % (variant,
+                                                      find_shared_ending()))
+            shutil.copy(out_modulename, path)
+            os.environ[isa.ISA_ENVVAR] = variant
+            lib = CDLL(path)
+            lib.isa_variants_get_isa.restype = c_char_p
+            self.assertEqual(lib.isa_variants_get_isa().decode(), expected)
+
+            lib.mult.argtypes = [POINTER(c_double), c_void_p, c_void_p,
+                                 c_double, c_double]
+            lib.mult.restype = c_int
+            res = c_double()
+            lib.mult(byref(res), None, None, 123, 321)
+            self.assertEqual(res.value, 123 * 321)
+
+            lib.multi.argtypes = [POINTER(c_int), c_void_p, c_void_p,
+                                  c_int, c_int]
+            lib.multi.restype = c_int
+            res = c_int()
+            lib.multi(byref(res), None, None, 987, 321)
+            self.assertEqual(res.value, 987 * 321)
+
+    def test_pycc_object_cache(self):
+        """
+        Test compiling a C shared library in parallel processes, with
+        an object cache.
+        """
+        unset_macosx_deployment_target()
+
+        modulename = os.path.join(base_path, 'compile_with_pycc')
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        cache_dir = os.path.join(tmpdir, 'cache')
+
+        def build(name):
+            out_modulename = os.path.join(tmpdir, name + find_shared_ending())
+            main(args=['-j', '2', '--cache-dir', cache_dir,
+                       '-o', out_modulename, modulename + '.py'])
+            lib = CDLL(out_modulename)
+            lib.mult.argtypes = [POINTER(c_double), c_void_p, c_void_p,
+                                 c_double, c_double]
+            lib.mult.restype = c_int
+            res = c_double()
+            lib.mult(byref(res), None, None, 123, 321)
+            self.assertEqual(res.value, 123 * 321)
+
+        build('cached1')
+        # One object per exported function
+        objects = sorted(os.listdir(cache_dir))
+        self.assertEqual(len(objects), 4)
+        stamps = [os.stat(os.path.join(cache_dir, obj)).st_mtime
+                  for obj in objects]
+        # The second build only uses the cached objects
+        build('cached2')
+        self.assertEqual(sorted(os.listdir(cache_dir)), objects)
+        self.assertEqual([os.stat(os.path.join(cache_dir, obj)).st_mtime
+                          for obj in objects], stamps)
+
+    def test_pycc_repeated_builds(self):
+        """
+        Test compiling a C shared library several times in the same
+        process, serially then in parallel processes.
+        """
+        unset_macosx_deployment_target()
+
+        modulename = os.path.join(base_path, 'compile_with_pycc')
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+
+        for i, jobs in enumerate([1, 1, 2]):
+            out_modulename = os.path.join(tmpdir, 'repeated%d%s'
+                                          % (i, find_shared_ending()))
+            main(args=['-j', str(jobs), '-o', out_modulename,
+                       modulename + '.py'])
+            lib = CDLL(out_modulename)
+            lib.mult.argtypes = [POINTER(c_double), c_void_p, c_void_p,
+                                 c_double, c_double]
+            lib.mult.restype = c_int
+            res = c_double()
+            lib.mult(byref(res), None, None, 123, 321)
+            self.assertEqual(res.value, 123 * 321)
+
+            lib.multi.argtypes = [POINTER(c_int), c_void_p, c_void_p,
+                                  c_int, c_int]
+            lib.multi.restype = c_int
+            res = c_int()
+            lib.multi(byref(res), None, None, 987, 321)
+            self.assertEqual(res.value, 987 * 321)
+
+    def test_pycc_object_without_relocatable_linker(self):
+        """
+        Test creating a single object file using pycc, when the object
+        files can't be combined.
+        """
+        from numba.pycc import compiler
+
+        modulename = os.path.join(base_path, 'compile_with_pycc')
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        output = os.path.join(tmpdir, 'single.o')
+
+        old_configs = compiler._relocatable_configs
+        compiler._relocatable_configs = {'default': None}
+        try:
+            main(args=['-c', '-o', output, modulename + '.py'])
+        finally:
+            compiler._relocatable_configs = old_configs
+        # Only the compiled code was written, no C sources were compiled
+        self.assertEqual(os.listdir(tmpdir), ['single.o'])
+        with open(output, 'rb') as f:
+            self.assertTrue(f.read(4) in (b'\x7fELF', b'\xcf\xfa\xed\xfe'))
+
+    def test_function_fingerprint(self):
+        """
+        The fingerprint of a function depends on the code of the functions
+        it calls.
+        """
+        fingerprint = function_fingerprint(caller)
+        self.assertEqual(function_fingerprint(caller), fingerprint)
+        self.assertNotEqual(function_fingerprint(callee), fingerprint)
+        old_code = callee.__code__
+        callee.__code__ = other_callee.__code__
+        try:
+            self.assertNotEqual(function_fingerprint(caller), fingerprint)
+        finally:
+            callee.__code__ = old_code
+        self.assertEqual(function_fingerprint(caller), fingerprint)
+
+    def test_function_fingerprint_module_attributes(self):
+        """
+        The fingerprint of a function depends on the values it references
+        as attributes of a module.
+        """
+        fingerprint = function_fingerprint(module_caller)
+        consts.FACTOR = 3
+        try:
+            self.assertNotEqual(function_fingerprint(module_caller),
+                                fingerprint)
+        finally:
+            consts.FACTOR = 2
+        consts.callee = other_callee
+        try:
+            self.assertNotEqual(function_fingerprint(module_caller),
+                                fingerprint)
+        finally:
+            consts.callee = callee
+        self.assertEqual(function_fingerprint(module_caller), fingerprint)
+
+    def test_object_cache_key(self):
+        """
+        The cache key depends on the configuration affecting code
+        generation.
+        """
+        cache = ObjectCache(tempfile.gettempdir())
+        entry = ExportEntry('caller', 'int64(int64)', caller, None)
+        key = cache.make_key(entry, 'mod')
+        self.assertEqual(cache.make_key(entry, 'mod'), key)
+        self.assertNotEqual(cache.make_key(entry, 'other'), key)
+        old_opt = config.OPT
+        config.OPT = 0 if old_opt else 3
+        try:
+            self.assertNotEqual(cache.make_key(entry, 'mod'), key)
+        finally:
+            config.OPT = old_opt
+
     def test_pycc_bitcode(self):
         """
         Test creating a LLVM bitcode file using pycc.
@@ -2,13 +2,18 @@ from __future__ import print_function, division, absolute_import
 
 import os, sys, subprocess
 import itertools
+import math
 
 import numpy as np
 
 from numba import unittest_support as unittest
 from numba.compiler import compile_isolated
-from numba import types, typeinfer, typing, jit, errors
+from numba import (bytecode, compiler, types, typeinfer, typing, jit,
+                   errors)
 from numba.typeconv import Conversion
+from numba.typing.templates import (AbstractTemplate, ConcreteTemplate,
+                                   Registry, signature)
+from numba.targets import cpu
 
 from .support import TestCase
 from .test_typeconv import CompatibilityTestMixin
@@ -437,6 +442,92 @@ class TestResolveOverload(unittest.TestCase):
                           "(int32, int32) -> int32",
                           ])
 
+    def test_template_overload_cache(self):
+        class CachedOp(ConcreteTemplate):
+            key = "cached_op"
+            cases = [i16(i16, i16), i32(i32, i32), f64(f64, f64)]
+
+        ctx = typing.Context()
+        ctx.insert_function(CachedOp(ctx))
+        sig = ctx.resolve_function_type("cached_op", (i8, i8), {})
+        self.assertIs(sig, CachedOp.cases[0])
+        self.assertEqual(len(ctx._overload_cache), 1)
+        # Cache hit
+        self.assertIs(ctx.resolve_function_type("cached_op", (i8, i8), {}),
+                      sig)
+        self.assertEqual(len(ctx._overload_cache), 1)
+        sig = ctx.resolve_function_type("cached_op", (u32, u32), {})
+        self.assertIs(sig, CachedOp.cases[2])
+        self.assertEqual(len(ctx._overload_cache), 2)
+        # Adding a template invalidates the cache
+        class OtherOp(ConcreteTemplate):
+            key = "other_op"
+            cases = [i8(i8)]
+
+        ctx.insert_function(OtherOp(ctx))
+        self.assertEqual(len(ctx._overload_cache), 0)
+        ctx.resolve_function_type("cached_op", (i8, i8), {})
+        self.assertEqual(len(ctx._overload_cache), 1)
+        # So does registering a conversion (here an existing one)
+        ctx.tm.set_compatible(i8, i16, Conversion.promote)
+        ctx.resolve_function_type("cached_op", (u32, u32), {})
+        self.assertEqual(len(ctx._overload_cache), 1)
+
+    def test_function_type_overload_cache(self):
+        class CachedOp(ConcreteTemplate):
+            key = "cached_op"
+            cases = [i16(i16, i16), i32(i32, i32)]
+
+        ctx = typing.Context()
+        fnty = types.Function(CachedOp)
+        # The template is instantiated for each call
+        sig = fnty.get_call_type(ctx, (i8, i8), {})
+        self.assertIs(sig, CachedOp.cases[0])
+        self.assertEqual(len(ctx._overload_cache), 1)
+        for i in range(3):
+            self.assertIs(fnty.get_call_type(ctx, (i8, i8), {}), sig)
+        self.assertEqual(len(ctx._overload_cache), 1)
+        # Loading the templates of another key lazily keeps the cache
+        ctx.get_function_templates("+")
+        self.assertEqual(len(ctx._overload_cache), 1)
+
+
+class TestLazyRegistries(unittest.TestCase):
+    """
+    Test that typing templates and implementations are taken from the
+    registries on demand.
+    """
+
+    def test_typing_templates(self):
+        ctx = typing.Context()
+        self.assertNotIn("+", ctx.functions)
+        sig = ctx.resolve_function_type("+", (i64, i64), {})
+        self.assertEqual(sig, i64(i64, i64))
+        self.assertIn("+", ctx.functions)
+
+    def test_install_after_lookup(self):
+        registry = Registry()
+
+        @registry.register
+        class LazyOp(AbstractTemplate):
+            key = "lazy_op"
+
+            def generic(self, args, kws):
+                return signature(i8, *args)
+
+        ctx = typing.Context()
+        self.assertIs(ctx.resolve_function_type("lazy_op", (i32,), {}), None)
+        ctx.install(registry)
+        self.assertEqual(ctx.resolve_function_type("lazy_op", (i32,), {}),
+                         i8(i32))
+
+    def test_target_implementations(self):
+        ctx = cpu.CPUContext(typing.Context())
+        self.assertNotIn(math.atan2, ctx.defns)
+        overloads = ctx.get_overloads(math.atan2)
+        self.assertTrue(overloads.versions)
+        self.assertIs(ctx.defns[math.atan2], overloads)
+
 
 class TestUnifyUseCases(unittest.TestCase):
     """
@@ -526,6 +617,23 @@ def issue_797(x0, y0, x1, y1, grid):
             y0 += sy
 
 
+def make_chain_function(n):
+    """
+    Return a function whose loop assigns each of *n* variables from the
+    next one, so that the argument's type flows backwards through the
+    statements.
+    """
+    lines = ["def f(x):"]
+    lines += ["    a%d = 0" % i for i in range(n + 1)]
+    lines.append("    for i in range(3):")
+    lines += ["        a%d = a%d" % (i, i + 1) for i in range(n)]
+    lines.append("        a%d = x" % n)
+    lines.append("    return a0")
+    ns = {}
+    exec("\n".join(lines), ns)
+    return ns['f']
+
+
 def issue_1080(a, b):
     if not a:
         return True
@@ -562,6 +670,35 @@ def list_unify_usecase2(n):
     return res
 
 
+class TestPropagate(unittest.TestCase):
+
+    def test_backward_chain(self):
+        """
+        Only constraints whose inputs changed are executed again.
+        """
+        class CountingInferer(typeinfer.TypeInferer):
+            ncopies = 0
+
+            def copy_type(self, src_var, dest_var):
+                self.ncopies += 1
+                super(CountingInferer, self).copy_type(src_var, dest_var)
+
+        n = 100
+        func = make_chain_function(n)
+        interp = compiler.translate_stage(bytecode.ByteCode(func=func))
+        infer = CountingInferer(typing.Context(), interp)
+        infer.seed_argument('x', 0, f64)
+        infer.build_constraint()
+        infer.propagate()
+        typemap, restype, calltypes = infer.unify()
+        self.assertEqual(restype, f64)
+        for i in range(n + 1):
+            self.assertEqual(typemap['a%d' % i], f64)
+        # Executing all constraints until a fixpoint would take O(n**2)
+        # copies, as each pass refines a single variable.
+        self.assertLess(infer.ncopies, 10 * n)
+
+
 class TestMiscIssues(TestCase):
 
     def test_issue_797(self):
@@ -15,6 +15,9 @@ class TypeManager(object):
     def __init__(self):
         self._ptr = _typeconv.new_type_manager()
         self._types = set()
+        # Incremented whenever a conversion is registered, so that results
+        # computed from the conversions can be invalidated
+        self.version = 0
 
     def select_overload(self, sig, overloads, allow_unsafe):
         sig = [t._code for t in sig]
@@ -31,6 +34,7 @@ class TypeManager(object):
     def set_compatible(self, fromty, toty, by):
         code = self._conversion_codes[by]
         _typeconv.set_compatible(self._ptr, fromty._code, toty._code, code)
+        self.version += 1
         # Ensure the types don't die, otherwise they may be recreated with
         # other type codes and pollute the hash table.
         self._types.add(fromty)
@@ -14,6 +14,7 @@ Constraints push types forward following the dataflow.
 
 from __future__ import print_function, division, absolute_import
 
+from collections import defaultdict, deque
 from pprint import pprint
 import itertools
 import traceback
@@ -89,36 +90,69 @@ class TypeVar(object):
 
 class ConstraintNetwork(object):
     """
-    TODO: It is possible to optimize constraint propagation to consider only
-          dirty type variables.
+    The constraints of a function, indexed by the type variables they
+    read (as returned by their get_inputs() method).  Constraints without
+    a get_inputs() method are assumed to read any variable.
     """
 
     def __init__(self):
         self.constraints = []
+        # Variable name -> constraints reading it
+        self.dependents = defaultdict(list)
+        self.unindexed = []
 
     def append(self, constraint):
         self.constraints.append(constraint)
+        get_inputs = getattr(constraint, 'get_inputs', None)
+        if get_inputs is None:
+            self.unindexed.append(constraint)
+        else:
+            for name in set(get_inputs()):
+                self.dependents[name].append(constraint)
 
     def propagate(self, typeinfer):
         """
-        Execute all constraints.  Errors are caught and returned as a list.
-        This allows progressing even though some constraints may fail
-        due to lack of information (e.g. imprecise types such as List(undefined)).
+        Execute all constraints, then execute again those whose inputs
+        changed, until a fixpoint is reached.  Since type variables can
+        only grow, this terminates.
+
+        Errors are caught and returned as a list.  This allows progressing
+        even though some constraints may fail due to lack of information
+        (e.g. imprecise types such as List(undefined)); only the errors
+        raised by the last execution of each constraint are returned.
         """
-        errors = []
-        for constraint in self.constraints:
+        errors = {}
+        worklist = deque(self.constraints)
+        queued = set(self.constraints)
+        typeinfer.pop_changed_vars()
+        while worklist:
+            constraint = worklist.popleft()
+            queued.discard(constraint)
             try:
                 constraint(typeinfer)
             except TypingError as e:
-                errors.append(e)
+                errors[constraint] = e
             except Exception:
                 msg = "Internal error at {con}:\n{sep}\n{err}{sep}\n"
                 e = TypingError(msg.format(con=constraint,
                                            err=traceback.format_exc(),
                                            sep='--%<' +'-' * 65),
                                 loc=constraint.loc)
-                errors.append(e)
-        return errors
+                errors[constraint] = e
+            else:
+                errors.pop(constraint, None)
+            changed = typeinfer.pop_changed_vars()
+            if changed:
+                for name in changed:
+                    for dep in self.dependents.get(name, ()):
+                        if dep not in queued:
+                            queued.add(dep)
+                            worklist.append(dep)
+                for dep in self.unindexed:
+                    if dep not in queued:
+                        queued.add(dep)
+                        worklist.append(dep)
+        return [errors[c] for c in self.constraints if c in errors]
 
 
 class Propagate(object):
@@ -137,6 +171,9 @@ class Propagate(object):
         # If `dst` is refined, notify us
         typeinfer.refine_map[self.dst] = self
 
+    def get_inputs(self):
+        return [self.src]
+
     def refine(self, typeinfer, target_type):
         # Do not back-propagate to locked variables (e.g. constants)
         typeinfer.add_type(self.src, target_type, unless_locked=True)
@@ -160,6 +197,9 @@ class BuildTupleConstraint(object):
                 tup = types.Tuple(vals)
             typeinfer.add_type(self.target, tup)
 
+    def get_inputs(self):
+        return [i.name for i in self.items]
+
 
 class BuildListConstraint(object):
     def __init__(self, target, items, loc):
@@ -178,6 +218,9 @@ class BuildListConstraint(object):
                 unified = typeinfer.context.unify_types(*typs)
                 typeinfer.add_type(self.target, types.List(unified))
 
+    def get_inputs(self):
+        return [i.name for i in self.items]
+
 
 class ExhaustIterConstraint(object):
     def __init__(self, target, count, iterator, loc):
@@ -202,6 +245,9 @@ class ExhaustIterConstraint(object):
                                      count=self.count)
                 typeinfer.add_type(self.target, tup)
 
+    def get_inputs(self):
+        return [self.iterator.name]
+
 
 class PairFirstConstraint(object):
     def __init__(self, target, pair, loc):
@@ -218,6 +264,9 @@ class PairFirstConstraint(object):
                 continue
             typeinfer.add_type(self.target, tp.first_type)
 
+    def get_inputs(self):
+        return [self.pair.name]
+
 
 class PairSecondConstraint(object):
     def __init__(self, target, pair, loc):
@@ -234,6 +283,9 @@ class PairSecondConstraint(object):
                 continue
             typeinfer.add_type(self.target, tp.second_type)
 
+    def get_inputs(self):
+        return [self.pair.name]
+
 
 class StaticGetItemConstraint(object):
     def __init__(self, target, value, index, loc):
@@ -249,6 +301,9 @@ class StaticGetItemConstraint(object):
             if isinstance(tp, types.BaseTuple):
                 typeinfer.add_type(self.target, tp.types[self.index])
 
+    def get_inputs(self):
+        return [self.value.name]
+
 
 class CallConstraint(object):
     """Constraint for calling functions.
@@ -269,6 +324,16 @@ class CallConstraint(object):
         fnty = typevars[self.func].getone()
         self.resolve(typeinfer, typevars, fnty)
 
+    def get_inputs(self):
+        return [self.func] + self.get_arg_inputs()
+
+    def get_arg_inputs(self):
+        names = [a.name for a in self.args]
+        names += [var.name for (kw, var) in self.kws]
+        if self.vararg is not None:
+            names.append(self.vararg.name)
+        return names
+
     def resolve(self, typeinfer, typevars, fnty):
         assert fnty
         context = typeinfer.context
@@ -323,6 +388,10 @@ class IntrinsicCallConstraint(CallConstraint):
     def __call__(self, typeinfer):
         self.resolve(typeinfer, typeinfer.typevars, fnty=self.func)
 
+    def get_inputs(self):
+        # The function is a type, not a variable
+        return self.get_arg_inputs()
+
 
 class GetAttrConstraint(object):
     def __init__(self, target, attr, value, loc, inst):
@@ -346,6 +415,9 @@ class GetAttrConstraint(object):
                 typeinfer.add_type(self.target, attrty)
         typeinfer.refine_map[self.target] = self
 
+    def get_inputs(self):
+        return [self.value.name]
+
     def refine(self, typeinfer, target_type):
         if isinstance(target_type, types.BoundFunction):
             recvr = target_type.this
@@ -378,6 +450,9 @@ class SetItemConstraint(object):
                 raise TypingError("Cannot resolve setitem: %s[%s] = %s" %
                                   (ty, it, vt), loc=self.loc)
 
+    def get_inputs(self):
+        return [self.target.name, self.index.name, self.value.name]
+
 
 class DelItemConstraint(object):
     def __init__(self, target, index, loc):
@@ -395,6 +470,9 @@ class DelItemConstraint(object):
                 raise TypingError("Cannot resolve delitem: %s[%s]" %
                                   (ty, it), loc=self.loc)
 
+    def get_inputs(self):
+        return [self.target.name, self.index.name]
+
 
 class SetAttrConstraint(object):
     def __init__(self, target, attr, value, loc):
@@ -415,6 +493,9 @@ class SetAttrConstraint(object):
                 raise TypingError("Cannot resolve setattr: (%s).%s = %s" %
                                   (ty, self.attr, vt), loc=self.loc)
 
+    def get_inputs(self):
+        return [self.target.name, self.value.name]
+
 
 class TypeVarMap(dict):
     def set_context(self, context):
@@ -460,6 +541,8 @@ class TypeInferer(object):
         self.setattrcalls = []
         # Target var -> constraint with refine hook
         self.refine_map = {}
+        # Names of the variables whose type changed, see pop_changed_vars()
+        self.changed_vars = set()
 
         if config.DEBUG or config.DEBUG_TYPEINFER:
             self.debug = TypeInferDebug(self)
@@ -494,18 +577,11 @@ class TypeInferer(object):
                 self.constrain_statement(inst)
 
     def propagate(self):
-        newtoken = self.get_state_token()
-        oldtoken = None
-        # Since the number of types are finite, the typesets will eventually
-        # stop growing.
-        while newtoken != oldtoken:
-            self.debug.propagate_started()
-            oldtoken = newtoken
-            # Errors can appear when the type set is incomplete; only
-            # raise them when there is no progress anymore.
-            errors = self.constraints.propagate(self)
-            newtoken = self.get_state_token()
-            self.debug.propagate_finished()
+        self.debug.propagate_started()
+        # Errors can appear when the type set is incomplete; only
+        # raise them when there is no progress anymore.
+        errors = self.constraints.propagate(self)
+        self.debug.propagate_finished()
         if errors:
             raise errors[0]
 
@@ -514,15 +590,32 @@ class TypeInferer(object):
         tv = self.typevars[var]
         if unless_locked and tv.locked:
             return
+        oldty = tv.type
         unified = tv.add_type(tp)
+        if unified != oldty:
+            self.changed_vars.add(var)
         self.propagate_refined_type(var, unified)
 
     def copy_type(self, src_var, dest_var):
-        unified = self.typevars[dest_var].union(self.typevars[src_var])
+        tv = self.typevars[dest_var]
+        oldty = tv.type
+        unified = tv.union(self.typevars[src_var])
+        if unified != oldty:
+            self.changed_vars.add(dest_var)
 
     def lock_type(self, var, tp):
         tv = self.typevars[var]
         tv.lock(tp)
+        self.changed_vars.add(var)
+
+    def pop_changed_vars(self):
+        """
+        Return the names of the variables whose type changed since the
+        last call, and reset them.
+        """
+        changed = self.changed_vars
+        self.changed_vars = set()
+        return changed
 
     def propagate_refined_type(self, updated_var, updated_type):
         source_constraint = self.refine_map.get(updated_var)
@@ -430,6 +430,41 @@ class NumbaFunction(Function):
         return self.fndesc.unique_name, self.sig
 
 
+class FunctionType(Function):
+    """
+    A first-class function: the native entry points of the specializations
+    of a Numba-compiled function, with signatures *sigs*, and their
+    environments.  Unlike Dispatcher, the function called isn't known at
+    compile time: a call is resolved to one of the signatures, and goes
+    through the function pointer of that specialization.
+    """
+    # The templates are shared by equal types, so that the resolution of
+    # their calls is only memoized once
+    _templates = {}
+
+    def __init__(self, sigs):
+        from . import typing
+        self.sigs = tuple(sigs)
+        try:
+            template = self._templates[self.sigs]
+        except KeyError:
+            template = typing.make_concrete_template("FunctionType",
+                                                     self.sigs, self.sigs)
+            self._templates[self.sigs] = template
+        super(FunctionType, self).__init__(template)
+
+    @property
+    def key(self):
+        return self.sigs
+
+    def get_signature_index(self, sig):
+        """
+        Return the index of the specialization called with the resolved
+        signature *sig*.
+        """
+        return [s.args for s in self.sigs].index(tuple(sig.args))
+
+
 class BoundFunction(Function):
     def __init__(self, template, this):
         self.this = this
@@ -3,6 +3,7 @@ from __future__ import print_function, division, absolute_import
 import itertools
 
 from numba import types, intrinsics
+from numba.special import prange
 from numba.utils import PYVERSION, RANGE_ITER_OBJECTS
 from numba.typing.templates import (AttributeTemplate, ConcreteTemplate,
                                     AbstractTemplate, builtin_global, builtin,
@@ -11,6 +12,9 @@ from numba.typing.templates import (AttributeTemplate, ConcreteTemplate,
 
 for obj in RANGE_ITER_OBJECTS:
     builtin_global(obj, types.range_type)
+# prange() is typed and implemented as range(); prange() loops are
+# recognized by the interpreter (see Interpreter._find_parallel_loops())
+builtin_global(prange, types.range_type)
 builtin_global(len, types.len_type)
 builtin_global(slice, types.slice_type)
 builtin_global(abs, types.abs_type)
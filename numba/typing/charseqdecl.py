@@ -0,0 +1,114 @@
+"""
+Typing declarations for fixed-width character sequences, i.e. the
+values of numpy's 'S' and 'U' record fields and scalars.
+"""
+
+from __future__ import print_function, division, absolute_import
+
+from .. import types
+from .templates import (AbstractTemplate, AttributeTemplate, Registry,
+                        signature, bound_function)
+
+
+registry = Registry()
+builtin = registry.register
+builtin_global = registry.register_global
+builtin_attr = registry.register_attr
+
+
+def _same_kind(a, b):
+    """
+    Whether *a* and *b* are character sequences of the same kind
+    (both bytes or both unicode), regardless of their widths.
+    """
+    return (isinstance(a, (types.CharSeq, types.UnicodeCharSeq))
+            and type(a) is type(b))
+
+
+class CharSeqCmpOp(AbstractTemplate):
+
+    def generic(self, args, kws):
+        assert not kws
+        if len(args) == 2 and _same_kind(*args):
+            return signature(types.boolean, *args)
+
+@builtin
+class CharSeqCmpEq(CharSeqCmpOp):
+    key = '=='
+
+@builtin
+class CharSeqCmpNe(CharSeqCmpOp):
+    key = '!='
+
+@builtin
+class CharSeqCmpLt(CharSeqCmpOp):
+    key = '<'
+
+@builtin
+class CharSeqCmpLe(CharSeqCmpOp):
+    key = '<='
+
+@builtin
+class CharSeqCmpGt(CharSeqCmpOp):
+    key = '>'
+
+@builtin
+class CharSeqCmpGe(CharSeqCmpOp):
+    key = '>='
+
+
+@builtin
+class CharSeqLen(AbstractTemplate):
+    key = types.len_type
+
+    def generic(self, args, kws):
+        assert not kws
+        (val,) = args
+        if isinstance(val, (types.CharSeq, types.UnicodeCharSeq)):
+            return signature(types.intp, val)
+
+
+class CharSeqHash(AbstractTemplate):
+    key = hash
+
+    def generic(self, args, kws):
+        assert not kws
+        (val,) = args
+        if isinstance(val, (types.CharSeq, types.UnicodeCharSeq)):
+            return signature(types.intp, val)
+
+builtin_global(hash, types.Function(CharSeqHash))
+
+
+@builtin
+class GetItemCharSeq(AbstractTemplate):
+    key = "getitem"
+
+    def generic(self, args, kws):
+        assert not kws
+        [val, idx] = args
+        if (isinstance(val, (types.CharSeq, types.UnicodeCharSeq))
+            and idx == types.slice3_type):
+            # A slice can't be longer than the original sequence,
+            # so the same width is used (padded with NULs).
+            return signature(val, val, idx)
+
+
+class CharSeqAttribute(AttributeTemplate):
+
+    @bound_function("charseq.startswith")
+    def resolve_startswith(self, ty, args, kws):
+        assert not kws
+        [prefix] = args
+        if _same_kind(ty, prefix):
+            return signature(types.boolean, prefix)
+
+
+@builtin_attr
+class BytesCharSeqAttribute(CharSeqAttribute):
+    key = types.CharSeq
+
+
+@builtin_attr
+class UnicodeCharSeqAttribute(CharSeqAttribute):
+    key = types.UnicodeCharSeq
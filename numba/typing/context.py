@@ -11,7 +11,7 @@ from .typeof import typeof, Purpose
 
 # Initialize declarations
 from . import (
-    builtins, cmathdecl, listdecl, mathdecl, npdatetime, npydecl,
+    builtins, charseqdecl, cmathdecl, listdecl, mathdecl, npdatetime, npydecl,
     operatordecl, randomdecl)
 from numba import utils
 from . import ctypes_utils, cffi_utils, bufproto
@@ -49,7 +49,16 @@ class BaseContext(object):
         self.functions = defaultdict(list)
         self.attributes = {}
         self._globals = utils.UniqueDict()
+        # Installed registries, and the keys whose templates were
+        # already instantiated from them
+        self._registries = []
+        self._resolved_functions = set()
+        self._resolved_attributes = set()
         self.tm = rules.default_type_manager
+        # Memoized results of resolve_template_overload(), valid for
+        # the type manager's version _overload_cache_version
+        self._overload_cache = {}
+        self._overload_cache_version = None
         self._load_builtins()
         self.init()
 
@@ -67,7 +76,7 @@ class BaseContext(object):
             sigs, param = func.get_call_signatures()
             defns.extend(sigs)
 
-        elif func in self.functions:
+        elif self.get_function_templates(func):
             for tpl in self.functions[func]:
                 param = param or hasattr(tpl, 'generic')
                 defns.extend(getattr(tpl, 'cases', []))
@@ -92,7 +101,7 @@ class BaseContext(object):
         Resolve function type *func* for argument types *args* and *kws*.
         A signature is returned.
         """
-        defns = self.functions[func]
+        defns = self.get_function_templates(func)
         for defn in defns:
             res = defn.apply(args, kws)
             if res is not None:
@@ -118,19 +127,18 @@ class BaseContext(object):
             assert ret
             return ret
 
-        try:
-            attrinfo = self.attributes[value]
-        except KeyError:
+        attrinfo = self.get_attribute_template(value)
+        if attrinfo is None:
             for cls in type(value).__mro__:
-                if cls in self.attributes:
-                    attrinfo = self.attributes[cls]
+                attrinfo = self.get_attribute_template(cls)
+                if attrinfo is not None:
                     break
             else:
                 if isinstance(value, types.Module):
                     attrty = self.resolve_module_constants(value, attr)
                     if attrty is not None:
                         return attrty
-                raise
+                raise KeyError(value)
 
         ret = attrinfo.resolve(value, attr)
         if ret is None:
@@ -212,13 +220,53 @@ class BaseContext(object):
         self.install(templates.builtin_registry)
 
     def install(self, registry):
-        for ftcls in registry.functions:
-            self.insert_function(ftcls(self))
-        for ftcls in registry.attributes:
-            self.insert_attributes(ftcls(self))
+        """
+        Install a *registry* (a templates.Registry instance) of typing
+        templates.  Function and attribute templates are only instantiated
+        when their key is first looked up.
+        """
+        self._registries.append(registry)
+        self._overload_cache.clear()
+        # Keys already looked up won't be looked up again
+        for key in self._resolved_functions:
+            for ftcls in registry.get_functions(key):
+                self.insert_function(ftcls(self))
+        for key in self._resolved_attributes:
+            for atcls in registry.get_attributes(key):
+                self.insert_attributes(atcls(self))
         for gv, gty in registry.globals:
             self.insert_global(gv, gty)
 
+    def get_function_templates(self, key):
+        """
+        Return the list of function templates for *key*, instantiating
+        those of the installed registries on first use.
+        """
+        if key not in self._resolved_functions:
+            self._resolved_functions.add(key)
+            # Registry templates come before any inserted directly
+            inserted = self.functions.pop(key, [])
+            # Unlike insert_function(), don't clear the overload cache:
+            # the memoized resolutions only depend on each template's cases
+            templates = self.functions[key]
+            for registry in self._registries:
+                for ftcls in registry.get_functions(key):
+                    templates.append(ftcls(self))
+            templates.extend(inserted)
+        return self.functions[key]
+
+    def get_attribute_template(self, key):
+        """
+        Return the attribute template for *key*, or None if there is none.
+        Templates of the installed registries are instantiated on first use.
+        """
+        if key not in self._resolved_attributes:
+            self._resolved_attributes.add(key)
+            for registry in self._registries:
+                for atcls in registry.get_attributes(key):
+                    self.insert_attributes(atcls(self))
+        return self.attributes.get(key)
+
     def _lookup_global(self, gv):
         """
         Look up the registered type for global value *gv*.
@@ -253,6 +301,7 @@ class BaseContext(object):
     def insert_function(self, ft):
         key = ft.key
         self.functions[key].append(ft)
+        self._overload_cache.clear()
 
     def insert_overloaded(self, overloaded):
         self._insert_global(overloaded, types.Dispatcher(overloaded))
@@ -268,6 +317,7 @@ class BaseContext(object):
             function template
         """
         self._insert_global(fn, types.Function(ft))
+        self._overload_cache.clear()
 
     def can_convert(self, fromty, toty):
         """
@@ -380,6 +430,24 @@ class BaseContext(object):
             #  and you call it with (int16, int16) arguments)
             return best
 
+    def resolve_template_overload(self, template, cases, args, kws):
+        """
+        Like resolve_overload(), for the fixed *cases* of function
+        *template*.  The results are memoized by template class (templates
+        are instantiated anew by types.Function), argument types and
+        keyword names, until templates or type conversions are added.
+        """
+        if self._overload_cache_version != self.tm.version:
+            self._overload_cache.clear()
+            self._overload_cache_version = self.tm.version
+        cache_key = type(template), tuple(args), tuple(sorted(kws))
+        try:
+            return self._overload_cache[cache_key]
+        except KeyError:
+            selected = self.resolve_overload(template.key, cases, args, kws)
+            self._overload_cache[cache_key] = selected
+            return selected
+
     def unify_types(self, *typelist):
         # Sort the type list according to bit width before doing
         # pairwise unification (with thanks to aterrel).
@@ -429,6 +497,7 @@ class BaseContext(object):
 
 class Context(BaseContext):
     def init(self):
+        self.install(charseqdecl.registry)
         self.install(cmathdecl.registry)
         self.install(listdecl.registry)
         self.install(mathdecl.registry)
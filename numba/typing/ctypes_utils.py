@@ -41,6 +41,22 @@ def convert_ctypes(ctypeobj):
         raise TypeError("unhandled ctypes type: %s" % ctypeobj)
 
 
+_FROM_NUMBA_MAP = dict((v, k) for k, v in CTYPES_MAP.items())
+
+
+def to_ctypes(ty):
+    """
+    Convert the Numba type *ty* to a ctypes type (the reverse of
+    convert_ctypes()).
+    """
+    if isinstance(ty, types.CPointer):
+        return ctypes.POINTER(to_ctypes(ty.dtype))
+    try:
+        return _FROM_NUMBA_MAP[ty]
+    except KeyError:
+        raise TypeError("cannot convert Numba type %s to ctypes type" % (ty,))
+
+
 def is_ctypes_funcptr(obj):
     try:
         # Is it something of which we can get the address
@@ -259,3 +259,58 @@ class DatetimeCmpGt(DatetimeCmpOp):
 @builtin
 class DatetimeCmpGE(DatetimeCmpOp):
     key = '>='
+
+
+# Calendar fields and rounding, on scalars and arrays
+
+class DatetimeFieldTemplate(AbstractTemplate):
+
+    def generic(self, args, kws):
+        assert not kws
+        if len(args) != 1:
+            return
+        [val] = args
+        if isinstance(val, types.Array):
+            dt = val.dtype
+            restype = types.Array(types.int64, val.ndim, 'C')
+        else:
+            dt = val
+            restype = types.int64
+        if (isinstance(dt, types.NPDatetime)
+            and npdatetime.can_extract_fields(dt.unit)):
+            return signature(restype, val)
+
+for _func in npdatetime.DATETIME_FIELDS:
+    _cls = type('Datetime_%s' % _func.__name__, (DatetimeFieldTemplate,),
+                dict(key=_func))
+    builtin_global(_func, types.Function(_cls))
+
+
+class DatetimeRoundTemplate(AbstractTemplate):
+
+    def generic(self, args, kws):
+        assert not kws
+        if len(args) != 2:
+            return
+        val, freq = args
+        dt = val.dtype if isinstance(val, types.Array) else val
+        if not (isinstance(dt, types.NPDatetime)
+                and isinstance(freq, types.NPTimedelta)):
+            return
+        unit = npdatetime.get_rounding_unit(dt.unit, freq.unit)
+        if unit is None:
+            return
+        if isinstance(val, types.Array):
+            restype = types.Array(types.NPDatetime(unit), val.ndim, 'C')
+        else:
+            restype = types.NPDatetime(unit)
+        return signature(restype, val, freq)
+
+class DatetimeFloor(DatetimeRoundTemplate):
+    key = npdatetime.floor
+
+class DatetimeCeil(DatetimeRoundTemplate):
+    key = npdatetime.ceil
+
+builtin_global(npdatetime.floor, types.Function(DatetimeFloor))
+builtin_global(npdatetime.ceil, types.Function(DatetimeCeil))
@@ -3,6 +3,7 @@ Define typing templates
 """
 from __future__ import print_function, division, absolute_import
 
+from collections import defaultdict
 import functools
 from functools import reduce
 import operator
@@ -237,7 +238,8 @@ class ConcreteTemplate(FunctionTemplate):
     def apply(self, args, kws):
         cases = getattr(self, 'cases')
         assert cases
-        return self._select(cases, args, kws)
+        # The cases don't depend on the arguments: memoize the selection
+        return self.context.resolve_template_overload(self, cases, args, kws)
 
 
 class AttributeTemplate(object):
@@ -308,17 +310,37 @@ class Registry(object):
         self.functions = []
         self.attributes = []
         self.globals = []
+        # Indices of the above by template key, for typing contexts
+        # instantiating templates on demand
+        self._functions_by_key = defaultdict(list)
+        self._attributes_by_key = defaultdict(list)
 
     def register(self, item):
         assert issubclass(item, FunctionTemplate)
         self.functions.append(item)
+        self._functions_by_key[item.key].append(item)
         return item
 
     def register_attr(self, item):
         assert issubclass(item, AttributeTemplate)
         self.attributes.append(item)
+        self._attributes_by_key[item.key].append(item)
         return item
 
+    def get_functions(self, key):
+        """
+        Return the function template classes for *key*, in registration
+        order.
+        """
+        return self._functions_by_key.get(key, ())
+
+    def get_attributes(self, key):
+        """
+        Return the attribute template classes for *key*, in registration
+        order.
+        """
+        return self._attributes_by_key.get(key, ())
+
     def register_global(self, v, t):
         self.globals.append((v, t))
 
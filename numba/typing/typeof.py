@@ -63,6 +63,20 @@ def _typeof_buffer(val, c):
                           readonly=m.readonly)
 
 
+def _typeof_dispatcher(val, c):
+    """
+    Type a dispatcher passed as an argument as a first-class function
+    over its nopython specializations, if it has any.  This is registered
+    for the dispatcher classes by numba.dispatcher.
+    """
+    if c.purpose != Purpose.argument:
+        # Called dispatchers are resolved at compile time
+        return
+    sigs = val.nopython_signatures
+    if sigs:
+        return types.FunctionType(sigs)
+
+
 @typeof_impl.register(bool)
 def _typeof_bool(val, c):
     return types.boolean
@@ -119,9 +119,12 @@ def shutting_down(globals=globals):
 
 class ConfigOptions(object):
     OPTIONS = ()
+    # Options holding a value, mapped to their default value
+    VALUE_OPTIONS = {}
 
     def __init__(self):
         self._enabled = set()
+        self._values = {}
 
     def set(self, name):
         if name not in self.OPTIONS:
@@ -133,27 +136,40 @@ class ConfigOptions(object):
             raise NameError("Invalid flag: %s" % name)
         self._enabled.discard(name)
 
+    def set_value(self, name, value):
+        if name not in self.VALUE_OPTIONS:
+            raise NameError("Invalid option: %s" % name)
+        self._values[name] = value
+
     def __getattr__(self, name):
+        if name in self.VALUE_OPTIONS:
+            return self._values.get(name, self.VALUE_OPTIONS[name])
         if name not in self.OPTIONS:
             raise NameError("Invalid flag: %s" % name)
         return name in self._enabled
 
     def __repr__(self):
-        return "Flags(%s)" % ', '.join(str(x) for x in self._enabled)
+        items = [str(x) for x in self._enabled]
+        items += ["%s=%r" % item for item in sorted(self._values.items())]
+        return "Flags(%s)" % ', '.join(items)
 
     def copy(self):
         copy = type(self)()
         copy._enabled = set(self._enabled)
+        copy._values = dict(self._values)
         return copy
 
     def __eq__(self, other):
-        return isinstance(other, ConfigOptions) and other._enabled == self._enabled
+        return (isinstance(other, ConfigOptions)
+                and other._enabled == self._enabled
+                and other._values == self._values)
 
     def __ne__(self, other):
         return not self == other
 
     def __hash__(self):
-        return hash(tuple(sorted(self._enabled)))
+        return hash((tuple(sorted(self._enabled)),
+                     tuple(sorted(self._values.items()))))
 
 
 class SortedMap(collections.Mapping):
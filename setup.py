@@ -79,6 +79,7 @@ ext_helperlib = Extension(name="numba._helperlib",
                           extra_link_args=install_name_tool_fixer,
                           depends=["numba/_pymodule.h",
                                    "numba/_math_c99.h",
+                                   "numba/_cpufeatures.h",
                                    "numba/mathnames.inc"])
 
 ext_typeconv = Extension(name="numba.typeconv._typeconv",
@@ -160,6 +161,10 @@ setup(name='numba',
         "numba.cuda.tests.cudadrv.data": ["*.ptx"],
         "numba.annotations": ["*.html"],
         "numba.hsa.tests.hsadrv": ["*.brig"],
+        # C sources compiled into the modules built by pycc
+        "numba": ["*.c", "*.h", "*.inc"],
+        "numba.runtime": ["*.c", "*.h"],
+        "numba.pycc": ["*.c"],
       },
       scripts=["numba/pycc/pycc", "bin/numba"],
       author="Continuum Analytics, Inc.",